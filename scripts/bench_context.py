@@ -0,0 +1,126 @@
+"""Benchmarks per-turn prompt size over long sessions with context windowing.
+
+Drives one long session through ``Runner`` on the offline ``FakeLlm`` (which
+reports estimated prompt tokens) twice: sending the full history, and with
+``greeting_agent.context_window.ContextWindow``. With windowing the prompt
+size must stay flat; the script exits non-zero if any windowed turn exceeds
+the budget plus the system instruction.
+
+Usage:
+  python scripts/bench_context.py --turns 150 --budget 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.context_window import ContextWindow  # noqa: E402
+from greeting_agent.context_window import estimate_tokens  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.instrumentation import Instrumentation  # noqa: E402
+
+_HOBBIES = ("painting", "running", "k-dramas", "chess", "gardening", "surfing")
+
+
+def _message(turn: int) -> types.Content:
+  hobby = _HOBBIES[turn % len(_HOBBIES)]
+  text = (
+      f"Turn {turn}: tell me another fun fact about {hobby}, and remind me "
+      "what we talked about before, including the funniest line so far."
+  )
+  return types.Content(role="user", parts=[types.Part.from_text(text=text)])
+
+
+async def _session(turns: int, window: Optional[ContextWindow]) -> Dict[str, Any]:
+  metrics = Instrumentation(source="bench")
+  agent = create_greeting_agent(
+      model=FakeLlm(), instrumentation=metrics, context_window=window
+  )
+  runner = Runner(
+      app_name="bench_context",
+      agent=agent,
+      session_service=InMemorySessionService(),
+  )
+  session = await runner.session_service.create_session(
+      app_name="bench_context", user_id="bench"
+  )
+  latencies: List[float] = []
+  for turn in range(turns):
+    start = time.perf_counter()
+    async for _ in runner.run_async(
+        user_id="bench", session_id=session.id, new_message=_message(turn)
+    ):
+      pass
+    latencies.append(time.perf_counter() - start)
+  return {
+      "prompt_tokens": [float(r.prompt_tokens) for r in metrics.records],
+      "latency": latencies,
+      "instruction_tokens": estimate_tokens(agent.instruction),
+  }
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument(
+      "--turns",
+      type=int,
+      default=120,
+      help="Turns in the session (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--budget",
+      type=int,
+      default=1_000,
+      help="ContextWindow token budget (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  full = asyncio.run(_session(args.turns, None))
+  windowed = asyncio.run(_session(args.turns, ContextWindow(args.budget)))
+
+  checkpoints = sorted({1, 10, 25, 50, 100, args.turns} & set(range(1, args.turns + 1)))
+  print(f"{'Turn':>6}  {'full history':>12}  {'windowed':>9}   (estimated prompt tokens)")
+  for turn in checkpoints:
+    print(
+        f"{turn:>6}  {full['prompt_tokens'][turn - 1]:>12.0f}"
+        f"  {windowed['prompt_tokens'][turn - 1]:>9.0f}"
+    )
+  tail = max(1, args.turns // 10)
+  for name, result in (("full", full), ("windowed", windowed)):
+    print(
+        f"{name:<9} last {tail} turns: {statistics.mean(result['prompt_tokens'][-tail:]):.0f}"
+        f" tokens, median latency {statistics.median(result['latency']) * 1000:.2f} ms"
+    )
+
+  # The summary lives in the system instruction, inside the budget; the
+  # slack covers the summary header and ADK's agent identity preamble.
+  bound = args.budget + windowed["instruction_tokens"] + 100
+  peak = max(windowed["prompt_tokens"])
+  if peak > bound:
+    print(f"FAIL: windowed prompt reached {peak:.0f} tokens (bound {bound:.0f})")
+    return 1
+  print(f"OK: windowed prompt stayed within {bound:.0f} tokens (peak {peak:.0f})")
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
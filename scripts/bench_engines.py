@@ -0,0 +1,93 @@
+"""Startup-time benchmark comparing the pytest and native evalset engines.
+
+Runs ``execute_evalsets`` in a fresh interpreter per sample against the
+offline ``scripts.fake_agent`` so only engine overhead and local scoring are
+measured. Evalset pass/fail is irrelevant here and exit codes are ignored.
+
+Usage:
+  python scripts/bench_engines.py --repeat 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+DEFAULT_EVALSET = SRC_ROOT / "greeting_agent" / "evalset47fcf6.evalset.json"
+ENGINES = ("pytest", "native")
+
+
+def _run_once(engine: str, evalset: Path) -> float:
+  env = dict(os.environ)
+  env["PYTHONPATH"] = os.pathsep.join(
+      filter(None, [str(REPO_ROOT), str(SRC_ROOT), env.get("PYTHONPATH")])
+  )
+  env.setdefault("FAKE_LLM_LATENCY", "0")
+  command = [
+      sys.executable,
+      "-m",
+      "greeting_agent.execute_evalsets",
+      "--engine",
+      engine,
+      "--agent-module",
+      "scripts.fake_agent",
+      "--num-runs",
+      "1",
+      str(evalset),
+  ]
+  start = time.perf_counter()
+  subprocess.run(
+      command,
+      env=env,
+      cwd=REPO_ROOT,
+      stdout=subprocess.DEVNULL,
+      stderr=subprocess.DEVNULL,
+      check=False,
+  )
+  return time.perf_counter() - start
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--evalset", type=Path, default=DEFAULT_EVALSET)
+  parser.add_argument(
+      "--repeat",
+      type=int,
+      default=5,
+      help="Samples per engine (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  samples: Dict[str, List[float]] = {engine: [] for engine in ENGINES}
+  # Interleave engines so drift in machine load affects both equally.
+  for _ in range(args.repeat):
+    for engine in ENGINES:
+      samples[engine].append(_run_once(engine, args.evalset))
+
+  print(f"{'Engine':<8}  {'min (s)':>8}  {'median (s)':>10}  {'max (s)':>8}")
+  for engine in ENGINES:
+    values = samples[engine]
+    print(
+        f"{engine:<8}  {min(values):>8.3f}  {statistics.median(values):>10.3f}"
+        f"  {max(values):>8.3f}"
+    )
+  speedup = statistics.median(samples["pytest"]) / statistics.median(
+      samples["native"]
+  )
+  print(f"\nnative is {speedup:.2f}x the speed of pytest (median wall time)")
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,92 @@
+"""Benchmarks evalset file size and load time for each serialization format.
+
+The bundled ``evalset47fcf6.evalset.json`` is replicated to ``--cases`` eval
+cases, written in every format from ``greeting_agent.evalset_io`` and loaded
+back with ``load_evalset``.
+
+Usage:
+  python scripts/bench_evalset_format.py --cases 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from greeting_agent.evalset_io import EVALSET_FORMATS  # noqa: E402
+from greeting_agent.evalset_io import evalset_path  # noqa: E402
+from greeting_agent.evalset_io import load_evalset  # noqa: E402
+from greeting_agent.evalset_io import write_evalset  # noqa: E402
+
+DEFAULT_EVALSET = SRC_ROOT / "greeting_agent" / "evalset47fcf6.evalset.json"
+
+
+def _scaled_payload(source: Path, cases: int) -> Dict[str, Any]:
+  payload = json.loads(source.read_text(encoding="utf-8"))
+  templates = payload["eval_cases"]
+  scaled = []
+  for index in range(cases):
+    case = copy.deepcopy(templates[index % len(templates)])
+    case["eval_id"] = f"{case['eval_id']}_{index}"
+    scaled.append(case)
+  payload["eval_cases"] = scaled
+  return payload
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--evalset", type=Path, default=DEFAULT_EVALSET)
+  parser.add_argument(
+      "--cases",
+      type=int,
+      default=10_000,
+      help="Eval cases in the synthetic evalset (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--repeat",
+      type=int,
+      default=3,
+      help="Load samples per format (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  payload = _scaled_payload(args.evalset, args.cases)
+
+  print(f"{args.cases} eval cases")
+  print(f"{'Format':<8}  {'size (KiB)':>11}  {'vs json':>8}  {'load (ms)':>10}")
+  baseline_size: Optional[int] = None
+  with tempfile.TemporaryDirectory() as tmp:
+    for fmt in EVALSET_FORMATS:
+      path = write_evalset(payload, evalset_path(Path(tmp), f"bench_{fmt}", fmt), fmt)
+      size = path.stat().st_size
+      baseline_size = baseline_size or size
+      timings = []
+      for _ in range(args.repeat):
+        start = time.perf_counter()
+        loaded = load_evalset(path)
+        timings.append(time.perf_counter() - start)
+        assert len(loaded["eval_cases"]) == args.cases
+      print(
+          f"{fmt:<8}  {size / 1024:>11.1f}  {size / baseline_size:>7.2f}x"
+          f"  {statistics.median(timings) * 1000:>10.1f}"
+      )
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,138 @@
+"""Microbenchmarks per-event text extraction and reply accumulation.
+
+A reply of ``--chars`` characters is streamed as ``--chunks`` partial
+``Event`` objects plus the final event, as the runner yields them with SSE
+streaming. Each extractor is timed over the whole stream and reported in
+nanoseconds per event:
+
+* ``model_dump walk``: the previous ``generate_evalset`` extractor, which
+  dumped every event to a dict and searched it.
+* ``join per event``: the previous cli helper, building a list and joining
+  the parts of every event, then joining the buffered chunks.
+* ``event_text``: the typed path of ``greeting_agent.event_text``.
+* ``TurnText``: ``event_text`` plus incremental accumulation of the reply.
+
+Usage:
+  python scripts/bench_event_text.py --chars 4000 --chunks 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from google.adk.events import Event  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent.event_text import TurnText  # noqa: E402
+from greeting_agent.event_text import event_text  # noqa: E402
+
+
+def _stream(chars: int, chunks: int) -> List[Event]:
+  reply = ("Brushes whisper colour across the morning canvas. " * (chars // 50 + 1))[:chars]
+  size = max(1, len(reply) // chunks)
+  pieces = [reply[i : i + size] for i in range(0, len(reply), size)]
+  events = [
+      Event(
+          author="greeting_agent",
+          partial=True,
+          content=types.Content(role="model", parts=[types.Part(text=piece)]),
+      )
+      for piece in pieces
+  ]
+  events.append(
+      Event(
+          author="greeting_agent",
+          content=types.Content(role="model", parts=[types.Part(text=reply)]),
+      )
+  )
+  return events
+
+
+def _legacy_dump_walk(event: Any) -> Optional[str]:
+  # Shape of the removed generate_evalset._extract_assistant_text hot path.
+  data = event.model_dump()
+  for part in (data.get("content") or {}).get("parts") or []:
+    text = part.get("text")
+    if isinstance(text, str) and text.strip():
+      return text
+  return None
+
+
+def _legacy_join(events: Sequence[Event]) -> List[str]:
+  replies = []
+  buffer: List[str] = []
+  for event in events:
+    parts = event.content.parts if event.content else None
+    if not parts:
+      continue
+    texts = [part.text for part in parts if getattr(part, "text", None)]
+    buffer.append(" ".join(filter(None, texts)))
+    if event.partial:
+      continue
+    replies.append(" ".join(buffer))
+    buffer.clear()
+  return replies
+
+
+def _turn_text(events: Sequence[Event]) -> List[str]:
+  turn = TurnText()
+  return [reply for reply in map(turn.add, events) if reply]
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument(
+      "--chars",
+      type=int,
+      default=4_000,
+      help="Characters in the streamed reply (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--chunks",
+      type=int,
+      default=200,
+      help="Partial events the reply is split into (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--repeat",
+      type=int,
+      default=5,
+      help="Timing repetitions; the best is reported (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  events = _stream(args.chars, args.chunks)
+  final_text = event_text(events[-1])
+  if _turn_text(events) != [final_text]:
+    print("FAIL: TurnText did not reproduce the final reply")
+    return 1
+
+  candidates: Dict[str, Callable[[], Any]] = {
+      "model_dump walk": lambda: [_legacy_dump_walk(e) for e in events],
+      "join per event": lambda: _legacy_join(events),
+      "event_text": lambda: [event_text(e) for e in events],
+      "TurnText": lambda: _turn_text(events),
+  }
+  print(f"{len(events)} events, {args.chars} characters per reply")
+  print(f"{'Extractor':<16}  {'ns/event':>10}")
+  for name, run in candidates.items():
+    number = max(1, 20_000 // len(events))
+    best = min(timeit.repeat(run, number=number, repeat=args.repeat))
+    print(f"{name:<16}  {best / number / len(events) * 1e9:>10.0f}")
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
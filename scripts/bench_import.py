@@ -0,0 +1,125 @@
+"""Measures package import time with ``python -X importtime``.
+
+Each module is imported in a fresh interpreter; the cumulative time of its
+own row in the ``-X importtime`` report is the import cost. The script exits
+non-zero when a module exceeds ``--max-ms`` or drags in a module listed in
+``--forbid`` (by default the ADK/GenAI runtime, which ``greeting_agent``
+only loads on first use of ``root_agent`` or ``run_cli``).
+
+Usage:
+  python scripts/bench_import.py --max-ms 50
+  python scripts/bench_import.py --module greeting_agent.evalset_io --top 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+
+DEFAULT_MODULES = ("greeting_agent",)
+DEFAULT_FORBIDDEN = ("google.adk", "google.genai")
+
+
+def _import_times(module: str) -> Dict[str, Tuple[int, int]]:
+  """Returns ``{module: (self_us, cumulative_us)}`` for one fresh import."""
+  env = dict(os.environ)
+  env["PYTHONPATH"] = os.pathsep.join(
+      path for path in (str(SRC_ROOT), env.get("PYTHONPATH", "")) if path
+  )
+  completed = subprocess.run(
+      [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+      capture_output=True,
+      text=True,
+      env=env,
+      check=False,
+  )
+  if completed.returncode != 0:
+    raise RuntimeError(f"import {module} failed:\n{completed.stderr}")
+  times: Dict[str, Tuple[int, int]] = {}
+  for line in completed.stderr.splitlines():
+    if not line.startswith("import time:") or "[us]" in line:
+      continue
+    self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+    times[name.strip()] = (int(self_us), int(cumulative_us))
+  return times
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument(
+      "--module",
+      dest="modules",
+      action="append",
+      default=None,
+      help="Module to import (repeatable; default: greeting_agent)",
+  )
+  parser.add_argument(
+      "--repeat",
+      type=int,
+      default=5,
+      help="Fresh interpreters per module (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--max-ms",
+      type=float,
+      default=None,
+      help="Fail when the median cumulative import time exceeds this",
+  )
+  parser.add_argument(
+      "--forbid",
+      action="append",
+      default=None,
+      help="Fail when this module (or a submodule) gets imported "
+      "(repeatable; default: google.adk, google.genai)",
+  )
+  parser.add_argument(
+      "--top",
+      type=int,
+      default=5,
+      help="Show the slowest imports by self time (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  modules = args.modules or list(DEFAULT_MODULES)
+  forbidden = args.forbid if args.forbid is not None else list(DEFAULT_FORBIDDEN)
+
+  failures: List[str] = []
+  for module in modules:
+    samples = [_import_times(module) for _ in range(max(1, args.repeat))]
+    cumulative_ms = statistics.median(
+        sample.get(module, (0, 0))[1] / 1000 for sample in samples
+    )
+    print(f"{module}: {cumulative_ms:.1f} ms (median of {len(samples)})")
+
+    last = samples[-1]
+    slowest = sorted(last.items(), key=lambda item: item[1][0], reverse=True)
+    for name, (self_us, _) in slowest[: args.top]:
+      print(f"  {self_us / 1000:>8.1f} ms  {name}")
+
+    if args.max_ms is not None and cumulative_ms > args.max_ms:
+      failures.append(f"{module} took {cumulative_ms:.1f} ms (> {args.max_ms} ms)")
+    for prefix in forbidden:
+      pulled = sorted(
+          name for name in last if name == prefix or name.startswith(prefix + ".")
+      )
+      if pulled:
+        failures.append(f"{module} imports {prefix} ({len(pulled)} modules)")
+
+  for failure in failures:
+    print(f"FAIL: {failure}")
+  return 1 if failures else 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
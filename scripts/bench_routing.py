@@ -0,0 +1,119 @@
+"""Exercises RoutingLlm hedging and fallback with scripted stub models.
+
+A primary ``FakeLlm`` answers quickly except for every ``--slow-every``-th
+call, which stalls for ``--stall`` seconds; a backup answers in a steady
+``--backup-latency``. The same request stream is sent to the primary alone,
+to ``RoutingLlm`` with hedging, and to ``RoutingLlm`` with a failing primary
+to show fallback. Latency percentiles are printed per configuration.
+
+Usage:
+  python scripts/bench_routing.py --requests 200 --hedge-after 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from google.adk.models import BaseLlm  # noqa: E402
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.instrumentation import percentile  # noqa: E402
+from greeting_agent.routing_llm import RoutingLlm  # noqa: E402
+
+
+def _request() -> LlmRequest:
+  return LlmRequest(
+      contents=[types.Content(role="user", parts=[types.Part.from_text(text="painting")])]
+  )
+
+
+async def _drive(llm: BaseLlm, requests: int, concurrency: int) -> Dict[str, Any]:
+  latencies: List[float] = []
+  errors = 0
+  semaphore = asyncio.Semaphore(concurrency)
+
+  async def one() -> None:
+    nonlocal errors
+    async with semaphore:
+      start = time.perf_counter()
+      try:
+        async for _ in llm.generate_content_async(_request()):
+          pass
+      except Exception:  # noqa: BLE001 - counted, not raised
+        errors += 1
+        return
+      latencies.append(time.perf_counter() - start)
+
+  await asyncio.gather(*(one() for _ in range(requests)))
+  return {"latencies": latencies, "errors": errors}
+
+
+def _primary(args: argparse.Namespace, **kwargs: Any) -> FakeLlm:
+  script = [args.primary_latency] * (args.slow_every - 1) + [args.stall]
+  return FakeLlm(model="fake-primary", latencies=script, **kwargs)
+
+
+def _backup(args: argparse.Namespace) -> FakeLlm:
+  return FakeLlm(model="fake-backup", latency=args.backup_latency)
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--requests", type=int, default=200)
+  parser.add_argument("--concurrency", type=int, default=20)
+  parser.add_argument("--primary-latency", type=float, default=0.05)
+  parser.add_argument("--backup-latency", type=float, default=0.08)
+  parser.add_argument("--slow-every", type=int, default=10)
+  parser.add_argument("--stall", type=float, default=2.0)
+  parser.add_argument("--hedge-after", type=float, default=0.2)
+  parser.add_argument("--error-rate", type=float, default=0.3)
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  configurations = {
+      "primary only": _primary(args),
+      "hedged": RoutingLlm(
+          routes={"default": [_primary(args), _backup(args)]},
+          hedge_after=args.hedge_after,
+      ),
+      "fallback": RoutingLlm(
+          routes={"default": [_primary(args, error_rate=args.error_rate), _backup(args)]},
+          hedge_after=args.hedge_after,
+          cooldown=0.0,
+      ),
+  }
+
+  print(f"{'Configuration':<14}  {'ok':>5}  {'errors':>6}  {'p50 ms':>8}  {'p95 ms':>8}  {'max ms':>8}")
+  for name, llm in configurations.items():
+    result = asyncio.run(_drive(llm, args.requests, args.concurrency))
+    latencies = result["latencies"]
+    cells = [
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 95) * 1000,
+        max(latencies) * 1000,
+    ] if latencies else [float("nan")] * 3
+    print(
+        f"{name:<14}  {len(latencies):>5}  {result['errors']:>6}"
+        + "".join(f"  {cell:>8.1f}" for cell in cells)
+    )
+    if isinstance(llm, RoutingLlm):
+      print(f"{'':<14}  {llm.stats()}")
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
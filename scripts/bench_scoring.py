@@ -0,0 +1,144 @@
+"""Benchmarks batched ROUGE-1 response matching against per-pair scoring.
+
+Reference responses come from the bundled evalset; candidates are seeded
+word-level mutations of them (dropped, repeated and swapped words), giving
+``--pairs`` (reference, candidate) pairs. They are scored:
+
+* per pair, the way ``AgentEvaluator`` does: ``rouge_score.RougeScorer``
+  when installed, else tokenizing both texts and intersecting ``Counter``s;
+* with ``greeting_agent.scoring.ProfileTable``: every text tokenized once,
+  then all pairs scored in one batched call (NumPy when installed).
+
+The script exits non-zero if any batched score differs from the per-pair
+score by more than ``--tolerance``.
+
+Usage:
+  python scripts/bench_scoring.py --pairs 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from greeting_agent import scoring  # noqa: E402
+from greeting_agent.event_text import content_text  # noqa: E402
+
+DEFAULT_EVALSET = SRC_ROOT / "greeting_agent" / "evalset47fcf6.evalset.json"
+
+
+def _references(path: Path) -> List[str]:
+  payload = json.loads(path.read_text(encoding="utf-8"))
+  return [
+      content_text(invocation.get("final_response"), "\n")
+      for case in payload["eval_cases"]
+      for invocation in case["conversation"]
+  ]
+
+
+def _mutate(text: str, rng: random.Random) -> str:
+  words = text.split()
+  out = []
+  for word in words:
+    roll = rng.random()
+    if roll < 0.1:
+      continue
+    out.append(word)
+    if roll > 0.95:
+      out.append(word)
+  if len(out) > 2 and rng.random() < 0.5:
+    i = rng.randrange(len(out) - 1)
+    out[i], out[i + 1] = out[i + 1], out[i]
+  return " ".join(out)
+
+
+def _pairs(references: Sequence[str], count: int, seed: int) -> List[Tuple[str, str]]:
+  rng = random.Random(seed)
+  return [
+      (reference, _mutate(reference, rng))
+      for reference in (references[i % len(references)] for i in range(count))
+  ]
+
+
+def _per_pair_scorer() -> Tuple[str, Callable[[str, str], float]]:
+  try:
+    from rouge_score import rouge_scorer
+  except ImportError:
+    tokenize = scoring.default_tokenizer()
+
+    def score(reference: str, candidate: str) -> float:
+      return scoring.rouge1_f(Counter(tokenize(candidate)), Counter(tokenize(reference)))
+
+    return "Counter per pair", score
+  scorer = rouge_scorer.RougeScorer(["rouge1"], use_stemmer=True)
+  return "rouge_score per pair", lambda reference, candidate: scorer.score(
+      target=reference, prediction=candidate
+  )["rouge1"].fmeasure
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--evalset", type=Path, default=DEFAULT_EVALSET)
+  parser.add_argument(
+      "--pairs",
+      type=int,
+      default=20_000,
+      help="Response pairs scored (default: %(default)s)",
+  )
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument(
+      "--tolerance",
+      type=float,
+      default=1e-9,
+      help="Largest accepted score difference (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  pairs = _pairs(_references(args.evalset), args.pairs, args.seed)
+
+  name, per_pair = _per_pair_scorer()
+  start = time.perf_counter()
+  expected = [per_pair(reference, candidate) for reference, candidate in pairs]
+  baseline = time.perf_counter() - start
+
+  table = scoring.ProfileTable()
+  start = time.perf_counter()
+  reference_rows = [table.row(reference) for reference, _ in pairs]
+  candidate_rows = [table.row(candidate) for _, candidate in pairs]
+  tokenized = time.perf_counter() - start
+  start = time.perf_counter()
+  batched = table.rouge1(candidate_rows, reference_rows)
+  scored = time.perf_counter() - start
+
+  engine = "NumPy" if scoring.np is not None else "pure Python"
+  print(f"{len(pairs)} pairs, {len(table)} distinct texts, batched engine: {engine}")
+  print(f"{name:<22}  {baseline * 1000:>9.1f} ms")
+  print(f"{'tokenize once':<22}  {tokenized * 1000:>9.1f} ms")
+  print(f"{'batched score':<22}  {scored * 1000:>9.1f} ms")
+  print(f"speedup: {baseline / (tokenized + scored):.1f}x end to end,"
+        f" {baseline / scored:.1f}x with cached profiles")
+
+  worst = max(abs(a - b) for a, b in zip(expected, batched))
+  if worst > args.tolerance:
+    print(f"FAIL: scores differ by up to {worst:.3g}")
+    return 1
+  print(f"OK: scores match within {args.tolerance:g} (max difference {worst:.3g})")
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,130 @@
+"""Throughput test for the asyncio server against the offline FakeLlm.
+
+Starts ``GreetingServer`` in-process on an ephemeral port and drives it with
+``--sessions`` concurrent keep-alive clients, each sending ``--turns``
+messages in order. Reports requests/sec, latency percentiles and whether
+every session saw its replies in order.
+
+Usage:
+  python scripts/bench_server.py --sessions 1000 --turns 3 --latency 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.instrumentation import percentile  # noqa: E402
+from greeting_agent.server import GreetingServer  # noqa: E402
+
+
+async def _post(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    path: str,
+    payload: dict,
+) -> Tuple[int, dict]:
+  body = json.dumps(payload).encode("utf-8")
+  writer.write(
+      (
+          f"POST {path} HTTP/1.1\r\nHost: bench\r\n"
+          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n"
+      ).encode("latin-1")
+      + body
+  )
+  await writer.drain()
+  status = int((await reader.readline()).split()[1])
+  length = 0
+  while True:
+    line = await reader.readline()
+    if line in (b"\r\n", b""):
+      break
+    name, _, value = line.decode("latin-1").partition(":")
+    if name.lower() == "content-length":
+      length = int(value)
+  return status, json.loads(await reader.readexactly(length))
+
+
+async def _client(
+    port: int, session: int, turns: int, latencies: List[float]
+) -> Tuple[int, bool]:
+  reader, writer = await asyncio.open_connection("127.0.0.1", port)
+  responses = FakeLlm().responses
+  errors = 0
+  ordered = True
+  try:
+    for turn in range(turns):
+      start = time.perf_counter()
+      status, payload = await _post(
+          reader,
+          writer,
+          f"/users/u{session}/sessions/s{session}/messages",
+          {"text": f"turn {turn}"},
+      )
+      latencies.append(time.perf_counter() - start)
+      if status != 200:
+        errors += 1
+        continue
+      # FakeLlm answers by user-turn count, so order shows in the replies.
+      expected = responses[turn % len(responses)]
+      ordered = ordered and payload["replies"][-1:] == [expected]
+  finally:
+    writer.close()
+  return errors, ordered
+
+
+async def _run(args: argparse.Namespace) -> int:
+  server = GreetingServer(
+      agent=create_greeting_agent(model=FakeLlm(latency=args.latency)),
+      max_inflight=args.max_inflight,
+      max_queue=args.max_queue,
+  )
+  listener = await server.start("127.0.0.1", 0)
+  port = listener.sockets[0].getsockname()[1]
+
+  latencies: List[float] = []
+  start = time.perf_counter()
+  results = await asyncio.gather(
+      *(_client(port, i, args.turns, latencies) for i in range(args.sessions))
+  )
+  elapsed = time.perf_counter() - start
+  await server.shutdown()
+
+  errors = sum(err for err, _ in results)
+  in_order = all(ok for _, ok in results)
+  requests = args.sessions * args.turns
+  print(f"{requests} requests over {args.sessions} sessions in {elapsed:.2f}s")
+  print(f"throughput: {requests / elapsed:.1f} req/s, errors: {errors}, in order: {in_order}")
+  for pct in (50, 95, 99):
+    print(f"p{pct} latency: {percentile(latencies, pct) * 1000:.1f} ms")
+  return 0 if in_order and not errors else 1
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--sessions", type=int, default=500)
+  parser.add_argument("--turns", type=int, default=3)
+  parser.add_argument("--latency", type=float, default=0.05, help="FakeLlm delay (s)")
+  parser.add_argument("--max-inflight", type=int, default=256)
+  parser.add_argument("--max-queue", type=int, default=100_000)
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  return asyncio.run(_run(_parse_args(argv)))
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
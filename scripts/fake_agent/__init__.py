@@ -0,0 +1,6 @@
+"""Greeting agent backed by FakeLlm, for offline benchmarks."""
+
+from . import agent
+from .agent import root_agent
+
+__all__ = ["agent", "root_agent"]
@@ -0,0 +1,30 @@
+"""Exposes ``root_agent`` built on the offline FakeLlm backend.
+
+``FAKE_LLM_LATENCY``, ``FAKE_LLM_TOKENS_PER_SECOND``, ``FAKE_LLM_ERROR_RATE``
+and ``FAKE_LLM_ERROR_CODE`` configure the fake model, so evaluator worker
+processes pick up the same settings as the process that spawned them.
+"""
+
+from __future__ import annotations
+
+import os
+
+from greeting_agent.agent import create_greeting_agent
+from greeting_agent.fake_llm import FakeLlm
+from greeting_agent.instrumentation import env_instrumentation
+from greeting_agent.llm_cache import env_response_cache
+from greeting_agent.rate_limit import env_rate_limiter
+
+root_agent = create_greeting_agent(
+    model=FakeLlm(
+        latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")),
+        tokens_per_second=float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", "0")),
+        error_rate=float(os.environ.get("FAKE_LLM_ERROR_RATE", "0")),
+        error_code=int(os.environ.get("FAKE_LLM_ERROR_CODE", "429")),
+    ),
+    response_cache=env_response_cache,
+    instrumentation=env_instrumentation,
+    rate_limiter=env_rate_limiter,
+)
+
+__all__ = ["root_agent"]
@@ -0,0 +1,485 @@
+"""Offline load test of the agent entry points against the fake Gemini backend.
+
+Every scenario swaps Gemini for ``greeting_agent.fake_llm.FakeLlm`` (fixed
+latency, token rate and seeded error injection), so no API key is needed and
+runs are repeatable:
+
+  cli       ``cli._stream_agent_responses`` over ``Runner.run``, one thread
+            per concurrent conversation.
+  generate  ``generate_evalset._main`` over synthetic eval scripts.
+  execute   ``execute_evalsets.main`` (native engine) on evalsets generated
+            from the same scripts, against ``scripts.fake_agent``.
+
+Each scenario runs in a fresh interpreter so its peak RSS is its own. Results
+can be saved as a baseline and later runs compared against it; the script
+exits non-zero when throughput, p95 latency or peak RSS regress by more than
+``--tolerance``.
+
+Usage:
+  python scripts/loadtest.py --conversations 200 --concurrency 16 --latency 0.05
+  python scripts/loadtest.py --save-baseline loadtest-baseline.json
+  python scripts/loadtest.py --baseline loadtest-baseline.json --tolerance 0.15
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+SRC_ROOT = REPO_ROOT / "src"
+DEFAULT_SCRIPTS = SRC_ROOT / "greeting_agent" / "eval_scripts.json"
+SCENARIOS = ("cli", "generate", "execute")
+
+# (result key, label, higher is better)
+_COMPARED_METRICS = (
+    ("requests_per_second", "req/s", True),
+    ("p95_ms", "p95 (ms)", False),
+    ("peak_rss_mib", "peak RSS (MiB)", False),
+)
+
+
+# ---------------------------------------------------------------------------
+# Worker side: runs one scenario in this process.
+# ---------------------------------------------------------------------------
+
+
+def _peak_rss_mib() -> float:
+  import resource
+
+  peak = max(
+      resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+  )
+  # ru_maxrss is KiB on Linux and bytes on macOS.
+  return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _fake_env(args: argparse.Namespace) -> Dict[str, str]:
+  return {
+      "FAKE_LLM_LATENCY": str(args.latency),
+      "FAKE_LLM_TOKENS_PER_SECOND": str(args.tokens_per_second),
+      "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+      "FAKE_LLM_ERROR_CODE": str(args.error_code),
+  }
+
+
+def _fake_llm(args: argparse.Namespace):
+  from greeting_agent.fake_llm import FakeLlm
+
+  return FakeLlm(
+      latency=args.latency,
+      tokens_per_second=args.tokens_per_second,
+      error_rate=args.error_rate,
+      error_code=args.error_code,
+  )
+
+
+def _scripts(args: argparse.Namespace) -> List[Dict[str, Any]]:
+  templates = json.loads(args.scripts.read_text(encoding="utf-8"))
+  return [
+      {
+          "id": f"{templates[i % len(templates)]['id']}_{i}",
+          "turns": templates[i % len(templates)]["turns"],
+      }
+      for i in range(args.conversations)
+  ]
+
+
+def _write_scripts(path: Path, scripts: Sequence[Dict[str, Any]]) -> Path:
+  with path.open("w", encoding="utf-8") as handle:
+    for script in scripts:
+      handle.write(json.dumps(script) + "\n")
+  return path
+
+
+def _turn_latencies(metrics_path: Path) -> List[float]:
+  from greeting_agent import instrumentation
+
+  return [
+      record["total_latency"]
+      for record in instrumentation.load_records(metrics_path)
+      if record.get("total_latency") is not None
+  ]
+
+
+def _run_cli(args: argparse.Namespace, workdir: Path) -> Tuple[List[float], int]:
+  import asyncio
+  from concurrent.futures import ThreadPoolExecutor
+
+  from google.adk.runners import Runner
+  from google.adk.sessions import InMemorySessionService
+
+  from greeting_agent import cli
+  from greeting_agent.agent import create_greeting_agent
+
+  runner = Runner(
+      app_name=cli._DEFAULT_APP_NAME,
+      agent=create_greeting_agent(model=_fake_llm(args)),
+      session_service=InMemorySessionService(),
+  )
+
+  def converse(script: Dict[str, Any]) -> Tuple[List[float], int]:
+    user_id = "loadtest"
+    session_id = script["id"]
+    asyncio.run(cli._open_session(runner, user_id, session_id))
+    latencies: List[float] = []
+    for text in script["turns"]:
+      start = time.perf_counter()
+      try:
+        events = runner.run(
+            user_id=user_id,
+            session_id=session_id,
+            new_message=cli._user_message(text),
+        )
+        for _ in cli._stream_agent_responses(events):
+          pass
+      except Exception:  # noqa: BLE001 - injected errors end the conversation
+        return latencies, 1
+      latencies.append(time.perf_counter() - start)
+    return latencies, 0
+
+  latencies: List[float] = []
+  errors = 0
+  with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+    for turn_latencies, failed in pool.map(converse, _scripts(args)):
+      latencies.extend(turn_latencies)
+      errors += failed
+  return latencies, errors
+
+
+def _generate(
+    args: argparse.Namespace,
+    scripts: Sequence[Dict[str, Any]],
+    output_dir: Path,
+    *,
+    generation_agent: Any,
+) -> Path:
+  import asyncio
+
+  from greeting_agent import generate_evalset
+
+  output_dir.mkdir(parents=True, exist_ok=True)
+  return asyncio.run(
+      generate_evalset._main(
+          concurrency=args.concurrency,
+          max_retries=args.max_retries,
+          retry_backoff=args.retry_backoff,
+          generation_agent=generation_agent,
+          tests_path=_write_scripts(output_dir / "scripts.jsonl", scripts),
+          output_dir=output_dir,
+      )
+  )
+
+
+def _run_generate(args: argparse.Namespace, workdir: Path) -> Tuple[List[float], int]:
+  import contextlib
+  import io
+
+  from greeting_agent import instrumentation
+  from greeting_agent.agent import create_greeting_agent
+
+  metrics_path = workdir / "metrics.jsonl"
+  instrumentation.configure_env(metrics_path, source="generate")
+  agent = create_greeting_agent(
+      model=_fake_llm(args), instrumentation=instrumentation.env_instrumentation
+  )
+  errors = 0
+  with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+    try:
+      _generate(args, _scripts(args), workdir / "out", generation_agent=agent)
+    except Exception:  # noqa: BLE001 - retries exhausted on injected errors
+      errors = 1
+  return _turn_latencies(metrics_path), errors
+
+
+def _run_execute(args: argparse.Namespace, workdir: Path) -> Tuple[List[float], int]:
+  import contextlib
+  import io
+
+  from greeting_agent import execute_evalsets
+  from greeting_agent.agent import create_greeting_agent
+  from greeting_agent.fake_llm import FakeLlm
+
+  # Reference evalsets come from an instant, error-free fake (same replies);
+  # one evalset per worker lets --workers fan out.
+  scripts = _scripts(args)
+  shards = max(1, args.workers)
+  evalsets = []
+  with contextlib.redirect_stdout(io.StringIO()):
+    for shard in range(shards):
+      evalsets.append(
+          _generate(
+              args,
+              scripts[shard::shards],
+              workdir / f"evalset_{shard}",
+              generation_agent=create_greeting_agent(model=FakeLlm()),
+          )
+      )
+
+  os.environ.update(_fake_env(args))
+  metrics_path = workdir / "metrics.jsonl"
+  argv = [str(path) for path in evalsets] + [
+      "--engine",
+      "native",
+      "--agent-module",
+      "scripts.fake_agent",
+      "--num-runs",
+      str(args.num_runs),
+      "--workers",
+      str(args.workers),
+      "--metrics",
+      str(metrics_path),
+  ]
+  with contextlib.redirect_stdout(io.StringIO()):
+    execute_evalsets.main(argv)
+  errors = sum(1 for result in execute_evalsets.RUN_RESULTS if not result.passed)
+  return _turn_latencies(metrics_path), errors
+
+
+_RUNNERS = {"cli": _run_cli, "generate": _run_generate, "execute": _run_execute}
+
+
+def _run_worker(args: argparse.Namespace) -> int:
+  for path in (SRC_ROOT, REPO_ROOT):
+    if str(path) not in sys.path:
+      sys.path.insert(0, str(path))
+  from greeting_agent import instrumentation
+
+  with tempfile.TemporaryDirectory(prefix=f"loadtest_{args.worker}_") as tmp:
+    start = time.perf_counter()
+    latencies, errors = _RUNNERS[args.worker](args, Path(tmp))
+    seconds = time.perf_counter() - start
+
+  result: Dict[str, Any] = {
+      "scenario": args.worker,
+      "requests": len(latencies),
+      "errors": errors,
+      "seconds": seconds,
+      "requests_per_second": len(latencies) / seconds if seconds else 0.0,
+      "peak_rss_mib": _peak_rss_mib(),
+  }
+  for pct in instrumentation.PERCENTILES:
+    result[f"p{pct}_ms"] = (
+        instrumentation.percentile(latencies, pct) * 1000 if latencies else None
+    )
+  args.result_file.write_text(json.dumps(result), encoding="utf-8")
+  return 0
+
+
+# ---------------------------------------------------------------------------
+# Driver side: one subprocess per scenario, reporting and baselines.
+# ---------------------------------------------------------------------------
+
+
+def _run_scenario(scenario: str, argv: Sequence[str]) -> Dict[str, Any]:
+  env = dict(os.environ)
+  env["PYTHONPATH"] = os.pathsep.join(
+      filter(None, [str(REPO_ROOT), str(SRC_ROOT), env.get("PYTHONPATH")])
+  )
+  with tempfile.TemporaryDirectory() as tmp:
+    result_file = Path(tmp) / "result.json"
+    completed = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            *argv,
+            "--worker",
+            scenario,
+            "--result-file",
+            str(result_file),
+        ],
+        env=env,
+        cwd=REPO_ROOT,
+        check=False,
+    )
+    if completed.returncode != 0 or not result_file.exists():
+      raise RuntimeError(f"Scenario {scenario} failed (exit {completed.returncode})")
+    return json.loads(result_file.read_text(encoding="utf-8"))
+
+
+def _format_ms(value: Optional[float]) -> str:
+  return "-" if value is None else f"{value:.1f}"
+
+
+def _print_results(results: Sequence[Dict[str, Any]]) -> None:
+  header = (
+      f"{'Scenario':<9}  {'requests':>8}  {'errors':>6}  {'req/s':>8}"
+      f"  {'p50 ms':>8}  {'p95 ms':>8}  {'p99 ms':>8}  {'RSS MiB':>8}"
+  )
+  print(header)
+  print("-" * len(header))
+  for result in results:
+    print(
+        f"{result['scenario']:<9}  {result['requests']:>8}  {result['errors']:>6}"
+        f"  {result['requests_per_second']:>8.1f}"
+        f"  {_format_ms(result['p50_ms']):>8}  {_format_ms(result['p95_ms']):>8}"
+        f"  {_format_ms(result['p99_ms']):>8}  {result['peak_rss_mib']:>8.1f}"
+    )
+
+
+def _compare(
+    results: Sequence[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+  """Prints the change against ``baseline`` and returns the regressions."""
+  previous = {entry["scenario"]: entry for entry in baseline.get("results", [])}
+  regressions: List[str] = []
+  print(f"\nAgainst baseline (tolerance {tolerance:.0%}):")
+  for result in results:
+    before = previous.get(result["scenario"])
+    if before is None:
+      print(f"  {result['scenario']}: not in baseline")
+      continue
+    for key, label, higher_is_better in _COMPARED_METRICS:
+      old, new = before.get(key), result.get(key)
+      if not old or new is None:
+        continue
+      change = new / old - 1
+      regressed = -change > tolerance if higher_is_better else change > tolerance
+      marker = "  REGRESSION" if regressed else ""
+      print(
+          f"  {result['scenario']:<9} {label:<15} {old:>10.1f} -> {new:>10.1f}"
+          f"  ({change:+.1%}){marker}"
+      )
+      if regressed:
+        regressions.append(f"{result['scenario']} {label} {change:+.1%}")
+  return regressions
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument(
+      "--scenario",
+      dest="scenarios",
+      action="append",
+      choices=SCENARIOS,
+      default=None,
+      help="Scenario to run (repeatable; default: all)",
+  )
+  parser.add_argument("--scripts", type=Path, default=DEFAULT_SCRIPTS)
+  parser.add_argument(
+      "--conversations",
+      type=int,
+      default=100,
+      help="Scripted conversations per scenario (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--concurrency",
+      type=int,
+      default=8,
+      help="Conversations in flight at once (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--workers",
+      type=int,
+      default=1,
+      help="execute_evalsets worker processes (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--num-runs",
+      type=int,
+      default=1,
+      help="execute_evalsets runs per evalset (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--latency",
+      type=float,
+      default=0.05,
+      help="Fake model latency per call in seconds (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--tokens-per-second",
+      type=float,
+      default=0.0,
+      help="Fake model token rate; 0 replies at once (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--error-rate",
+      type=float,
+      default=0.0,
+      help="Fraction of fake model calls that fail (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--error-code",
+      type=int,
+      default=429,
+      help="HTTP status of injected errors (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--max-retries",
+      type=int,
+      default=2,
+      help="generate_evalset retries per case (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--retry-backoff",
+      type=float,
+      default=0.05,
+      help="generate_evalset initial retry delay (default: %(default)s)",
+  )
+  parser.add_argument("--save-baseline", type=Path, default=None)
+  parser.add_argument("--baseline", type=Path, default=None)
+  parser.add_argument(
+      "--tolerance",
+      type=float,
+      default=0.10,
+      help="Allowed relative regression against --baseline (default: %(default)s)",
+  )
+  parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+  parser.add_argument("--result-file", type=Path, help=argparse.SUPPRESS)
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  argv = list(sys.argv[1:] if argv is None else argv)
+  args = _parse_args(argv)
+  if args.worker:
+    return _run_worker(args)
+
+  forwarded = [
+      "--scripts", str(args.scripts),
+      "--conversations", str(args.conversations),
+      "--concurrency", str(args.concurrency),
+      "--workers", str(args.workers),
+      "--num-runs", str(args.num_runs),
+      "--latency", str(args.latency),
+      "--tokens-per-second", str(args.tokens_per_second),
+      "--error-rate", str(args.error_rate),
+      "--error-code", str(args.error_code),
+      "--max-retries", str(args.max_retries),
+      "--retry-backoff", str(args.retry_backoff),
+  ]
+  results = [
+      _run_scenario(scenario, forwarded)
+      for scenario in (args.scenarios or SCENARIOS)
+  ]
+  _print_results(results)
+
+  if args.save_baseline:
+    settings = {
+        key: str(value) if isinstance(value, Path) else value
+        for key, value in vars(args).items()
+        if key not in ("worker", "result_file", "save_baseline", "baseline")
+    }
+    payload = {"settings": settings, "results": results}
+    args.save_baseline.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"\nBaseline written to {args.save_baseline}")
+
+  if args.baseline:
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    regressions = _compare(results, baseline, args.tolerance)
+    if regressions:
+      print("\nRegressed: " + "; ".join(regressions))
+      return 1
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
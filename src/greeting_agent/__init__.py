@@ -1,6 +1,37 @@
-"""Hobby poem agent package."""
+"""Hobby poem agent package.
 
-from .agent import create_greeting_agent, root_agent
-from .cli import run_cli
+Attributes are resolved lazily (PEP 562) so importing the package, or one
+of its lightweight submodules, does not pull in the ADK runtime or build
+``root_agent`` until something actually uses them.
+"""
 
-__all__ = ["create_greeting_agent", "root_agent", "run_cli"]
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+_LAZY_ATTRS = {
+    "create_greeting_agent": ".agent",
+    "root_agent": ".agent",
+    "run_batch_cli": ".cli",
+    "run_cli": ".cli",
+}
+# ADK's AgentEvaluator reads ``<package>.agent.root_agent``.
+_LAZY_SUBMODULES = ("agent", "cli")
+
+__all__ = ["create_greeting_agent", "root_agent", "run_batch_cli", "run_cli"]
+
+
+def __getattr__(name: str) -> Any:
+  if name in _LAZY_SUBMODULES:
+    return importlib.import_module(f".{name}", __name__)
+  module_name = _LAZY_ATTRS.get(name)
+  if module_name is None:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+  value = getattr(importlib.import_module(module_name, __name__), name)
+  globals()[name] = value
+  return value
+
+
+def __dir__() -> list:
+  return sorted(set(globals()) | set(__all__) | set(_LAZY_SUBMODULES))
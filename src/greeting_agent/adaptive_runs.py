@@ -0,0 +1,140 @@
+"""Adaptive repeat counts for evalset evaluation.
+
+Instead of a fixed ``num_runs`` for every eval case, each case is run one
+repetition at a time. After every run a Wilson score interval on the
+case's pass rate decides: the case passes once the lower bound reaches
+``pass_rate``, fails once the upper bound drops below it, and otherwise
+runs again until ``max_runs``. The interval is checked after every run, so
+its confidence is Bonferroni-adjusted over the ``max_runs`` looks to keep
+the overall error rate at ``1 - confidence``.
+
+The defaults are tuned to spend fewer runs than fixed repetition: a case
+that passes (or fails) its first two runs is decided there, the same budget
+as the fixed ``num_runs`` of 2, and only cases with mixed results get a third
+run, after which the observed pass rate decides. Raise ``confidence`` or
+``pass_rate`` for stricter verdicts at the cost of more runs; a
+``pass_rate`` of 1.0 requires every one of ``max_runs`` runs to pass.
+"""
+
+from __future__ import annotations
+
+import math
+import statistics
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+DEFAULT_MAX_RUNS = 3
+DEFAULT_PASS_RATE = 0.5
+DEFAULT_CONFIDENCE = 0.5
+
+
+def wilson_interval(passes: int, runs: int, confidence: float) -> Tuple[float, float]:
+  """Two-sided Wilson score interval for ``passes`` out of ``runs``."""
+  if runs <= 0:
+    return 0.0, 1.0
+  z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+  rate = passes / runs
+  denominator = 1 + z * z / runs
+  center = (rate + z * z / (2 * runs)) / denominator
+  margin = z * math.sqrt(rate * (1 - rate) / runs + z * z / (4 * runs * runs)) / denominator
+  # At 0 or all passes the open end is exactly 0 or 1; rounding must not
+  # move it inside a pass_rate of 1.0.
+  low = 0.0 if passes <= 0 else max(0.0, center - margin)
+  high = 1.0 if passes >= runs else min(1.0, center + margin)
+  return low, high
+
+
+@dataclass(frozen=True)
+class AdaptivePolicy:
+  """When to stop repeating an eval case.
+
+  Attributes:
+    max_runs: Upper bound on runs per case.
+    pass_rate: Fraction of runs a case must pass.
+    confidence: Overall two-sided confidence of the verdict; each look
+      uses ``look_confidence``.
+  """
+
+  max_runs: int = DEFAULT_MAX_RUNS
+  pass_rate: float = DEFAULT_PASS_RATE
+  confidence: float = DEFAULT_CONFIDENCE
+
+  def __post_init__(self):
+    if self.max_runs <= 0:
+      raise ValueError("max_runs must be a positive integer")
+    if not 0 < self.pass_rate <= 1:
+      raise ValueError("pass_rate must be in (0, 1]")
+    if not 0 < self.confidence < 1:
+      raise ValueError("confidence must be in (0, 1)")
+
+  @property
+  def look_confidence(self) -> float:
+    """Per-run confidence, Bonferroni-adjusted over ``max_runs`` looks."""
+    return 1 - (1 - self.confidence) / self.max_runs
+
+  def verdict(self, passes: int, runs: int) -> Optional[bool]:
+    """``True``/``False`` once the bound is decisive, else ``None``."""
+    low, high = wilson_interval(passes, runs, self.look_confidence)
+    if low >= self.pass_rate:
+      return True
+    if high < self.pass_rate:
+      return False
+    return None
+
+  def describe(self) -> str:
+    return (
+        f"adaptive(max_runs={self.max_runs},pass_rate={self.pass_rate},"
+        f"confidence={self.confidence})"
+    )
+
+
+@dataclass
+class CaseRuns:
+  """Runs spent on one eval case and its verdict.
+
+  ``decided`` is false when the case used ``max_runs`` without the bound
+  becoming decisive (below a ``pass_rate`` of 1); its verdict is then the
+  observed pass rate. ``scores`` maps each metric to its score over all
+  runs, as ``AgentEvaluator`` judges it (``None`` when not evaluated), and
+  its threshold.
+  """
+
+  case_id: str
+  runs: int = 0
+  passes: int = 0
+  passed: bool = False
+  decided: bool = False
+  error: Optional[str] = None
+  scores: Dict[str, Tuple[Optional[float], float]] = field(default_factory=dict)
+
+  def observe(self, passed: bool, policy: AdaptivePolicy) -> bool:
+    """Records one run; returns whether the case needs another."""
+    self.runs += 1
+    self.passes += int(passed)
+    verdict = policy.verdict(self.passes, self.runs)
+    if verdict is not None:
+      self.passed, self.decided = verdict, True
+      return False
+    if self.runs >= policy.max_runs:
+      self.passed = self.passes / self.runs >= policy.pass_rate
+      # No finite sample certifies a pass rate of 1, so at that target the
+      # budget of clean runs is the verdict rather than a fallback.
+      self.decided = policy.pass_rate >= 1
+      return False
+    return True
+
+  def describe(self) -> str:
+    if self.error:
+      return f"{self.runs} runs; {self.error}"
+    note = "" if self.decided else ", undecided at max runs"
+    return f"{self.runs} runs ({self.passes}/{self.runs} passed{note})"
+
+
+__all__ = [
+    "AdaptivePolicy",
+    "CaseRuns",
+    "DEFAULT_CONFIDENCE",
+    "DEFAULT_MAX_RUNS",
+    "DEFAULT_PASS_RATE",
+    "wilson_interval",
+]
@@ -2,25 +2,50 @@
 
 from __future__ import annotations
 
-from typing import Optional
+from typing import Optional, Union
 
 from google.adk.agents import LlmAgent
+from google.adk.models import BaseLlm
+
+from .context_window import ContextWindow, EnvContextWindow, env_context_window
+from .instrumentation import EnvInstrumentation, Instrumentation
+from .instrumentation import env_instrumentation
+from .llm_cache import EnvResponseCache, ResponseCache, env_response_cache
+from .poem_cache import EnvPoemCache, PoemCache, env_poem_cache
+from .rate_limit import EnvRateLimiter, RateLimiter, env_rate_limiter
+from .routing_llm import RoutingLlm
 
 DEFAULT_GREETING_MODEL = "gemini-2.0-flash"
 
 
 def create_greeting_agent(
     *,
-    model: str = DEFAULT_GREETING_MODEL,
+    model: Union[str, BaseLlm] = DEFAULT_GREETING_MODEL,
     agent_name: str = "greeting_agent",
     instruction_override: Optional[str] = None,
+    response_cache: Optional[Union[ResponseCache, EnvResponseCache]] = None,
+    instrumentation: Optional[Union[Instrumentation, EnvInstrumentation]] = None,
+    poem_cache: Optional[Union[PoemCache, EnvPoemCache]] = None,
+    context_window: Optional[Union[ContextWindow, EnvContextWindow]] = None,
+    rate_limiter: Optional[Union[RateLimiter, EnvRateLimiter]] = None,
 ) -> LlmAgent:
   """Builds the hobby poem agent configured for Gemini.
 
   Args:
-    model: The Gemini model identifier to invoke via ADK.
+    model: The Gemini model identifier to invoke via ADK, or a ``BaseLlm``
+      instance (for example ``FakeLlm`` in offline runs, or ``RoutingLlm`` to
+      route, hedge and fall back across Gemini tiers).
     agent_name: Logical name of the agent instance.
     instruction_override: Optional custom instruction to replace the default.
+    response_cache: Optional record/replay cache consulted before each model
+      call.
+    instrumentation: Optional per-turn latency/token metrics collector.
+    poem_cache: Optional cache of poem variants keyed on the normalized
+      hobby, consulted after ``response_cache``.
+    context_window: Optional history trimming to a token budget; runs before
+      the caches so they key on the request actually sent.
+    rate_limiter: Optional shared RPM/TPM limiter; waits after the caches
+      so cache hits never spend quota.
 
   Returns:
     Configured ``LlmAgent`` that asks for the user's hobby and writes a poem.
@@ -35,6 +60,31 @@ def create_greeting_agent(
       "conversation after sharing the poem."
   )
 
+  before_agent_callbacks = []
+  after_agent_callbacks = []
+  before_model_callbacks = []
+  after_model_callbacks = []
+  if instrumentation is not None:
+    before_agent_callbacks.append(instrumentation.before_agent)
+    after_agent_callbacks.append(instrumentation.after_agent)
+    # Sees raw model output first; its before hook runs after the caches and
+    # the rate limiter so cache hits and quota waits are not timed as model
+    # calls.
+    after_model_callbacks.append(instrumentation.after_model)
+  if context_window is not None:
+    before_model_callbacks.append(context_window.before_model)
+  if response_cache is not None:
+    before_model_callbacks.append(response_cache.before_model)
+    after_model_callbacks.append(response_cache.after_model)
+  if poem_cache is not None:
+    before_model_callbacks.append(poem_cache.before_model)
+    after_model_callbacks.append(poem_cache.after_model)
+  if rate_limiter is not None:
+    before_model_callbacks.append(rate_limiter.before_model)
+    after_model_callbacks.append(rate_limiter.after_model)
+  if instrumentation is not None:
+    before_model_callbacks.append(instrumentation.before_model)
+
   return LlmAgent(
       name=agent_name,
       model=model,
@@ -43,9 +93,44 @@ def create_greeting_agent(
           "poem that mentions them."
       ),
       instruction=instruction,
+      before_agent_callback=before_agent_callbacks or None,
+      after_agent_callback=after_agent_callbacks or None,
+      before_model_callback=before_model_callbacks or None,
+      after_model_callback=after_model_callbacks or None,
   )
 
 
-root_agent = create_greeting_agent()
+_root_agent: Optional[LlmAgent] = None
+# Declared for type checkers and ``__all__``; the value comes from
+# ``__getattr__`` below, as the annotation alone binds nothing at runtime.
+root_agent: LlmAgent
+
+
+def get_root_agent() -> LlmAgent:
+  """Returns the shared ``root_agent``, building it on first use.
+
+  It routes across models when ``GREETING_AGENT_ROUTES`` is set (see
+  ``routing_llm``) and otherwise calls ``DEFAULT_GREETING_MODEL``.
+  """
+  global _root_agent
+  if _root_agent is None:
+    _root_agent = create_greeting_agent(
+        model=RoutingLlm.from_env() or DEFAULT_GREETING_MODEL,
+        response_cache=env_response_cache,
+        instrumentation=env_instrumentation,
+        poem_cache=env_poem_cache,
+        context_window=env_context_window,
+        rate_limiter=env_rate_limiter,
+    )
+  return _root_agent
+
+
+def __getattr__(name: str):
+  # ``root_agent`` is built on first access (PEP 562) so importing this
+  # module stays cheap for entry points that never run the default agent.
+  if name == "root_agent":
+    return get_root_agent()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-__all__ = ["create_greeting_agent", "root_agent"]
+__all__ = ["create_greeting_agent", "get_root_agent", "root_agent"]
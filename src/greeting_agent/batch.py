@@ -0,0 +1,251 @@
+"""Runs conversations from JSON Lines through one ``Runner`` concurrently.
+
+Each input line is one conversation::
+
+  {"id": "user-42", "user_id": "42", "turns": ["hi", "I love painting"]}
+
+``turns`` may be a single ``text`` string instead; ``id`` and ``user_id``
+are optional. Each output line repeats the ``id`` with the agent replies of
+every turn, per-turn and total latency in seconds, and ``error`` when the
+conversation or the deletion of its session failed::
+
+  {"id": "user-42", "turns": [{"user": "hi", "replies": ["..."],
+   "latency": 0.41}, ...], "latency": 1.23}
+
+Outputs are written in input order. Input is read in small chunks and at
+most ``max_pending`` conversations are in flight or waiting for an earlier
+one to finish, so memory stays flat however long the input is.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, TextIO
+
+from google.adk.runners import Runner
+from google.genai import types
+
+from . import profiling
+from .event_text import TurnText
+from .instrumentation import percentile
+
+DEFAULT_BATCH_USER_ID = "batch-user"
+# Latencies kept for percentiles (reservoir sample beyond this).
+LATENCY_SAMPLE_SIZE = 10_000
+# Bytes of input read per chunk (``readlines`` size hint).
+_READ_HINT = 1 << 16
+
+
+@dataclass
+class BatchStats:
+  """Throughput and latency of one batch run.
+
+  ``latencies`` holds per-conversation seconds, sampled down to
+  ``LATENCY_SAMPLE_SIZE`` values on long runs.
+  """
+
+  conversations: int = 0
+  turns: int = 0
+  errors: int = 0
+  elapsed: float = 0.0
+  latencies: List[float] = field(default_factory=list)
+  _rng: random.Random = field(default_factory=lambda: random.Random(0), repr=False)
+
+  def record(self, record: Dict[str, Any]) -> None:
+    self.conversations += 1
+    self.turns += len(record.get("turns", []))
+    self.errors += "error" in record
+    if len(self.latencies) < LATENCY_SAMPLE_SIZE:
+      self.latencies.append(record["latency"])
+      return
+    slot = self._rng.randrange(self.conversations)
+    if slot < LATENCY_SAMPLE_SIZE:
+      self.latencies[slot] = record["latency"]
+
+  def summary(self) -> Dict[str, Any]:
+    rate = self.conversations / self.elapsed if self.elapsed else 0.0
+    return {
+        "conversations": self.conversations,
+        "turns": self.turns,
+        "errors": self.errors,
+        "elapsed": round(self.elapsed, 3),
+        "conversations_per_second": round(rate, 2),
+        "p50": round(percentile(self.latencies, 50), 4) if self.latencies else None,
+        "p95": round(percentile(self.latencies, 95), 4) if self.latencies else None,
+    }
+
+
+def _parse_conversation(line: str, index: int) -> Dict[str, Any]:
+  item = json.loads(line)
+  if isinstance(item, str):
+    item = {"text": item}
+  if not isinstance(item, dict):
+    raise ValueError("each line must be a JSON object with turns[] or text")
+  turns = item.get("turns")
+  if turns is None:
+    turns = [item["text"]] if "text" in item else []
+  if not isinstance(turns, list) or not turns:
+    raise ValueError("conversation has no turns")
+  return {
+      "id": str(item.get("id", index)),
+      "user_id": str(item.get("user_id") or DEFAULT_BATCH_USER_ID),
+      "turns": [str(turn) for turn in turns],
+  }
+
+
+async def run_conversation(
+    runner: Runner, line: str, index: int, *, keep_sessions: bool = False
+) -> Dict[str, Any]:
+  """Runs one input line and returns its output record."""
+  start = time.perf_counter()
+  record: Dict[str, Any] = {"id": str(index)}
+  session = None
+  try:
+    conversation = _parse_conversation(line, index)
+    record["id"] = conversation["id"]
+    user_id = conversation["user_id"]
+    with profiling.phase("session"):
+      session = await runner.session_service.create_session(
+          app_name=runner.app_name,
+          user_id=user_id,
+          session_id=f"batch-{uuid.uuid4().hex}",
+      )
+    turns = record["turns"] = []
+    for text in conversation["turns"]:
+      turn_start = time.perf_counter()
+      accumulator = TurnText()
+      replies = []
+      events = runner.run_async(
+          user_id=user_id,
+          session_id=session.id,
+          new_message=types.Content(role="user", parts=[types.Part.from_text(text=text)]),
+      )
+      async for event in profiling.phase_aiter(events, "model_wait"):
+        with profiling.phase("extract"):
+          reply = accumulator.add(event)
+        if reply:
+          replies.append(reply)
+      turns.append(
+          {
+              "user": text,
+              "replies": replies,
+              "latency": round(time.perf_counter() - turn_start, 4),
+          }
+      )
+  except Exception as exc:  # noqa: BLE001 - reported in the output line
+    record["error"] = f"{exc.__class__.__name__}: {exc}"
+  finally:
+    if session is not None and not keep_sessions:
+      try:
+        with profiling.phase("session"):
+          await runner.session_service.delete_session(
+              app_name=runner.app_name, user_id=session.user_id, session_id=session.id
+          )
+      except Exception as exc:  # noqa: BLE001 - reported in the output line
+        cleanup = f"session cleanup failed: {exc.__class__.__name__}: {exc}"
+        record["error"] = (
+            f"{record['error']}; {cleanup}" if "error" in record else cleanup
+        )
+  record["latency"] = round(time.perf_counter() - start, 4)
+  return record
+
+
+async def run_batch(
+    runner: Runner,
+    source: TextIO,
+    sink: TextIO,
+    *,
+    workers: int = 8,
+    max_pending: Optional[int] = None,
+    keep_sessions: bool = False,
+) -> BatchStats:
+  """Streams conversations from ``source`` to ``sink`` over ``runner``.
+
+  Args:
+    runner: Runner shared by all conversations.
+    source: JSON Lines input, read incrementally.
+    sink: Receives one JSON line per conversation, in input order.
+    workers: Conversations run concurrently.
+    max_pending: Conversations read but not yet written (default
+      ``4 * workers``); bounds memory when an early conversation is slow.
+    keep_sessions: Keep each conversation's session instead of deleting it.
+
+  Returns:
+    Counts, elapsed time and per-conversation latencies.
+  """
+  if workers <= 0:
+    raise ValueError("workers must be a positive integer")
+  max_pending = max(workers, max_pending or 4 * workers)
+  stats = BatchStats()
+  queue: "asyncio.Queue[Optional[tuple[int, str]]]" = asyncio.Queue(maxsize=workers)
+  window = asyncio.Semaphore(max_pending)
+  finished: Dict[int, Dict[str, Any]] = {}
+  next_index = 0
+  started = time.perf_counter()
+
+  async def produce() -> None:
+    index = 0
+    try:
+      while True:
+        with profiling.phase("read"):
+          chunk = await asyncio.to_thread(source.readlines, _READ_HINT)
+        if not chunk:
+          break
+        for line in chunk:
+          if not line.strip():
+            continue
+          await window.acquire()
+          await queue.put((index, line))
+          index += 1
+    finally:
+      for _ in range(workers):
+        await queue.put(None)
+
+  def emit(index: int, record: Dict[str, Any]) -> None:
+    nonlocal next_index
+    finished[index] = record
+    while next_index in finished:
+      record = finished.pop(next_index)
+      with profiling.phase("write"):
+        sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+      next_index += 1
+      window.release()
+      stats.record(record)
+
+  async def work() -> None:
+    while True:
+      item = await queue.get()
+      if item is None:
+        return
+      index, line = item
+      emit(index, await run_conversation(runner, line, index, keep_sessions=keep_sessions))
+
+  await asyncio.gather(produce(), *(work() for _ in range(workers)))
+  sink.flush()
+  stats.elapsed = time.perf_counter() - started
+  return stats
+
+
+def print_stats(stats: BatchStats, out: TextIO = sys.stderr) -> None:
+  summary = stats.summary()
+  out.write(
+      f"Batch: {summary['conversations']} conversations ({summary['turns']} turns,"
+      f" {summary['errors']} errors) in {summary['elapsed']:.2f}s,"
+      f" {summary['conversations_per_second']:.2f} conversations/s,"
+      f" p50 {summary['p50']}s, p95 {summary['p95']}s\n"
+  )
+
+
+__all__ = [
+    "BatchStats",
+    "DEFAULT_BATCH_USER_ID",
+    "print_stats",
+    "run_batch",
+    "run_conversation",
+]
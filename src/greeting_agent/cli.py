@@ -2,21 +2,51 @@
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import os
-from typing import Generator, Iterable
+import sys
+import threading
+import time
+from typing import Generator, Iterable, Optional, Sequence, TextIO, Tuple, Union
 
 from dotenv import load_dotenv
+from google.adk.agents.run_config import RunConfig
+from google.adk.agents.run_config import StreamingMode
 from google.adk.events import Event
-from google.adk.runners import InMemoryArtifactService
-from google.adk.runners import InMemoryMemoryService
-from google.adk.runners import InMemorySessionService
 from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
 from google.genai import types
 
+from . import batch
+from . import instrumentation
+from . import profiling
+from . import rate_limit
+from . import routing_llm
+from .agent import DEFAULT_GREETING_MODEL
 from .agent import create_greeting_agent
+from .context_window import ContextWindow
+from .context_window import parse_model_budgets
+from .event_text import TurnText
+from .event_text import event_text
+from .routing_llm import RoutingLlm
+from .sessions import DEFAULT_SESSION_DB
+from .sessions import SESSION_BACKENDS
+from .sessions import create_session_service
 
 _EXIT_COMMANDS = {"exit", "quit"}
 _DEFAULT_APP_NAME = "greeting_agent_app"
+_DEFAULT_USER_ID = "local-user"
+_DEFAULT_SESSION_ID = "local-session"
+_PROFILE_HELP = (
+    "Profile the run: write PREFIX.collapsed (flamegraph stacks),"
+    " PREFIX.json (phase and asyncio task timing) and, with --profile-mode"
+    " deterministic, PREFIX.pstats"
+)
+_PROFILE_MODE_HELP = (
+    "sample: stack samples only; deterministic: also cProfile every call,"
+    " which slows CPU-bound code (default: %(default)s)"
+)
 
 
 def _ensure_api_key() -> str:
@@ -29,50 +59,282 @@ def _ensure_api_key() -> str:
   return api_key
 
 
-def _content_to_text(content: types.Content | None) -> str:
-  if not content or not content.parts:
-    return ""
-  texts = [part.text for part in content.parts if getattr(part, "text", None)]
-  return " ".join(filter(None, texts))
-
-
 def _stream_agent_responses(events: Iterable[Event]) -> Generator[str, None, None]:
-  buffer: list[str] = []
+  turn = TurnText()
   for event in events:
+    with profiling.phase("extract"):
+      reply = turn.add(event)
+    if reply:
+      yield reply
+
+
+def _build_runner(
+    session_service: BaseSessionService,
+    *,
+    context_budget: Optional[Union[int, str]] = None,
+) -> Runner:
+  context_window = ContextWindow.from_spec(context_budget)
+  return Runner(
+      app_name=_DEFAULT_APP_NAME,
+      agent=create_greeting_agent(
+          model=RoutingLlm.from_env() or DEFAULT_GREETING_MODEL,
+          instrumentation=instrumentation.env_instrumentation,
+          context_window=context_window,
+          rate_limiter=rate_limit.env_rate_limiter,
+      ),
+      # The agent saves no artifacts and has no memory tools; in-memory
+      # services for them would only hold state for the life of the process.
+      session_service=session_service,
+  )
+
+
+def _user_message(text: str) -> types.Content:
+  return types.Content(role="user", parts=[types.Part.from_text(text=text)])
+
+
+async def _stream_turn(
+    runner: Runner,
+    *,
+    user_id: str,
+    session_id: str,
+    message: types.Content,
+    out: Optional[TextIO] = None,
+) -> Tuple[Optional[float], float]:
+  """Prints one agent turn as text deltas arrive, to ``out`` or stdout.
+
+  Returns:
+    Seconds until the first text was received (``None`` if the agent sent no
+    text) and the total turn latency in seconds.
+  """
+  # Looked up per call so redirecting sys.stdout also redirects replies.
+  out = out or sys.stdout
+  start = time.perf_counter()
+  first_text: Optional[float] = None
+  mid_line = False
+  events = runner.run_async(
+      user_id=user_id,
+      session_id=session_id,
+      new_message=message,
+      run_config=RunConfig(streaming_mode=StreamingMode.SSE),
+  )
+  metrics = instrumentation.env_instrumentation.resolve()
+  if metrics:
+    events = metrics.track(events, label=session_id)
+  async for event in profiling.phase_aiter(events, "model_wait"):
     if event.author == "user":
       continue
-    text = _content_to_text(event.content)
+    with profiling.phase("extract"):
+      text = event_text(event)
     if not text:
       continue
-    buffer.append(text)
-    if event.partial:
-      continue
-    yield " ".join(buffer)
-    buffer.clear()
+    if first_text is None:
+      first_text = time.perf_counter() - start
+    with profiling.phase("write"):
+      if event.partial:
+        if not mid_line:
+          out.write("Agent: ")
+          mid_line = True
+        out.write(text)
+        out.flush()
+        continue
+      if mid_line:
+        # The final SSE event repeats the deltas already printed.
+        out.write("\n")
+        mid_line = False
+      else:
+        out.write(f"Agent: {text}\n")
+  if mid_line:
+    out.write("\n")
+  out.flush()
+  return first_text, time.perf_counter() - start
+
+
+async def _open_session(runner: Runner, user_id: str, session_id: str) -> None:
+  """Resumes ``session_id`` if the backend still has it, else creates it."""
+  with profiling.phase("session"):
+    session = await runner.session_service.get_session(
+        app_name=_DEFAULT_APP_NAME, user_id=user_id, session_id=session_id
+    )
+    if session is not None:
+      print(f"Resuming session {session_id} ({len(session.events)} events).")
+      return
+    await runner.session_service.create_session(
+        app_name=_DEFAULT_APP_NAME, user_id=user_id, session_id=session_id
+    )
+
+
+class _ConsoleInput:
+  """Reads stdin lines on a daemon thread and hands them to the loop.
+
+  ``asyncio.to_thread(input)`` parks an executor thread in ``input()`` and
+  ``asyncio.run`` joins the executor on exit, so Ctrl+C hung until Enter.
+  A daemon thread is simply abandoned instead.
+  """
+
+  def __init__(self, loop: asyncio.AbstractEventLoop):
+    self._loop = loop
+    self._lines: asyncio.Queue[Optional[str]] = asyncio.Queue()
+    # Only read when prompted so the prompt always precedes the echo.
+    self._wanted = threading.Semaphore(0)
+    threading.Thread(target=self._read, name="console-input", daemon=True).start()
+
+  def _read(self) -> None:
+    while True:
+      self._wanted.acquire()
+      line = sys.stdin.readline()
+      try:
+        self._loop.call_soon_threadsafe(self._lines.put_nowait, line or None)
+      except RuntimeError:  # The loop closed while we were reading.
+        return
+      if not line:
+        return
+
+  async def readline(self, prompt: str) -> str:
+    """Prints ``prompt`` and returns the next line, like ``input()``.
+
+    Raises:
+      EOFError: stdin is exhausted.
+    """
+    print(prompt, end="", flush=True)
+    self._wanted.release()
+    line = await self._lines.get()
+    if line is None:
+      raise EOFError
+    return line.rstrip("\r\n")
+
+
+async def _run_cli_streaming(
+    runner: Runner, user_id: str, session_id: str, *, keep_session: bool
+) -> None:
+  await _open_session(runner, user_id, session_id)
+  console = _ConsoleInput(asyncio.get_running_loop())
+  try:
+    while True:
+      try:
+        with profiling.phase("input"):
+          user_input = (await console.readline("You: ")).strip()
+      except EOFError:
+        print()
+        break
+
+      if not user_input:
+        continue
+
+      if user_input.lower() in _EXIT_COMMANDS:
+        print("Agent: Goodbye!")
+        break
+
+      try:
+        first_text, total = await _stream_turn(
+            runner,
+            user_id=user_id,
+            session_id=session_id,
+            message=_user_message(user_input),
+        )
+      except Exception as exc:  # pragma: no cover - linting requires explicit logging.
+        print(f"Agent error: {exc}")
+        break
+
+      first = f"{first_text:.2f}s" if first_text is not None else "n/a"
+      print(f"  [first token {first}, total {total:.2f}s]")
+  finally:
+    if not keep_session:
+      await runner.session_service.delete_session(
+          app_name=_DEFAULT_APP_NAME, user_id=user_id, session_id=session_id
+      )
+
+
+def _print_metrics_summary() -> None:
+  metrics = instrumentation.env_instrumentation.resolve()
+  if metrics:
+    print(instrumentation.format_summary(instrumentation.summarize(metrics.records)))
+  limiter = rate_limit.env_rate_limiter.resolve()
+  if limiter:
+    print(f"Rate limiter: {limiter.stats()}")
+
 
+def run_cli(
+    *,
+    stream: bool = False,
+    metrics_path: Optional[str] = None,
+    session_backend: str = "memory",
+    session_db: str = DEFAULT_SESSION_DB,
+    session_ttl: Optional[float] = None,
+    max_sessions: Optional[int] = None,
+    session_id: str = _DEFAULT_SESSION_ID,
+    context_budget: Optional[Union[int, str]] = None,
+    rate_limits: Optional[str] = None,
+    rate_limit_file: Optional[str] = None,
+    routes: Optional[str] = None,
+    hedge_after: Optional[float] = None,
+) -> None:
+  """Starts the hobby poem agent in an interactive console loop.
 
-def run_cli() -> None:
-  """Starts the hobby poem agent in an interactive console loop."""
+  Args:
+    stream: Print the reply token by token via ``run_async`` with SSE
+      streaming, reporting time-to-first-token and total latency per turn.
+    metrics_path: Optional JSON Lines file receiving per-turn metrics; a
+      percentile summary is printed on exit.
+    session_backend: ``memory`` or ``sqlite``; SQLite sessions survive
+      restarts and are resumed by ``session_id``.
+    session_db: SQLite database file for the ``sqlite`` backend.
+    session_ttl: Idle seconds before in-memory sessions are evicted.
+    max_sessions: Maximum number of in-memory sessions kept (LRU).
+    session_id: Conversation to start or resume.
+    context_budget: Estimated history tokens sent to the model per turn;
+      older turns are folded into a running summary. ``"auto"`` uses the
+      model's budget, ``"MODEL=TOKENS,..."`` overrides some model budgets;
+      ``None`` or ``0`` (the default) sends everything.
+    rate_limits: Shared per-model budgets as ``MODEL=RPM[:TPM],...``; the
+      console waits in the ``interactive`` lane, ahead of batch jobs.
+    rate_limit_file: State file shared with other rate-limited processes.
+    routes: Route turns across models with ``RoutingLlm``: ``"default"`` or
+      ``"TURN=MODEL[:MODEL...],..."``.
+    hedge_after: Seconds before a slow routed request is raced against the
+      next model; ``0`` turns hedging off.
+  """
   load_dotenv()
   _ensure_api_key()
+  if metrics_path:
+    instrumentation.configure_env(metrics_path, source="cli")
+  if rate_limits:
+    rate_limit.configure_env(rate_limits, state_path=rate_limit_file, lane="interactive")
+  if routes:
+    routing_llm.configure_env(routes, hedge_after=hedge_after)
 
-  agent = create_greeting_agent()
-  runner = Runner(
-      app_name=_DEFAULT_APP_NAME,
-      agent=agent,
-      session_service=InMemorySessionService(),
-      artifact_service=InMemoryArtifactService(),
-      memory_service=InMemoryMemoryService(),
-  )
+  with profiling.phase("load"):
+    runner = _build_runner(
+        create_session_service(
+            session_backend,
+            db_path=session_db,
+            ttl_seconds=session_ttl,
+            max_sessions=max_sessions,
+        ),
+        context_budget=context_budget,
+    )
+  keep_session = session_backend != "memory"
 
-  user_id = "local-user"
-  session_id = "local-session"
+  user_id = _DEFAULT_USER_ID
 
   print("Hobby poem agent ready. Tell me your hobby! Type 'exit' to quit.")
+  if stream:
+    try:
+      profiling.run(
+          _run_cli_streaming(
+              runner, user_id, session_id, keep_session=keep_session
+          )
+      )
+    except KeyboardInterrupt:
+      print()  # Keeps console output tidy on Ctrl+C.
+    _print_metrics_summary()
+    return
+
+  profiling.run(_open_session(runner, user_id, session_id))
   try:
     while True:
       try:
-        user_input = input("You: ").strip()
+        with profiling.phase("input"):
+          user_input = input("You: ").strip()
       except EOFError:
         print()
         break
@@ -84,10 +346,7 @@ def run_cli() -> None:
         print("Agent: Goodbye!")
         break
 
-      message = types.Content(
-          role="user",
-          parts=[types.Part.from_text(text=user_input)],
-      )
+      message = _user_message(user_input)
 
       try:
         events = runner.run(
@@ -99,13 +358,369 @@ def run_cli() -> None:
         print(f"Agent error: {exc}")
         break
 
+      metrics = instrumentation.env_instrumentation.resolve()
+      if metrics:
+        events = metrics.track_sync(events, label=session_id)
+
+      events = profiling.phase_iter(events, "model_wait")
       for response in _stream_agent_responses(events):
-        print(f"Agent: {response}")
+        with profiling.phase("write"):
+          print(f"Agent: {response}")
   except KeyboardInterrupt:
     print()  # Keeps console output tidy on Ctrl+C.
   finally:
-    runner.close_session(user_id=user_id, session_id=session_id)
+    if not keep_session:
+      profiling.run(
+          runner.session_service.delete_session(
+              app_name=_DEFAULT_APP_NAME, user_id=user_id, session_id=session_id
+          )
+      )
+    _print_metrics_summary()
+
+
+def run_batch_cli(
+    input_path: str = "-",
+    output_path: str = "-",
+    *,
+    workers: int = 8,
+    max_pending: Optional[int] = None,
+    metrics_path: Optional[str] = None,
+    session_backend: str = "memory",
+    session_db: str = DEFAULT_SESSION_DB,
+    keep_sessions: bool = False,
+    context_budget: Optional[Union[int, str]] = None,
+    rate_limits: Optional[str] = None,
+    rate_limit_file: Optional[str] = None,
+    routes: Optional[str] = None,
+    hedge_after: Optional[float] = None,
+) -> batch.BatchStats:
+  """Runs JSON Lines conversations through one ``Runner`` without a prompt.
+
+  See ``greeting_agent.batch`` for the input and output line formats.
+
+  Args:
+    input_path: JSON Lines file of conversations, or ``-`` for stdin.
+    output_path: File receiving one result line per conversation in input
+      order, or ``-`` for stdout.
+    workers: Conversations run concurrently.
+    max_pending: Conversations read but not yet written (default
+      ``4 * workers``).
+    metrics_path: Optional JSON Lines file receiving per-turn metrics.
+    session_backend: ``memory`` or ``sqlite``.
+    session_db: SQLite database file for the ``sqlite`` backend.
+    keep_sessions: Keep the conversations' sessions, e.g. to inspect them
+      in the SQLite backend afterwards.
+    context_budget: Estimated history tokens sent to the model per turn, as
+      for ``run_cli``.
+    rate_limits: Shared per-model budgets as ``MODEL=RPM[:TPM],...``; batch
+      conversations wait in the ``batch`` lane.
+    rate_limit_file: State file shared with other rate-limited processes.
+    routes: Route turns across models, as for ``run_cli``.
+    hedge_after: Hedging delay for routed requests, as for ``run_cli``.
+
+  Returns:
+    Throughput and latency statistics of the run.
+  """
+  load_dotenv()
+  _ensure_api_key()
+  if metrics_path:
+    instrumentation.configure_env(metrics_path, source="batch")
+  if rate_limits:
+    rate_limit.configure_env(rate_limits, state_path=rate_limit_file, lane="batch")
+  if routes:
+    routing_llm.configure_env(routes, hedge_after=hedge_after)
+
+  with profiling.phase("load"):
+    runner = _build_runner(
+        create_session_service(session_backend, db_path=session_db),
+        context_budget=context_budget,
+    )
+  source = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+  sink = sys.stdout if output_path == "-" else open(output_path, "w", encoding="utf-8")
+  try:
+    return profiling.run(
+        batch.run_batch(
+            runner,
+            source,
+            sink,
+            workers=workers,
+            max_pending=max_pending,
+            keep_sessions=keep_sessions,
+        )
+    )
+  finally:
+    for handle in (source, sink):
+      if handle not in (sys.stdin, sys.stdout):
+        handle.close()
+
+
+def _add_rate_limit_args(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument(
+      "--rate-limit",
+      default=None,
+      help="Shared per-model budgets as MODEL=RPM[:TPM],... ('*' for any model)",
+  )
+  parser.add_argument(
+      "--rate-limit-file",
+      default=None,
+      help="State file shared by rate-limited processes (default: in the temp dir)",
+  )
+
+
+def _add_routing_args(parser: argparse.ArgumentParser) -> None:
+  parser.add_argument(
+      "--route",
+      type=_routes,
+      default=None,
+      metavar="SPEC",
+      help="Route turns across models: 'default' or TURN=MODEL[:MODEL...],... "
+      "with turns question, poem and default (default: one model)",
+  )
+  parser.add_argument(
+      "--hedge-after",
+      type=float,
+      default=None,
+      metavar="SECONDS",
+      help="Race a routed request that is still silent after this long "
+      "against the next model; 0 turns hedging off",
+  )
+
+
+def _routes(value: str) -> str:
+  try:
+    routing_llm.parse_routes(value)
+  except ValueError as exc:
+    raise argparse.ArgumentTypeError(str(exc)) from exc
+  return value
+
+
+def _context_budget(value: str) -> Union[int, str]:
+  if value.strip().lower() == "auto":
+    return "auto"
+  if "=" in value:
+    try:
+      parse_model_budgets(value)
+    except ValueError as exc:
+      raise argparse.ArgumentTypeError(str(exc)) from exc
+    return value
+  try:
+    budget = int(value)
+  except ValueError:
+    budget = -1
+  if budget < 0:
+    raise argparse.ArgumentTypeError(
+        "expected 'auto', MODEL=TOKENS,... or a token count >= 0"
+    )
+  return budget
+
+
+def _valid_rate_limits(spec: Optional[str]) -> bool:
+  try:
+    rate_limit.parse_budgets(spec or "")
+  except ValueError as exc:
+    print(exc, file=sys.stderr)
+    return False
+  return True
+
+
+def _parse_batch_args(argv: Sequence[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      prog="cli batch",
+      description=(
+          "Run conversations from JSON Lines concurrently and write one JSON"
+          " result line per conversation, in input order"
+      ),
+  )
+  parser.add_argument(
+      "--input",
+      default="-",
+      help="JSON Lines file of {id, user_id, turns[]} objects (default: stdin)",
+  )
+  parser.add_argument(
+      "--output",
+      default="-",
+      help="File receiving the JSON Lines results (default: stdout)",
+  )
+  parser.add_argument(
+      "--workers",
+      type=int,
+      default=8,
+      help="Conversations run concurrently (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--max-pending",
+      type=int,
+      default=None,
+      help="Conversations read ahead of the output (default: 4 x --workers)",
+  )
+  parser.add_argument(
+      "--metrics",
+      default=None,
+      help="Write per-turn latency/token metrics to this JSON Lines file",
+  )
+  parser.add_argument(
+      "--session-backend",
+      choices=SESSION_BACKENDS,
+      default="memory",
+      help="Where sessions are stored (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-db",
+      default=DEFAULT_SESSION_DB,
+      help="SQLite file for --session-backend sqlite (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--keep-sessions",
+      action="store_true",
+      help="Keep each conversation's session instead of deleting it",
+  )
+  parser.add_argument(
+      "--context-budget",
+      type=_context_budget,
+      default=None,
+      help="Fold history beyond this many estimated tokens per turn into a "
+      "summary; 'auto' uses the model's budget and MODEL=TOKENS,... overrides "
+      "it for some models (default: send the full history)",
+  )
+  parser.add_argument(
+      "--profile",
+      default=None,
+      metavar="PREFIX",
+      help=_PROFILE_HELP,
+  )
+  parser.add_argument(
+      "--profile-mode",
+      choices=profiling.PROFILE_MODES,
+      default=profiling.DEFAULT_PROFILE_MODE,
+      help=_PROFILE_MODE_HELP,
+  )
+  _add_rate_limit_args(parser)
+  _add_routing_args(parser)
+  return parser.parse_args(argv)
+
+
+def _batch_main(argv: Sequence[str]) -> int:
+  args = _parse_batch_args(argv)
+  if args.workers <= 0:
+    print("--workers must be a positive integer", file=sys.stderr)
+    return 2
+  if not _valid_rate_limits(args.rate_limit):
+    return 2
+  with profiling.profile(args.profile, mode=args.profile_mode):
+    stats = run_batch_cli(
+        args.input,
+        args.output,
+        workers=args.workers,
+        max_pending=args.max_pending,
+        metrics_path=args.metrics,
+        session_backend=args.session_backend,
+        session_db=args.session_db,
+        keep_sessions=args.keep_sessions,
+        context_budget=args.context_budget,
+        rate_limits=args.rate_limit,
+        rate_limit_file=args.rate_limit_file,
+        routes=args.route,
+        hedge_after=args.hedge_after,
+    )
+  batch.print_stats(stats)
+  limiter = rate_limit.env_rate_limiter.resolve()
+  if limiter:
+    print(f"Rate limiter: {limiter.stats()}", file=sys.stderr)
+  return 1 if stats.errors else 0
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      description="Chat with the hobby poem agent",
+      epilog="Run 'cli batch --help' for non-interactive JSON Lines batches.",
+  )
+  parser.add_argument(
+      "--stream",
+      action="store_true",
+      help="Print replies as they are generated and report per-turn latency",
+  )
+  parser.add_argument(
+      "--metrics",
+      default=None,
+      help="Write per-turn latency/token metrics to this JSON Lines file",
+  )
+  parser.add_argument(
+      "--session-backend",
+      choices=SESSION_BACKENDS,
+      default="memory",
+      help="Where sessions are stored (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-db",
+      default=DEFAULT_SESSION_DB,
+      help="SQLite file for --session-backend sqlite (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-id",
+      default=_DEFAULT_SESSION_ID,
+      help="Session to start or resume (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-ttl",
+      type=float,
+      default=None,
+      help="Evict in-memory sessions idle for this many seconds",
+  )
+  parser.add_argument(
+      "--max-sessions",
+      type=int,
+      default=None,
+      help="Keep at most this many in-memory sessions (least recently used go first)",
+  )
+  parser.add_argument(
+      "--context-budget",
+      type=_context_budget,
+      default=None,
+      help="Fold history beyond this many estimated tokens per turn into a "
+      "summary; 'auto' uses the model's budget and MODEL=TOKENS,... overrides "
+      "it for some models (default: send the full history)",
+  )
+  parser.add_argument(
+      "--profile",
+      default=None,
+      metavar="PREFIX",
+      help=_PROFILE_HELP,
+  )
+  parser.add_argument(
+      "--profile-mode",
+      choices=profiling.PROFILE_MODES,
+      default=profiling.DEFAULT_PROFILE_MODE,
+      help=_PROFILE_MODE_HELP,
+  )
+  _add_rate_limit_args(parser)
+  _add_routing_args(parser)
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  argv = list(sys.argv[1:] if argv is None else argv)
+  if argv[:1] == ["batch"]:
+    return _batch_main(argv[1:])
+  args = _parse_args(argv)
+  if not _valid_rate_limits(args.rate_limit):
+    return 2
+  with profiling.profile(args.profile, mode=args.profile_mode):
+    run_cli(
+        stream=args.stream,
+        metrics_path=args.metrics,
+        session_backend=args.session_backend,
+        session_db=args.session_db,
+        session_ttl=args.session_ttl,
+        max_sessions=args.max_sessions,
+        session_id=args.session_id,
+        context_budget=args.context_budget,
+        rate_limits=args.rate_limit,
+        rate_limit_file=args.rate_limit_file,
+        routes=args.route,
+        hedge_after=args.hedge_after,
+    )
+  return 0
 
 
 if __name__ == "__main__":
-  run_cli()
+  raise SystemExit(main())
@@ -0,0 +1,319 @@
+"""Keeps the conversation sent to the model under a per-model token budget.
+
+Once a session's history exceeds the budget, ``ContextWindow`` forwards only
+the most recent contents that fit and folds everything older into a running
+summary appended to the system instruction. Summaries are cached per
+session and extended incrementally, so each turn only summarizes the
+contents that just slid out of the window.
+
+Token counts are estimated at four characters per token, the rule of thumb
+in ``GEMINI_MODELS.md``. Per-model budgets default to
+``DEFAULT_MODEL_BUDGETS`` and can be overridden per model with a
+``MODEL=TOKENS,...`` spec (``--context-budget`` or
+``GREETING_AGENT_CONTEXT_BUDGET``).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+CONTEXT_BUDGET_ENV = "GREETING_AGENT_CONTEXT_BUDGET"
+CHARS_PER_TOKEN = 4
+DEFAULT_CONTEXT_BUDGET = 2_000
+# The "Context Budget" table of GEMINI_MODELS.md.
+DEFAULT_MODEL_BUDGETS: Dict[str, int] = {
+    "gemini-2.5-pro": 8_000,
+    "gemini-2.5-flash": 4_000,
+    "gemini-2.0-flash": 4_000,
+    "gemini-2.0-flash-lite": 2_000,
+    "gemini-1.5-flash": 4_000,
+    "gemini-1.5-flash-8b": 2_000,
+    "gemini-1.5-pro": 8_000,
+}
+_SUMMARY_HEADER = "Summary of the earlier conversation:"
+# Session-scoped state key naming the session's cached summary.
+SUMMARY_KEY_STATE = "context_window_summary_key"
+
+Summarizer = Callable[[str, Sequence[types.Content]], str]
+
+
+def estimate_tokens(text: str) -> int:
+  """Approximates the token count of ``text`` (4 characters per token)."""
+  return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _content_text(content: types.Content) -> str:
+  return " ".join(part.text for part in content.parts or [] if part.text)
+
+
+def content_tokens(content: types.Content) -> int:
+  """Estimated tokens of one content; non-text parts count as one token."""
+  parts = content.parts or []
+  return sum(estimate_tokens(p.text) if p.text else 1 for p in parts) or 1
+
+
+def parse_model_budgets(spec: str) -> Dict[str, int]:
+  """Parses ``MODEL=TOKENS`` entries separated by commas.
+
+  Entries override ``DEFAULT_MODEL_BUDGETS``; ``*`` sets the budget for
+  models without their own entry, e.g. ``gemini-2.5-flash=6000,*=3000``.
+  """
+  budgets = dict(DEFAULT_MODEL_BUDGETS)
+  for entry in filter(None, (item.strip() for item in spec.split(","))):
+    model, sep, tokens = entry.partition("=")
+    try:
+      budget = int(tokens) if sep and model.strip() else 0
+    except ValueError:
+      budget = 0
+    if budget <= 0:
+      raise ValueError(f"Invalid context budget {entry!r}; expected MODEL=TOKENS")
+    budgets[model.strip()] = budget
+  return budgets
+
+
+def budget_for(model: str, budgets: Optional[Dict[str, int]] = None) -> int:
+  """History budget for ``model``: exact match, longest prefix, then ``*``."""
+  budgets = DEFAULT_MODEL_BUDGETS if budgets is None else budgets
+  if model in budgets:
+    return budgets[model]
+  prefixes = [name for name in budgets if name != "*" and model.startswith(name)]
+  if prefixes:
+    return budgets[max(prefixes, key=len)]
+  return budgets.get("*", DEFAULT_CONTEXT_BUDGET)
+
+
+def extractive_summary(
+    previous: str, dropped: Sequence[types.Content], *, line_chars: int = 160
+) -> str:
+  """Default summarizer: one clipped line per dropped content, no LLM call."""
+  lines = [previous] if previous else []
+  for content in dropped:
+    text = " ".join(_content_text(content).split())
+    if not text:
+      continue
+    speaker = "User" if content.role == "user" else "Agent"
+    if len(text) > line_chars:
+      text = text[: line_chars - 3].rstrip() + "..."
+    lines.append(f"{speaker}: {text}")
+  return "\n".join(lines)
+
+
+def _clip_summary(summary: str, max_tokens: int) -> str:
+  """Keeps the newest summary lines that fit in ``max_tokens``."""
+  if estimate_tokens(summary) <= max_tokens:
+    return summary
+  kept = []
+  used = 0
+  for line in reversed(summary.splitlines()):
+    cost = estimate_tokens(line) + 1
+    if used + cost > max_tokens:
+      break
+    kept.append(line)
+    used += cost
+  return "\n".join(reversed(kept))
+
+
+@dataclass
+class _Summary:
+  folded: int = 0
+  text: str = ""
+
+
+def _session_key(callback_context: CallbackContext) -> str:
+  """Summary cache key, stored in session state so it follows the session."""
+  key = callback_context.state.get(SUMMARY_KEY_STATE)
+  if not key:
+    key = uuid.uuid4().hex
+    callback_context.state[SUMMARY_KEY_STATE] = key
+  return key
+
+
+class ContextWindow:
+  """``before_model_callback`` trimming history to a token budget.
+
+  Args:
+    budget: Estimated token budget for the forwarded history plus summary.
+      ``None`` picks the budget of the request's model.
+    summary_share: Fraction of the budget reserved for the running summary.
+    min_recent: Contents always kept verbatim, even over budget.
+    summarizer: ``(previous_summary, dropped_contents) -> summary``.
+    max_sessions: Sessions whose summaries stay cached (LRU).
+  """
+
+  def __init__(
+      self,
+      budget: Optional[int] = None,
+      *,
+      summary_share: float = 0.25,
+      min_recent: int = 2,
+      summarizer: Summarizer = extractive_summary,
+      max_sessions: int = 10_000,
+      model_budgets: Optional[Dict[str, int]] = None,
+  ):
+    if budget is not None and budget <= 0:
+      raise ValueError("budget must be positive")
+    if not 0 <= summary_share < 1:
+      raise ValueError("summary_share must be in [0, 1)")
+    self.budget = budget
+    self.summary_share = summary_share
+    self.min_recent = max(1, min_recent)
+    self.summarizer = summarizer
+    self.max_sessions = max_sessions
+    self.model_budgets = (
+        dict(DEFAULT_MODEL_BUDGETS) if model_budgets is None else model_budgets
+    )
+    self.trimmed_turns = 0
+    self._lock = threading.Lock()
+    self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+
+  @classmethod
+  def from_spec(cls, spec: Any) -> Optional["ContextWindow"]:
+    """Builds a window from a budget spec, or None when it is off.
+
+    ``auto`` uses the per-model budgets; ``MODEL=TOKENS,...`` overrides some
+    of them (see ``parse_model_budgets``); a number fixes the budget for
+    every model; empty or ``0`` disables windowing.
+    """
+    value = str(spec or "").strip()
+    if not value or value == "0":
+      return None
+    if value.lower() == "auto":
+      return cls()
+    if "=" in value:
+      return cls(model_budgets=parse_model_budgets(value))
+    return cls(int(value))
+
+  @classmethod
+  def from_env(cls) -> Optional["ContextWindow"]:
+    """Builds a window from ``GREETING_AGENT_CONTEXT_BUDGET``, if set."""
+    return cls.from_spec(os.environ.get(CONTEXT_BUDGET_ENV))
+
+  def budget_for(self, model: Optional[str]) -> int:
+    if self.budget is not None:
+      return self.budget
+    return budget_for(model or "", self.model_budgets)
+
+  def _split(self, contents: Sequence[types.Content], budget: int) -> int:
+    """Index of the first content kept verbatim."""
+    used = 0
+    start = len(contents)
+    while start > 0:
+      cost = content_tokens(contents[start - 1])
+      if len(contents) - start >= self.min_recent and used + cost > budget:
+        break
+      used += cost
+      start -= 1
+    # Start the window on a user turn and never orphan a function response
+    # from the call that produced it.
+    while 0 < start < len(contents) - 1 and (
+        contents[start].role != "user"
+        or any(part.function_response for part in contents[start].parts or [])
+    ):
+      start += 1
+    return start
+
+  def _summary_for(
+      self, key: str, contents: Sequence[types.Content], fold_to: int, max_tokens: int
+  ) -> str:
+    with self._lock:
+      cached = self._summaries.pop(key, None) or _Summary()
+      if cached.folded > fold_to:
+        # History shrank (rewind or new session with a reused id); rebuild.
+        cached = _Summary()
+      if cached.folded < fold_to:
+        text = self.summarizer(cached.text, contents[cached.folded : fold_to])
+        cached = _Summary(folded=fold_to, text=_clip_summary(text, max_tokens))
+      self._summaries[key] = cached
+      while len(self._summaries) > self.max_sessions:
+        self._summaries.popitem(last=False)
+      return cached.text
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    contents = llm_request.contents or []
+    budget = self.budget_for(llm_request.model)
+    if sum(content_tokens(content) for content in contents) <= budget:
+      return None
+    summary_budget = int(budget * self.summary_share)
+    start = self._split(contents, budget - summary_budget)
+    if start == 0:
+      return None
+    summary = self._summary_for(
+        _session_key(callback_context), contents, start, summary_budget
+    )
+    llm_request.contents = list(contents[start:])
+    if summary:
+      llm_request.append_instructions([f"{_SUMMARY_HEADER}\n{summary}"])
+    self.trimmed_turns += 1
+    return None
+
+  def forget(self, key: str) -> None:
+    """Drops a cached summary; ``key`` is the session's ``SUMMARY_KEY_STATE``."""
+    with self._lock:
+      self._summaries.pop(key, None)
+
+
+class EnvContextWindow:
+  """Resolves a ``ContextWindow`` from the environment on first model call.
+
+  Follows ``llm_cache.EnvResponseCache`` so ``root_agent`` can be built
+  before entry points have configured windowing.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._resolved = False
+    self._window: Optional[ContextWindow] = None
+
+  def reset(self) -> None:
+    with self._lock:
+      self._resolved = False
+      self._window = None
+
+  def resolve(self) -> Optional[ContextWindow]:
+    with self._lock:
+      if not self._resolved:
+        self._window = ContextWindow.from_env()
+        self._resolved = True
+      return self._window
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    window = self.resolve()
+    return window.before_model(callback_context, llm_request) if window else None
+
+
+env_context_window = EnvContextWindow()
+
+
+def configure_env(budget: Any) -> None:
+  """Sets ``GREETING_AGENT_CONTEXT_BUDGET``; see ``ContextWindow.from_spec``."""
+  os.environ[CONTEXT_BUDGET_ENV] = str(budget)
+  env_context_window.reset()
+
+
+__all__ = [
+    "ContextWindow",
+    "DEFAULT_MODEL_BUDGETS",
+    "EnvContextWindow",
+    "SUMMARY_KEY_STATE",
+    "budget_for",
+    "configure_env",
+    "content_tokens",
+    "env_context_window",
+    "estimate_tokens",
+    "extractive_summary",
+    "parse_model_budgets",
+]
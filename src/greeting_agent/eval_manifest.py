@@ -0,0 +1,153 @@
+"""Fingerprint manifest used to skip re-evaluating unchanged evalsets."""
+
+from __future__ import annotations
+
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .evalset_io import TEST_CONFIG_NAME
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_PATH = ".evalset_manifest.json"
+
+
+@dataclass
+class ManifestEntry:
+  fingerprint: str
+  passed: bool
+  details: str
+
+
+def _hash_bytes(*chunks: bytes) -> str:
+  digest = hashlib.sha256()
+  for chunk in chunks:
+    digest.update(len(chunk).to_bytes(8, "big"))
+    digest.update(chunk)
+  return digest.hexdigest()
+
+
+def _module_sources(agent_module: str) -> list[Path]:
+  spec = importlib.util.find_spec(agent_module)
+  if spec is None or not spec.origin:
+    return []
+  if spec.submodule_search_locations:
+    sources: list[Path] = []
+    for location in spec.submodule_search_locations:
+      sources.extend(sorted(Path(location).rglob("*.py")))
+    return sources
+  return [Path(spec.origin)]
+
+
+def agent_config(agent_module: str) -> Dict[str, Any]:
+  """Describes the module's ``root_agent`` (model, name, instruction)."""
+  module = importlib.import_module(agent_module)
+  agent_source = getattr(module, "agent", module)
+  root_agent = getattr(agent_source, "root_agent", None)
+  if root_agent is None:
+    return {}
+  model = getattr(root_agent, "model", "")
+  instruction = getattr(root_agent, "instruction", "")
+  return {
+      "name": getattr(root_agent, "name", ""),
+      "model": model if isinstance(model, str) else getattr(model, "model", ""),
+      "instruction": instruction if isinstance(instruction, str) else "",
+  }
+
+
+def agent_fingerprint(agent_module: str) -> str:
+  """Hashes the agent module's source files and its root agent config."""
+  chunks = [path.read_bytes() for path in _module_sources(agent_module)]
+  config = json.dumps(agent_config(agent_module), sort_keys=True)
+  return _hash_bytes(config.encode("utf-8"), *chunks)
+
+
+def evalset_fingerprint(
+    path: Path,
+    *,
+    agent_fp: str,
+    num_runs: int,
+    initial_session_file: Optional[str] = None,
+    mode: str = "",
+) -> str:
+  """Hashes every input that can change an evalset's verdict.
+
+  The sibling ``test_config.json`` holds the criteria thresholds, so its
+  bytes are hashed too. ``mode`` describes non-default repeat strategies
+  (adaptive runs); it is left out of the hash when empty so existing
+  fingerprints stay valid.
+  """
+  session_bytes = (
+      Path(initial_session_file).read_bytes() if initial_session_file else b""
+  )
+  chunks = [
+      path.read_bytes(),
+      agent_fp.encode("utf-8"),
+      str(num_runs).encode("utf-8"),
+      session_bytes,
+  ]
+  config_path = path.parent / TEST_CONFIG_NAME
+  if config_path.is_file():
+    chunks.append(b"config:" + config_path.read_bytes())
+  if mode:
+    chunks.append(mode.encode("utf-8"))
+  return _hash_bytes(*chunks)
+
+
+class EvalManifest:
+  """JSON file mapping evalset paths to their last fingerprint and verdict."""
+
+  def __init__(self, path: str | Path):
+    self.path = Path(path).expanduser().resolve()
+    self.entries: Dict[str, ManifestEntry] = {}
+
+  @classmethod
+  def load(cls, path: str | Path) -> "EvalManifest":
+    manifest = cls(path)
+    if not manifest.path.exists():
+      return manifest
+    data = json.loads(manifest.path.read_text(encoding="utf-8"))
+    if data.get("version") != MANIFEST_VERSION:
+      return manifest
+    for key, entry in data.get("evalsets", {}).items():
+      manifest.entries[key] = ManifestEntry(**entry)
+    return manifest
+
+  def lookup(self, evalset_path: Path, fingerprint: str) -> Optional[ManifestEntry]:
+    """Returns the stored entry when ``fingerprint`` is unchanged."""
+    entry = self.entries.get(str(evalset_path))
+    if entry and entry.fingerprint == fingerprint:
+      return entry
+    return None
+
+  def update(
+      self, evalset_path: Path, fingerprint: str, passed: bool, details: str
+  ) -> None:
+    self.entries[str(evalset_path)] = ManifestEntry(
+        fingerprint=fingerprint, passed=passed, details=details
+    )
+
+  def save(self) -> None:
+    payload = {
+        "version": MANIFEST_VERSION,
+        "evalsets": {key: asdict(entry) for key, entry in sorted(self.entries.items())},
+    }
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    os.replace(tmp_path, self.path)
+
+
+__all__ = [
+    "DEFAULT_MANIFEST_PATH",
+    "EvalManifest",
+    "ManifestEntry",
+    "agent_config",
+    "agent_fingerprint",
+    "evalset_fingerprint",
+]
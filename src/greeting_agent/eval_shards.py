@@ -0,0 +1,261 @@
+"""Case-level sharding of evalsets and shard result files.
+
+``--shard i/N`` deals the eval cases of all listed evalsets round-robin, in
+the order the evalsets are given, so every node running the same command
+gets a disjoint, balanced slice. Each evalset's slice is written as a plain
+``.evalset.json`` (next to a copy of its ``test_config.json``) that
+``AgentEvaluator`` runs like any other evalset.
+
+Shard results are saved as JSON or JUnit XML and combined by
+``merge_results`` into one verdict per source evalset.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import tempfile
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .evalset_io import case_id
+from .evalset_io import load_evalset
+from .evalset_io import write_derived_evalset
+
+RESULTS_VERSION = 1
+_SHARD_SPEC = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+
+Shard = Tuple[int, int]
+
+
+def parse_shard(spec: str) -> Shard:
+  """Parses ``i/N`` (1-based) into ``(i, N)``."""
+  match = _SHARD_SPEC.match(spec or "")
+  if not match:
+    raise ValueError(f"Invalid shard {spec!r}; expected i/N, e.g. 1/4")
+  index, count = int(match.group(1)), int(match.group(2))
+  if count <= 0 or not 1 <= index <= count:
+    raise ValueError(f"Invalid shard {spec!r}; i must be between 1 and N")
+  return index, count
+
+
+def format_shard(shard: Shard) -> str:
+  return f"{shard[0]}/{shard[1]}"
+
+
+@dataclass
+class ShardPlan:
+  """The slice of one source evalset assigned to this shard."""
+
+  source: Path
+  path: Path
+  case_ids: List[str]
+
+
+def write_slice(
+    source: Path,
+    payload: Dict[str, Any],
+    cases: List[Dict[str, Any]],
+    key: str,
+    work_dir: Optional[Path] = None,
+) -> Path:
+  """Writes ``cases`` of ``source`` as a plain evalset and returns its path.
+
+  Slices are keyed by the source and config versions and ``key``, so
+  re-running the same slice reuses the file (and its manifest entry); see
+  ``evalset_io.write_derived_evalset``.
+  """
+  base_dir = work_dir or Path(tempfile.gettempdir()) / "greeting_agent_shards"
+  return write_derived_evalset(
+      source, key, lambda: {**payload, "eval_cases": cases}, base_dir
+  )
+
+
+def shard_evalsets(
+    paths: Sequence[Path], shard: Shard, work_dir: Optional[Path] = None
+) -> List[ShardPlan]:
+  """Writes this shard's cases of each evalset into ``work_dir``.
+
+  Evalsets without cases in the shard are left out.
+  """
+  index, count = shard
+  plans: List[ShardPlan] = []
+  position = 0
+  for source in paths:
+    payload = load_evalset(source)
+    cases = payload.get("eval_cases") or []
+    # Global positions name cases without an id the same way in every shard.
+    selected = [
+        (position + offset, case)
+        for offset, case in enumerate(cases)
+        if (position + offset) % count == index - 1
+    ]
+    position += len(cases)
+    if not selected:
+      continue
+    plans.append(
+        ShardPlan(
+            source=source,
+            path=write_slice(
+                source,
+                payload,
+                [case for _, case in selected],
+                format_shard(shard),
+                work_dir,
+            ),
+            case_ids=[case_id(case) or str(i) for i, case in selected],
+        )
+    )
+  return plans
+
+
+@dataclass
+class ShardResult:
+  """Verdict of one evalset slice, as stored in a results file."""
+
+  evalset: str
+  passed: bool
+  details: str
+  cases: List[str] = field(default_factory=list)
+
+
+def write_results(
+    path: Path, results: Iterable[ShardResult], shard: Optional[Shard] = None
+) -> Path:
+  """Saves ``results`` as JUnit XML (``*.xml``) or JSON (anything else)."""
+  results = list(results)
+  shard = shard or (1, 1)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+  if path.suffix.lower() == ".xml":
+    _junit_tree(results, shard).write(tmp_path, encoding="utf-8", xml_declaration=True)
+  else:
+    payload = {
+        "version": RESULTS_VERSION,
+        "shard": format_shard(shard),
+        "results": [asdict(result) for result in results],
+    }
+    tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+  os.replace(tmp_path, path)
+  return path
+
+
+def _junit_tree(results: Sequence[ShardResult], shard: Shard) -> ET.ElementTree:
+  failures = sum(1 for result in results if not result.passed)
+  suite = ET.Element(
+      "testsuite",
+      name=f"evalsets shard {format_shard(shard)}",
+      tests=str(len(results)),
+      failures=str(failures),
+  )
+  properties = ET.SubElement(suite, "properties")
+  ET.SubElement(properties, "property", name="shard", value=format_shard(shard))
+  for result in results:
+    case = ET.SubElement(
+        suite, "testcase", classname="evalsets", name=Path(result.evalset).name
+    )
+    case.set("file", result.evalset)
+    case_properties = ET.SubElement(case, "properties")
+    ET.SubElement(
+        case_properties, "property", name="cases", value=",".join(result.cases)
+    )
+    if not result.passed:
+      failure = ET.SubElement(case, "failure", message=result.details)
+      failure.text = result.details
+  return ET.ElementTree(suite)
+
+
+def _property(element: ET.Element, name: str) -> Optional[str]:
+  prop = element.find(f"properties/property[@name='{name}']")
+  return None if prop is None else prop.get("value")
+
+
+def read_results(path: Path) -> Tuple[Shard, List[ShardResult]]:
+  """Loads a results file written by ``write_results``."""
+  if path.suffix.lower() == ".xml":
+    suite = ET.parse(path).getroot()
+    results = []
+    for case in suite.iter("testcase"):
+      failure = case.find("failure")
+      details = "all criteria satisfied" if failure is None else failure.get("message", "")
+      cases = _property(case, "cases")
+      results.append(
+          ShardResult(
+              evalset=case.get("file") or case.get("name", ""),
+              passed=failure is None,
+              details=details,
+              cases=cases.split(",") if cases else [],
+          )
+      )
+    return parse_shard(_property(suite, "shard") or "1/1"), results
+  data = json.loads(path.read_text(encoding="utf-8"))
+  if data.get("version") != RESULTS_VERSION:
+    raise ValueError(f"{path}: unsupported results version {data.get('version')!r}")
+  return (
+      parse_shard(data.get("shard", "1/1")),
+      [ShardResult(**entry) for entry in data.get("results", [])],
+  )
+
+
+def merge_results(
+    paths: Sequence[Path],
+) -> Tuple[List[ShardResult], List[str]]:
+  """Combines shard results into one result per source evalset.
+
+  An evalset passes when all of its slices passed. Returns the merged
+  results, in first-seen order, and a list of problems: missing or
+  duplicated shards, or shard files disagreeing on ``N``.
+  """
+  merged: Dict[str, ShardResult] = {}
+  failures: Dict[str, List[str]] = {}
+  seen: Dict[int, Set[int]] = {}
+  problems: List[str] = []
+  for path in paths:
+    shard, results = read_results(path)
+    indices = seen.setdefault(shard[1], set())
+    if shard[0] in indices:
+      problems.append(f"shard {format_shard(shard)} appears more than once ({path})")
+    indices.add(shard[0])
+    for result in results:
+      entry = merged.setdefault(
+          result.evalset,
+          ShardResult(evalset=result.evalset, passed=True, details=""),
+      )
+      entry.cases.extend(result.cases)
+      if not result.passed:
+        entry.passed = False
+        failures.setdefault(result.evalset, []).append(
+            f"shard {format_shard(shard)}: {result.details}"
+        )
+  if len(seen) > 1:
+    problems.append(f"shard files disagree on the shard count: {sorted(seen)}")
+  for count, indices in seen.items():
+    missing = sorted(set(range(1, count + 1)) - indices)
+    if missing:
+      problems.append(
+          "missing results for shard(s) "
+          + ", ".join(format_shard((index, count)) for index in missing)
+      )
+  for key, entry in merged.items():
+    entry.details = (
+        "; ".join(failures[key])
+        if key in failures
+        else f"all criteria satisfied ({len(entry.cases)} cases)"
+    )
+  return list(merged.values()), problems
+
+
+__all__ = [
+    "ShardPlan",
+    "ShardResult",
+    "format_shard",
+    "merge_results",
+    "parse_shard",
+    "read_results",
+    "shard_evalsets",
+    "write_results",
+    "write_slice",
+]
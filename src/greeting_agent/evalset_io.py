@@ -0,0 +1,440 @@
+"""Reading and writing evalsets in the compact, gzip and JSON Lines formats.
+
+``AgentEvaluator`` only reads plain ``.evalset.json`` files, so the other
+formats are materialized into a compact JSON copy before evaluation.
+
+Formats:
+  json: legacy ``indent=2`` output with every field, including nulls.
+  compact: ``None`` fields dropped, no indentation (``.evalset.json``).
+  gzip: compact JSON, gzip-compressed (``.evalset.json.gz``).
+  jsonl: one header line with the evalset metadata followed by one line per
+    eval case (``.evalset.jsonl``).
+
+``EvalsetJournal`` uses the jsonl layout as an append-only journal so cases
+can be flushed as they finish and compacted into any format at the end.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Set, TextIO
+
+EVALSET_FORMATS = ("json", "compact", "gzip", "jsonl")
+DEFAULT_EVALSET_FORMAT = "compact"
+_SUFFIXES = {
+    "json": ".evalset.json",
+    "compact": ".evalset.json",
+    "gzip": ".evalset.json.gz",
+    "jsonl": ".evalset.jsonl",
+}
+_PARTIAL_SUFFIX = ".evalset.partial.jsonl"
+_READ_CHUNK_SIZE = 1 << 16
+_COMPACT_SEPARATORS = (",", ":")
+TEST_CONFIG_NAME = "test_config.json"
+# Derived evalsets (materialized copies, shard and case slices) not used for
+# this long are deleted when another one is written.
+DERIVED_MAX_AGE_SECONDS = 7 * 24 * 3600
+
+
+def strip_none(value: Any) -> Any:
+  """Recursively drops ``None`` values from dicts (lists keep their length)."""
+  if isinstance(value, dict):
+    return {k: strip_none(v) for k, v in value.items() if v is not None}
+  if isinstance(value, list):
+    return [strip_none(item) for item in value]
+  return value
+
+
+def evalset_path(output_dir: Path, eval_set_id: str, fmt: str) -> Path:
+  """Returns the output path for ``eval_set_id`` in format ``fmt``."""
+  return output_dir / f"{eval_set_id}{_SUFFIXES[fmt]}"
+
+
+def _compact_dumps(value: Any) -> str:
+  return json.dumps(value, ensure_ascii=False, separators=_COMPACT_SEPARATORS)
+
+
+def _header(payload: Dict[str, Any]) -> Dict[str, Any]:
+  return {k: v for k, v in payload.items() if k != "eval_cases"}
+
+
+def case_id(case: Dict[str, Any]) -> Optional[str]:
+  """Returns the eval id of a dumped case (snake_case or camelCase keys)."""
+  value = case.get("eval_id", case.get("evalId"))
+  return None if value is None else str(value)
+
+
+def write_evalset_stream(
+    header: Dict[str, Any],
+    cases: Iterable[Dict[str, Any]],
+    path: Path,
+    fmt: str,
+) -> Path:
+  """Writes an evalset from its metadata and an iterable of case dicts.
+
+  Except for the legacy ``json`` format, cases are serialized one at a time,
+  so the full evalset never has to be held in memory.
+  """
+  if fmt not in EVALSET_FORMATS:
+    raise ValueError(f"Unknown evalset format {fmt!r}; expected one of {EVALSET_FORMATS}")
+  if fmt == "json":
+    payload = dict(header, eval_cases=list(cases))
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+  header = strip_none(header)
+  if fmt == "jsonl":
+    with path.open("w", encoding="utf-8") as handle:
+      handle.write(_compact_dumps(header) + "\n")
+      for case in cases:
+        handle.write(_compact_dumps(strip_none(case)) + "\n")
+    return path
+
+  opener = gzip.open if fmt == "gzip" else open
+  with opener(path, "wt", encoding="utf-8") as handle:
+    prefix = _compact_dumps(header)[:-1]
+    handle.write(prefix + ("," if header else "") + '"eval_cases":[')
+    for index, case in enumerate(cases):
+      if index:
+        handle.write(",")
+      handle.write(_compact_dumps(strip_none(case)))
+    handle.write("]}")
+  return path
+
+
+def write_evalset(payload: Dict[str, Any], path: Path, fmt: str) -> Path:
+  """Serializes an evalset ``payload`` dict to ``path`` in format ``fmt``."""
+  return write_evalset_stream(
+      _header(payload), payload.get("eval_cases", []), path, fmt
+  )
+
+
+def _open_text(path: Path):
+  if path.name.endswith(".gz"):
+    return gzip.open(path, "rt", encoding="utf-8")
+  return path.open("r", encoding="utf-8")
+
+
+def _is_jsonl(path: Path) -> bool:
+  return path.name.endswith((".jsonl", ".jsonl.gz"))
+
+
+def iter_jsonl_cases(path: Path) -> Iterator[Dict[str, Any]]:
+  """Yields the eval cases of a JSON Lines evalset, skipping the header."""
+  with _open_text(path) as handle:
+    for index, line in enumerate(handle):
+      line = line.strip()
+      if index == 0 or not line:
+        continue
+      yield json.loads(line)
+
+
+def iter_json_array(
+    handle: TextIO, chunk_size: int = _READ_CHUNK_SIZE
+) -> Iterator[Any]:
+  """Yields the elements of a top-level JSON array as they are read.
+
+  Only the element being decoded is buffered, so arbitrarily large arrays
+  are parsed in constant memory per element.
+  """
+  decoder = json.JSONDecoder()
+  buf = ""
+  pos = 0
+  eof = False
+
+  def _fill() -> None:
+    nonlocal buf, pos, eof
+    chunk = handle.read(chunk_size)
+    if chunk:
+      buf = buf[pos:] + chunk
+      pos = 0
+    else:
+      eof = True
+
+  def _peek() -> str:
+    nonlocal pos
+    while True:
+      while pos < len(buf) and buf[pos].isspace():
+        pos += 1
+      if pos < len(buf):
+        return buf[pos]
+      if eof:
+        return ""
+      _fill()
+
+  if _peek() != "[":
+    raise ValueError("Expected a JSON array")
+  pos += 1
+  if _peek() == "]":
+    return
+  while True:
+    if not _peek():
+      raise ValueError("Unterminated JSON array")
+    while True:
+      try:
+        value, end = decoder.raw_decode(buf, pos)
+      except json.JSONDecodeError:
+        if eof:
+          raise
+        _fill()
+        continue
+      # A number cut at the chunk edge still decodes (``12`` of ``123``,
+      # ``1.5`` of ``1.5e3``); accept it only once a delimiter follows.
+      truncated = end == len(buf) or (
+          isinstance(value, (int, float))
+          and not isinstance(value, bool)
+          and not (buf[end].isspace() or buf[end] in ",]")
+      )
+      if truncated and not eof:
+        _fill()
+        continue
+      break
+    pos = end
+    yield value
+    delimiter = _peek()
+    if delimiter == ",":
+      pos += 1
+    elif delimiter == "]":
+      return
+    else:
+      raise ValueError(f"Malformed JSON array: unexpected {delimiter!r}")
+
+
+def iter_json_records(path: Path) -> Iterator[Any]:
+  """Yields records from a JSON Lines file or the elements of a JSON array."""
+  with _open_text(path) as handle:
+    if _is_jsonl(path):
+      for line in handle:
+        line = line.strip()
+        if line:
+          yield json.loads(line)
+    else:
+      yield from iter_json_array(handle)
+
+
+def load_evalset(path: Path) -> Dict[str, Any]:
+  """Loads an evalset in any supported format into a plain dict."""
+  if _is_jsonl(path):
+    with _open_text(path) as handle:
+      header = json.loads(handle.readline() or "{}")
+    header["eval_cases"] = list(iter_jsonl_cases(path))
+    return header
+  with _open_text(path) as handle:
+    return json.load(handle)
+
+
+def needs_materialization(path: Path) -> bool:
+  """Whether ``AgentEvaluator`` cannot read ``path`` directly."""
+  return path.name.endswith(".gz") or _is_jsonl(path)
+
+
+def _digest(*chunks: bytes) -> str:
+  digest = hashlib.sha256()
+  for chunk in chunks:
+    digest.update(len(chunk).to_bytes(8, "big"))
+    digest.update(chunk)
+  return digest.hexdigest()[:16]
+
+
+def _evalset_stem(path: Path) -> str:
+  stem = path.name
+  for suffix in (".gz", ".jsonl", ".json", ".evalset"):
+    stem = stem.removesuffix(suffix)
+  return stem
+
+
+def _prune_derived(base_dir: Path, slot: Path, keep: Path) -> None:
+  """Removes older versions in ``slot`` and entries unused for a while."""
+  cutoff = time.time() - DERIVED_MAX_AGE_SECONDS
+  for version_dir in base_dir.glob("*/*"):
+    if version_dir == keep:
+      continue
+    try:
+      stale = version_dir.parent == slot or version_dir.stat().st_mtime < cutoff
+    except OSError:
+      continue
+    if stale:
+      shutil.rmtree(version_dir, ignore_errors=True)
+      try:
+        version_dir.parent.rmdir()
+      except OSError:
+        pass  # Other versions remain.
+
+
+def write_derived_evalset(
+    source: Path,
+    key: str,
+    build: Callable[[], Dict[str, Any]],
+    base_dir: Path,
+) -> Path:
+  """Writes ``build()`` as a plain ``.evalset.json`` derived from ``source``.
+
+  The file lands in ``base_dir/<source, key>/<version>/`` next to a copy of
+  the source directory's ``test_config.json``. The version covers the
+  source's mtime and size and the config's bytes, so editing either
+  rewrites it; otherwise the existing file is reused. Writing a new version
+  removes the older ones, and versions unused for
+  ``DERIVED_MAX_AGE_SECONDS`` are pruned.
+  """
+  config = source.parent / TEST_CONFIG_NAME
+  config_bytes = config.read_bytes() if config.is_file() else None
+  stat = source.stat()
+  slot = base_dir / _digest(f"{source.resolve()}:{key}".encode("utf-8"))
+  version = _digest(
+      f"{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"),
+      b"" if config_bytes is None else b"config:" + config_bytes,
+  )
+  target_dir = slot / version
+  target = target_dir / f"{_evalset_stem(source)}.evalset.json"
+  if target.exists():
+    os.utime(target_dir)  # Marks the version as in use for pruning.
+    return target
+
+  target_dir.mkdir(parents=True, exist_ok=True)
+  if config_bytes is not None:
+    (target_dir / TEST_CONFIG_NAME).write_bytes(config_bytes)
+  tmp_target = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+  write_evalset(build(), tmp_target, "compact")
+  os.replace(tmp_target, target)
+  _prune_derived(base_dir, slot, target_dir)
+  return target
+
+
+def materialize_evalset(path: Path, cache_dir: Path | None = None) -> Path:
+  """Returns a plain ``.evalset.json`` equivalent of ``path``.
+
+  Plain JSON files are returned unchanged. Other formats are converted once
+  per file and ``test_config.json`` version into ``cache_dir`` (a temp
+  directory by default); see ``write_derived_evalset``.
+  """
+  if not needs_materialization(path):
+    return path
+  base_dir = cache_dir or Path(tempfile.gettempdir()) / "greeting_agent_evalsets"
+  return write_derived_evalset(path, "materialized", lambda: load_evalset(path), base_dir)
+
+
+def journal_path(output_dir: Path, eval_set_id: str) -> Path:
+  """Returns the default journal path for an evalset being generated."""
+  return output_dir / f"{eval_set_id}{_PARTIAL_SUFFIX}"
+
+
+class EvalsetJournal:
+  """Append-only JSON Lines file of finished eval cases.
+
+  The first line holds the evalset metadata; every later line is one case,
+  flushed as soon as it is appended. Only byte offsets are kept in memory,
+  and a torn final line from a crash is truncated on reopen.
+  """
+
+  def __init__(self, path: Path, header: Dict[str, Any]):
+    self.path = path
+    self.header = header
+    self._offsets: Dict[str, int] = {}
+    self._handle = None
+
+  @classmethod
+  def open(
+      cls, path: Path, header: Optional[Dict[str, Any]] = None
+  ) -> "EvalsetJournal":
+    """Opens ``path`` for appending, creating it with ``header`` if missing."""
+    if path.exists():
+      journal = cls(path, {})
+      journal._recover()
+    else:
+      if header is None:
+        raise FileNotFoundError(f"Evalset journal not found: {path}")
+      journal = cls(path, dict(header))
+      path.parent.mkdir(parents=True, exist_ok=True)
+      path.write_bytes((_compact_dumps(journal.header) + "\n").encode("utf-8"))
+    journal._handle = path.open("ab")
+    journal._handle.seek(0, os.SEEK_END)
+    return journal
+
+  def _recover(self) -> None:
+    valid_end = 0
+    with self.path.open("rb") as handle:
+      offset = 0
+      for index, raw in enumerate(handle):
+        if not raw.endswith(b"\n"):
+          break
+        try:
+          record = json.loads(raw)
+        except ValueError:
+          break
+        if index == 0:
+          self.header = record
+        else:
+          cid = case_id(record)
+          if cid is not None:
+            self._offsets[cid] = offset
+        offset += len(raw)
+        valid_end = offset
+    if valid_end < self.path.stat().st_size:
+      with self.path.open("r+b") as handle:
+        handle.truncate(valid_end)
+
+  @property
+  def completed_ids(self) -> Set[str]:
+    return set(self._offsets)
+
+  def append(self, case: Dict[str, Any]) -> None:
+    """Appends one finished case and flushes it to disk."""
+    cid = case_id(case)
+    if cid is None:
+      raise ValueError("Eval case is missing its eval_id")
+    self._offsets[cid] = self._handle.tell()
+    self._handle.write((_compact_dumps(case) + "\n").encode("utf-8"))
+    self._handle.flush()
+
+  def iter_cases(self, order: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    """Yields recorded cases in ``order``, skipping ids never recorded."""
+    with self.path.open("rb") as handle:
+      for cid in order:
+        offset = self._offsets.get(cid)
+        if offset is None:
+          continue
+        handle.seek(offset)
+        yield json.loads(handle.readline())
+
+  def compact(self, path: Path, fmt: str, order: Sequence[str]) -> Path:
+    """Writes the recorded cases, in ``order``, as a regular evalset."""
+    if self._handle:
+      self._handle.flush()
+    return write_evalset_stream(self.header, self.iter_cases(order), path, fmt)
+
+  def close(self) -> None:
+    if self._handle:
+      self._handle.close()
+      self._handle = None
+
+  def remove(self) -> None:
+    self.close()
+    self.path.unlink(missing_ok=True)
+
+
+__all__ = [
+    "DEFAULT_EVALSET_FORMAT",
+    "DERIVED_MAX_AGE_SECONDS",
+    "EVALSET_FORMATS",
+    "EvalsetJournal",
+    "case_id",
+    "evalset_path",
+    "iter_json_array",
+    "iter_json_records",
+    "iter_jsonl_cases",
+    "journal_path",
+    "load_evalset",
+    "materialize_evalset",
+    "needs_materialization",
+    "strip_none",
+    "write_derived_evalset",
+    "write_evalset",
+    "write_evalset_stream",
+]
@@ -0,0 +1,142 @@
+"""Extracts agent text from runner events.
+
+``event_text`` reads ``Event.content.parts`` directly, without copying the
+event; a single text part (the common case) is returned as is. Shapes that
+are not events or contents (dicts, other response objects) fall back to a
+walk over known dict layouts, dumping pydantic models first.
+
+``TurnText`` accumulates the streamed chunks of one reply and joins them
+once, when the reply completes, instead of on every partial event.
+"""
+
+from __future__ import annotations
+
+from typing import Any, List, Optional, Sequence
+
+_MISSING = object()
+# Dict layouts seen in serialized events and older runner responses.
+_FALLBACK_PATHS = (
+    ("final_response", "parts", 0, "text"),
+    ("response", "text"),
+    ("assistant", "text"),
+    ("message", "content", 0, "text"),
+)
+
+
+def _parts_text(parts: Optional[Sequence[Any]], sep: str) -> str:
+  if not parts:
+    return ""
+  if len(parts) == 1:
+    text = getattr(parts[0], "text", None)
+    if text is None and isinstance(parts[0], dict):
+      text = parts[0].get("text")
+    return text if isinstance(text, str) else ""
+  texts = []
+  for part in parts:
+    text = getattr(part, "text", None)
+    if text is None and isinstance(part, dict):
+      text = part.get("text")
+    if isinstance(text, str) and text:
+      texts.append(text)
+  return sep.join(texts)
+
+
+def content_text(content: Any, sep: str = " ") -> str:
+  """Text parts of a ``types.Content`` (or its dict form) joined by ``sep``."""
+  if content is None:
+    return ""
+  parts = getattr(content, "parts", _MISSING)
+  if parts is _MISSING:
+    parts = content.get("parts") if isinstance(content, dict) else None
+  return _parts_text(parts, sep)
+
+
+def _dict_text(data: dict, sep: str) -> str:
+  text = content_text(data.get("content"), sep) or content_text(data, sep)
+  if text.strip():
+    return text
+  for path in _FALLBACK_PATHS:
+    current: Any = data
+    try:
+      for key in path:
+        current = current[key]
+    except (KeyError, IndexError, TypeError):
+      continue
+    if isinstance(current, str) and current.strip():
+      return current
+  for value in data.values():
+    if isinstance(value, dict):
+      text = value.get("text")
+      if isinstance(text, str) and text.strip():
+        return text
+  return ""
+
+
+def event_text(event: Any, sep: str = " ") -> str:
+  """Text carried by ``event``; ``""`` when it has none.
+
+  Events and contents are read through their attributes. Anything else is
+  treated as an unknown shape: dicts are searched directly and objects with
+  ``model_dump`` are dumped and searched.
+  """
+  if event is None:
+    return ""
+  content = getattr(event, "content", _MISSING)
+  if content is not _MISSING and not isinstance(event, dict):
+    return content_text(content, sep)
+  parts = getattr(event, "parts", _MISSING)
+  if parts is not _MISSING:
+    return _parts_text(parts, sep)
+  if isinstance(event, dict):
+    return _dict_text(event, sep)
+  if hasattr(event, "model_dump"):
+    try:
+      dumped = event.model_dump()
+    except Exception:  # noqa: BLE001 - unknown shapes yield no text
+      return ""
+    if isinstance(dumped, dict):
+      return _dict_text(dumped, sep)
+  return ""
+
+
+class TurnText:
+  """Accumulates one agent reply from streamed events.
+
+  Partial events contribute chunks that are only joined when the reply is
+  read. A final event with text replaces the chunks, since with SSE
+  streaming it repeats the text already streamed.
+  """
+
+  __slots__ = ("_chunks", "replies")
+
+  def __init__(self):
+    self._chunks: List[str] = []
+    self.replies = 0
+
+  def add(self, event: Any) -> Optional[str]:
+    """Feeds one event; returns the completed reply when it ends one."""
+    if getattr(event, "author", None) == "user":
+      return None
+    text = event_text(event)
+    if getattr(event, "partial", False):
+      if text:
+        self._chunks.append(text)
+      return None
+    if text:
+      self._chunks = [text]
+    elif not self._chunks:
+      return None
+    reply = self.text
+    self._chunks = []
+    self.replies += 1
+    return reply
+
+  @property
+  def text(self) -> str:
+    """The reply so far; chunks are joined once and kept joined."""
+    if len(self._chunks) > 1:
+      self._chunks = ["".join(self._chunks)]
+    return self._chunks[0] if self._chunks else ""
+
+
+__all__ = ["TurnText", "content_text", "event_text"]
@@ -1,21 +1,29 @@
-﻿"""Programmatic runner for ADK evalsets using pytest."""
+﻿"""Programmatic runner for ADK evalsets, natively or through pytest."""
 
 from __future__ import annotations
 
 import argparse
 import asyncio
+import contextlib
 import inspect
+import os
+import statistics
 import sys
-from dataclasses import dataclass
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 try:
   import pytest
-except ModuleNotFoundError as exc:  # pragma: no cover - hard failure
-  raise SystemExit(
-      "pytest is required to run evalsets. Install it via `pip install pytest`."
-  ) from exc
+except ModuleNotFoundError:  # pragma: no cover - only the pytest engine needs it
+  pytest = None  # type: ignore
+
+if TYPE_CHECKING:
+  from greeting_agent.adaptive_runs import AdaptivePolicy
+  from greeting_agent.adaptive_runs import CaseRuns
 
 try:
   from dotenv import load_dotenv
@@ -37,6 +45,8 @@ SRC_PACKAGE_MODULE_NAME = (
 )
 sys.modules.setdefault(SRC_PACKAGE_MODULE_NAME, sys.modules[__name__])
 
+from greeting_agent import profiling  # noqa: E402
+
 if load_dotenv:
   load_dotenv()
 
@@ -45,6 +55,14 @@ AGENT_MODULE_DEFAULT = "greeting_agent"
 AGENT_MODULE: str = AGENT_MODULE_DEFAULT
 NUM_RUNS: int = 2
 INITIAL_SESSION_FILE: Optional[str] = None
+# When set, cases are repeated one run at a time instead of NUM_RUNS times.
+ADAPTIVE: Optional["AdaptivePolicy"] = None
+# Cases of one evalset evaluated at once in adaptive mode, matching
+# AgentEvaluator's own inference parallelism.
+PER_CASE_PARALLELISM = 4
+# Evalsets are retried from scratch when Gemini reports a quota error.
+QUOTA_RETRIES = 3
+QUOTA_RETRY_BACKOFF = 5.0
 EXECUTION_PATHS: List[Path] = []
 
 
@@ -53,10 +71,22 @@ class EvalsetResult:
   path: Path
   passed: bool
   details: str
+  # Adaptive mode: total runs. Cases carry per-metric scores in every mode.
+  runs: Optional[int] = None
+  cases: List["CaseRuns"] = field(default_factory=list)
+  # Verdict carried over from the manifest by --changed-only, not evaluated.
+  reused: bool = False
 
 
 RUN_RESULTS: List[EvalsetResult] = []
 
+# Metric results of the AgentEvaluator runs in the current context, by eval
+# case id, then metric name: the threshold and the per-invocation scores.
+_MetricResults = Dict[str, Dict[str, Tuple[float, List[float]]]]
+_METRIC_RESULTS: ContextVar[Optional[_MetricResults]] = ContextVar(
+    "_METRIC_RESULTS", default=None
+)
+
 
 class _EvalsetPlugin:
   def __init__(self, evalset_paths: Sequence[Path]):
@@ -71,18 +101,114 @@ class _EvalsetPlugin:
 
 def _import_agent_evaluator():
   try:
-    from google.adk.evaluation.agent_evaluator import AgentEvaluator
+    with profiling.phase("load"):
+      from google.adk.evaluation.agent_evaluator import AgentEvaluator
   except ModuleNotFoundError as exc:
     missing = exc.name or "dependency"
     raise RuntimeError(
         "google.adk evaluation tooling is missing required dependency: "
         f"{missing}. Install project requirements before running evalsets."
     ) from exc
+  from greeting_agent.scoring import register_adk_evaluator
+
+  register_adk_evaluator()
+  _capture_metric_results(AgentEvaluator)
   return AgentEvaluator
 
 
-def _record_result(path: Path, passed: bool, details: str) -> None:
-  RUN_RESULTS.append(EvalsetResult(path=path, passed=passed, details=details))
+def _capture_metric_results(evaluator) -> None:
+  """Copies the metric results ``evaluator`` computes into ``_METRIC_RESULTS``.
+
+  ``AgentEvaluator.evaluate`` only asserts on failures, so the per-case
+  scores behind its verdict are taken from the step that computes them.
+  Evaluators without that step record no scores.
+  """
+  original = getattr(evaluator, "_get_eval_results_by_eval_id", None)
+  if original is None or getattr(original, "captures_metric_results", False):
+    return
+
+  async def _get_eval_results_by_eval_id(*args, **kwargs):
+    results_by_eval_id = await original(*args, **kwargs)
+    collected = _METRIC_RESULTS.get()
+    if collected is not None:
+      for eval_id, case_results in results_by_eval_id.items():
+        metrics = collected.setdefault(eval_id, {})
+        for case_result in case_results:
+          for invocation in case_result.eval_metric_result_per_invocation:
+            for result in invocation.eval_metric_results:
+              _, scores = metrics.setdefault(result.metric_name, (result.threshold, []))
+              scores.append(result.score)
+    return results_by_eval_id
+
+  _get_eval_results_by_eval_id.captures_metric_results = True  # type: ignore[attr-defined]
+  evaluator._get_eval_results_by_eval_id = staticmethod(_get_eval_results_by_eval_id)
+
+
+@contextlib.contextmanager
+def _collect_metric_results() -> Iterator[_MetricResults]:
+  """Collects the metric results of the evaluations run in this context."""
+  collected: _MetricResults = {}
+  token = _METRIC_RESULTS.set(collected)
+  try:
+    yield collected
+  finally:
+    _METRIC_RESULTS.reset(token)
+
+
+def _metric_scores(
+    metrics: Dict[str, Tuple[float, List[float]]],
+) -> Dict[str, Tuple[Optional[float], float]]:
+  """Overall score and threshold per metric, as ``AgentEvaluator`` judges them.
+
+  Like ``AgentEvaluator`` this averages the non-zero invocation scores; a
+  metric without any is not evaluated and has no score.
+  """
+  scores = {}
+  for metric, (threshold, values) in metrics.items():
+    counted = [value for value in values if value]
+    scores[metric] = (statistics.mean(counted) if counted else None, threshold)
+  return scores
+
+
+def _fixed_result(
+    path: Path,
+    num_runs: int,
+    metric_results: _MetricResults,
+    exc: Optional[BaseException] = None,
+) -> EvalsetResult:
+  """The result of evaluating ``path`` ``num_runs`` times in one go."""
+  from greeting_agent.adaptive_runs import CaseRuns
+
+  cases = []
+  for eval_id, metrics in metric_results.items():
+    scores = _metric_scores(metrics)
+    passed = all(
+        score is not None and score >= threshold for score, threshold in scores.values()
+    )
+    cases.append(
+        CaseRuns(
+            case_id=eval_id,
+            runs=num_runs,
+            passed=passed,
+            decided=True,
+            scores=scores,
+        )
+    )
+  if exc is not None:
+    return EvalsetResult(
+        path=path, passed=False, details=_format_exception(exc), cases=cases
+    )
+  return EvalsetResult(
+      path=path, passed=True, details="all criteria satisfied", cases=cases
+  )
+
+
+def _record_result(
+    path: Path, passed: bool, details: str, *, reused: bool = False
+) -> None:
+  RUN_RESULTS.append(
+      EvalsetResult(path=path, passed=passed, details=details, reused=reused)
+  )
 
 
 def _format_exception(exc: BaseException) -> str:
@@ -98,32 +224,434 @@ def _resolve_evalset(path_str: str) -> Path:
   return path
 
 
-@pytest.fixture(scope="module")
-def _agent_evaluator():
+if pytest is not None:
+
+  @pytest.fixture(scope="module")
+  def _agent_evaluator():
+    try:
+      return _import_agent_evaluator()
+    except RuntimeError as exc:
+      details = _format_exception(exc)
+      for path in EXECUTION_PATHS:
+        _record_result(path, False, details)
+      raise
+
+
+def _evaluation_file(path: Path) -> Path:
+  """Returns a plain JSON evalset AgentEvaluator can read for ``path``."""
+  from greeting_agent.evalset_io import materialize_evalset
+
+  with profiling.phase("load"):
+    return materialize_evalset(path)
+
+
+async def _evaluate(
+    evaluator,
+    path: Path,
+    agent_module: str,
+    num_runs: int,
+    initial_session_file: Optional[str],
+) -> None:
+  """Runs ``AgentEvaluator`` on one evalset, retrying after quota errors."""
+  from greeting_agent import rate_limit
+
+  attempt = 0
+  while True:
+    try:
+      evaluation_file = _evaluation_file(path)
+      with profiling.phase("evaluate"):
+        evaluation = evaluator.evaluate(
+            agent_module=agent_module,
+            eval_dataset_file_path_or_dir=str(evaluation_file),
+            num_runs=num_runs,
+            initial_session_file=initial_session_file,
+        )
+        if inspect.isawaitable(evaluation):
+          await evaluation
+      return
+    except Exception as exc:
+      if attempt >= QUOTA_RETRIES or not rate_limit.is_quota_error(exc):
+        raise
+      limiter = rate_limit.env_rate_limiter.resolve()
+      if limiter:
+        from greeting_agent.eval_manifest import agent_config
+
+        # Pause the model for every worker sharing the limiter.
+        await limiter.report_quota_error(agent_config(agent_module).get("model") or "")
+      delay = rate_limit.jittered_backoff(attempt, QUOTA_RETRY_BACKOFF)
+      attempt += 1
+      print(
+          f"{path.name}: quota exhausted; retry {attempt}/{QUOTA_RETRIES} in {delay:.1f}s",
+          file=sys.stderr,
+      )
+      await asyncio.sleep(delay)
+
+
+async def _evaluate_adaptive(
+    evaluator,
+    path: Path,
+    agent_module: str,
+    initial_session_file: Optional[str],
+    policy: "AdaptivePolicy",
+) -> EvalsetResult:
+  """Repeats each case of ``path`` one run at a time until ``policy`` decides.
+
+  Cases are independent, so up to ``PER_CASE_PARALLELISM`` of them run at
+  once; each case's slice is written once and reused for all of its runs.
+  """
+  from greeting_agent.adaptive_runs import CaseRuns
+  from greeting_agent.eval_shards import write_slice
+  from greeting_agent.evalset_io import case_id
+  from greeting_agent.evalset_io import load_evalset
+
+  payload = load_evalset(path)
+  semaphore = asyncio.Semaphore(PER_CASE_PARALLELISM)
+
+  async def _case(index: int, case: Dict[str, Any]) -> "CaseRuns":
+    runs = CaseRuns(case_id=case_id(case) or str(index))
+    case_path = write_slice(path, payload, [case], f"case:{index}")
+    with _collect_metric_results() as metric_results:
+      while True:
+        async with semaphore:
+          try:
+            await _evaluate(evaluator, case_path, agent_module, 1, initial_session_file)
+          except AssertionError:
+            # AgentEvaluator asserts on criteria below their thresholds.
+            passed = False
+          except Exception as exc:  # noqa: BLE001 - reported per case
+            runs.runs += 1
+            runs.error = _format_exception(exc)
+            break
+          else:
+            passed = True
+        if not runs.observe(passed, policy):
+          break
+    # The slice holds this case only; its runs add up to one score per metric.
+    for metrics in metric_results.values():
+      runs.scores.update(_metric_scores(metrics))
+    return runs
+
+  cases = await asyncio.gather(
+      *(_case(index, case) for index, case in enumerate(payload.get("eval_cases") or []))
+  )
+  return _case_result(path, list(cases))
+
+
+def _case_result(path: Path, cases: List["CaseRuns"]) -> EvalsetResult:
+  failed = [runs for runs in cases if not runs.passed]
+  details = (
+      f"{len(failed)}/{len(cases)} cases failed: "
+      + ", ".join(runs.case_id for runs in failed)
+      if failed
+      else "all criteria satisfied"
+  )
+  return EvalsetResult(
+      path=path,
+      passed=not failed,
+      details=details,
+      runs=sum(runs.runs for runs in cases),
+      cases=cases,
+  )
+
+
+def test_evalset(evalset_path: Path, _agent_evaluator):
+  if ADAPTIVE is not None:
+    result = profiling.run(
+        _evaluate_adaptive(
+            _agent_evaluator,
+            evalset_path,
+            AGENT_MODULE,
+            INITIAL_SESSION_FILE,
+            ADAPTIVE,
+        )
+    )
+    RUN_RESULTS.append(result)
+    assert result.passed, result.details
+    return
+  # asyncio.run copies this context, so the evaluation fills metric_results.
+  with _collect_metric_results() as metric_results:
+    try:
+      profiling.run(
+          _evaluate(
+              _agent_evaluator,
+              evalset_path,
+              AGENT_MODULE,
+              NUM_RUNS,
+              INITIAL_SESSION_FILE,
+          )
+      )
+    except Exception as exc:  # noqa: BLE001 - pytest needs full stack
+      RUN_RESULTS.append(_fixed_result(evalset_path, NUM_RUNS, metric_results, exc))
+      raise
+    RUN_RESULTS.append(_fixed_result(evalset_path, NUM_RUNS, metric_results))
+
+
+async def _evaluate_evalset_async(
+    evaluator,
+    path: Path,
+    agent_module: str,
+    num_runs: int,
+    initial_session_file: Optional[str],
+    adaptive: Optional["AdaptivePolicy"] = None,
+) -> EvalsetResult:
+  if adaptive is not None:
+    try:
+      return await _evaluate_adaptive(
+          evaluator, path, agent_module, initial_session_file, adaptive
+      )
+    except Exception as exc:  # noqa: BLE001 - e.g. an unreadable evalset
+      return EvalsetResult(path=path, passed=False, details=_format_exception(exc))
+  with _collect_metric_results() as metric_results:
+    try:
+      await _evaluate(evaluator, path, agent_module, num_runs, initial_session_file)
+    except Exception as exc:  # noqa: BLE001 - reported in the summary
+      return _fixed_result(path, num_runs, metric_results, exc)
+  return _fixed_result(path, num_runs, metric_results)
+
+
+def _evaluate_evalset(
+    path: Path,
+    agent_module: str,
+    num_runs: int,
+    initial_session_file: Optional[str],
+    adaptive: Optional["AdaptivePolicy"] = None,
+) -> EvalsetResult:
+  """Evaluates one evalset outside pytest; used by worker processes."""
   try:
-    return _import_agent_evaluator()
+    evaluator = _import_agent_evaluator()
+  except RuntimeError as exc:
+    return EvalsetResult(path=path, passed=False, details=_format_exception(exc))
+  return profiling.run(
+      _evaluate_evalset_async(
+          evaluator,
+          path,
+          agent_module,
+          num_runs,
+          initial_session_file,
+          adaptive,
+      )
+  )
+
+
+def _case_slices(path: Path) -> List[Tuple[Optional[str], Path]]:
+  """Writes each case of ``path`` to its own evalset for the worker pool.
+
+  Returns ``(case id, slice path)`` pairs in case order; an evalset without
+  cases is evaluated as a whole, under a case id of ``None``.
+  """
+  from greeting_agent.eval_shards import write_slice
+  from greeting_agent.evalset_io import case_id
+  from greeting_agent.evalset_io import load_evalset
+
+  payload = load_evalset(path)
+  cases = payload.get("eval_cases") or []
+  if not cases:
+    return [(None, path)]
+  return [
+      (case_id(case) or str(index), write_slice(path, payload, [case], f"case:{index}"))
+      for index, case in enumerate(cases)
+  ]
+
+
+def _merge_case_results(
+    path: Path,
+    case_ids: Sequence[Optional[str]],
+    results: Dict[int, EvalsetResult],
+) -> EvalsetResult:
+  """Combines the results of ``path``'s case slices that have finished."""
+  if case_ids == [None]:
+    return replace(results[0], path=path)
+  done = [results[index] for index in sorted(results)]
+  failed = [
+      f"{case_ids[index]} ({results[index].details})"
+      for index in sorted(results)
+      if not results[index].passed
+  ]
+  if failed:
+    details = f"{len(failed)}/{len(case_ids)} cases failed: " + "; ".join(failed)
+  else:
+    details = "all criteria satisfied"
+  return EvalsetResult(
+      path=path,
+      passed=not failed and len(done) == len(case_ids),
+      details=details,
+      runs=sum(res.runs for res in done) if ADAPTIVE else None,
+      cases=[case for res in done for case in res.cases],
+  )
+
+
+def _terminate_workers(pool: ProcessPoolExecutor) -> None:
+  """Cancels ``pool``'s queued evaluations and kills the running ones."""
+  terminate = getattr(pool, "terminate_workers", None)
+  if terminate is not None:  # Python 3.14+
+    terminate()
+    return
+  for process in list((getattr(pool, "_processes", None) or {}).values()):
+    process.terminate()
+  # The pool notices its workers died, fails their futures and reaps them.
+  pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _run_with_workers(
+    evalset_paths: Sequence[Path], *, workers: int, fail_fast: bool
+) -> int:
+  """Fans the cases of evalsets out over a process pool into RUN_RESULTS.
+
+  Each case is evaluated in its own task, so one large evalset spreads over
+  all workers; an evalset's result is recorded once all of its cases are
+  done. With ``fail_fast`` the first failing case stops the pool, killing
+  evaluations already running.
+
+  Returns a pytest-compatible exit code (0 when every evalset passed).
+  """
+  failed = False
+  slices: Dict[Path, List[Tuple[Optional[str], Path]]] = {}
+  for path in evalset_paths:
+    try:
+      slices[path] = _case_slices(path)
+    except Exception as exc:  # noqa: BLE001 - e.g. an unreadable evalset
+      RUN_RESULTS.append(
+          EvalsetResult(path=path, passed=False, details=_format_exception(exc))
+      )
+      failed = True
+      if fail_fast:
+        return 1
+
+  pool = ProcessPoolExecutor(max_workers=workers)
+  try:
+    futures = {
+        pool.submit(
+            _evaluate_evalset,
+            slice_path,
+            AGENT_MODULE,
+            NUM_RUNS,
+            INITIAL_SESSION_FILE,
+            ADAPTIVE,
+        ): (path, index)
+        for path, cases in slices.items()
+        for index, (_, slice_path) in enumerate(cases)
+    }
+    done: Dict[Path, Dict[int, EvalsetResult]] = {path: {} for path in slices}
+    for future in as_completed(futures):
+      path, index = futures[future]
+      try:
+        result = future.result()
+      except Exception as exc:  # noqa: BLE001 - e.g. a crashed worker
+        result = EvalsetResult(
+            path=slices[path][index][1], passed=False, details=_format_exception(exc)
+        )
+      done[path][index] = result
+      case_ids = [case_id for case_id, _ in slices[path]]
+      if fail_fast and not result.passed:
+        RUN_RESULTS.append(_merge_case_results(path, case_ids, done[path]))
+        failed = True
+        _terminate_workers(pool)
+        break
+      if len(done[path]) == len(case_ids):
+        merged = _merge_case_results(path, case_ids, done[path])
+        RUN_RESULTS.append(merged)
+        failed = failed or not merged.passed
+  finally:
+    pool.shutdown(wait=True, cancel_futures=True)
+  return 1 if failed else 0
+
+
+async def _run_evalsets_async(
+    evalset_paths: Sequence[Path],
+    *,
+    agent_module: str,
+    num_runs: int,
+    initial_session_file: Optional[str],
+    fail_fast: bool,
+    workers: int,
+    adaptive: Optional["AdaptivePolicy"] = None,
+) -> List[EvalsetResult]:
+  try:
+    evaluator = _import_agent_evaluator()
   except RuntimeError as exc:
     details = _format_exception(exc)
-    for path in EXECUTION_PATHS:
-      _record_result(path, False, details)
-    raise
+    return [
+        EvalsetResult(path=path, passed=False, details=details)
+        for path in evalset_paths
+    ]
 
+  semaphore = asyncio.Semaphore(workers)
 
-def test_evalset(evalset_path: Path, _agent_evaluator):
+  async def _bounded(path: Path) -> EvalsetResult:
+    async with semaphore:
+      return await _evaluate_evalset_async(
+          evaluator,
+          path,
+          agent_module,
+          num_runs,
+          initial_session_file,
+          adaptive,
+      )
+
+  by_path: Dict[Path, EvalsetResult] = {}
+  pending = {asyncio.ensure_future(_bounded(path)) for path in evalset_paths}
   try:
-    evaluation = _agent_evaluator.evaluate(
-        agent_module=AGENT_MODULE,
-        eval_dataset_file_path_or_dir=str(evalset_path),
-        num_runs=NUM_RUNS,
-        initial_session_file=INITIAL_SESSION_FILE,
-    )
-    if inspect.isawaitable(evaluation):
-      asyncio.run(evaluation)
-  except Exception as exc:  # noqa: BLE001 - pytest needs full stack
-    _record_result(evalset_path, False, _format_exception(exc))
-    raise
-  else:
-    _record_result(evalset_path, True, "all criteria satisfied")
+    while pending:
+      done, pending = await asyncio.wait(
+          pending, return_when=asyncio.FIRST_COMPLETED
+      )
+      for task in done:
+        result = task.result()
+        by_path[result.path] = result
+      if fail_fast and any(not task.result().passed for task in done):
+        break
+  finally:
+    for task in pending:
+      task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+  return [by_path[path] for path in evalset_paths if path in by_path]
+
+
+def run_evalsets(
+    paths: Sequence[str | Path],
+    *,
+    agent_module: str = AGENT_MODULE_DEFAULT,
+    num_runs: int = NUM_RUNS,
+    initial_session_file: Optional[str] = None,
+    fail_fast: bool = False,
+    workers: int = 1,
+    adaptive: Optional["AdaptivePolicy"] = None,
+) -> List[EvalsetResult]:
+  """Evaluates evalsets in-process with ``AgentEvaluator``, without pytest.
+
+  All evalsets share one asyncio event loop; ``workers`` bounds how many are
+  evaluated concurrently.
+
+  Args:
+    paths: Evalset files to evaluate.
+    agent_module: Python import path to the module exposing ``root_agent``.
+    num_runs: Number of repeated runs per eval case.
+    initial_session_file: Optional path to an initial session JSON file.
+    fail_fast: Cancel outstanding evalsets after the first failure.
+    workers: Maximum number of evalsets evaluated at the same time.
+    adaptive: Repeat each case one run at a time until this policy reaches
+      a verdict, instead of ``num_runs`` runs.
+
+  Returns:
+    One ``EvalsetResult`` per evalset that ran, in the order of ``paths``.
+  """
+  if num_runs <= 0:
+    raise ValueError("num_runs must be a positive integer")
+  if workers <= 0:
+    raise ValueError("workers must be a positive integer")
+
+  resolved = [_resolve_evalset(str(path)) for path in paths]
+  return profiling.run(
+      _run_evalsets_async(
+          resolved,
+          agent_module=agent_module,
+          num_runs=num_runs,
+          initial_session_file=initial_session_file,
+          fail_fast=fail_fast,
+          workers=workers,
+          adaptive=adaptive,
+      )
+  )
 
 
 def _print_summary(expected: Sequence[Path], results: Sequence[EvalsetResult]) -> None:
@@ -133,7 +661,9 @@ def _print_summary(expected: Sequence[Path], results: Sequence[EvalsetResult]) -
 
   by_path: Dict[Path, EvalsetResult] = {res.path: res for res in results}
 
-  name_width = max(len(path.name) for path in expected)
+  # Fixed-count runs only get case rows in the run history.
+  case_ids = [f"  {case.case_id}" for res in results for case in res.cases if ADAPTIVE]
+  name_width = max(len(name) for name in [path.name for path in expected] + case_ids)
   header = f"{'Evalset':<{name_width}}  Status  Details"
   print("\n" + header)
   print("-" * len(header))
@@ -146,19 +676,43 @@ def _print_summary(expected: Sequence[Path], results: Sequence[EvalsetResult]) -
       status = "FAIL"
       details = "not run (see pytest log)"
     print(f"{path.name:<{name_width}}  {status:<5}  {details}")
+    for case in res.cases if res and ADAPTIVE else []:
+      status = "PASS" if case.passed else "FAIL"
+      print(f"{'  ' + case.case_id:<{name_width}}  {status:<5}  {case.describe()}")
 
   passed = sum(1 for res in results if res.passed)
   print(f"\n{passed}/{len(expected)} evalsets passed")
+  adaptive = [res for res in results if res.runs is not None]
+  if adaptive and ADAPTIVE:
+    runs = sum(res.runs for res in adaptive)
+    cases = sum(len(res.cases) for res in adaptive)
+    print(f"{runs} eval runs over {cases} cases ({runs / max(cases, 1):.1f} per case)")
+
+
+def _display_path(path: Path) -> str:
+  """``path`` relative to the working directory when below it.
+
+  Results files name evalsets this way so shards run from different
+  checkout locations still merge.
+  """
+  try:
+    return str(path.relative_to(Path.cwd()))
+  except ValueError:
+    return str(path)
 
 
 def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
   parser = argparse.ArgumentParser(
-      description="Execute ADK evalset files with pytest and report pass/fail"
+      description="Execute ADK evalset files and report pass/fail",
+      epilog=(
+          "Combine per-shard results with:"
+          " execute_evalsets merge RESULTS [RESULTS ...]"
+      ),
   )
   parser.add_argument(
       "evalsets",
       nargs="+",
-      help="Paths to .evalset.json files",
+      help="Paths to .evalset.json, .evalset.json.gz or .evalset.jsonl files",
   )
   parser.add_argument(
       "--agent-module",
@@ -169,7 +723,39 @@ def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
       "--num-runs",
       type=int,
       default=NUM_RUNS,
-      help="Number of repeated runs per eval case (default: %(default)s)",
+      help="Number of repeated runs per eval case (default: %(default)s; ignored with --adaptive)",
+  )
+  parser.add_argument(
+      "--adaptive",
+      action="store_true",
+      help=(
+          "Run each eval case one repetition at a time and stop once a Wilson"
+          " bound on its pass rate clears or misses --pass-rate"
+      ),
+  )
+  parser.add_argument(
+      "--max-runs",
+      type=int,
+      default=None,
+      help="Run budget per case with --adaptive (default: 3)",
+  )
+  parser.add_argument(
+      "--pass-rate",
+      type=float,
+      default=None,
+      help=(
+          "Fraction of runs a case must pass with --adaptive (default: 0.5;"
+          " 1.0 requires every run to pass)"
+      ),
+  )
+  parser.add_argument(
+      "--confidence",
+      type=float,
+      default=None,
+      help=(
+          "Overall confidence of the --adaptive verdict, split over the"
+          " --max-runs looks (default: 0.5)"
+      ),
   )
   parser.add_argument(
       "--initial-session",
@@ -182,6 +768,154 @@ def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
       action="store_true",
       help="Stop after first failing evalset",
   )
+  parser.add_argument(
+      "--engine",
+      choices=("pytest", "native"),
+      default="pytest",
+      help=(
+          "Run evalsets through pytest or directly in-process with"
+          " AgentEvaluator (default: %(default)s)"
+      ),
+  )
+  parser.add_argument(
+      "--workers",
+      type=int,
+      default=1,
+      help=(
+          "Evaluations run concurrently: worker processes, each taking one"
+          " eval case at a time, for the pytest engine; asyncio tasks, one"
+          " evalset each, for the native engine (default: %(default)s)"
+      ),
+  )
+  parser.add_argument(
+      "--shard",
+      default=None,
+      metavar="I/N",
+      help=(
+          "Evaluate only the I-th of N deterministic slices of the eval cases"
+          " (1-based), e.g. --shard 2/4 on the second of four CI nodes"
+      ),
+  )
+  parser.add_argument(
+      "--results",
+      default=None,
+      help=(
+          "Write machine-readable results to this file: JUnit XML for *.xml,"
+          " JSON otherwise"
+      ),
+  )
+  parser.add_argument(
+      "--cache-mode",
+      choices=("passthrough", "record", "replay"),
+      default=None,
+      help=(
+          "LLM response cache mode for the agent under evaluation"
+          " (default: $GREETING_AGENT_CACHE_MODE or passthrough)"
+      ),
+  )
+  parser.add_argument(
+      "--cache-dir",
+      type=str,
+      default=None,
+      help=(
+          "Directory of the LLM response cache; requires --cache-mode"
+          " (default: .llm_cache)"
+      ),
+  )
+  parser.add_argument(
+      "--scoring",
+      choices=("adk", "local"),
+      default=None,
+      help=(
+          "response_match_score implementation: ADK's per-pair ROUGE-1 or the"
+          " local scorer of greeting_agent.scoring, which tokenizes each"
+          " distinct text once (default: $GREETING_AGENT_SCORING or adk)"
+      ),
+  )
+  parser.add_argument(
+      "--rate-limit",
+      default=None,
+      help=(
+          "Per-model budgets shared by all worker processes, as"
+          " MODEL=RPM[:TPM],... ('*' for any model)"
+      ),
+  )
+  parser.add_argument(
+      "--rate-limit-file",
+      default=None,
+      help="State file shared by rate-limited processes (default: in the temp dir)",
+  )
+  parser.add_argument(
+      "--route",
+      default=None,
+      metavar="SPEC",
+      help="Route the greeting agent's turns across models: 'default' or "
+      "TURN=MODEL[:MODEL...],... with turns question, poem and default",
+  )
+  parser.add_argument(
+      "--hedge-after",
+      type=float,
+      default=None,
+      metavar="SECONDS",
+      help="Race a routed request that is still silent after this long "
+      "against the next model; 0 turns hedging off",
+  )
+  parser.add_argument(
+      "--metrics",
+      type=str,
+      default=None,
+      help=(
+          "Write per-turn latency/token metrics of the agent under evaluation"
+          " to this JSON Lines file and print percentiles at the end"
+      ),
+  )
+  parser.add_argument(
+      "--changed-only",
+      action="store_true",
+      help=(
+          "Skip evalsets that passed last time and whose file, test config,"
+          " agent source, model and run count are unchanged; failures re-run"
+      ),
+  )
+  parser.add_argument(
+      "--manifest",
+      type=str,
+      default=None,
+      help="Fingerprint manifest path (default: .evalset_manifest.json)",
+  )
+  parser.add_argument(
+      "--history",
+      nargs="?",
+      const="",
+      default=None,
+      metavar="DB",
+      help=(
+          "Append this run (verdicts, per-turn latency, tokens and cost) to a"
+          " SQLite run history (default DB: .eval_history.sqlite); compare"
+          " runs with python -m greeting_agent.run_history report; per-case"
+          " metric scores are recorded as well"
+      ),
+  )
+  parser.add_argument(
+      "--profile",
+      default=None,
+      metavar="PREFIX",
+      help=(
+          "Profile this process: write PREFIX.collapsed (flamegraph stacks),"
+          " PREFIX.json (phase and asyncio task timing) and, with"
+          " --profile-mode deterministic, PREFIX.pstats; worker processes of"
+          " --engine pytest --workers N are not profiled"
+      ),
+  )
+  parser.add_argument(
+      "--profile-mode",
+      choices=profiling.PROFILE_MODES,
+      default=profiling.DEFAULT_PROFILE_MODE,
+      help=(
+          "sample: stack samples only; deterministic: also cProfile every"
+          " call, which slows CPU-bound code (default: %(default)s)"
+      ),
+  )
   parser.add_argument(
       "--pytest-args",
       nargs=argparse.REMAINDER,
@@ -193,8 +927,155 @@ def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
   return parser.parse_args(argv)
 
 
-def main(argv: Optional[Sequence[str]] = None) -> int:
-  args = _parse_args(argv)
+def _execute(evalset_paths: Sequence[Path], args: argparse.Namespace) -> int:
+  """Runs ``evalset_paths`` on the selected engine, filling RUN_RESULTS."""
+  EXECUTION_PATHS.clear()
+  EXECUTION_PATHS.extend(evalset_paths)
+
+  if args.engine == "native":
+    results = run_evalsets(
+        evalset_paths,
+        agent_module=AGENT_MODULE,
+        num_runs=NUM_RUNS,
+        initial_session_file=INITIAL_SESSION_FILE,
+        fail_fast=args.fail_fast,
+        workers=args.workers,
+        adaptive=ADAPTIVE,
+    )
+    RUN_RESULTS.extend(results)
+    return 0 if results and all(res.passed for res in results) else 1
+
+  if args.workers > 1:
+    return _run_with_workers(
+        evalset_paths, workers=args.workers, fail_fast=args.fail_fast
+    )
+
+  if pytest is None:
+    print(
+        "pytest is required for --engine pytest. Install it via"
+        " `pip install pytest` or use --engine native."
+    )
+    return 2
+
+  plugin = _EvalsetPlugin(evalset_paths)
+
+  pytest_args: List[str] = ["-q", str(Path(__file__).resolve())]
+  if args.fail_fast:
+    pytest_args.append("-x")
+  if args.pytest_args:
+    pytest_args.extend(args.pytest_args)
+
+  return int(pytest.main(pytest_args, plugins=[plugin]))
+
+
+def _parse_merge_args(argv: Sequence[str]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      prog="execute_evalsets merge",
+      description="Combine --results files of evalset shards into one summary",
+  )
+  parser.add_argument(
+      "results",
+      nargs="+",
+      help="Results files (JSON or JUnit XML) written with --results",
+  )
+  parser.add_argument(
+      "--output",
+      default=None,
+      help="Write the merged results to this file (JUnit XML for *.xml, else JSON)",
+  )
+  return parser.parse_args(argv)
+
+
+def merge_main(argv: Sequence[str]) -> int:
+  """Prints the combined summary of shard results files.
+
+  Exits non-zero when an evalset failed in any shard or when shard results
+  are missing or duplicated.
+  """
+  from greeting_agent import eval_shards
+
+  args = _parse_merge_args(argv)
+  try:
+    merged, problems = eval_shards.merge_results([Path(p) for p in args.results])
+  except (OSError, SyntaxError, TypeError, ValueError) as exc:
+    print(_format_exception(exc))
+    return 2
+
+  results = [
+      EvalsetResult(path=Path(res.evalset), passed=res.passed, details=res.details)
+      for res in merged
+  ]
+  _print_summary([res.path for res in results], results)
+  for problem in problems:
+    print(f"WARNING: {problem}")
+  if args.output:
+    eval_shards.write_results(Path(args.output), merged)
+  passed = bool(results) and all(res.passed for res in results)
+  return 0 if passed and not problems else 1
+
+
+def _record_history(
+    args: argparse.Namespace,
+    started_at: float,
+    metrics_path: str,
+    expected: Sequence[Path],
+    results: Sequence[EvalsetResult],
+    exit_code: int,
+) -> None:
+  from greeting_agent import instrumentation
+  from greeting_agent.eval_manifest import agent_config
+  from greeting_agent.eval_manifest import agent_fingerprint
+  from greeting_agent.run_history import DEFAULT_HISTORY_DB
+  from greeting_agent.run_history import RunHistory
+  from greeting_agent.run_history import file_hash
+
+  by_path = {res.path: res for res in results}
+  evalsets = []
+  for path in expected:
+    res = by_path.get(path)
+    evalsets.append(
+        {
+            "evalset": _display_path(path),
+            "evalset_hash": file_hash(path),
+            "passed": res.passed if res else False,
+            "details": res.details if res else "not run",
+            "runs": res.runs if res else None,
+            "reused": res.reused if res else False,
+            "cases": [
+                {
+                    "case_id": case.case_id,
+                    "passed": case.passed,
+                    "runs": case.runs,
+                    # Fixed-count runs only report a verdict per case.
+                    "passes": case.passes if ADAPTIVE else None,
+                    "scores": case.scores,
+                }
+                for case in (res.cases if res else [])
+            ],
+        }
+    )
+  # The metrics file may hold earlier runs; keep this run's turns only.
+  turns = [
+      record
+      for record in instrumentation.load_records(metrics_path)
+      if record.get("timestamp", 0) >= started_at
+  ]
+  with RunHistory(args.history or DEFAULT_HISTORY_DB) as history:
+    run_id = history.record_run(
+        agent_module=AGENT_MODULE,
+        started_at=started_at,
+        evalsets=evalsets,
+        turns=turns,
+        agent_fingerprint=agent_fingerprint(AGENT_MODULE),
+        agent_config=agent_config(AGENT_MODULE),
+        mode=ADAPTIVE.describe() if ADAPTIVE else f"num_runs={NUM_RUNS}",
+        exit_code=exit_code,
+    )
+    print(f"Recorded run {run_id} ({len(turns)} turns) in {history.path}")
+
+
+def _main(args: argparse.Namespace) -> int:
+  started_at = time.time()
 
   try:
     resolved = [_resolve_evalset(p) for p in args.evalsets]
@@ -206,26 +1087,205 @@ def main(argv: Optional[Sequence[str]] = None) -> int:
     print("--num-runs must be a positive integer")
     return 2
 
-  global AGENT_MODULE, NUM_RUNS, INITIAL_SESSION_FILE
+  if args.workers <= 0:
+    print("--workers must be a positive integer")
+    return 2
+
+  if args.cache_dir is not None and not args.cache_mode:
+    print("--cache-dir requires --cache-mode")
+    return 2
+
+  if args.cache_mode:
+    # Worker processes and the lazily imported agent module read the cache
+    # settings from the environment.
+    from greeting_agent.llm_cache import configure_env
+
+    configure_env(args.cache_mode, args.cache_dir)
+
+  if args.scoring:
+    # Read by _import_agent_evaluator, here and in worker processes.
+    from greeting_agent import scoring
+
+    scoring.configure_env(args.scoring)
+
+  if args.rate_limit:
+    from greeting_agent import rate_limit
+
+    try:
+      rate_limit.configure_env(
+          args.rate_limit, state_path=args.rate_limit_file, lane="batch"
+      )
+    except ValueError as exc:
+      print(exc)
+      return 2
+
+  if args.route:
+    # Like the cache settings, picked up by the lazily built root_agent.
+    from greeting_agent import routing_llm
+
+    try:
+      routing_llm.configure_env(args.route, hedge_after=args.hedge_after)
+    except ValueError as exc:
+      print(exc)
+      return 2
+
+  shard = None
+  plans = {}
+  if args.shard:
+    from greeting_agent import eval_shards
+
+    try:
+      shard = eval_shards.parse_shard(args.shard)
+    except ValueError as exc:
+      print(exc)
+      return 2
+    sources = resolved
+    # From here on the per-shard evalset files stand in for the sources.
+    plans = {plan.path: plan for plan in eval_shards.shard_evalsets(sources, shard)}
+    resolved = list(plans)
+    print(
+        f"Shard {eval_shards.format_shard(shard)}:"
+        f" {sum(len(plan.case_ids) for plan in plans.values())} eval cases"
+        f" from {len(plans)} of {len(sources)} evalsets"
+    )
+
+  adaptive = None
+  if args.adaptive:
+    from greeting_agent.adaptive_runs import AdaptivePolicy
+
+    overrides = {
+        "max_runs": args.max_runs,
+        "pass_rate": args.pass_rate,
+        "confidence": args.confidence,
+    }
+    try:
+      adaptive = AdaptivePolicy(
+          **{key: value for key, value in overrides.items() if value is not None}
+      )
+    except ValueError as exc:
+      print(exc)
+      return 2
+
+  # The run history needs per-turn metrics; collect them in a scratch file
+  # unless --metrics names one.
+  metrics_path = args.metrics
+  if args.history is not None and not metrics_path:
+    import tempfile
+
+    handle, metrics_path = tempfile.mkstemp(prefix="greeting_agent_metrics_", suffix=".jsonl")
+    os.close(handle)
+  if metrics_path:
+    from greeting_agent import instrumentation
+
+    instrumentation.configure_env(metrics_path, source="evaluate")
+
+  global AGENT_MODULE, NUM_RUNS, INITIAL_SESSION_FILE, ADAPTIVE
   AGENT_MODULE = args.agent_module
   NUM_RUNS = args.num_runs
   INITIAL_SESSION_FILE = args.initial_session
+  ADAPTIVE = adaptive
 
-  EXECUTION_PATHS.clear()
-  EXECUTION_PATHS.extend(resolved)
   RUN_RESULTS.clear()
 
-  plugin = _EvalsetPlugin(resolved)
+  manifest = None
+  fingerprints: Dict[Path, str] = {}
+  pending = list(resolved)
+  if args.changed_only or args.manifest:
+    from greeting_agent.eval_manifest import DEFAULT_MANIFEST_PATH
+    from greeting_agent.eval_manifest import EvalManifest
+    from greeting_agent.eval_manifest import agent_fingerprint
+    from greeting_agent.eval_manifest import evalset_fingerprint
 
-  pytest_args: List[str] = ["-q", str(Path(__file__).resolve())]
-  if args.fail_fast:
-    pytest_args.append("-x")
-  if args.pytest_args:
-    pytest_args.extend(args.pytest_args)
+    manifest = EvalManifest.load(args.manifest or DEFAULT_MANIFEST_PATH)
+    agent_fp = agent_fingerprint(AGENT_MODULE)
+    for path in resolved:
+      fingerprints[path] = evalset_fingerprint(
+          path,
+          agent_fp=agent_fp,
+          num_runs=NUM_RUNS,
+          initial_session_file=INITIAL_SESSION_FILE,
+          mode=ADAPTIVE.describe() if ADAPTIVE else "",
+      )
+    if args.changed_only:
+      pending = []
+      for path in resolved:
+        entry = manifest.lookup(path, fingerprints[path])
+        # A failure may have been flaky or quota-related; only passes stick.
+        if entry is None or not entry.passed:
+          pending.append(path)
+        else:
+          _record_result(
+              path, entry.passed, f"unchanged; {entry.details}", reused=True
+          )
+
+  exit_code = _execute(pending, args) if pending else 0
+  if any(not res.passed for res in RUN_RESULTS):
+    exit_code = exit_code or 1
+
+  if manifest is not None:
+    with profiling.phase("write"):
+      for res in RUN_RESULTS:
+        if res.path in pending:
+          manifest.update(res.path, fingerprints[res.path], res.passed, res.details)
+      manifest.save()
+
+  expected = resolved
+  results: List[EvalsetResult] = list(RUN_RESULTS)
+  if plans:
+    expected = [plans[path].source for path in resolved]
+    results = [
+        replace(res, path=plans[res.path].source) for res in results if res.path in plans
+    ]
+  if args.results:
+    from greeting_agent import eval_shards
+
+    by_path = {res.path: res for res in results}
+    with profiling.phase("write"):
+      eval_shards.write_results(
+          Path(args.results),
+          [
+              eval_shards.ShardResult(
+                  evalset=_display_path(path),
+                  passed=by_path[path].passed if path in by_path else False,
+                  details=by_path[path].details if path in by_path else "not run",
+                  cases=plans[shard_path].case_ids if plans else [],
+              )
+              for shard_path, path in zip(resolved, expected)
+          ],
+          shard,
+      )
+
+  _print_summary(expected, results)
+  if args.metrics:
+    # Worker processes append to the same file, so summarize from disk.
+    print()
+    print(
+        instrumentation.format_summary(
+            instrumentation.summarize(instrumentation.load_records(args.metrics))
+        )
+    )
+  if args.rate_limit:
+    limiter = rate_limit.env_rate_limiter.resolve()
+    if limiter:
+      print(f"Rate limiter: {limiter.stats()}")
+  if args.history is not None:
+    try:
+      with profiling.phase("write"):
+        _record_history(args, started_at, metrics_path, expected, results, exit_code)
+    finally:
+      if not args.metrics:
+        Path(metrics_path).unlink(missing_ok=True)
+  return exit_code
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  argv = list(sys.argv[1:] if argv is None else argv)
+  if argv[:1] == ["merge"]:
+    return merge_main(argv[1:])
+  args = _parse_args(argv)
 
-  exit_code = pytest.main(pytest_args, plugins=[plugin])
-  _print_summary(resolved, RUN_RESULTS)
-  return int(exit_code)
+  with profiling.profile(args.profile, mode=args.profile_mode):
+    return _main(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,165 @@
+"""Deterministic offline stand-in for Gemini used by tests and benchmarks."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import re
+from typing import AsyncGenerator, List, Optional
+
+from google.adk.models import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import errors
+from google.genai import types
+from pydantic import PrivateAttr
+
+from .context_window import content_tokens, estimate_tokens
+
+FAKE_MODEL_NAME = "fake-gemini"
+
+_DEFAULT_RESPONSES = [
+    "Hello there! What hobby fills your days with joy?",
+    "Oh what fun, a hobby so grand,\n"
+    "With facts and cheer close at hand,\n"
+    "You practice it daily with flair,\n"
+    "A poem for you, light as air!",
+]
+
+_ERROR_STATUS = {
+    429: "RESOURCE_EXHAUSTED",
+    500: "INTERNAL",
+    503: "UNAVAILABLE",
+}
+
+
+class FakeLlm(BaseLlm):
+  """Offline ``BaseLlm`` that replies from a script after a fixed delay.
+
+  Replies cycle through ``responses`` based on how many user turns the request
+  carries, so a scripted conversation yields the same text on every run.
+
+  ``latencies`` scripts the delay per call (cycling), overriding ``latency``,
+  so routing and hedging can be exercised with predictable slow calls.
+  With ``tokens_per_second`` set, each whitespace-separated token adds
+  ``1 / tokens_per_second`` seconds after the initial ``latency``; streaming
+  requests receive one partial response per token, carrying the whitespace
+  before it, followed by the full reply. The final response reports estimated usage (4 characters per token)
+  so prompt growth can be measured offline.
+
+  ``error_rate`` makes that fraction of calls raise the ``google.genai`` API
+  error for ``error_code``, drawn from a generator seeded with ``seed`` so a
+  run injects the same failures every time.
+  """
+
+  model: str = FAKE_MODEL_NAME
+  latency: float = 0.0
+  latencies: List[float] = []
+  tokens_per_second: float = 0.0
+  error_rate: float = 0.0
+  error_code: int = 429
+  seed: Optional[int] = 0
+  responses: List[str] = list(_DEFAULT_RESPONSES)
+
+  _rng: random.Random = PrivateAttr(default=None)
+  _call_count: int = PrivateAttr(default=0)
+  _error_count: int = PrivateAttr(default=0)
+
+  def model_post_init(self, __context) -> None:  # noqa: ANN001
+    super().model_post_init(__context)
+    self._rng = random.Random(self.seed)
+
+  @property
+  def call_count(self) -> int:
+    """Number of ``generate_content_async`` calls so far."""
+    return self._call_count
+
+  @property
+  def error_count(self) -> int:
+    """Number of calls that raised an injected error."""
+    return self._error_count
+
+  @classmethod
+  def supported_models(cls) -> list[str]:
+    return [r"fake-.*"]
+
+  def _reply_for(self, llm_request: LlmRequest) -> str:
+    user_turns = sum(
+        1 for content in llm_request.contents or [] if content.role == "user"
+    )
+    index = max(user_turns - 1, 0) % len(self.responses)
+    return self.responses[index]
+
+  def _maybe_fail(self) -> None:
+    if self.error_rate <= 0 or self._rng.random() >= self.error_rate:
+      return
+    self._error_count += 1
+    status = _ERROR_STATUS.get(self.error_code, "UNKNOWN")
+    error_type = errors.ClientError if self.error_code < 500 else errors.ServerError
+    raise error_type(
+        self.error_code,
+        {
+            "error": {
+                "code": self.error_code,
+                "message": "Injected by FakeLlm",
+                "status": status,
+            }
+        },
+    )
+
+  @staticmethod
+  def _response(
+      text: str,
+      *,
+      partial: bool = False,
+      usage: Optional[types.GenerateContentResponseUsageMetadata] = None,
+  ) -> LlmResponse:
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part.from_text(text=text)]),
+        partial=partial,
+        usage_metadata=usage,
+    )
+
+  @staticmethod
+  def _usage(
+      llm_request: LlmRequest, reply: str
+  ) -> types.GenerateContentResponseUsageMetadata:
+    config = llm_request.config
+    instruction = getattr(config, "system_instruction", None) if config else None
+    prompt_tokens = sum(content_tokens(c) for c in llm_request.contents or [])
+    if isinstance(instruction, str):
+      prompt_tokens += estimate_tokens(instruction)
+    elif instruction is not None:
+      prompt_tokens += content_tokens(instruction)
+    reply_tokens = estimate_tokens(reply)
+    return types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=prompt_tokens,
+        candidates_token_count=reply_tokens,
+        total_token_count=prompt_tokens + reply_tokens,
+    )
+
+  async def generate_content_async(
+      self, llm_request: LlmRequest, stream: bool = False
+  ) -> AsyncGenerator[LlmResponse, None]:
+    latency = (
+        self.latencies[self._call_count % len(self.latencies)]
+        if self.latencies
+        else self.latency
+    )
+    self._call_count += 1
+    if latency > 0:
+      await asyncio.sleep(latency)
+    self._maybe_fail()
+
+    reply = self._reply_for(llm_request)
+    if self.tokens_per_second > 0:
+      per_token = 1.0 / self.tokens_per_second
+      # Each chunk keeps the whitespace before it, newlines included.
+      for token in re.findall(r"\s*\S+", reply):
+        await asyncio.sleep(per_token)
+        if stream:
+          yield self._response(token, partial=True)
+    yield self._response(reply, usage=self._usage(llm_request, reply))
+
+
+__all__ = ["FAKE_MODEL_NAME", "FakeLlm"]
@@ -3,23 +3,34 @@
 
 from __future__ import annotations
 
+import argparse
 import asyncio
+import functools
+import hashlib
+import inspect
 import json
 import sys
 import uuid
 from dotenv import load_dotenv
 from importlib import import_module
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
 # --- make "src" imports work when run as a script ---
 PKG_ROOT = Path(__file__).resolve().parents[1]  # .../<repo>/src
 if str(PKG_ROOT) not in sys.path:
     sys.path.insert(0, str(PKG_ROOT))
 
-load_dotenv()
-# --- your agent (expects root_agent exported in agent.py) ---
-from greeting_agent.agent import root_agent as agent  # noqa: E402
+# --- your agent (root_agent is built lazily on first use in agent.py) ---
+from greeting_agent.agent import create_greeting_agent, get_root_agent  # noqa: E402
+from greeting_agent.evalset_io import DEFAULT_EVALSET_FORMAT, EVALSET_FORMATS  # noqa: E402
+from greeting_agent.evalset_io import EvalsetJournal, evalset_path, iter_json_records, journal_path  # noqa: E402
+from greeting_agent.event_text import TurnText  # noqa: E402
+from greeting_agent import instrumentation  # noqa: E402
+from greeting_agent import profiling  # noqa: E402
+from greeting_agent.llm_cache import CACHE_MODES, configure_env, env_response_cache  # noqa: E402
+from greeting_agent import rate_limit  # noqa: E402
+from greeting_agent import routing_llm  # noqa: E402
 
 # --- ADK runtime ---
 from google.adk.runners import Runner  # noqa: E402
@@ -27,11 +38,11 @@ from google.adk.sessions import InMemorySessionService  # noqa: E402
 from google.genai import types as genai_types  # noqa: E402
 
 # ---------------------------------------------------------------------------
-# ADK Eval models: try multiple locations; else fall back to dict builders
+# ADK Eval models: try multiple locations; else fall back to dict builders.
+# Probed on first use and cached, so importing this module stays cheap.
 # ---------------------------------------------------------------------------
 
-EvalSet = EvalCase = ConversationTurn = Content = Part = None  # type: ignore
-
+@functools.lru_cache(maxsize=None)
 def _try_import_models() -> Tuple[Optional[type], Optional[type], Optional[type], Optional[type], Optional[type]]:
     paths = [
         "google.adk.evaluation.eval_models",      # some 1.14.x wheels
@@ -53,9 +64,9 @@ def _try_import_models() -> Tuple[Optional[type], Optional[type], Optional[type]
             pass
     return None, None, None, None, None
 
-EvalSet, EvalCase, ConversationTurn, Content, Part = _try_import_models()
 
-USE_MODELS = all([EvalSet, EvalCase, ConversationTurn, Content, Part])
+def _use_models() -> bool:
+    return all(_try_import_models())
 
 # ---------------------------------------------------------------------------
 # IO layout (keep next to this file)
@@ -65,6 +76,9 @@ TESTS_PATH = SCRIPT_DIR / "eval_scripts.json"
 OUTPUT_DIR = SCRIPT_DIR
 APP_NAME   = "greeting_agent"
 
+# Status codes the Gemini API uses for rate limits and temporary outages.
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
 def _new_id(prefix: str, n: int = 6) -> str:
     return f"{prefix}{uuid.uuid4().hex[:n]}"
@@ -82,33 +96,35 @@ def _model_dump(obj: Any) -> Dict[str, Any]:
 # Builders (models or dicts)
 # -----------------------------
 def _part_text(text: str):
-    if USE_MODELS:
-        return Part(text=text)  # type: ignore
-    return {"text": text, "inline_data": None, "file_data": None, "function_call": None,
-            "function_response": None, "code_execution_result": None, "executable_code": None,
-            "video_metadata": None, "thought": None, "thought_signature": None}
+    if _use_models():
+        Part = _try_import_models()[4]
+        return Part(text=text)
+    return {"text": text}
 
-def _content_from_text(text: str):
-    if USE_MODELS:
-        return Content(parts=[_part_text(text)])  # type: ignore
-    return {"parts": [_part_text(text)]}
+def _content_from_text(text: str, role: str):
+    if _use_models():
+        Content = _try_import_models()[3]
+        return Content(role=role, parts=[_part_text(text)])
+    return {"role": role, "parts": [_part_text(text)]}
 
 def _turn(user_text: str, assistant_text: str):
-    if USE_MODELS:
-        return ConversationTurn(  # type: ignore
-            user_content=_content_from_text(user_text),
-            final_response=_content_from_text(assistant_text),
+    if _use_models():
+        ConversationTurn = _try_import_models()[2]
+        return ConversationTurn(
+            user_content=_content_from_text(user_text, "user"),
+            final_response=_content_from_text(assistant_text, "model"),
             role="user",
         )
     return {
-        "user_content": _content_from_text(user_text),
-        "final_response": _content_from_text(assistant_text),
+        "user_content": _content_from_text(user_text, "user"),
+        "final_response": _content_from_text(assistant_text, "model"),
         "role": "user",
     }
 
 def _case(case_id: str, turns: List[Dict[str, str]]):
-    if USE_MODELS:
-        return EvalCase(  # type: ignore
+    if _use_models():
+        EvalCase = _try_import_models()[1]
+        return EvalCase(
             eval_id=case_id,
             conversation=[_turn(t["user_text"], t["assistant_text"]) for t in turns],
         )
@@ -117,10 +133,20 @@ def _case(case_id: str, turns: List[Dict[str, str]]):
         "conversation": [_turn(t["user_text"], t["assistant_text"]) for t in turns],
     }
 
+def _evalset_header(name: Optional[str] = None) -> Dict[str, Any]:
+    header = dict(_model_dump(_evalset([], name=name)))
+    header.pop("eval_cases", None)
+    header.pop("evalCases", None)
+    return header
+
+def _header_id(header: Dict[str, Any]) -> str:
+    return str(header.get("eval_set_id") or header.get("evalSetId") or _new_id("evalset"))
+
 def _evalset(cases: List[Any], name: Optional[str] = None):
     eid = _new_id("evalset")
-    if USE_MODELS:
-        return EvalSet(  # type: ignore
+    if _use_models():
+        EvalSet = _try_import_models()[0]
+        return EvalSet(
             eval_set_id=eid,
             name=name or "generated",
             description=None,
@@ -137,74 +163,6 @@ def _evalset(cases: List[Any], name: Optional[str] = None):
 # --------------------------------
 # Helpers to talk to the runner
 # --------------------------------
-def _content_first_text(content: Any) -> Optional[str]:
-    if content is None:
-        return None
-    parts = getattr(content, "parts", None)
-    if parts is None and isinstance(content, dict):
-        parts = content.get("parts")
-    if not parts:
-        return None
-    for part in parts:
-        text = getattr(part, "text", None)
-        if text is None and isinstance(part, dict):
-            text = part.get("text")
-        if isinstance(text, str) and text.strip():
-            return text
-    return None
-
-
-def _extract_assistant_text(event: Any) -> Optional[str]:
-    if event is None:
-        return None
-
-    maybe = _content_first_text(event)
-    if maybe:
-        return maybe
-
-    if hasattr(event, "content"):
-        maybe = _content_first_text(getattr(event, "content"))
-        if maybe:
-            return maybe
-
-    if hasattr(event, "model_dump"):
-        try:
-            dumped = event.model_dump()
-        except Exception:
-            dumped = None
-        else:
-            maybe = _extract_assistant_text(dumped)
-            if maybe:
-                return maybe
-
-    if isinstance(event, dict):
-        maybe = _content_first_text(event.get("content"))
-        if maybe:
-            return maybe
-
-        paths = [
-            ("final_response", "parts", 0, "text"),
-            ("response", "text"),
-            ("assistant", "text"),
-            ("message", "content", 0, "text"),
-        ]
-        for path in paths:
-            cur: Any = event
-            try:
-                for p in path:
-                    cur = cur[p]
-                if isinstance(cur, str) and cur.strip():
-                    return cur
-            except Exception:
-                continue
-        for value in event.values():
-            if isinstance(value, dict):
-                text = value.get("text")
-                if isinstance(text, str) and text.strip():
-                    return text
-    return None
-
-
 def _user_message(text: str) -> genai_types.Content:
     return genai_types.Content(
         role="user",
@@ -216,87 +174,417 @@ async def _run_turns(runner: Runner, user_id: str, session_id: str, turns: List[
     out: List[Dict[str, str]] = []
     for text in turns:
         assistant_text: Optional[str] = None
+        turn = TurnText()
         message = _user_message(text)
-        async for ev in runner.run_async(
+        events = runner.run_async(
             user_id=user_id,
             session_id=session_id,
             new_message=message,
-        ):
-            maybe = _extract_assistant_text(ev)
-            if maybe:
-                assistant_text = maybe
+        )
+        metrics = instrumentation.env_instrumentation.resolve()
+        if metrics:
+            events = metrics.track(events, label=session_id)
+        async for ev in profiling.phase_aiter(events, "model_wait"):
+            # Keep the last complete reply of the turn.
+            with profiling.phase("extract"):
+                reply = turn.add(ev)
+            if reply and reply.strip():
+                assistant_text = reply
         out.append({"user_text": text, "assistant_text": assistant_text or ""})
     return out
 
 
-def _load_tests(path: Path) -> List[Dict[str, Any]]:
-    data = json.loads(path.read_text(encoding="utf-8"))
-    if not isinstance(data, list):
-        raise ValueError("eval_scripts.json must be a JSON array of objects with {id, turns[]}.")
-    results: List[Dict[str, Any]] = []
-    for item in data:
-        cid = item.get("id") or _new_id("case")
-        turns = item.get("turns") or []
-        results.append({"id": str(cid), "turns": [str(t) for t in turns]})
-    return results
-
-
-async def _main() -> Path:
-    # Services
-    session_service = InMemorySessionService()
-    runner = Runner(
-        app_name=APP_NAME,
-        agent=agent,
-        session_service=session_service,
-    )
+def _script_id(turns: List[str], seen: Dict[str, int]) -> str:
+    # Scripts without an id get one derived from their turns, so a rerun
+    # with --resume recognizes the cases it already finished. Repeats of
+    # the same script are numbered in file order.
+    digest = hashlib.sha256(json.dumps(turns).encode("utf-8")).hexdigest()[:6]
+    seen[digest] = seen.get(digest, 0) + 1
+    count = seen[digest]
+    return f"case{digest}" if count == 1 else f"case{digest}_{count}"
 
-    # Load test scripts
-    tests = _load_tests(TESTS_PATH)
 
-    cases: List[Any] = []
-    for t in tests:
-        user_id = f"user_{uuid.uuid4().hex[:8]}"
-        session_id = f"sess_{uuid.uuid4().hex[:8]}"
+def _iter_tests(path: Path) -> Iterator[Dict[str, Any]]:
+    # Streams scripts one at a time: JSON Lines (*.jsonl) or a JSON array,
+    # parsed incrementally so huge script files never load whole.
+    seen: Dict[str, int] = {}
+    for item in iter_json_records(path):
+        if not isinstance(item, dict):
+            raise ValueError(f"{path.name} must contain objects with {{id, turns[]}}.")
+        turns = [str(t) for t in item.get("turns") or []]
+        cid = item.get("id") or _script_id(turns, seen)
+        yield {"id": str(cid), "turns": turns}
+
+
+def _model_name(gen_agent: Any) -> str:
+    model = getattr(gen_agent, "model", "")
+    return model if isinstance(model, str) else getattr(model, "model", "")
 
-        # Register session (different ADK versions have different arg names)
+
+def _is_transient(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+    return code in TRANSIENT_STATUS_CODES
+
+
+async def _create_session(session_service: Any, gen_agent: Any, user_id: str, session_id: str) -> None:
+    # Register session (different ADK versions have different arg names, and
+    # newer ones make create_session a coroutine)
+    try:
+        created = session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+        )
+    except TypeError:
         try:
-            session_service.create_session(
-                app_name=APP_NAME,
-                user_id=user_id,
+            created = session_service.create_session(
                 session_id=session_id,
+                root_agent=gen_agent,
+                app_name=APP_NAME,
             )
         except TypeError:
             try:
-                session_service.create_session(
+                created = session_service.create_session(
                     session_id=session_id,
-                    root_agent=agent,
+                    agent=gen_agent,
                     app_name=APP_NAME,
                 )
             except TypeError:
-                try:
-                    session_service.create_session(
-                        session_id=session_id,
-                        agent=agent,
-                        app_name=APP_NAME,
-                    )
-                except TypeError:
-                    session_service.create_session(session_id, agent)  # very old signature
-
-        events = await _run_turns(runner, user_id, session_id, t["turns"])
-        cases.append(_case(t["id"], events))
-
-    es = _evalset(cases, name=f"{APP_NAME}-generated")
-    payload = _model_dump(es)
-
-    out_path = OUTPUT_DIR / f'{payload.get("eval_set_id", _new_id("evalset"))}.evalset.json'
-    out_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+                created = session_service.create_session(session_id, gen_agent)  # very old signature
+    if inspect.isawaitable(created):
+        await created
+
+
+async def _generate_case(
+    runner: Runner,
+    session_service: Any,
+    gen_agent: Any,
+    test: Dict[str, Any],
+    *,
+    case_timeout: Optional[float],
+    max_retries: int,
+    retry_backoff: float,
+) -> Any:
+    attempt = 0
+    while True:
+        # Every attempt gets a fresh session so a retried case never sees the
+        # half-finished history of the failed one.
+        user_id = f"user_{uuid.uuid4().hex[:8]}"
+        session_id = f"sess_{uuid.uuid4().hex[:8]}"
+        with profiling.phase("session"):
+            await _create_session(session_service, gen_agent, user_id, session_id)
+        try:
+            turns = _run_turns(runner, user_id, session_id, test["turns"])
+            if case_timeout:
+                events = await asyncio.wait_for(turns, timeout=case_timeout)
+            else:
+                events = await turns
+        except Exception as exc:
+            if attempt >= max_retries or not _is_transient(exc):
+                raise
+            limiter = rate_limit.env_rate_limiter.resolve()
+            if limiter and rate_limit.is_quota_error(exc):
+                # Pause the model for every worker sharing the limiter.
+                await limiter.report_quota_error(_model_name(gen_agent))
+            delay = rate_limit.jittered_backoff(attempt, retry_backoff)
+            attempt += 1
+            print(
+                f"Case {test['id']}: {exc.__class__.__name__} ({exc}); "
+                f"retry {attempt}/{max_retries} in {delay:.1f}s",
+                file=sys.stderr,
+            )
+            await asyncio.sleep(delay)
+        else:
+            return _case(test["id"], events)
+
+
+async def _main(
+    *,
+    concurrency: int = 1,
+    case_timeout: Optional[float] = None,
+    max_retries: int = 2,
+    retry_backoff: float = 1.0,
+    generation_agent: Any = None,
+    tests_path: Path = TESTS_PATH,
+    output_dir: Path = OUTPUT_DIR,
+    output_format: str = DEFAULT_EVALSET_FORMAT,
+    resume_path: Optional[Path] = None,
+) -> Path:
+    with profiling.phase("load"):
+        gen_agent = generation_agent or get_root_agent()
+
+        # Services (shared by every case; each case gets its own session)
+        session_service = InMemorySessionService()
+        runner = Runner(
+            app_name=APP_NAME,
+            agent=gen_agent,
+            session_service=session_service,
+        )
+
+    # Finished cases go straight to an append-only journal, so a crash only
+    # loses the cases still in flight and --resume can pick up from there.
+    if resume_path is not None:
+        journal = EvalsetJournal.open(resume_path)
+    else:
+        header = _evalset_header(name=f"{APP_NAME}-generated")
+        journal = EvalsetJournal.open(journal_path(output_dir, _header_id(header)), header)
+    done = journal.completed_ids
+    print(f"Journal: {journal.path} ({len(done)} cases already done)")
+
+    # Scripts are pulled lazily by a fixed pool of workers, so the first
+    # model call starts right away and memory does not grow with the suite.
+    # Only the ids are kept, to restore script order at compaction.
+    order: List[str] = []
+
+    def _pending_tests() -> Iterator[Dict[str, Any]]:
+        for t in _iter_tests(tests_path):
+            order.append(t["id"])
+            if t["id"] not in done:
+                yield t
+
+    pending = _pending_tests()
+
+    async def _worker() -> None:
+        for t in pending:
+            case = await _generate_case(
+                runner,
+                session_service,
+                gen_agent,
+                t,
+                case_timeout=case_timeout,
+                max_retries=max_retries,
+                retry_backoff=retry_backoff,
+            )
+            with profiling.phase("write"):
+                journal.append(_model_dump(case))
+
+    tasks = [asyncio.ensure_future(_worker()) for _ in range(max(1, concurrency))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        journal.close()
+        print(f"Generation stopped; resume with --resume {journal.path}", file=sys.stderr)
+        raise
+
+    # Compaction emits cases in script order no matter which finished first.
+    eval_set_id = _header_id(journal.header)
+    with profiling.phase("write"):
+        out_path = journal.compact(
+            evalset_path(output_dir, eval_set_id, output_format),
+            output_format,
+            order=order,
+        )
+        journal.remove()
     print(
         "Wrote:", out_path,
-        "(models:", "ok" if USE_MODELS else "fallback-dict", ")"
+        "(models:", "ok" if _use_models() else "fallback-dict", ")"
     )
     return out_path
 
 
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run eval_scripts.json through the agent and write an evalset"
+    )
+    parser.add_argument(
+        "--scripts",
+        type=Path,
+        default=TESTS_PATH,
+        help="Scripted conversations as a JSON array or JSON Lines file (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=OUTPUT_DIR,
+        help="Directory for the generated evalset (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=EVALSET_FORMATS,
+        default=DEFAULT_EVALSET_FORMAT,
+        help="Evalset file format: legacy indented json, compact json, gzip or jsonl (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--resume",
+        type=Path,
+        default=None,
+        help="Continue an interrupted run from its .evalset.partial.jsonl journal",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of cases generated in parallel (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--case-timeout",
+        type=float,
+        default=None,
+        help="Seconds allowed per case attempt before it is retried",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=2,
+        help="Retries per case on transient model errors (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=1.0,
+        help="Initial retry delay in seconds, doubled per attempt with jitter (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=Path,
+        default=None,
+        help="Write per-turn latency/token metrics to this JSON Lines file",
+    )
+    parser.add_argument(
+        "--fake-llm-latency",
+        type=float,
+        default=None,
+        help="Use the offline FakeLlm with this per-call latency instead of Gemini",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=CACHE_MODES,
+        default=None,
+        help="LLM response cache mode (default: $GREETING_AGENT_CACHE_MODE or passthrough)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Directory of the LLM response cache; requires --cache-mode"
+            " (default: $GREETING_AGENT_CACHE_DIR or .llm_cache)"
+        ),
+    )
+    parser.add_argument(
+        "--rate-limit",
+        default=None,
+        help="Shared per-model budgets as MODEL=RPM[:TPM],... ('*' for any model)",
+    )
+    parser.add_argument(
+        "--rate-limit-file",
+        type=Path,
+        default=None,
+        help="State file shared by rate-limited processes (default: in the temp dir)",
+    )
+    parser.add_argument(
+        "--route",
+        default=None,
+        metavar="SPEC",
+        help="Route the agent's turns across models: 'default' or "
+        "TURN=MODEL[:MODEL...],... with turns question, poem and default",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Race a routed request that is still silent after this long "
+        "against the next model; 0 turns hedging off",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="PREFIX",
+        help=(
+            "Profile the run: write PREFIX.collapsed (flamegraph stacks), PREFIX.json"
+            " (phase and asyncio task timing) and, with --profile-mode deterministic,"
+            " PREFIX.pstats"
+        ),
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=profiling.PROFILE_MODES,
+        default=profiling.DEFAULT_PROFILE_MODE,
+        help=(
+            "sample: stack samples only; deterministic: also cProfile every call,"
+            " which slows CPU-bound code (default: %(default)s)"
+        ),
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    load_dotenv()
+    args = _parse_args(argv)
+    if args.concurrency <= 0:
+        print("--concurrency must be a positive integer")
+        return 2
+    if args.max_retries < 0:
+        print("--max-retries must not be negative")
+        return 2
+    if args.resume is not None and not args.resume.is_file():
+        print(f"Evalset journal not found: {args.resume}")
+        return 2
+    if args.cache_dir is not None and not args.cache_mode:
+        print("--cache-dir requires --cache-mode")
+        return 2
+
+    if args.cache_mode:
+        configure_env(args.cache_mode, args.cache_dir)
+    if args.metrics:
+        instrumentation.configure_env(args.metrics, source="generate")
+    if args.rate_limit:
+        try:
+            rate_limit.configure_env(
+                args.rate_limit, state_path=args.rate_limit_file, lane="batch"
+            )
+        except ValueError as exc:
+            print(exc)
+            return 2
+    if args.route:
+        # get_root_agent builds its RoutingLlm from the environment.
+        try:
+            routing_llm.configure_env(args.route, hedge_after=args.hedge_after)
+        except ValueError as exc:
+            print(exc)
+            return 2
+
+    with profiling.profile(args.profile, mode=args.profile_mode):
+        generation_agent = None
+        if args.fake_llm_latency is not None:
+            from greeting_agent.fake_llm import FakeLlm
+
+            with profiling.phase("load"):
+                generation_agent = create_greeting_agent(
+                    model=FakeLlm(latency=args.fake_llm_latency),
+                    response_cache=env_response_cache,
+                    instrumentation=instrumentation.env_instrumentation,
+                    rate_limiter=rate_limit.env_rate_limiter,
+                )
+
+        profiling.run(
+            _main(
+                concurrency=args.concurrency,
+                case_timeout=args.case_timeout,
+                max_retries=args.max_retries,
+                retry_backoff=args.retry_backoff,
+                generation_agent=generation_agent,
+                tests_path=args.scripts,
+                output_dir=args.output_dir,
+                output_format=args.format,
+                resume_path=args.resume,
+            )
+        )
+    metrics = instrumentation.env_instrumentation.resolve()
+    if metrics:
+        print(instrumentation.format_summary(instrumentation.summarize(metrics.records)))
+    limiter = rate_limit.env_rate_limiter.resolve()
+    if limiter:
+        print("Rate limiter:", limiter.stats())
+    return 0
+
+
 if __name__ == "__main__":
-    asyncio.run(_main())
+    raise SystemExit(main())
 
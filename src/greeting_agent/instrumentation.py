@@ -0,0 +1,422 @@
+"""Opt-in per-turn latency, token and event metrics for the greeting agent.
+
+``Instrumentation`` hooks into the ``LlmAgent`` as agent and model callbacks,
+so it measures every turn no matter who drives the runner (the console, the
+evalset generator or ``AgentEvaluator``). Callers that drive the runner
+themselves can also wrap the event stream with ``track``/``track_sync`` to
+add wall-clock timings around the runner call, which include ADK session
+bookkeeping on top of the agent's own time.
+
+Each finished turn becomes one JSON line in the metrics file; ``summarize``
+turns those lines into p50/p95/p99 statistics.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.events import Event
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+METRICS_PATH_ENV = "GREETING_AGENT_METRICS_PATH"
+METRICS_SOURCE_ENV = "GREETING_AGENT_METRICS_SOURCE"
+SUMMARY_FIELDS = (
+    "time_to_first_event",
+    "total_latency",
+    "agent_latency",
+    "model_latency",
+    "prompt_tokens",
+    "response_tokens",
+    "events",
+)
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class TurnMetrics:
+  """Measurements for one user turn (one ADK invocation)."""
+
+  source: str
+  label: str
+  invocation_id: str
+  timestamp: float
+  time_to_first_event: Optional[float]
+  total_latency: float
+  agent_latency: Optional[float]
+  model_latency: float
+  model_calls: int
+  prompt_tokens: int
+  response_tokens: int
+  events: int
+
+
+@dataclass
+class _InvocationStats:
+  started: float
+  agent_ended: Optional[float] = None
+  first_response: Optional[float] = None
+  model_started: Optional[float] = None
+  model_calls: int = 0
+  model_time: float = 0.0
+  prompt_tokens: int = 0
+  response_tokens: int = 0
+  responses: int = 0
+  call_prompt_tokens: int = 0
+  call_response_tokens: int = 0
+  tracked: bool = False
+  label: str = ""
+
+
+class Instrumentation:
+  """Collects ``TurnMetrics`` and appends them to a JSON Lines file."""
+
+  def __init__(self, path: Optional[str | Path] = None, *, source: str = "agent"):
+    self.path = Path(path).expanduser() if path else None
+    self.source = source
+    self.records: List[TurnMetrics] = []
+    self._stats: Dict[str, _InvocationStats] = {}
+    self._lock = threading.Lock()
+    if self.path:
+      self.path.parent.mkdir(parents=True, exist_ok=True)
+
+  def _stats_for(self, invocation_id: str) -> _InvocationStats:
+    stats = self._stats.get(invocation_id)
+    if stats is None:
+      stats = self._stats[invocation_id] = _InvocationStats(
+          started=time.perf_counter()
+      )
+    return stats
+
+  # -- agent callbacks ------------------------------------------------------
+
+  def before_agent(self, callback_context: CallbackContext) -> None:
+    stats = self._stats_for(callback_context.invocation_id)
+    stats.label = stats.label or callback_context.agent_name
+    return None
+
+  def after_agent(self, callback_context: CallbackContext) -> None:
+    stats = self._stats.get(callback_context.invocation_id)
+    if stats is None:
+      return None
+    stats.agent_ended = time.perf_counter()
+    if not stats.tracked:
+      # Nobody wraps this runner call (e.g. AgentEvaluator); emit from here.
+      self._stats.pop(callback_context.invocation_id, None)
+      total = stats.agent_ended - stats.started
+      self._emit(
+          callback_context.invocation_id,
+          stats,
+          label=stats.label,
+          total=total,
+          first_event=(
+              stats.first_response - stats.started
+              if stats.first_response is not None
+              else None
+          ),
+          events=stats.responses,
+      )
+    return None
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    self._stats_for(callback_context.invocation_id).model_started = (
+        time.perf_counter()
+    )
+    return None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    now = time.perf_counter()
+    stats = self._stats_for(callback_context.invocation_id)
+    stats.responses += 1
+    if stats.first_response is None:
+      stats.first_response = now
+    usage = llm_response.usage_metadata
+    if usage is not None:
+      # Streaming chunks repeat cumulative counts; the last one wins.
+      stats.call_prompt_tokens = usage.prompt_token_count or 0
+      stats.call_response_tokens = usage.candidates_token_count or 0
+    if not llm_response.partial:
+      stats.model_calls += 1
+      if stats.model_started is not None:
+        stats.model_time += now - stats.model_started
+        stats.model_started = None
+      stats.prompt_tokens += stats.call_prompt_tokens
+      stats.response_tokens += stats.call_response_tokens
+      stats.call_prompt_tokens = stats.call_response_tokens = 0
+    return None
+
+  # -- runner wrappers ------------------------------------------------------
+
+  def _finish_tracked(
+      self,
+      invocation_id: Optional[str],
+      *,
+      label: str,
+      started: float,
+      first_event: Optional[float],
+      events: int,
+  ) -> None:
+    stats = self._stats.pop(invocation_id, None) if invocation_id else None
+    if stats is None:
+      stats = _InvocationStats(started=started)
+    self._emit(
+        invocation_id or "",
+        stats,
+        label=label,
+        total=time.perf_counter() - started,
+        first_event=first_event,
+        events=events,
+    )
+
+  def _mark_tracked(self, event: Event, label: str) -> None:
+    stats = self._stats_for(event.invocation_id)
+    stats.tracked = True
+    stats.label = label
+
+  async def track(
+      self, events: AsyncIterator[Event], *, label: str
+  ) -> AsyncIterator[Event]:
+    """Wraps ``runner.run_async`` output and records the turn when done."""
+    started = time.perf_counter()
+    first_event: Optional[float] = None
+    invocation_id: Optional[str] = None
+    count = 0
+    try:
+      async for event in events:
+        if invocation_id is None:
+          invocation_id = event.invocation_id
+          self._mark_tracked(event, label)
+        if first_event is None and event.author != "user":
+          first_event = time.perf_counter() - started
+        count += 1
+        yield event
+    finally:
+      self._finish_tracked(
+          invocation_id,
+          label=label,
+          started=started,
+          first_event=first_event,
+          events=count,
+      )
+
+  def track_sync(self, events: Iterable[Event], *, label: str) -> Iterator[Event]:
+    """Blocking counterpart of ``track`` for ``runner.run``."""
+    started = time.perf_counter()
+    first_event: Optional[float] = None
+    invocation_id: Optional[str] = None
+    count = 0
+    try:
+      for event in events:
+        if invocation_id is None:
+          invocation_id = event.invocation_id
+          self._mark_tracked(event, label)
+        if first_event is None and event.author != "user":
+          first_event = time.perf_counter() - started
+        count += 1
+        yield event
+    finally:
+      self._finish_tracked(
+          invocation_id,
+          label=label,
+          started=started,
+          first_event=first_event,
+          events=count,
+      )
+
+  # -- output ---------------------------------------------------------------
+
+  def _emit(
+      self,
+      invocation_id: str,
+      stats: _InvocationStats,
+      *,
+      label: str,
+      total: float,
+      first_event: Optional[float],
+      events: int,
+  ) -> None:
+    agent_latency = (
+        stats.agent_ended - stats.started if stats.agent_ended is not None else None
+    )
+    self.record(
+        TurnMetrics(
+            source=self.source,
+            label=label,
+            invocation_id=invocation_id,
+            timestamp=time.time(),
+            time_to_first_event=first_event,
+            total_latency=total,
+            agent_latency=agent_latency,
+            model_latency=stats.model_time,
+            model_calls=stats.model_calls,
+            prompt_tokens=stats.prompt_tokens,
+            response_tokens=stats.response_tokens,
+            events=events,
+        )
+    )
+
+  def record(self, metrics: TurnMetrics) -> None:
+    """Keeps ``metrics`` and appends it to the metrics file, if any."""
+    line = json.dumps(asdict(metrics)) + "\n"
+    with self._lock:
+      self.records.append(metrics)
+      if self.path:
+        # One short append per line keeps concurrent writers from
+        # interleaving records.
+        with self.path.open("a", encoding="utf-8") as handle:
+          handle.write(line)
+
+
+def load_records(path: str | Path) -> List[Dict[str, Any]]:
+  """Reads the metrics JSON Lines file written by ``Instrumentation``."""
+  path = Path(path)
+  if not path.exists():
+    return []
+  with path.open(encoding="utf-8") as handle:
+    return [json.loads(line) for line in handle if line.strip()]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+  """Linearly interpolated percentile of ``values`` (which must be non-empty)."""
+  ordered = sorted(values)
+  rank = (len(ordered) - 1) * pct / 100
+  low = math.floor(rank)
+  high = math.ceil(rank)
+  return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(records: Iterable[Dict[str, Any] | TurnMetrics]) -> Dict[str, Dict[str, float]]:
+  """Returns count, mean and p50/p95/p99 for each ``SUMMARY_FIELDS`` entry."""
+  rows = [asdict(r) if isinstance(r, TurnMetrics) else r for r in records]
+  summary: Dict[str, Dict[str, float]] = {}
+  for name in SUMMARY_FIELDS:
+    values = [float(row[name]) for row in rows if row.get(name) is not None]
+    if not values:
+      continue
+    stats = {"count": float(len(values)), "mean": sum(values) / len(values)}
+    for pct in PERCENTILES:
+      stats[f"p{pct}"] = percentile(values, pct)
+    summary[name] = stats
+  return summary
+
+
+def format_summary(summary: Dict[str, Dict[str, float]]) -> str:
+  """Renders ``summarize`` output as a fixed-width table."""
+  if not summary:
+    return "No turn metrics recorded."
+  name_width = max(len(name) for name in summary)
+  columns = ["count", "mean"] + [f"p{pct}" for pct in PERCENTILES]
+  lines = [f"{'Metric':<{name_width}}  " + "  ".join(f"{c:>9}" for c in columns)]
+  lines.append("-" * len(lines[0]))
+  for name, stats in summary.items():
+    cells = [f"{int(stats['count']):>9}"] + [f"{stats[c]:>9.3f}" for c in columns[1:]]
+    lines.append(f"{name:<{name_width}}  " + "  ".join(cells))
+  return "\n".join(lines)
+
+
+class EnvInstrumentation:
+  """Resolves ``Instrumentation`` from the environment on first use.
+
+  Mirrors ``llm_cache.EnvResponseCache``: ``root_agent`` may exist before entry
+  points parse ``--metrics``, and evaluator worker processes only inherit
+  environment variables.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._resolved = False
+    self._instrumentation: Optional[Instrumentation] = None
+
+  def reset(self) -> None:
+    with self._lock:
+      self._resolved = False
+      self._instrumentation = None
+
+  def resolve(self) -> Optional[Instrumentation]:
+    with self._lock:
+      if not self._resolved:
+        path = os.environ.get(METRICS_PATH_ENV)
+        if path:
+          self._instrumentation = Instrumentation(
+              path, source=os.environ.get(METRICS_SOURCE_ENV, "agent")
+          )
+        self._resolved = True
+      return self._instrumentation
+
+  def before_agent(self, callback_context: CallbackContext) -> None:
+    instrumentation = self.resolve()
+    if instrumentation:
+      instrumentation.before_agent(callback_context)
+    return None
+
+  def after_agent(self, callback_context: CallbackContext) -> None:
+    instrumentation = self.resolve()
+    if instrumentation:
+      instrumentation.after_agent(callback_context)
+    return None
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    instrumentation = self.resolve()
+    if instrumentation:
+      instrumentation.before_model(callback_context, llm_request)
+    return None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    instrumentation = self.resolve()
+    if instrumentation:
+      instrumentation.after_model(callback_context, llm_response)
+    return None
+
+
+env_instrumentation = EnvInstrumentation()
+
+
+def configure_env(path: str | Path, *, source: str = "agent") -> None:
+  """Enables metrics for this process and its children.
+
+  The metrics file is truncated so it only holds the run about to start.
+  """
+  path = Path(path).expanduser()
+  path.parent.mkdir(parents=True, exist_ok=True)
+  path.write_text("", encoding="utf-8")
+  os.environ[METRICS_PATH_ENV] = str(path)
+  os.environ[METRICS_SOURCE_ENV] = source
+  env_instrumentation.reset()
+
+
+__all__ = [
+    "EnvInstrumentation",
+    "Instrumentation",
+    "TurnMetrics",
+    "configure_env",
+    "env_instrumentation",
+    "format_summary",
+    "load_records",
+    "percentile",
+    "summarize",
+]
@@ -0,0 +1,289 @@
+"""Content-addressed record/replay cache for LLM responses.
+
+The cache plugs into ``LlmAgent`` as a before/after model callback pair. Keys
+hash the model name, the system instruction and the full conversation sent to
+the model, so any change to the prompt, model or history is a miss.
+
+Modes:
+  passthrough: the cache is bypassed entirely.
+  record: cached responses are served; misses call the model and are stored.
+  replay: cached responses are served; misses raise ``CacheMissError`` so CI
+    runs never reach the network.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+CACHE_MODES = ("passthrough", "record", "replay")
+CACHE_MODE_ENV = "GREETING_AGENT_CACHE_MODE"
+CACHE_DIR_ENV = "GREETING_AGENT_CACHE_DIR"
+CACHE_MAX_ENTRIES_ENV = "GREETING_AGENT_CACHE_MAX_ENTRIES"
+CACHE_MAX_BYTES_ENV = "GREETING_AGENT_CACHE_MAX_BYTES"
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_ENTRIES = 10_000
+# Model calls a callback pair tracks at once; see ``PendingCalls``.
+DEFAULT_MAX_PENDING_CALLS = 1024
+
+
+class CacheMissError(RuntimeError):
+  """Raised in replay mode when a request has no recorded response."""
+
+
+def _dump(value: Any) -> Any:
+  if hasattr(value, "model_dump"):
+    return value.model_dump(mode="json", exclude_none=True)
+  return value
+
+
+def request_key(llm_request: LlmRequest) -> str:
+  """Returns the content hash identifying ``llm_request``."""
+  config = llm_request.config
+  instruction = getattr(config, "system_instruction", None) if config else None
+  material = {
+      "model": llm_request.model,
+      "instruction": _dump(instruction),
+      "contents": [_dump(content) for content in llm_request.contents or []],
+  }
+  encoded = json.dumps(material, sort_keys=True, ensure_ascii=False)
+  return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class PendingCalls:
+  """State a ``before_model`` callback hands to the matching ``after_model``.
+
+  Entries are keyed by invocation id. ADK skips ``after_model`` when the
+  model call raises, so entries of failed calls are never popped; only the
+  ``max_entries`` most recently added ones are kept to bound that leak. A
+  retried call of the same invocation replaces its earlier entry.
+  """
+
+  def __init__(self, max_entries: int = DEFAULT_MAX_PENDING_CALLS):
+    if max_entries <= 0:
+      raise ValueError("max_entries must be a positive integer")
+    self.max_entries = max_entries
+    self._lock = threading.Lock()
+    self._entries: "OrderedDict[str, Any]" = OrderedDict()
+
+  def __len__(self) -> int:
+    return len(self._entries)
+
+  def put(self, invocation_id: str, value: Any) -> None:
+    with self._lock:
+      self._entries.pop(invocation_id, None)
+      self._entries[invocation_id] = value
+      while len(self._entries) > self.max_entries:
+        self._entries.popitem(last=False)
+
+  def pop(self, invocation_id: str, default: Any = None) -> Any:
+    with self._lock:
+      return self._entries.pop(invocation_id, default)
+
+
+class ResponseCache:
+  """On-disk LRU cache of final ``LlmResponse`` objects.
+
+  Each entry is one JSON file named after its key. Reads refresh the file
+  modification time so recency survives restarts; eviction removes the least
+  recently used entries once ``max_entries`` or ``max_bytes`` is exceeded.
+  """
+
+  def __init__(
+      self,
+      directory: str | Path = DEFAULT_CACHE_DIR,
+      *,
+      mode: str = "record",
+      max_entries: Optional[int] = DEFAULT_MAX_ENTRIES,
+      max_bytes: Optional[int] = None,
+  ):
+    if mode not in CACHE_MODES:
+      raise ValueError(f"Unknown cache mode {mode!r}; expected one of {CACHE_MODES}")
+    self.directory = Path(directory).expanduser()
+    self.mode = mode
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+    self._index: "OrderedDict[str, int]" = OrderedDict()
+    self._total_bytes = 0
+    self._pending = PendingCalls()
+    if mode != "passthrough":
+      self.directory.mkdir(parents=True, exist_ok=True)
+      self._load_index()
+
+  @classmethod
+  def from_env(cls) -> Optional["ResponseCache"]:
+    """Builds a cache from ``GREETING_AGENT_CACHE_*`` variables, if enabled."""
+    mode = os.environ.get(CACHE_MODE_ENV, "passthrough").strip().lower()
+    if mode == "passthrough":
+      return None
+    max_entries = os.environ.get(CACHE_MAX_ENTRIES_ENV)
+    max_bytes = os.environ.get(CACHE_MAX_BYTES_ENV)
+    return cls(
+        os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR),
+        mode=mode,
+        max_entries=int(max_entries) if max_entries else DEFAULT_MAX_ENTRIES,
+        max_bytes=int(max_bytes) if max_bytes else None,
+    )
+
+  def _path_for(self, key: str) -> Path:
+    return self.directory / f"{key}.json"
+
+  def _load_index(self) -> None:
+    entries: list[Tuple[float, str, int]] = []
+    for path in self.directory.glob("*.json"):
+      try:
+        stat = path.stat()
+      except OSError:
+        continue
+      entries.append((stat.st_mtime, path.stem, stat.st_size))
+    for _, key, size in sorted(entries):
+      self._index[key] = size
+      self._total_bytes += size
+
+  def _evict(self) -> None:
+    while self._index and (
+        (self.max_entries is not None and len(self._index) > self.max_entries)
+        or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+    ):
+      key, size = self._index.popitem(last=False)
+      self._total_bytes -= size
+      try:
+        self._path_for(key).unlink()
+      except FileNotFoundError:
+        pass
+
+  def get(self, key: str) -> Optional[LlmResponse]:
+    """Returns the stored response for ``key`` and marks it recently used."""
+    path = self._path_for(key)
+    try:
+      payload = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+      with self._lock:
+        self._total_bytes -= self._index.pop(key, 0)
+      return None
+    with self._lock:
+      if key in self._index:
+        self._index.move_to_end(key)
+    try:
+      os.utime(path)
+    except OSError:
+      pass
+    return LlmResponse.model_validate_json(payload)
+
+  def put(self, key: str, response: LlmResponse) -> None:
+    """Stores ``response`` under ``key``, evicting old entries if needed."""
+    payload = response.model_dump_json(exclude_none=True)
+    path = self._path_for(key)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(payload, encoding="utf-8")
+    os.replace(tmp_path, path)
+    size = len(payload.encode("utf-8"))
+    with self._lock:
+      self._total_bytes += size - self._index.pop(key, 0)
+      self._index[key] = size
+      self._evict()
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    """``before_model_callback`` serving cached responses."""
+    if self.mode == "passthrough":
+      return None
+    key = request_key(llm_request)
+    cached = self.get(key)
+    if cached is not None:
+      self.hits += 1
+      return cached
+    self.misses += 1
+    if self.mode == "replay":
+      raise CacheMissError(
+          f"No recorded response for request {key[:12]} in {self.directory}"
+      )
+    self._pending.put(callback_context.invocation_id, key)
+    return None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    """``after_model_callback`` recording final responses on a miss."""
+    if llm_response.partial:
+      return None
+    key = self._pending.pop(callback_context.invocation_id, None)
+    if key and not llm_response.error_code and llm_response.content:
+      self.put(key, llm_response)
+    return None
+
+
+class EnvResponseCache:
+  """Resolves a ``ResponseCache`` from the environment on first model call.
+
+  ``root_agent`` may be built before entry points have parsed their flags;
+  deferring the lookup lets them configure caching through ``configure_env``
+  afterwards.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._resolved = False
+    self._cache: Optional[ResponseCache] = None
+
+  def reset(self) -> None:
+    with self._lock:
+      self._resolved = False
+      self._cache = None
+
+  def resolve(self) -> Optional[ResponseCache]:
+    with self._lock:
+      if not self._resolved:
+        self._cache = ResponseCache.from_env()
+        self._resolved = True
+      return self._cache
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    cache = self.resolve()
+    return cache.before_model(callback_context, llm_request) if cache else None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    cache = self.resolve()
+    return cache.after_model(callback_context, llm_response) if cache else None
+
+
+env_response_cache = EnvResponseCache()
+
+
+def configure_env(mode: str, directory: Optional[str | Path] = None) -> None:
+  """Sets the cache environment variables for this process and its children."""
+  if mode not in CACHE_MODES:
+    raise ValueError(f"Unknown cache mode {mode!r}; expected one of {CACHE_MODES}")
+  os.environ[CACHE_MODE_ENV] = mode
+  if directory is not None:
+    os.environ[CACHE_DIR_ENV] = str(directory)
+  env_response_cache.reset()
+
+
+__all__ = [
+    "CACHE_MODES",
+    "CacheMissError",
+    "EnvResponseCache",
+    "PendingCalls",
+    "ResponseCache",
+    "configure_env",
+    "env_response_cache",
+    "request_key",
+]
@@ -0,0 +1,326 @@
+"""In-memory cache of hobby poems keyed on the normalized hobby.
+
+Unlike ``llm_cache``, which only matches byte-identical prompts, this cache
+serves any conversation whose latest user message answers the agent's hobby
+question with a hobby it has already seen ("Painting!", "i love painting" and
+"painting" share a key). Only that turn is cached: its reply depends on the
+hobby alone, whereas follow-ups ("make it rhyme more", "10 years") depend on
+the conversation so far. Keys also carry a fingerprint of the model and
+system instruction, so a prompt or model change never serves stale poems.
+
+Each key collects up to ``variants`` distinct model replies before it starts
+serving them, round-robin, so repeat visitors do not always get the same
+poem. Variants expire after ``ttl_seconds`` and the least recently used keys
+are dropped beyond ``max_keys``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .llm_cache import PendingCalls
+
+POEM_CACHE_VARIANTS_ENV = "GREETING_AGENT_POEM_CACHE_VARIANTS"
+POEM_CACHE_TTL_ENV = "GREETING_AGENT_POEM_CACHE_TTL"
+POEM_CACHE_MAX_KEYS_ENV = "GREETING_AGENT_POEM_CACHE_MAX_KEYS"
+DEFAULT_VARIANTS = 3
+DEFAULT_MAX_KEYS = 1_000
+
+# Words that carry no hobby information: greetings, sign-offs and the filler
+# around a hobby ("I really love painting" -> "painting").
+_FILLER_WORDS = frozenset(
+    """
+    a an and are at bye cheers do doing enjoy enjoying fan favorite favourite
+    for goodbye hello hey hi hobby hola i im in is it just like love lot lots
+    me much my of ok okay on play playing really thank thanks the to very
+    watch watching well what with yes you
+    """.split()
+)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+_HOBBY_WORD = re.compile(r"\bhobb(?:y|ies)\b", re.IGNORECASE)
+
+
+def normalize_hobby(text: str) -> str:
+  """Reduces a user message to a canonical hobby string.
+
+  Lowercases, strips accents and punctuation, drops filler words and
+  singularizes plain plurals, so ``"I love K-Dramas!"`` becomes
+  ``"k drama"``. Returns ``""`` when nothing hobby-like is left.
+  """
+  ascii_text = (
+      unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+  )
+  words = []
+  for word in _NON_WORD.split(ascii_text.lower()):
+    if not word or word in _FILLER_WORDS:
+      continue
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+      word = word[:-1]
+    words.append(word)
+  return " ".join(words)
+
+
+def _text_of(content: Any) -> str:
+  parts = getattr(content, "parts", None) or []
+  return " ".join(part.text for part in parts if getattr(part, "text", None))
+
+
+def request_fingerprint(llm_request: LlmRequest) -> str:
+  """Short hash of the model name and system instruction of a request."""
+  config = llm_request.config
+  instruction = getattr(config, "system_instruction", None) if config else None
+  if instruction is not None and not isinstance(instruction, str):
+    instruction = _text_of(instruction)
+  material = f"{llm_request.model}\0{instruction or ''}"
+  return hashlib.sha256(material.encode("utf-8")).hexdigest()[:16]
+
+
+def _asks_for_hobby(text: str) -> bool:
+  return "?" in text and _HOBBY_WORD.search(text) is not None
+
+
+def answered_hobby(llm_request: LlmRequest) -> Optional[str]:
+  """Normalized hobby when the latest message answers the hobby question.
+
+  That is the case when the previous model turn asked about the hobby and no
+  earlier user message named one; any other turn returns None. User contents
+  may lack a role (evalsets do not set one), so every non-model content
+  counts as the user's.
+  """
+  contents = llm_request.contents or []
+  if len(contents) < 2 or contents[-1].role == "model" or contents[-2].role != "model":
+    return None
+  if not _asks_for_hobby(_text_of(contents[-2])):
+    return None
+  for content in contents[:-2]:
+    if content.role != "model" and normalize_hobby(_text_of(content)):
+      return None
+  return normalize_hobby(_text_of(contents[-1])) or None
+
+
+def hobby_key(llm_request: LlmRequest) -> Optional[str]:
+  """Cache key for a request answering the hobby question, else None."""
+  hobby = answered_hobby(llm_request)
+  if hobby is None:
+    return None
+  return f"{request_fingerprint(llm_request)}:{hobby}"
+
+
+@dataclass
+class _Variants:
+  responses: List[LlmResponse] = field(default_factory=list)
+  stored_at: List[float] = field(default_factory=list)
+  next_index: int = 0
+
+
+class PoemCache:
+  """Bounded cache of poem variants keyed by ``hobby_key``."""
+
+  def __init__(
+      self,
+      *,
+      variants: int = DEFAULT_VARIANTS,
+      ttl_seconds: Optional[float] = None,
+      max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+  ):
+    if variants <= 0:
+      raise ValueError("variants must be a positive integer")
+    self.variants = variants
+    self.ttl_seconds = ttl_seconds
+    self.max_keys = max_keys
+    self.hits = 0
+    self.misses = 0
+    self.skipped = 0
+    self.evictions = 0
+    self.expirations = 0
+    self._lock = threading.Lock()
+    self._entries: "OrderedDict[str, _Variants]" = OrderedDict()
+    self._pending = PendingCalls()
+
+  @classmethod
+  def from_env(cls) -> Optional["PoemCache"]:
+    """Builds a cache from ``GREETING_AGENT_POEM_CACHE_*``, if enabled."""
+    variants = int(os.environ.get(POEM_CACHE_VARIANTS_ENV) or 0)
+    if variants <= 0:
+      return None
+    ttl = os.environ.get(POEM_CACHE_TTL_ENV)
+    max_keys = os.environ.get(POEM_CACHE_MAX_KEYS_ENV)
+    return cls(
+        variants=variants,
+        ttl_seconds=float(ttl) if ttl else None,
+        max_keys=int(max_keys) if max_keys else DEFAULT_MAX_KEYS,
+    )
+
+  @property
+  def hit_rate(self) -> float:
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+  def stats(self) -> Dict[str, Any]:
+    """Counters for dashboards and health endpoints."""
+    with self._lock:
+      keys = len(self._entries)
+    return {
+        "keys": keys,
+        "hits": self.hits,
+        "misses": self.misses,
+        "skipped": self.skipped,
+        "hit_rate": round(self.hit_rate, 4),
+        "evictions": self.evictions,
+        "expirations": self.expirations,
+    }
+
+  def _expire(self, entry: _Variants, now: float) -> None:
+    if self.ttl_seconds is None:
+      return
+    keep = [
+        index
+        for index, stored_at in enumerate(entry.stored_at)
+        if now - stored_at <= self.ttl_seconds
+    ]
+    if len(keep) != len(entry.stored_at):
+      self.expirations += len(entry.stored_at) - len(keep)
+      entry.responses = [entry.responses[i] for i in keep]
+      entry.stored_at = [entry.stored_at[i] for i in keep]
+
+  def get(self, key: str) -> Optional[LlmResponse]:
+    """Returns the next variant once ``key`` holds a full set, else None."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        return None
+      self._expire(entry, time.monotonic())
+      if not entry.responses:
+        del self._entries[key]
+        return None
+      self._entries.move_to_end(key)
+      if len(entry.responses) < self.variants:
+        return None
+      response = entry.responses[entry.next_index % len(entry.responses)]
+      entry.next_index += 1
+    return response.model_copy(deep=True)
+
+  def put(self, key: str, response: LlmResponse) -> None:
+    """Adds ``response`` as a variant of ``key`` unless the set is full."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is None:
+        entry = self._entries[key] = _Variants()
+      self._entries.move_to_end(key)
+      self._expire(entry, time.monotonic())
+      if len(entry.responses) < self.variants:
+        entry.responses.append(response.model_copy(deep=True))
+        entry.stored_at.append(time.monotonic())
+      while self.max_keys is not None and len(self._entries) > self.max_keys:
+        self._entries.popitem(last=False)
+        self.evictions += 1
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    """``before_model_callback`` serving a cached poem for known hobbies."""
+    key = hobby_key(llm_request)
+    if key is None:
+      self.skipped += 1
+      return None
+    cached = self.get(key)
+    if cached is not None:
+      self.hits += 1
+      return cached
+    self.misses += 1
+    self._pending.put(callback_context.invocation_id, key)
+    return None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    """``after_model_callback`` storing plain-text replies as variants."""
+    if llm_response.partial:
+      return None
+    key = self._pending.pop(callback_context.invocation_id, None)
+    content = llm_response.content
+    if not key or llm_response.error_code or content is None:
+      return None
+    parts = content.parts or []
+    # Tool calls depend on live state; only cache finished text replies.
+    if parts and all(getattr(part, "text", None) for part in parts):
+      self.put(key, llm_response)
+    return None
+
+
+class EnvPoemCache:
+  """Resolves a ``PoemCache`` from the environment on first model call.
+
+  Follows ``llm_cache.EnvResponseCache`` so ``root_agent`` can be built
+  before entry points have configured the cache.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._resolved = False
+    self._cache: Optional[PoemCache] = None
+
+  def reset(self) -> None:
+    with self._lock:
+      self._resolved = False
+      self._cache = None
+
+  def resolve(self) -> Optional[PoemCache]:
+    with self._lock:
+      if not self._resolved:
+        self._cache = PoemCache.from_env()
+        self._resolved = True
+      return self._cache
+
+  def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    cache = self.resolve()
+    return cache.before_model(callback_context, llm_request) if cache else None
+
+  def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    cache = self.resolve()
+    return cache.after_model(callback_context, llm_response) if cache else None
+
+
+env_poem_cache = EnvPoemCache()
+
+
+def configure_env(
+    variants: int,
+    *,
+    ttl_seconds: Optional[float] = None,
+    max_keys: Optional[int] = None,
+) -> None:
+  """Sets the poem cache environment variables for this process and children."""
+  os.environ[POEM_CACHE_VARIANTS_ENV] = str(variants)
+  if ttl_seconds is not None:
+    os.environ[POEM_CACHE_TTL_ENV] = str(ttl_seconds)
+  if max_keys is not None:
+    os.environ[POEM_CACHE_MAX_KEYS_ENV] = str(max_keys)
+  env_poem_cache.reset()
+
+
+__all__ = [
+    "EnvPoemCache",
+    "PoemCache",
+    "answered_hobby",
+    "configure_env",
+    "env_poem_cache",
+    "hobby_key",
+    "normalize_hobby",
+]
@@ -0,0 +1,456 @@
+"""Profiling for the cli, generate_evalset and execute_evalsets entry points.
+
+``--profile PREFIX`` on those commands runs them under a ``Profiler`` that
+collects:
+
+* stack samples of every thread every few milliseconds, written to
+  ``PREFIX.collapsed`` in the folded format ``flamegraph.pl`` and
+  speedscope read; samples parked in the event loop's selector are counted
+  as idle, i.e. waiting on the network;
+* wall time per named phase (``load``, ``session``, ``model_wait``,
+  ``extract``, ``write``, ...) marked with ``phase`` in the code;
+* per-coroutine asyncio task counts, lifetime and busy time (time spent
+  running on the event loop rather than awaiting), via a task factory;
+* with ``--profile-mode deterministic`` only, a ``cProfile`` of the main
+  thread, written to ``PREFIX.pstats`` (open with ``python -m pstats`` or
+  snakeviz). It hooks every Python call and slows CPU-bound code down
+  noticeably, so the default ``sample`` mode leaves it off.
+
+Phases and task timing go to ``PREFIX.json`` and a summary is printed to
+stderr. Only the process running the command is profiled, not evaluation
+worker processes.
+
+When no profiler is active, ``phase`` returns a shared no-op context
+manager and ``phase_iter``/``phase_aiter`` return their argument, so the
+markers cost next to nothing in normal runs.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections.abc
+import contextlib
+import contextvars
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TypeVar,
+)
+
+DEFAULT_SAMPLE_INTERVAL = 0.005
+PROFILE_MODES = ("sample", "deterministic")
+DEFAULT_PROFILE_MODE = "sample"
+_NULL_PHASE = contextlib.nullcontext()
+
+T = TypeVar("T")
+
+
+@dataclass
+class PhaseStats:
+  """Wall time of one named phase.
+
+  ``self_time`` excludes nested phases entered by the same task; phases
+  of concurrent tasks overlap, so their totals can exceed elapsed time.
+  """
+
+  calls: int = 0
+  wall: float = 0.0
+  self_time: float = 0.0
+
+
+@dataclass
+class TaskStats:
+  """asyncio tasks running one coroutine function.
+
+  ``busy`` is time spent stepping the coroutine on the event loop; the
+  rest of ``wall`` (creation to completion) was spent awaiting.
+  """
+
+  tasks: int = 0
+  wall: float = 0.0
+  busy: float = 0.0
+
+
+class _Phase:
+  __slots__ = ("_profiler", "_name", "_start", "_token", "_nested")
+
+  def __init__(self, profiler: "Profiler", name: str):
+    self._profiler = profiler
+    self._name = name
+
+  def __enter__(self) -> "_Phase":
+    self._nested = 0.0
+    self._token = _CURRENT_PHASE.set(self)
+    self._start = time.perf_counter()
+    return self
+
+  def __exit__(self, *exc_info: Any) -> None:
+    elapsed = time.perf_counter() - self._start
+    _CURRENT_PHASE.reset(self._token)
+    parent = _CURRENT_PHASE.get()
+    if parent is not None:
+      parent._nested += elapsed
+    self._profiler._add_phase(self._name, elapsed, max(0.0, elapsed - self._nested))
+
+
+_CURRENT_PHASE: contextvars.ContextVar[Optional[_Phase]] = contextvars.ContextVar(
+    "greeting_agent_profile_phase", default=None
+)
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+  """Wraps a task's coroutine to time each step on the event loop."""
+
+  __slots__ = ("_coro", "_stats")
+
+  def __init__(self, coro: Any, stats: TaskStats):
+    self._coro = coro
+    self._stats = stats
+
+  def send(self, value: Any) -> Any:
+    start = time.perf_counter()
+    try:
+      return self._coro.send(value)
+    finally:
+      self._stats.busy += time.perf_counter() - start
+
+  def throw(self, *args: Any) -> Any:
+    start = time.perf_counter()
+    try:
+      return self._coro.throw(*args)
+    finally:
+      self._stats.busy += time.perf_counter() - start
+
+  def close(self) -> None:
+    self._coro.close()
+
+  def __await__(self) -> "_TimedCoroutine":
+    return self
+
+  def __next__(self) -> Any:
+    return self.send(None)
+
+  def __getattr__(self, name: str) -> Any:
+    # cr_frame, __qualname__, ... for task reprs and stack dumps.
+    return getattr(self._coro, name)
+
+
+def _coroutine_name(coro: Any) -> str:
+  return getattr(coro, "__qualname__", None) or type(coro).__name__
+
+
+class Profiler:
+  """Collects stack samples, phases, task timing and optionally a pstats profile.
+
+  Args:
+    prefix: Output path prefix; ``.collapsed``, ``.json`` and, in
+      deterministic mode, ``.pstats`` are appended.
+    interval: Seconds between stack samples.
+    mode: ``"sample"`` or ``"deterministic"``; the latter also runs cProfile.
+  """
+
+  def __init__(
+      self,
+      prefix: str | Path,
+      *,
+      interval: float = DEFAULT_SAMPLE_INTERVAL,
+      mode: str = DEFAULT_PROFILE_MODE,
+  ):
+    if interval <= 0:
+      raise ValueError("interval must be positive")
+    if mode not in PROFILE_MODES:
+      raise ValueError(f"mode must be one of {', '.join(PROFILE_MODES)}")
+    self.prefix = Path(prefix)
+    self.interval = interval
+    self.mode = mode
+    self.phases: Dict[str, PhaseStats] = {}
+    self.tasks: Dict[str, TaskStats] = {}
+    self.stacks: collections.Counter[Tuple[str, ...]] = collections.Counter()
+    self.samples = 0
+    self.idle_samples = 0
+    self.elapsed = 0.0
+    self._lock = threading.Lock()
+    self._labels: Dict[Any, str] = {}
+    self._profile = cProfile.Profile() if mode == "deterministic" else None
+    self._stop = threading.Event()
+    self._sampler: Optional[threading.Thread] = None
+    self._main_thread = threading.main_thread().ident
+    self._started = 0.0
+
+  # -- collection -------------------------------------------------------------
+
+  def start(self) -> None:
+    self._started = time.perf_counter()
+    self._stop.clear()
+    self._sampler = threading.Thread(
+        target=self._sample_loop, name="greeting-agent-profiler", daemon=True
+    )
+    self._sampler.start()
+    if self._profile is not None:
+      self._profile.enable()
+
+  def stop(self) -> None:
+    if self._profile is not None:
+      self._profile.disable()
+    self._stop.set()
+    if self._sampler is not None:
+      self._sampler.join()
+      self._sampler = None
+    self.elapsed = time.perf_counter() - self._started
+
+  def phase(self, name: str) -> _Phase:
+    """Context manager attributing the wall time of its body to ``name``."""
+    return _Phase(self, name)
+
+  def _add_phase(self, name: str, wall: float, self_time: float) -> None:
+    with self._lock:
+      stats = self.phases.get(name)
+      if stats is None:
+        stats = self.phases[name] = PhaseStats()
+      stats.calls += 1
+      stats.wall += wall
+      stats.self_time += self_time
+
+  def task_factory(
+      self, loop: asyncio.AbstractEventLoop, coro: Any, **kwargs: Any
+  ) -> asyncio.Task:
+    """``loop.set_task_factory`` hook timing every task by coroutine name."""
+    stats = self._task_stats(coro)
+    created = time.perf_counter()
+    task = asyncio.Task(_TimedCoroutine(coro, stats), loop=loop, **kwargs)
+
+    def _done(_: asyncio.Future) -> None:
+      stats.wall += time.perf_counter() - created
+
+    task.add_done_callback(_done)
+    return task
+
+  def _task_stats(self, coro: Any) -> TaskStats:
+    name = _coroutine_name(coro)
+    stats = self.tasks.get(name)
+    if stats is None:
+      stats = self.tasks[name] = TaskStats()
+    stats.tasks += 1
+    return stats
+
+  async def _instrumented(self, coro: Awaitable[T]) -> T:
+    loop = asyncio.get_running_loop()
+    loop.set_task_factory(self.task_factory)
+    stats = self._task_stats(coro)
+    created = time.perf_counter()
+    try:
+      return await _TimedCoroutine(coro, stats)
+    finally:
+      stats.wall += time.perf_counter() - created
+      loop.set_task_factory(None)
+
+  def _frame_label(self, code: Any) -> str:
+    label = self._labels.get(code)
+    if label is None:
+      filename = code.co_filename
+      for root in sorted(sys.path, key=len, reverse=True):
+        if root and filename.startswith(root + os.sep):
+          filename = filename[len(root) + 1 :]
+          break
+      label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+      self._labels[code] = label
+    return label
+
+  def _sample_loop(self) -> None:
+    own = threading.get_ident()
+    while not self._stop.wait(self.interval):
+      names = {thread.ident: thread.name for thread in threading.enumerate()}
+      for ident, frame in sys._current_frames().items():
+        if ident == own:
+          continue
+        codes = []
+        while frame is not None:
+          codes.append(frame.f_code)
+          frame = frame.f_back
+        if not codes:
+          continue
+        if ident == self._main_thread:
+          self.samples += 1
+          leaf = codes[0]
+          if leaf.co_name == "select" and leaf.co_filename.endswith("selectors.py"):
+            self.idle_samples += 1
+        stack = (names.get(ident, f"thread-{ident}"),) + tuple(
+            self._frame_label(code) for code in reversed(codes)
+        )
+        self.stacks[stack] += 1
+
+  # -- output -----------------------------------------------------------------
+
+  def write(self) -> List[Path]:
+    """Writes the collapsed-stack, JSON and any pstats files; returns their paths."""
+    self.prefix.parent.mkdir(parents=True, exist_ok=True)
+    collapsed_path = self.prefix.with_name(self.prefix.name + ".collapsed")
+    json_path = self.prefix.with_name(self.prefix.name + ".json")
+    paths = [collapsed_path, json_path]
+    with collapsed_path.open("w", encoding="utf-8") as handle:
+      for stack, count in self.stacks.most_common():
+        handle.write(f"{';'.join(stack)} {count}\n")
+    json_path.write_text(
+        json.dumps(
+            {
+                "elapsed": round(self.elapsed, 6),
+                "mode": self.mode,
+                "sample_interval": self.interval,
+                "samples": self.samples,
+                "idle_samples": self.idle_samples,
+                "phases": {name: asdict(stats) for name, stats in self.phases.items()},
+                "tasks": {name: asdict(stats) for name, stats in self.tasks.items()},
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    if self._profile is not None:
+      pstats_path = self.prefix.with_name(self.prefix.name + ".pstats")
+      self._profile.dump_stats(str(pstats_path))
+      paths.insert(0, pstats_path)
+    return paths
+
+  def format_summary(self, top: int = 10) -> str:
+    """Phase and task tables plus the share of idle main-thread samples."""
+    lines = [f"Profile: {self.elapsed:.2f}s wall, {self.samples} main-thread samples"]
+    if self.samples:
+      lines[0] += f" ({self.idle_samples / self.samples:.0%} idle in the event loop)"
+    if self.phases:
+      lines.append(f"{'Phase':<24} {'calls':>7} {'wall s':>9} {'self s':>9} {'% wall':>7}")
+      for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].wall):
+        share = stats.wall / self.elapsed if self.elapsed else 0.0
+        lines.append(
+            f"{name:<24} {stats.calls:>7} {stats.wall:>9.3f} {stats.self_time:>9.3f}"
+            f" {share:>7.1%}"
+        )
+    if self.tasks:
+      lines.append(f"{'Task coroutine':<40} {'tasks':>7} {'wall s':>9} {'busy s':>9}")
+      ranked = sorted(self.tasks.items(), key=lambda item: -item[1].busy)[:top]
+      for name, stats in ranked:
+        lines.append(f"{name[-40:]:<40} {stats.tasks:>7} {stats.wall:>9.3f} {stats.busy:>9.3f}")
+    return "\n".join(lines)
+
+
+_active: Optional[Profiler] = None
+
+
+def active_profiler() -> Optional[Profiler]:
+  return _active
+
+
+def phase(name: str) -> contextlib.AbstractContextManager:
+  """Marks a named phase on the active profiler; no-op when none is."""
+  profiler = _active
+  return profiler.phase(name) if profiler is not None else _NULL_PHASE
+
+
+def phase_iter(items: Iterable[T], name: str) -> Iterable[T]:
+  """Attributes the time spent producing each item of ``items`` to ``name``."""
+  if _active is None:
+    return items
+  return _phase_iter(items, name)
+
+
+def _phase_iter(items: Iterable[T], name: str) -> Iterator[T]:
+  iterator = iter(items)
+  while True:
+    with phase(name):
+      try:
+        item = next(iterator)
+      except StopIteration:
+        return
+    yield item
+
+
+def phase_aiter(items: AsyncIterable[T], name: str) -> AsyncIterable[T]:
+  """Async ``phase_iter``: e.g. time waiting on ``Runner.run_async`` events."""
+  if _active is None:
+    return items
+  return _phase_aiter(items, name)
+
+
+async def _phase_aiter(items: AsyncIterable[T], name: str) -> AsyncIterator[T]:
+  iterator = items.__aiter__()
+  while True:
+    with phase(name):
+      try:
+        item = await iterator.__anext__()
+      except StopAsyncIteration:
+        return
+    yield item
+
+
+def run(coro: Awaitable[T]) -> T:
+  """``asyncio.run`` that times the loop's tasks when a profiler is active."""
+  profiler = _active
+  if profiler is None:
+    return asyncio.run(coro)
+  return asyncio.run(profiler._instrumented(coro))
+
+
+@contextlib.contextmanager
+def profile(
+    prefix: Optional[str | Path],
+    *,
+    interval: float = DEFAULT_SAMPLE_INTERVAL,
+    mode: str = DEFAULT_PROFILE_MODE,
+    out: Optional[TextIO] = None,
+) -> Iterator[Optional[Profiler]]:
+  """Profiles the ``with`` body when ``prefix`` is set, then writes the files.
+
+  Yields the active ``Profiler``, or ``None`` when ``prefix`` is empty. The
+  summary goes to ``out``, by default the current ``sys.stderr``.
+  """
+  global _active
+  if not prefix:
+    yield None
+    return
+  if _active is not None:
+    raise RuntimeError("a profiler is already active")
+  profiler = Profiler(prefix, interval=interval, mode=mode)
+  _active = profiler
+  profiler.start()
+  try:
+    yield profiler
+  finally:
+    profiler.stop()
+    _active = None
+    paths = profiler.write()
+    out = out or sys.stderr
+    out.write(profiler.format_summary() + "\n")
+    out.write(f"Profile written to {', '.join(str(path) for path in paths)}\n")
+
+
+__all__ = [
+    "DEFAULT_PROFILE_MODE",
+    "DEFAULT_SAMPLE_INTERVAL",
+    "PROFILE_MODES",
+    "PhaseStats",
+    "Profiler",
+    "TaskStats",
+    "active_profiler",
+    "phase",
+    "phase_aiter",
+    "phase_iter",
+    "profile",
+    "run",
+]
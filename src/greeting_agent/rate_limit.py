@@ -0,0 +1,484 @@
+"""Token-bucket rate limiter shared by every process on the machine.
+
+``generate_evalset`` workers, ``execute_evalsets`` worker processes and the
+console or server all draw from the same per-model request (RPM) and token
+(TPM) buckets, kept in a small JSON state file guarded by ``fcntl.flock``.
+The limiter plugs into ``LlmAgent`` as an async before/after model callback
+pair: it waits for capacity before each model call and reconciles the token
+estimate with the reported usage afterwards.
+
+Two priority lanes share the buckets: while an ``interactive`` caller (the
+console or server) is waiting, ``batch`` callers (``generate_evalset``,
+``execute_evalsets``, ``cli batch``) hold back. A quota error reported
+through ``report_quota_error`` pauses the model for every process.
+
+The state file is locked, read and rewritten in a worker thread so waiting
+on another process never blocks the event loop; polls that change nothing
+leave the file alone. By default each budget spec gets its own state file
+in the temp dir, so unrelated budgets never share buckets.
+
+On platforms without ``fcntl`` the state file is only shared by threads of
+one process.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from .context_window import content_tokens, estimate_tokens
+from .llm_cache import PendingCalls
+
+try:
+  import fcntl
+except ImportError:  # pragma: no cover - Windows
+  fcntl = None  # type: ignore
+
+RATE_LIMITS_ENV = "GREETING_AGENT_RATE_LIMITS"
+RATE_LIMIT_FILE_ENV = "GREETING_AGENT_RATE_LIMIT_FILE"
+RATE_LIMIT_LANE_ENV = "GREETING_AGENT_RATE_LIMIT_LANE"
+LANES = ("interactive", "batch")
+DEFAULT_OUTPUT_TOKENS = 256
+QUOTA_STATUS_CODES = {429}
+# Waiters that have not polled for this long belong to dead processes.
+_STALE_WAITER_SECONDS = 120.0
+# Waiters refresh their timestamp this often, not on every poll.
+_WAITER_REFRESH_SECONDS = 30.0
+_POLL_SECONDS = 0.05
+_MAX_SLEEP_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class ModelBudget:
+  """Requests and tokens a model may use per minute (``None`` = unlimited)."""
+
+  rpm: Optional[float] = None
+  tpm: Optional[float] = None
+
+
+def parse_budgets(spec: str) -> Dict[str, ModelBudget]:
+  """Parses ``MODEL=RPM[:TPM]`` entries separated by commas.
+
+  ``*`` sets the budget for models without their own entry, e.g.
+  ``gemini-2.0-flash=15:1000000,*=60``.
+  """
+  budgets: Dict[str, ModelBudget] = {}
+  for entry in filter(None, (item.strip() for item in spec.split(","))):
+    model, sep, limits = entry.partition("=")
+    if not sep or not model.strip():
+      raise ValueError(f"Invalid rate limit {entry!r}; expected MODEL=RPM[:TPM]")
+    rpm, _, tpm = limits.partition(":")
+    budgets[model.strip()] = ModelBudget(
+        rpm=float(rpm) if rpm else None, tpm=float(tpm) if tpm else None
+    )
+  return budgets
+
+
+def default_state_file(budgets: Dict[str, ModelBudget]) -> Path:
+  """State file in the temp dir shared by processes with the same budgets."""
+  spec = json.dumps(
+      {model: [budget.rpm, budget.tpm] for model, budget in budgets.items()},
+      sort_keys=True,
+  )
+  digest = hashlib.sha256(spec.encode("utf-8")).hexdigest()[:12]
+  return Path(tempfile.gettempdir()) / f"greeting_agent_rate_limit_{digest}.json"
+
+
+def is_quota_error(exc: BaseException) -> bool:
+  """True for Gemini quota/rate-limit errors (HTTP 429, RESOURCE_EXHAUSTED)."""
+  code = getattr(exc, "code", None) or getattr(exc, "status_code", None)
+  return code in QUOTA_STATUS_CODES or "RESOURCE_EXHAUSTED" in str(exc)
+
+
+def jittered_backoff(attempt: int, base: float, *, cap: float = 60.0) -> float:
+  """Exponential backoff with "equal jitter": half fixed, half random."""
+  delay = min(cap, base * (2 ** attempt))
+  return delay / 2 + random.uniform(0, delay / 2)
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+  """Prompt plus expected output tokens of a request (4 chars per token)."""
+  config = llm_request.config
+  instruction = getattr(config, "system_instruction", None) if config else None
+  tokens = sum(content_tokens(content) for content in llm_request.contents or [])
+  if isinstance(instruction, str):
+    tokens += estimate_tokens(instruction)
+  elif instruction is not None:
+    tokens += content_tokens(instruction)
+  max_output = getattr(config, "max_output_tokens", None) if config else None
+  return tokens + (max_output or DEFAULT_OUTPUT_TOKENS)
+
+
+class RateLimiter:
+  """Cross-process token buckets with priority lanes.
+
+  Args:
+    budgets: Per-model budgets; ``*`` applies to unlisted models. Models
+      without a budget are not limited.
+    state_path: JSON file holding the shared buckets (default:
+      ``default_state_file(budgets)``).
+    lane: Default lane of this process (``interactive`` or ``batch``).
+    quota_cooldown: Seconds a model pauses after ``report_quota_error``
+      when the error carries no retry hint.
+  """
+
+  def __init__(
+      self,
+      budgets: Dict[str, ModelBudget],
+      *,
+      state_path: Optional[str | Path] = None,
+      lane: str = "interactive",
+      quota_cooldown: float = 10.0,
+  ):
+    if lane not in LANES:
+      raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+    self.budgets = dict(budgets)
+    self.state_path = Path(state_path or default_state_file(self.budgets)).expanduser()
+    self.lane = lane
+    self.quota_cooldown = quota_cooldown
+    self.acquired = 0
+    self.waited = 0
+    self.wait_seconds = 0.0
+    self.max_wait_seconds = 0.0
+    self.quota_errors = 0
+    # Deepest queue per lane this limiter saw while waiting.
+    self.peak_waiting: Dict[str, int] = {}
+    self._tickets: Iterator[int] = itertools.count()
+    self._thread_lock = threading.Lock()
+    self._pending = PendingCalls()
+    self.state_path.parent.mkdir(parents=True, exist_ok=True)
+
+  @classmethod
+  def from_env(cls) -> Optional["RateLimiter"]:
+    """Builds a limiter from ``GREETING_AGENT_RATE_LIMIT*``, if configured."""
+    spec = os.environ.get(RATE_LIMITS_ENV, "").strip()
+    if not spec:
+      return None
+    return cls(
+        parse_budgets(spec),
+        state_path=os.environ.get(RATE_LIMIT_FILE_ENV) or None,
+        lane=os.environ.get(RATE_LIMIT_LANE_ENV) or "interactive",
+    )
+
+  def budget_for(self, model: str) -> Optional[ModelBudget]:
+    return self.budgets.get(model) or self.budgets.get("*")
+
+  # -- shared state ---------------------------------------------------------
+
+  def _update_state(self, update) -> Any:  # noqa: ANN001
+    """Runs ``update(state, now)`` under the cross-process lock.
+
+    The file is only rewritten when ``update`` changed the state. Blocks on
+    the lock; the polling paths go through ``_update_state_async``.
+    """
+    with self._thread_lock, self.state_path.open("a+", encoding="utf-8") as handle:
+      if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+      try:
+        handle.seek(0)
+        raw = handle.read()
+        try:
+          state = json.loads(raw) if raw.strip() else {}
+        except ValueError:
+          state = {}  # torn by a crash mid-write; start over
+        result = update(state, time.time())
+        saved = json.dumps(state)
+        if saved != raw:
+          handle.seek(0)
+          handle.truncate()
+          handle.write(saved)
+          handle.flush()
+        return result
+      finally:
+        if fcntl is not None:
+          fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+  async def _update_state_async(self, update) -> Any:  # noqa: ANN001
+    return await asyncio.to_thread(self._update_state, update)
+
+  @staticmethod
+  def _levels(
+      bucket: Optional[Dict[str, Any]], budget: ModelBudget, now: float
+  ) -> Tuple[float, float]:
+    """Requests and tokens available now, without touching the bucket."""
+    if bucket is None:
+      return budget.rpm or 0.0, budget.tpm or 0.0
+    elapsed = max(0.0, now - bucket["updated"])
+    requests, tokens = bucket["requests"], bucket["tokens"]
+    if budget.rpm:
+      requests = min(budget.rpm, requests + elapsed * budget.rpm / 60)
+    if budget.tpm:
+      tokens = min(budget.tpm, tokens + elapsed * budget.tpm / 60)
+    return requests, tokens
+
+  @staticmethod
+  def _bucket(state: Dict[str, Any], model: str, budget: ModelBudget, now: float):
+    buckets = state.setdefault("buckets", {})
+    bucket = buckets.get(model)
+    if bucket is None:
+      bucket = buckets[model] = {
+          "requests": budget.rpm or 0.0,
+          "tokens": budget.tpm or 0.0,
+          "updated": now,
+          "blocked_until": 0.0,
+      }
+    bucket["requests"], bucket["tokens"] = RateLimiter._levels(bucket, budget, now)
+    bucket["updated"] = now
+    return bucket
+
+  async def _try_acquire(
+      self, model: str, tokens: int, lane: str, ticket: str
+  ) -> float:
+    """Takes capacity and returns 0, or registers a waiter and returns a delay."""
+    budget = self.budget_for(model)
+
+    def update(state: Dict[str, Any], now: float) -> Tuple[float, int]:
+      waiters = state.get("waiters", {})
+      for key in [k for k, w in waiters.items() if now - w["seen"] > _STALE_WAITER_SECONDS]:
+        waiters.pop(key)
+      bucket = state.get("buckets", {}).get(model)
+      requests, available = self._levels(bucket, budget, now)
+      blocked_until = bucket["blocked_until"] if bucket else 0.0
+      wait = 0.0
+      if blocked_until > now:
+        wait = blocked_until - now
+      elif lane == "batch" and any(
+          w["lane"] == "interactive" and w["model"] == model
+          for key, w in waiters.items()
+          if key != ticket
+      ):
+        wait = _POLL_SECONDS
+      else:
+        need_tokens = min(tokens, budget.tpm) if budget.tpm else 0
+        if budget.rpm and requests < 1:
+          wait = (1 - requests) * 60 / budget.rpm
+        if budget.tpm and available < need_tokens:
+          wait = max(wait, (need_tokens - available) * 60 / budget.tpm)
+        if wait <= 0:
+          bucket = self._bucket(state, model, budget, now)
+          if budget.rpm:
+            bucket["requests"] -= 1
+          if budget.tpm:
+            bucket["tokens"] -= tokens
+          waiters.pop(ticket, None)
+          return 0.0, 0
+      # Re-registering on every poll would rewrite the file each time.
+      waiter = waiters.get(ticket)
+      if waiter is None or now - waiter["seen"] > _WAITER_REFRESH_SECONDS:
+        state.setdefault("waiters", waiters)[ticket] = {
+            "lane": lane,
+            "model": model,
+            "seen": now,
+        }
+      return wait, sum(1 for w in waiters.values() if w["lane"] == lane)
+
+    delay, depth = await self._update_state_async(update)
+    if depth > self.peak_waiting.get(lane, 0):
+      self.peak_waiting[lane] = depth
+    return delay
+
+  def _drop_waiter(self, ticket: str) -> None:
+    def update(state: Dict[str, Any], now: float) -> None:
+      state.setdefault("waiters", {}).pop(ticket, None)
+
+    self._update_state(update)
+
+  async def acquire(self, model: str, tokens: int = 0, *, lane: Optional[str] = None) -> float:
+    """Waits until ``model`` has room for one request of ``tokens`` tokens.
+
+    Returns:
+      Seconds spent waiting.
+    """
+    if self.budget_for(model) is None:
+      return 0.0
+    lane = lane or self.lane
+    ticket = f"{os.getpid()}:{next(self._tickets)}"
+    started = time.monotonic()
+    queued = False
+    try:
+      while True:
+        delay = await self._try_acquire(model, tokens, lane, ticket)
+        if delay <= 0:
+          break
+        queued = True
+        # Jitter keeps waiting processes from polling in lockstep.
+        await asyncio.sleep(min(delay, _MAX_SLEEP_SECONDS) * random.uniform(1.0, 1.2))
+    except BaseException:
+      if queued:
+        # Synchronous on purpose: a cancelled caller may not await again.
+        self._drop_waiter(ticket)
+      raise
+    waited = time.monotonic() - started
+    self.acquired += 1
+    if queued:
+      self.waited += 1
+      self.wait_seconds += waited
+      self.max_wait_seconds = max(self.max_wait_seconds, waited)
+    return waited
+
+  async def adjust_tokens(self, model: str, delta: int) -> None:
+    """Charges (or refunds, if negative) ``delta`` tokens to ``model``."""
+    budget = self.budget_for(model)
+    if budget is None or not budget.tpm or not delta:
+      return
+
+    def update(state: Dict[str, Any], now: float) -> None:
+      bucket = self._bucket(state, model, budget, now)
+      bucket["tokens"] = min(budget.tpm, bucket["tokens"] - delta)
+
+    await self._update_state_async(update)
+
+  async def report_quota_error(
+      self, model: str, retry_after: Optional[float] = None
+  ) -> None:
+    """Pauses ``model`` for every process after a 429 from the API."""
+    self.quota_errors += 1
+    budget = self.budget_for(model)
+    if budget is None:
+      return
+    pause = self.quota_cooldown if retry_after is None else retry_after
+
+    def update(state: Dict[str, Any], now: float) -> None:
+      bucket = self._bucket(state, model, budget, now)
+      bucket["blocked_until"] = max(bucket["blocked_until"], now + pause)
+      bucket["requests"] = min(bucket["requests"], 0.0)
+
+    await self._update_state_async(update)
+
+  def queue_depth(self) -> Dict[str, int]:
+    """Callers currently waiting per lane, across processes."""
+
+    def update(state: Dict[str, Any], now: float) -> Dict[str, int]:
+      waiters = state.get("waiters", {}).values()
+      return {lane: sum(1 for w in waiters if w["lane"] == lane) for lane in LANES}
+
+    return self._update_state(update)
+
+  def stats(self) -> Dict[str, Any]:
+    """This process's counters, the shared queue depth and its observed peaks."""
+    return {
+        "lane": self.lane,
+        "acquired": self.acquired,
+        "waited": self.waited,
+        "wait_seconds": round(self.wait_seconds, 3),
+        "max_wait_seconds": round(self.max_wait_seconds, 3),
+        "quota_errors": self.quota_errors,
+        "queue_depth": self.queue_depth(),
+        "peak_queue_depth": dict(self.peak_waiting),
+    }
+
+  # -- agent callbacks ------------------------------------------------------
+
+  async def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    """``before_model_callback`` waiting for rate-limit capacity."""
+    model = llm_request.model or ""
+    tokens = estimate_request_tokens(llm_request)
+    await self.acquire(model, tokens)
+    self._pending.put(callback_context.invocation_id, (model, tokens))
+    return None
+
+  async def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    """``after_model_callback`` replacing the estimate with reported usage.
+
+    Quota errors raise out of the model call instead of reaching this
+    callback; the entry points' retry loops call ``report_quota_error``.
+    """
+    if llm_response.partial:
+      return None
+    model, estimate = self._pending.pop(callback_context.invocation_id, ("", 0))
+    usage = llm_response.usage_metadata
+    if model and usage is not None and usage.total_token_count:
+      await self.adjust_tokens(model, usage.total_token_count - estimate)
+    return None
+
+
+class EnvRateLimiter:
+  """Resolves a ``RateLimiter`` from the environment on first model call.
+
+  Follows ``llm_cache.EnvResponseCache``: ``root_agent`` may be built before
+  entry points parse their flags, and evaluator worker processes only
+  inherit environment variables.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._resolved = False
+    self._limiter: Optional[RateLimiter] = None
+
+  def reset(self) -> None:
+    with self._lock:
+      self._resolved = False
+      self._limiter = None
+
+  def resolve(self) -> Optional[RateLimiter]:
+    with self._lock:
+      if not self._resolved:
+        self._limiter = RateLimiter.from_env()
+        self._resolved = True
+      return self._limiter
+
+  async def before_model(
+      self, callback_context: CallbackContext, llm_request: LlmRequest
+  ) -> Optional[LlmResponse]:
+    limiter = self.resolve()
+    if limiter is None:
+      return None
+    return await limiter.before_model(callback_context, llm_request)
+
+  async def after_model(
+      self, callback_context: CallbackContext, llm_response: LlmResponse
+  ) -> Optional[LlmResponse]:
+    limiter = self.resolve()
+    if limiter is None:
+      return None
+    return await limiter.after_model(callback_context, llm_response)
+
+
+env_rate_limiter = EnvRateLimiter()
+
+
+def configure_env(
+    spec: str, *, state_path: Optional[str | Path] = None, lane: str = "interactive"
+) -> None:
+  """Sets the rate limit environment variables for this process and children."""
+  parse_budgets(spec)  # fail fast on typos
+  if lane not in LANES:
+    raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+  os.environ[RATE_LIMITS_ENV] = spec
+  os.environ[RATE_LIMIT_LANE_ENV] = lane
+  if state_path is not None:
+    os.environ[RATE_LIMIT_FILE_ENV] = str(state_path)
+  env_rate_limiter.reset()
+
+
+__all__ = [
+    "EnvRateLimiter",
+    "LANES",
+    "ModelBudget",
+    "RateLimiter",
+    "configure_env",
+    "default_state_file",
+    "env_rate_limiter",
+    "estimate_request_tokens",
+    "is_quota_error",
+    "jittered_backoff",
+    "parse_budgets",
+]
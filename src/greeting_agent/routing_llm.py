@@ -0,0 +1,319 @@
+"""Latency-aware routing, hedging and fallback across several models.
+
+``RoutingLlm`` is a ``BaseLlm`` that picks a model per request from routes
+keyed by turn type: by default ``poem`` for the turn answering the agent's
+hobby question and ``question`` for everything else (greetings, follow-ups). Within a
+route the configured order is the preference; models are demoted while they
+cool down after an error, fail more often than ``max_error_rate`` or answer
+slower than ``latency_slo`` (exponentially weighted averages).
+
+A request that has produced nothing after ``hedge_after`` seconds is raced
+against the next candidate and the first model to respond wins. A model that
+fails before responding falls through to the next candidate.
+
+Entry points enable routing with ``--route``: ``default`` for
+``DEFAULT_ROUTES`` or ``TURN=MODEL[:MODEL...],...`` such as
+``question=gemini-2.0-flash-lite,poem=gemini-2.5-flash:gemini-2.0-flash``.
+They pass it on through ``GREETING_AGENT_ROUTES`` (and
+``GREETING_AGENT_HEDGE_AFTER``), which the lazily built ``root_agent`` reads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple, Union
+
+from google.adk.models import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import Field
+from pydantic import PrivateAttr
+
+from .poem_cache import answered_hobby
+
+ROUTES_ENV = "GREETING_AGENT_ROUTES"
+HEDGE_AFTER_ENV = "GREETING_AGENT_HEDGE_AFTER"
+ROUTING_MODEL_NAME = "routing"
+DEFAULT_ROUTES: Dict[str, List[str]] = {
+    "question": ["gemini-2.0-flash-lite", "gemini-2.0-flash"],
+    "poem": ["gemini-2.5-flash", "gemini-2.0-flash"],
+}
+
+TurnClassifier = Callable[[LlmRequest], str]
+
+
+def parse_routes(spec: str) -> Dict[str, List[str]]:
+  """Parses ``TURN=MODEL[:MODEL...]`` entries separated by commas.
+
+  Models of a route are listed most preferred first; ``default`` on its own
+  selects ``DEFAULT_ROUTES``.
+  """
+  if spec.strip().lower() == "default":
+    return {turn: list(models) for turn, models in DEFAULT_ROUTES.items()}
+  routes: Dict[str, List[str]] = {}
+  for entry in filter(None, (item.strip() for item in spec.split(","))):
+    turn, sep, models = entry.partition("=")
+    names = [name.strip() for name in models.split(":") if name.strip()]
+    if not sep or not turn.strip() or not names:
+      raise ValueError(f"Invalid route {entry!r}; expected TURN=MODEL[:MODEL...]")
+    routes[turn.strip()] = names
+  if not routes:
+    raise ValueError("No routes given; expected 'default' or TURN=MODEL[:MODEL...]")
+  return routes
+
+
+def classify_turn(llm_request: LlmRequest) -> str:
+  """``poem`` when the latest message answers the hobby question, else ``question``."""
+  return "poem" if answered_hobby(llm_request) else "question"
+
+
+@dataclass
+class ModelStats:
+  """Exponentially weighted health of one model."""
+
+  calls: int = 0
+  errors: int = 0
+  latency: Optional[float] = None
+  error_rate: float = 0.0
+  cooldown_until: float = 0.0
+
+  def observe(self, *, latency: Optional[float], failed: bool, alpha: float) -> None:
+    self.calls += 1
+    self.errors += int(failed)
+    self.error_rate += alpha * (float(failed) - self.error_rate)
+    if latency is not None:
+      self.latency = (
+          latency if self.latency is None else self.latency + alpha * (latency - self.latency)
+      )
+
+
+class RoutingLlm(BaseLlm):
+  """Routes each request to the healthiest configured model for its turn.
+
+  Attributes:
+    routes: Turn type to candidate models, most preferred first. Entries are
+      model names (resolved through ADK's ``LLMRegistry``) or ``BaseLlm``
+      instances. ``default`` is used for turn types without a route.
+    classifier: Maps a request to a turn type (default ``classify_turn``).
+    hedge_after: Seconds without a response before racing the next
+      candidate; ``None`` disables hedging.
+    latency_slo: Models whose average latency exceeds this are demoted.
+    max_error_rate: Models failing more often than this are demoted.
+    cooldown: Seconds a model is demoted after an error.
+    alpha: Weight of the newest sample in the moving averages.
+  """
+
+  model: str = ROUTING_MODEL_NAME
+  routes: Dict[str, List[Union[str, BaseLlm]]] = Field(
+      default_factory=lambda: {k: list(v) for k, v in DEFAULT_ROUTES.items()}
+  )
+  classifier: Optional[TurnClassifier] = None
+  hedge_after: Optional[float] = 2.0
+  latency_slo: Optional[float] = None
+  max_error_rate: float = 0.5
+  cooldown: float = 30.0
+  alpha: float = 0.3
+
+  _llms: Dict[str, BaseLlm] = PrivateAttr(default_factory=dict)
+  _stats: Dict[str, ModelStats] = PrivateAttr(default_factory=dict)
+  _hedges: int = PrivateAttr(default=0)
+  _fallbacks: int = PrivateAttr(default=0)
+
+  @classmethod
+  def supported_models(cls) -> list[str]:
+    return [ROUTING_MODEL_NAME]
+
+  @classmethod
+  def from_env(cls) -> Optional["RoutingLlm"]:
+    """Builds a router from ``GREETING_AGENT_ROUTES``, if configured.
+
+    ``GREETING_AGENT_HEDGE_AFTER`` overrides ``hedge_after``; ``0`` turns
+    hedging off.
+    """
+    spec = os.environ.get(ROUTES_ENV, "").strip()
+    if not spec:
+      return None
+    router = cls(routes=parse_routes(spec))
+    hedge_after = os.environ.get(HEDGE_AFTER_ENV, "").strip()
+    if hedge_after:
+      router.hedge_after = float(hedge_after) or None
+    return router
+
+  def _resolve(self, candidate: Union[str, BaseLlm]) -> Tuple[str, BaseLlm]:
+    if isinstance(candidate, BaseLlm):
+      return candidate.model, candidate
+    llm = self._llms.get(candidate)
+    if llm is None:
+      llm = self._llms[candidate] = LLMRegistry.new_llm(candidate)
+    return candidate, llm
+
+  def _stats_for(self, name: str) -> ModelStats:
+    return self._stats.setdefault(name, ModelStats())
+
+  def candidates(self, llm_request: LlmRequest) -> List[Tuple[str, BaseLlm]]:
+    """Candidate models for ``llm_request``, best first."""
+    turn = (self.classifier or classify_turn)(llm_request)
+    configured = self.routes.get(turn) or self.routes.get("default")
+    if not configured:
+      configured = [c for route in self.routes.values() for c in route]
+    now = time.monotonic()
+    ranked = []
+    for index, candidate in enumerate(configured):
+      name, llm = self._resolve(candidate)
+      stats = self._stats_for(name)
+      demoted = (
+          stats.cooldown_until > now,
+          stats.error_rate > self.max_error_rate,
+          self.latency_slo is not None
+          and stats.latency is not None
+          and stats.latency > self.latency_slo,
+      )
+      ranked.append((demoted, index, name, llm))
+    ranked.sort(key=lambda item: (item[0], item[1]))
+    return [(name, llm) for _, _, name, llm in ranked]
+
+  def stats(self) -> Dict[str, Any]:
+    """Per-model health plus hedge and fallback counts."""
+    return {
+        "hedges": self._hedges,
+        "fallbacks": self._fallbacks,
+        "models": {
+            name: {
+                "calls": stats.calls,
+                "errors": stats.errors,
+                "latency": stats.latency,
+                "error_rate": round(stats.error_rate, 4),
+            }
+            for name, stats in self._stats.items()
+        },
+    }
+
+  def _record(self, name: str, started: float, error: Optional[BaseException]) -> None:
+    stats = self._stats_for(name)
+    now = time.monotonic()
+    stats.observe(
+        latency=None if error else now - started,
+        failed=error is not None,
+        alpha=self.alpha,
+    )
+    if error is not None:
+      stats.cooldown_until = now + self.cooldown
+
+  def _record_censored(self, name: str, started: float) -> None:
+    """Records a hedged loser, cancelled before it answered.
+
+    Its true latency is unknown but at least the time it ran, so the sample
+    never improves the model's average.
+    """
+    stats = self._stats_for(name)
+    elapsed = time.monotonic() - started
+    stats.observe(
+        latency=max(elapsed, stats.latency or 0.0), failed=False, alpha=self.alpha
+    )
+
+  @staticmethod
+  def _start(
+      llm: BaseLlm, llm_request: LlmRequest, stream: bool
+  ) -> Tuple[AsyncGenerator[LlmResponse, None], "asyncio.Task[LlmResponse]", float]:
+    # Hedged calls run concurrently and models may edit their request.
+    request = llm_request.model_copy(update={"model": llm.model}, deep=True)
+    responses = llm.generate_content_async(request, stream=stream)
+    first = asyncio.ensure_future(responses.__anext__())
+    return responses, first, time.monotonic()
+
+  async def generate_content_async(
+      self, llm_request: LlmRequest, stream: bool = False
+  ) -> AsyncGenerator[LlmResponse, None]:
+    queue = self.candidates(llm_request)
+    # name -> (generator, first-response task, start time)
+    running: Dict[str, Tuple[AsyncGenerator[LlmResponse, None], asyncio.Task, float]] = {}
+    last_error: Optional[BaseException] = None
+    winner: Optional[str] = None
+    first_response: Optional[LlmResponse] = None
+    try:
+      while winner is None:
+        if not running:
+          if not queue:
+            break
+          if last_error is not None:
+            self._fallbacks += 1
+          name, llm = queue.pop(0)
+          running[name] = self._start(llm, llm_request, stream)
+        timeout = self.hedge_after if queue and len(running) == 1 else None
+        done, _ = await asyncio.wait(
+            [task for _, task, _ in running.values()],
+            timeout=timeout,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        if not done:
+          # Primary is slow: race the next candidate.
+          self._hedges += 1
+          name, llm = queue.pop(0)
+          running[name] = self._start(llm, llm_request, stream)
+          continue
+        for name, (responses, task, started) in list(running.items()):
+          if task not in done:
+            continue
+          error = task.exception()
+          if isinstance(error, StopAsyncIteration):
+            error = RuntimeError(f"{name} returned no response")
+          self._record(name, started, error)
+          if error is None and winner is None:
+            winner = name
+            first_response = task.result()
+          elif error is not None:
+            last_error = error
+            running.pop(name)
+            await responses.aclose()
+    finally:
+      losers = {name: entry for name, entry in running.items() if name != winner}
+      for name, (_, task, started) in losers.items():
+        if winner is not None and not task.done():
+          self._record_censored(name, started)
+        task.cancel()
+      try:
+        if losers:
+          # wait() never raises the losers' errors, only our own cancellation.
+          await asyncio.wait([task for _, task, _ in losers.values()])
+      finally:
+        for responses, task, _ in losers.values():
+          if not task.done():
+            continue  # Still unwinding; we were cancelled while waiting.
+          if not task.cancelled():
+            task.exception()  # Retrieved so asyncio does not log it.
+          await responses.aclose()
+
+    if winner is None:
+      if last_error is not None:
+        raise last_error
+      raise RuntimeError("RoutingLlm has no candidate models configured")
+
+    responses = running[winner][0]
+    yield first_response
+    async for response in responses:
+      yield response
+
+
+def configure_env(spec: str, *, hedge_after: Optional[float] = None) -> None:
+  """Sets the routing environment variables for this process and children."""
+  parse_routes(spec)  # fail fast on typos
+  os.environ[ROUTES_ENV] = spec
+  if hedge_after is not None:
+    os.environ[HEDGE_AFTER_ENV] = str(hedge_after)
+
+
+__all__ = [
+    "DEFAULT_ROUTES",
+    "HEDGE_AFTER_ENV",
+    "ModelStats",
+    "ROUTES_ENV",
+    "ROUTING_MODEL_NAME",
+    "RoutingLlm",
+    "classify_turn",
+    "configure_env",
+    "parse_routes",
+]
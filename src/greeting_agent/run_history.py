@@ -0,0 +1,645 @@
+"""Persistent history of evalset runs with regression reports.
+
+``execute_evalsets --history`` appends every run to a local SQLite file:
+the agent module, fingerprint, config and model, each evalset's content
+hash and verdict, per-case verdicts and metric scores, and per-turn
+latency, token usage and estimated cost from the instrumentation
+callbacks. Tables are indexed on the columns reports filter by.
+
+``report`` compares a run against the previous runs of the same agent
+module, repeat mode and evalset contents (the rolling baseline) and flags
+regressions that are both statistically significant and larger than a
+minimum relative change:
+
+  latency, cost  one-sided Mann-Whitney U test on per-turn samples.
+  pass rate      one-sided two-proportion z-test on evalset verdicts,
+                 leaving out verdicts reused by ``--changed-only``.
+  metric scores  one-sided Mann-Whitney U test on per-case scores of
+                 each metric, e.g. ``response_match_score``.
+
+Usage:
+  python -m greeting_agent.run_history report --db .eval_history.sqlite
+  python -m greeting_agent.run_history list
+  python -m greeting_agent.run_history scores path/to/file.evalset.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import math
+import sqlite3
+import statistics
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_HISTORY_DB = ".eval_history.sqlite"
+DEFAULT_BASELINE_RUNS = 10
+DEFAULT_ALPHA = 0.05
+DEFAULT_MIN_CHANGE = 0.1
+# USD per million (input, output) tokens, from the "Pricing" table of
+# GEMINI_MODELS.md.
+DEFAULT_MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-pro": (10.00, 30.00),
+    "gemini-2.5-flash": (3.50, 10.50),
+    "gemini-2.0-flash": (3.50, 10.50),
+    "gemini-2.0-flash-lite": (0.70, 2.10),
+    "gemini-1.5-flash": (2.50, 7.50),
+    "gemini-1.5-flash-8b": (0.35, 1.05),
+    "gemini-1.5-pro": (7.00, 21.00),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY,
+  started_at REAL NOT NULL,
+  finished_at REAL NOT NULL,
+  agent_module TEXT NOT NULL,
+  agent_fingerprint TEXT,
+  agent_config TEXT,
+  model TEXT,
+  mode TEXT,
+  exit_code INTEGER
+);
+CREATE TABLE IF NOT EXISTS evalset_results (
+  run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+  evalset TEXT NOT NULL,
+  evalset_hash TEXT NOT NULL,
+  passed INTEGER NOT NULL,
+  details TEXT,
+  runs INTEGER,
+  reused INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (run_id, evalset)
+);
+CREATE TABLE IF NOT EXISTS case_results (
+  run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+  evalset TEXT NOT NULL,
+  case_id TEXT NOT NULL,
+  passed INTEGER NOT NULL,
+  runs INTEGER,
+  passes INTEGER,
+  PRIMARY KEY (run_id, evalset, case_id)
+);
+CREATE TABLE IF NOT EXISTS case_scores (
+  run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+  evalset TEXT NOT NULL,
+  case_id TEXT NOT NULL,
+  metric TEXT NOT NULL,
+  score REAL,
+  threshold REAL,
+  PRIMARY KEY (run_id, evalset, case_id, metric)
+);
+CREATE TABLE IF NOT EXISTS turns (
+  run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+  total_latency REAL,
+  model_latency REAL,
+  prompt_tokens INTEGER,
+  response_tokens INTEGER,
+  cost REAL
+);
+CREATE INDEX IF NOT EXISTS runs_by_agent ON runs(agent_module, started_at);
+CREATE INDEX IF NOT EXISTS runs_by_model ON runs(model, started_at);
+CREATE INDEX IF NOT EXISTS evalset_results_by_evalset ON evalset_results(evalset, run_id);
+CREATE INDEX IF NOT EXISTS evalset_results_by_hash ON evalset_results(evalset_hash);
+CREATE INDEX IF NOT EXISTS case_results_by_case ON case_results(evalset, case_id, run_id);
+CREATE INDEX IF NOT EXISTS case_scores_by_metric ON case_scores(metric, run_id);
+CREATE INDEX IF NOT EXISTS case_scores_by_case ON case_scores(evalset, case_id, run_id);
+CREATE INDEX IF NOT EXISTS turns_by_run ON turns(run_id);
+"""
+
+
+def file_hash(path: str | Path) -> str:
+  """SHA-256 of a file's bytes, read in chunks."""
+  digest = hashlib.sha256()
+  with Path(path).open("rb") as handle:
+    for chunk in iter(lambda: handle.read(1 << 16), b""):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def turn_cost(
+    model: Optional[str],
+    prompt_tokens: int,
+    response_tokens: int,
+    prices: Dict[str, Tuple[float, float]],
+) -> Optional[float]:
+  """Estimated USD cost of one turn, ``None`` for unpriced models.
+
+  Prices match the model exactly, then by longest prefix.
+  """
+  model = model or ""
+  price = prices.get(model)
+  if price is None:
+    prefixes = [name for name in prices if model.startswith(name)]
+    if not prefixes:
+      return None
+    price = prices[max(prefixes, key=len)]
+  return (prompt_tokens * price[0] + response_tokens * price[1]) / 1_000_000
+
+
+# -- statistics ---------------------------------------------------------------
+
+
+def mann_whitney_greater(current: Sequence[float], baseline: Sequence[float]) -> float:
+  """One-sided p-value that ``current`` tends to be larger than ``baseline``.
+
+  Normal approximation of the Mann-Whitney U test with tie correction.
+  """
+  n1, n2 = len(current), len(baseline)
+  if not n1 or not n2:
+    return 1.0
+  pooled = sorted([(value, 0) for value in current] + [(value, 1) for value in baseline])
+  ranks = [0.0] * len(pooled)
+  ties = 0.0
+  start = 0
+  while start < len(pooled):
+    end = start
+    while end + 1 < len(pooled) and pooled[end + 1][0] == pooled[start][0]:
+      end += 1
+    for index in range(start, end + 1):
+      ranks[index] = (start + end) / 2 + 1
+    size = end - start + 1
+    ties += size**3 - size
+    start = end + 1
+  rank_sum = sum(rank for rank, (_, group) in zip(ranks, pooled) if group == 0)
+  u = rank_sum - n1 * (n1 + 1) / 2
+  total = n1 + n2
+  variance = n1 * n2 / 12 * ((total + 1) - ties / (total * (total - 1)))
+  if variance <= 0:
+    return 1.0
+  z = (u - n1 * n2 / 2) / math.sqrt(variance)
+  return 1 - statistics.NormalDist().cdf(z)
+
+
+def proportion_lower(
+    current_passes: int, current_total: int, baseline_passes: int, baseline_total: int
+) -> float:
+  """One-sided p-value that the current pass rate is below the baseline's."""
+  if not current_total or not baseline_total:
+    return 1.0
+  pooled = (current_passes + baseline_passes) / (current_total + baseline_total)
+  variance = pooled * (1 - pooled) * (1 / current_total + 1 / baseline_total)
+  if variance <= 0:
+    return 1.0
+  z = (current_passes / current_total - baseline_passes / baseline_total) / math.sqrt(variance)
+  return statistics.NormalDist().cdf(z)
+
+
+# -- store --------------------------------------------------------------------
+
+
+@dataclass
+class Comparison:
+  """One metric of a run against its baseline."""
+
+  metric: str
+  baseline: Optional[float]
+  current: Optional[float]
+  p_value: float
+  regression: bool
+
+  @property
+  def change(self) -> Optional[float]:
+    if not self.baseline or self.current is None:
+      return None
+    return self.current / self.baseline - 1
+
+
+class RunHistory:
+  """SQLite store of evalset runs."""
+
+  def __init__(self, path: str | Path = DEFAULT_HISTORY_DB):
+    self.path = Path(path).expanduser()
+    self.path.parent.mkdir(parents=True, exist_ok=True)
+    self._connection = sqlite3.connect(self.path)
+    self._connection.row_factory = sqlite3.Row
+    self._connection.execute("PRAGMA journal_mode=WAL")
+    self._connection.execute("PRAGMA synchronous=NORMAL")
+    self._connection.execute("PRAGMA busy_timeout=5000")
+    self._connection.execute("PRAGMA foreign_keys=ON")
+    self._connection.executescript(_SCHEMA)
+
+  def close(self) -> None:
+    self._connection.close()
+
+  def __enter__(self) -> "RunHistory":
+    return self
+
+  def __exit__(self, *exc_info: Any) -> None:
+    self.close()
+
+  def record_run(
+      self,
+      *,
+      agent_module: str,
+      started_at: float,
+      evalsets: Iterable[Dict[str, Any]],
+      turns: Iterable[Dict[str, Any]] = (),
+      agent_fingerprint: Optional[str] = None,
+      agent_config: Optional[Dict[str, Any]] = None,
+      mode: str = "",
+      exit_code: Optional[int] = None,
+      prices: Optional[Dict[str, Tuple[float, float]]] = None,
+  ) -> int:
+    """Appends one run and returns its id.
+
+    Args:
+      agent_module: Module whose ``root_agent`` was evaluated.
+      started_at: Epoch seconds when the run started.
+      evalsets: Per evalset: ``evalset``, ``evalset_hash``, ``passed``,
+        ``details`` and optionally ``runs``, ``reused`` (verdict carried
+        over without evaluating; left out of pass-rate statistics) and
+        ``cases`` (dicts with ``case_id``, ``passed``, ``runs``, ``passes``
+        and ``scores``, a mapping of metric name to ``(score, threshold)``).
+      turns: Instrumentation records (``total_latency``, ``model_latency``,
+        ``prompt_tokens``, ``response_tokens``) of the run.
+      agent_fingerprint: Hash of the agent's sources and config.
+      agent_config: Name, model and instruction of the agent.
+      mode: Repeat strategy, e.g. ``num_runs=2`` or the adaptive policy.
+      exit_code: Exit code of the evaluation.
+      prices: Model prices for the cost column (default: ``DEFAULT_MODEL_PRICES``).
+    """
+    config = agent_config or {}
+    model = config.get("model") or None
+    prices = DEFAULT_MODEL_PRICES if prices is None else prices
+    with self._connection:
+      cursor = self._connection.execute(
+          "INSERT INTO runs (started_at, finished_at, agent_module, agent_fingerprint,"
+          " agent_config, model, mode, exit_code) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+          (
+              started_at,
+              time.time(),
+              agent_module,
+              agent_fingerprint,
+              json.dumps(config, sort_keys=True),
+              model,
+              mode,
+              exit_code,
+          ),
+      )
+      run_id = int(cursor.lastrowid)
+      for result in evalsets:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO evalset_results (run_id, evalset, evalset_hash,"
+            " passed, details, runs, reused) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                run_id,
+                result["evalset"],
+                result["evalset_hash"],
+                int(bool(result["passed"])),
+                result.get("details"),
+                result.get("runs"),
+                int(bool(result.get("reused"))),
+            ),
+        )
+        cases = result.get("cases", [])
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO case_results VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id,
+                    result["evalset"],
+                    case["case_id"],
+                    int(bool(case["passed"])),
+                    case.get("runs"),
+                    case.get("passes"),
+                )
+                for case in cases
+            ],
+        )
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO case_scores VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, result["evalset"], case["case_id"], metric, score, threshold)
+                for case in cases
+                for metric, (score, threshold) in (case.get("scores") or {}).items()
+            ],
+        )
+      self._connection.executemany(
+          "INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?)",
+          [
+              (
+                  run_id,
+                  turn.get("total_latency"),
+                  turn.get("model_latency"),
+                  turn.get("prompt_tokens") or 0,
+                  turn.get("response_tokens") or 0,
+                  turn_cost(
+                      model,
+                      turn.get("prompt_tokens") or 0,
+                      turn.get("response_tokens") or 0,
+                      prices,
+                  ),
+              )
+              for turn in turns
+          ],
+      )
+    return run_id
+
+  def runs(self, *, agent_module: Optional[str] = None, limit: int = 20) -> List[sqlite3.Row]:
+    """Most recent runs first, with evalset pass counts and turn counts."""
+    where = "WHERE r.agent_module = ?" if agent_module else ""
+    params: Tuple[Any, ...] = (agent_module,) if agent_module else ()
+    return self._connection.execute(
+        "SELECT r.*,"
+        " (SELECT COUNT(*) FROM evalset_results e WHERE e.run_id = r.id) AS evalsets,"
+        " (SELECT SUM(passed) FROM evalset_results e WHERE e.run_id = r.id) AS passed,"
+        " (SELECT COUNT(*) FROM turns t WHERE t.run_id = r.id) AS turns"
+        f" FROM runs r {where} ORDER BY r.started_at DESC, r.id DESC LIMIT ?",
+        params + (limit,),
+    ).fetchall()
+
+  def case_scores(
+      self,
+      evalset: str,
+      *,
+      case_id: Optional[str] = None,
+      metric: Optional[str] = None,
+      limit: int = 20,
+  ) -> List[sqlite3.Row]:
+    """Metric scores of an evalset's cases over its ``limit`` latest runs.
+
+    Rows hold the run's ``run_id`` and ``started_at`` with ``case_id``,
+    ``metric``, ``score`` and ``threshold``, most recent run first.
+    """
+    where = ["s.evalset = ?"]
+    params: List[Any] = [evalset]
+    if case_id is not None:
+      where.append("s.case_id = ?")
+      params.append(case_id)
+    if metric is not None:
+      where.append("s.metric = ?")
+      params.append(metric)
+    return self._connection.execute(
+        "SELECT s.run_id, r.started_at, s.case_id, s.metric, s.score, s.threshold"
+        " FROM case_scores s JOIN runs r ON r.id = s.run_id"
+        f" WHERE {' AND '.join(where)} AND s.run_id IN ("
+        "  SELECT run_id FROM case_scores WHERE evalset = ?"
+        "  GROUP BY run_id ORDER BY run_id DESC LIMIT ?)"
+        " ORDER BY r.started_at DESC, s.run_id DESC, s.case_id, s.metric",
+        tuple(params) + (evalset, limit),
+    ).fetchall()
+
+  def _run(self, run_id: Optional[int]) -> Optional[sqlite3.Row]:
+    if run_id is None:
+      return self._connection.execute(
+          "SELECT * FROM runs ORDER BY started_at DESC, id DESC LIMIT 1"
+      ).fetchone()
+    return self._connection.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+
+  def _evalset_hashes(self, run_id: int) -> frozenset:
+    rows = self._connection.execute(
+        "SELECT evalset_hash FROM evalset_results WHERE run_id = ?", (run_id,)
+    ).fetchall()
+    return frozenset(row[0] for row in rows)
+
+  def _baseline_ids(self, run: sqlite3.Row, count: int) -> List[int]:
+    """Earlier runs with ``run``'s agent module, mode and evalset hashes.
+
+    Runs over other evalsets or repeat counts do a different amount of
+    work, so mixing them in would report workload changes as regressions.
+    """
+    hashes = self._evalset_hashes(run["id"])
+    rows = self._connection.execute(
+        "SELECT id FROM runs WHERE agent_module = ? AND mode IS ? AND started_at < ?"
+        " ORDER BY started_at DESC",
+        (run["agent_module"], run["mode"], run["started_at"]),
+    )
+    baseline: List[int] = []
+    for row in rows:
+      if self._evalset_hashes(row["id"]) == hashes:
+        baseline.append(row["id"])
+        if len(baseline) >= count:
+          break
+    return baseline
+
+  def _turn_values(self, run_ids: Sequence[int], column: str) -> List[float]:
+    marks = ",".join("?" * len(run_ids))
+    rows = self._connection.execute(
+        f"SELECT {column} FROM turns WHERE run_id IN ({marks}) AND {column} IS NOT NULL",
+        tuple(run_ids),
+    ).fetchall()
+    return [float(row[0]) for row in rows]
+
+  def _scores(self, run_ids: Sequence[int]) -> Dict[str, List[float]]:
+    """Evaluated per-case scores of the runs, by metric."""
+    marks = ",".join("?" * len(run_ids))
+    rows = self._connection.execute(
+        f"SELECT metric, score FROM case_scores WHERE run_id IN ({marks})"
+        " AND score IS NOT NULL",
+        tuple(run_ids),
+    ).fetchall()
+    scores: Dict[str, List[float]] = {}
+    for row in rows:
+      scores.setdefault(row["metric"], []).append(float(row["score"]))
+    return scores
+
+  def _pass_counts(self, run_ids: Sequence[int]) -> Tuple[int, int]:
+    marks = ",".join("?" * len(run_ids))
+    row = self._connection.execute(
+        "SELECT COALESCE(SUM(passed), 0), COUNT(*) FROM evalset_results"
+        f" WHERE run_id IN ({marks}) AND NOT reused",
+        tuple(run_ids),
+    ).fetchone()
+    return int(row[0]), int(row[1])
+
+  def compare(
+      self,
+      run_id: Optional[int] = None,
+      *,
+      baseline_runs: int = DEFAULT_BASELINE_RUNS,
+      alpha: float = DEFAULT_ALPHA,
+      min_change: float = DEFAULT_MIN_CHANGE,
+  ) -> Tuple[Optional[sqlite3.Row], List[int], List[Comparison]]:
+    """Compares a run (default: the latest) with its rolling baseline.
+
+    Returns the run, the baseline run ids and one ``Comparison`` per
+    metric. Latency and cost compare medians, eval metric scores compare
+    means; a regression needs ``p < alpha`` and a relative change of at
+    least ``min_change``.
+    """
+    run = self._run(run_id)
+    if run is None:
+      return None, [], []
+    baseline = self._baseline_ids(run, baseline_runs)
+    if not baseline:
+      return run, [], []
+
+    comparisons = []
+    for metric, column in (
+        ("latency (s/turn)", "total_latency"),
+        ("model latency (s/turn)", "model_latency"),
+        ("cost (USD/turn)", "cost"),
+        ("tokens/turn", "prompt_tokens + response_tokens"),
+    ):
+      current = self._turn_values([run["id"]], column)
+      previous = self._turn_values(baseline, column)
+      if not current or not previous:
+        continue
+      before, after = statistics.median(previous), statistics.median(current)
+      p_value = mann_whitney_greater(current, previous)
+      grew = before > 0 and after / before - 1 >= min_change
+      comparisons.append(
+          Comparison(metric, before, after, p_value, p_value < alpha and grew)
+      )
+
+    passes, total = self._pass_counts([run["id"]])
+    baseline_passes, baseline_total = self._pass_counts(baseline)
+    if total and baseline_total:
+      before, after = baseline_passes / baseline_total, passes / total
+      p_value = proportion_lower(passes, total, baseline_passes, baseline_total)
+      dropped = before - after >= min_change * before
+      comparisons.append(
+          Comparison("pass rate", before, after, p_value, p_value < alpha and dropped)
+      )
+
+    baseline_scores = self._scores(baseline)
+    for metric, current in sorted(self._scores([run["id"]]).items()):
+      previous = baseline_scores.get(metric)
+      if not previous:
+        continue
+      before, after = statistics.mean(previous), statistics.mean(current)
+      # Scores regress downwards: test whether the baseline is larger.
+      p_value = mann_whitney_greater(previous, current)
+      dropped = before > 0 and before - after >= min_change * before
+      comparisons.append(
+          Comparison(metric, before, after, p_value, p_value < alpha and dropped)
+      )
+    return run, baseline, comparisons
+
+
+def format_comparisons(comparisons: Sequence[Comparison]) -> str:
+  """Renders ``RunHistory.compare`` output as a fixed-width table."""
+  if not comparisons:
+    return "Nothing to compare."
+  width = max(len(c.metric) for c in comparisons)
+  header = f"{'Metric':<{width}}  {'baseline':>10}  {'current':>10}  {'change':>8}  {'p':>7}"
+  lines = [header, "-" * len(header)]
+  for c in comparisons:
+    change = "n/a" if c.change is None else f"{c.change:+.1%}"
+    flag = "  REGRESSION" if c.regression else ""
+    lines.append(
+        f"{c.metric:<{width}}  {c.baseline:>10.4g}  {c.current:>10.4g}"
+        f"  {change:>8}  {c.p_value:>7.3f}{flag}"
+    )
+  return "\n".join(lines)
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Evalset run history and regression reports")
+  parser.add_argument(
+      "--db",
+      default=DEFAULT_HISTORY_DB,
+      help="History database (default: %(default)s)",
+  )
+  commands = parser.add_subparsers(dest="command", required=True)
+  report = commands.add_parser("report", help="Flag regressions of a run against its baseline")
+  report.add_argument("--run", type=int, default=None, help="Run id (default: the latest)")
+  report.add_argument(
+      "--baseline-runs",
+      type=int,
+      default=DEFAULT_BASELINE_RUNS,
+      help=(
+          "Previous runs with the same agent module, mode and evalsets in the"
+          " baseline (default: %(default)s)"
+      ),
+  )
+  report.add_argument(
+      "--alpha",
+      type=float,
+      default=DEFAULT_ALPHA,
+      help="Significance level (default: %(default)s)",
+  )
+  report.add_argument(
+      "--min-change",
+      type=float,
+      default=DEFAULT_MIN_CHANGE,
+      help="Smallest relative change reported as a regression (default: %(default)s)",
+  )
+  listing = commands.add_parser("list", help="Show recent runs")
+  listing.add_argument("--agent-module", default=None)
+  listing.add_argument("--limit", type=int, default=20)
+  scores = commands.add_parser("scores", help="Show per-case metric scores of an evalset")
+  scores.add_argument("evalset", help="Evalset path as recorded, e.g. by `list`")
+  scores.add_argument("--case", default=None, help="Only this eval case")
+  scores.add_argument("--metric", default=None, help="Only this metric")
+  scores.add_argument("--limit", type=int, default=20, help="Latest runs to show")
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  if not Path(args.db).exists():
+    print(f"No run history at {args.db}; run execute_evalsets with --history first.")
+    return 2
+  with RunHistory(args.db) as history:
+    if args.command == "list":
+      print(f"{'Run':>5}  {'Started':<19}  {'Agent':<20}  {'Model':<22}  Passed  Turns")
+      for row in history.runs(agent_module=args.agent_module, limit=args.limit):
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["started_at"]))
+        print(
+            f"{row['id']:>5}  {started:<19}  {row['agent_module']:<20}"
+            f"  {row['model'] or '-':<22}  {row['passed'] or 0}/{row['evalsets']:<4}"
+            f"  {row['turns']}"
+        )
+      return 0
+
+    if args.command == "scores":
+      rows = history.case_scores(
+          args.evalset, case_id=args.case, metric=args.metric, limit=args.limit
+      )
+      if not rows:
+        print(f"No scores recorded for {args.evalset}.")
+        return 1
+      width = max([len("Case")] + [len(row["case_id"]) for row in rows])
+      metric_width = max([len("Metric")] + [len(row["metric"]) for row in rows])
+      print(
+          f"{'Run':>5}  {'Case':<{width}}  {'Metric':<{metric_width}}"
+          f"  {'score':>7}  {'threshold':>9}"
+      )
+      for row in rows:
+        score = "-" if row["score"] is None else f"{row['score']:.3f}"
+        print(
+            f"{row['run_id']:>5}  {row['case_id']:<{width}}  {row['metric']:<{metric_width}}"
+            f"  {score:>7}  {row['threshold']:>9.3g}"
+        )
+      return 0
+
+    run, baseline, comparisons = history.compare(
+        args.run,
+        baseline_runs=args.baseline_runs,
+        alpha=args.alpha,
+        min_change=args.min_change,
+    )
+  if run is None:
+    print("No runs recorded.")
+    return 2
+  print(
+      f"Run {run['id']} ({run['agent_module']}, model {run['model'] or '-'})"
+      f" against {len(baseline)} previous run(s)"
+  )
+  print(format_comparisons(comparisons))
+  regressions = [c.metric for c in comparisons if c.regression]
+  if regressions:
+    print(f"\nRegressions: {', '.join(regressions)}")
+    return 1
+  return 0
+
+
+__all__ = [
+    "Comparison",
+    "DEFAULT_HISTORY_DB",
+    "RunHistory",
+    "file_hash",
+    "format_comparisons",
+    "mann_whitney_greater",
+    "proportion_lower",
+    "turn_cost",
+]
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
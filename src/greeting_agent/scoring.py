@@ -0,0 +1,472 @@
+"""Local, batched response-match scoring for evalsets.
+
+Computes ADK's ``response_match_score`` (ROUGE-1 F-measure of each
+invocation's final response against the reference, averaged over the
+invocations of a case and then over runs) without calling
+``AgentEvaluator``. Candidate responses come from evalsets produced by
+``generate_evalset``, one file per run, matched to the reference cases by
+``eval_id``.
+
+Every distinct text is tokenized once into a shared table of unigram
+counts; the profiles of a reference evalset are cached per file version.
+With NumPy installed all pairs of a call are scored in a few array
+operations; without it a per-pair ``Counter`` fallback gives the same
+numbers. Tokens come from ``rouge_score`` (as used by ADK, with stemming)
+when it is installed, else from the same lowercase alphanumeric split
+without stemming.
+
+``execute_evalsets --scoring local`` also swaps this scorer in for ADK's
+``response_match_score`` evaluator (``GREETING_AGENT_SCORING=local``).
+ADK scores one run of one case per call there, so the gain is tokenizing
+every distinct text once per process rather than batching across cases.
+
+Usage:
+  python -m greeting_agent.scoring golden.evalset.json run1.evalset.json run2.evalset.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import array
+import json
+import os
+import re
+import statistics
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+  import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+  np = None  # type: ignore
+
+from .event_text import content_text
+from .evalset_io import TEST_CONFIG_NAME
+from .evalset_io import case_id
+from .evalset_io import load_evalset
+
+DEFAULT_THRESHOLD = 0.8
+RESPONSE_MATCH_METRIC = "response_match_score"
+SCORING_ENV = "GREETING_AGENT_SCORING"
+SCORING_MODES = ("adk", "local")
+# Below this many pairs, converting the table to arrays costs more than the
+# per-pair ``Counter`` path saves.
+_MIN_ARRAY_PAIRS = 32
+_ALNUM_RUN = re.compile(r"[a-z0-9]+")
+
+Tokenizer = Callable[[str], List[str]]
+
+
+def _plain_tokenize(text: str) -> List[str]:
+  return _ALNUM_RUN.findall(text.lower())
+
+
+def default_tokenizer() -> Tokenizer:
+  """``rouge_score``'s stemming tokenizer, or a plain fallback."""
+  try:
+    from rouge_score.tokenizers import DefaultTokenizer
+  except ImportError:
+    return _plain_tokenize
+  return DefaultTokenizer(use_stemmer=True).tokenize
+
+
+def rouge1_f(candidate: Counter, reference: Counter) -> float:
+  """ROUGE-1 F-measure of two unigram count profiles."""
+  overlap = sum((candidate & reference).values())
+  if not overlap:
+    return 0.0
+  precision = overlap / sum(candidate.values())
+  recall = overlap / sum(reference.values())
+  return 2 * precision * recall / (precision + recall)
+
+
+class ProfileTable:
+  """Unigram count profiles of distinct texts, one row per text.
+
+  Rows are stored CSR-style (``offsets`` into flat ``ids``/``counts``, ids
+  ascending within a row) so a batch of rows can be gathered with array
+  indexing into sorted ``(pair, token)`` keys.
+  """
+
+  def __init__(self, tokenizer: Optional[Tokenizer] = None):
+    self.tokenizer = tokenizer or default_tokenizer()
+    self._vocabulary: Dict[str, int] = {}
+    self._rows: Dict[str, int] = {}
+    self._profiles: List[Counter] = []
+    # Typed buffers convert to NumPy with a memcpy instead of per item.
+    self._flat_ids = array.array("q")
+    self._flat_counts = array.array("d")
+    self._offsets = array.array("q", [0])
+    self._lengths = array.array("d")
+    self._arrays: Optional[Tuple[Any, Any, Any, Any]] = None
+
+  def __len__(self) -> int:
+    return len(self._profiles)
+
+  def row(self, text: str) -> int:
+    """Row of ``text``, tokenizing it on first sight."""
+    row = self._rows.get(text)
+    if row is not None:
+      return row
+    profile = Counter(self.tokenizer(text))
+    if profile:
+      vocabulary = self._vocabulary
+      # Ids are kept sorted within a row so gathered keys come out sorted.
+      ids, counts = zip(
+          *sorted(
+              (vocabulary.setdefault(token, len(vocabulary)), count)
+              for token, count in profile.items()
+          )
+      )
+      self._flat_ids.extend(ids)
+      self._flat_counts.extend(counts)
+    self._offsets.append(len(self._flat_ids))
+    self._lengths.append(sum(profile.values()))
+    self._profiles.append(profile)
+    self._arrays = None
+    row = self._rows[text] = len(self._profiles) - 1
+    return row
+
+  def _numpy_arrays(self) -> Tuple[Any, Any, Any, Any]:
+    if self._arrays is None:
+      self._arrays = (
+          np.array(self._offsets, dtype=np.int64),
+          np.array(self._flat_ids, dtype=np.int64),
+          np.array(self._flat_counts, dtype=np.float64),
+          np.array(self._lengths, dtype=np.float64),
+      )
+    return self._arrays
+
+  def _gather(self, rows: Any) -> Tuple[Any, Any, Any]:
+    """Flattened (pair index, token id, count) of ``rows``."""
+    offsets, ids, counts, _ = self._numpy_arrays()
+    starts = offsets[rows]
+    sizes = offsets[rows + 1] - starts
+    pair = np.repeat(np.arange(len(rows)), sizes)
+    within = np.arange(int(sizes.sum())) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    positions = np.repeat(starts, sizes) + within
+    return pair, ids[positions], counts[positions]
+
+  def rouge1(self, candidate_rows: Sequence[int], reference_rows: Sequence[int]) -> List[float]:
+    """ROUGE-1 F-measures of row pairs, batched when NumPy is available."""
+    if len(candidate_rows) != len(reference_rows):
+      raise ValueError("candidate and reference rows must pair up")
+    if not candidate_rows:
+      return []
+    if np is None or len(candidate_rows) < _MIN_ARRAY_PAIRS:
+      return [
+          rouge1_f(self._profiles[c], self._profiles[r])
+          for c, r in zip(candidate_rows, reference_rows)
+      ]
+    candidates = np.asarray(candidate_rows, dtype=np.int64)
+    references = np.asarray(reference_rows, dtype=np.int64)
+    _, _, _, lengths = self._numpy_arrays()
+    vocabulary = max(len(self._vocabulary), 1)
+    c_pair, c_ids, c_counts = self._gather(candidates)
+    r_pair, r_ids, r_counts = self._gather(references)
+    # Keys are sorted (pair ascending, ids ascending within a row), so the
+    # shared tokens of every pair are found with one binary search.
+    c_keys = c_pair * vocabulary + c_ids
+    r_keys = r_pair * vocabulary + r_ids
+    overlap = np.zeros(len(candidates))
+    if len(r_keys) and len(c_keys):
+      found = np.minimum(np.searchsorted(r_keys, c_keys), len(r_keys) - 1)
+      hits = r_keys[found] == c_keys
+      overlap = np.bincount(
+          c_pair[hits],
+          weights=np.minimum(c_counts[hits], r_counts[found[hits]]),
+          minlength=len(candidates),
+      )
+    c_lengths = lengths[candidates]
+    r_lengths = lengths[references]
+    zeros = np.zeros(len(candidates))
+    precision = np.divide(overlap, c_lengths, out=zeros.copy(), where=c_lengths > 0)
+    recall = np.divide(overlap, r_lengths, out=zeros.copy(), where=r_lengths > 0)
+    total = precision + recall
+    scores = np.divide(2 * precision * recall, total, out=zeros, where=total > 0)
+    return scores.tolist()
+
+
+def _final_responses(case: Dict[str, Any]) -> List[str]:
+  responses = []
+  for invocation in case.get("conversation") or []:
+    content = invocation.get("final_response", invocation.get("finalResponse"))
+    responses.append(content_text(content, "\n"))
+  return responses
+
+
+def _cases(payload: Dict[str, Any]) -> Dict[str, List[str]]:
+  return {
+      case_id(case) or str(index): _final_responses(case)
+      for index, case in enumerate(payload.get("eval_cases") or [])
+  }
+
+
+def load_threshold(path: Path, default: float = DEFAULT_THRESHOLD) -> float:
+  """``response_match_score`` criterion of the evalset's ``test_config.json``."""
+  config = path.parent / TEST_CONFIG_NAME
+  try:
+    criteria = json.loads(config.read_text(encoding="utf-8")).get("criteria", {})
+  except (OSError, ValueError):
+    return default
+  return float(criteria.get(RESPONSE_MATCH_METRIC, default))
+
+
+@dataclass
+class CaseScore:
+  """Response match of one case: per-run scores and their mean."""
+
+  case_id: str
+  run_scores: List[Optional[float]] = field(default_factory=list)
+
+  @property
+  def score(self) -> Optional[float]:
+    scores = [score for score in self.run_scores if score is not None]
+    return statistics.fmean(scores) if scores else None
+
+
+class ResponseScorer:
+  """Scores candidate evalsets against cached reference profiles."""
+
+  def __init__(self, tokenizer: Optional[Tokenizer] = None):
+    self.table = ProfileTable(tokenizer)
+    self._references: Dict[Tuple[str, int, int], Dict[str, List[int]]] = {}
+
+  def reference_rows(self, path: Path) -> Dict[str, List[int]]:
+    """Profile rows of each reference case, cached per file version."""
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+    rows = self._references.get(key)
+    if rows is None:
+      rows = {
+          cid: [self.table.row(text) for text in texts]
+          for cid, texts in _cases(load_evalset(path)).items()
+      }
+      self._references[key] = rows
+    return rows
+
+  def score(
+      self, reference: Path, runs: Sequence[Dict[str, List[str]]]
+  ) -> List[CaseScore]:
+    """Scores every case of ``reference`` against each run's responses.
+
+    Args:
+      reference: Evalset holding the expected final responses.
+      runs: Per run, eval id to the final response of each invocation.
+        Cases missing from a run get ``None`` for that run; invocations
+        missing from a case score 0.
+
+    Returns:
+      One ``CaseScore`` per reference case, in file order.
+    """
+    references = self.reference_rows(reference)
+    candidate_rows: List[int] = []
+    reference_rows: List[int] = []
+    # (case, run) -> number of invocations scored, in pair order.
+    slots: List[Tuple[str, int, int]] = []
+    for run_index, run in enumerate(runs):
+      for cid, rows in references.items():
+        texts = run.get(cid)
+        if texts is None:
+          continue
+        for position, row in enumerate(rows):
+          text = texts[position] if position < len(texts) else ""
+          candidate_rows.append(self.table.row(text))
+          reference_rows.append(row)
+        slots.append((cid, run_index, len(rows)))
+    scores = self.table.rouge1(candidate_rows, reference_rows)
+
+    results = {cid: CaseScore(cid, [None] * len(runs)) for cid in references}
+    cursor = 0
+    for cid, run_index, count in slots:
+      chunk = scores[cursor : cursor + count]
+      cursor += count
+      results[cid].run_scores[run_index] = statistics.fmean(chunk) if chunk else 0.0
+    return list(results.values())
+
+  def score_files(self, reference: Path, run_files: Sequence[Path]) -> List[CaseScore]:
+    """Scores generated evalsets (one per run) against ``reference``."""
+    return self.score(reference, [_cases(load_evalset(path)) for path in run_files])
+
+
+class ResponseMatchEvaluator:
+  """ADK ``response_match_score`` evaluator backed by a shared ``ProfileTable``.
+
+  Scores each call's invocations in one batch. The table is shared by all
+  instances, so references repeated by every run are tokenized once.
+  """
+
+  _table: Optional[ProfileTable] = None
+
+  def __init__(self, eval_metric: Any):
+    self.threshold = eval_metric.threshold
+
+  @classmethod
+  def table(cls) -> ProfileTable:
+    if cls._table is None:
+      cls._table = ProfileTable()
+    return cls._table
+
+  def evaluate_invocations(
+      self, actual_invocations: List[Any], expected_invocations: List[Any]
+  ) -> Any:
+    from google.adk.evaluation.evaluator import EvalStatus
+    from google.adk.evaluation.evaluator import EvaluationResult
+    from google.adk.evaluation.evaluator import PerInvocationResult
+
+    pairs = list(zip(actual_invocations, expected_invocations))
+    if not pairs:
+      return EvaluationResult()
+    table = self.table()
+    scores = table.rouge1(
+        [table.row(content_text(actual.final_response, "\n")) for actual, _ in pairs],
+        [table.row(content_text(expected.final_response, "\n")) for _, expected in pairs],
+    )
+
+    def status(score: float) -> Any:
+      return EvalStatus.PASSED if score >= self.threshold else EvalStatus.FAILED
+
+    overall = statistics.fmean(scores)
+    return EvaluationResult(
+        overall_score=overall,
+        overall_eval_status=status(overall),
+        per_invocation_results=[
+            PerInvocationResult(
+                actual_invocation=actual,
+                expected_invocation=expected,
+                score=score,
+                eval_status=status(score),
+            )
+            for (actual, expected), score in zip(pairs, scores)
+        ],
+    )
+
+
+def configure_env(mode: str) -> None:
+  """Selects the ``response_match_score`` scorer for this process and children."""
+  if mode not in SCORING_MODES:
+    raise ValueError(f"Unknown scoring mode {mode!r}; expected one of {SCORING_MODES}")
+  os.environ[SCORING_ENV] = mode
+
+
+def register_adk_evaluator() -> str:
+  """Registers the scorer ``GREETING_AGENT_SCORING`` selects with ADK.
+
+  Returns:
+    The scoring mode in effect, ``adk`` unless set to ``local``.
+
+  Raises:
+    RuntimeError: ``local`` scoring on an ADK without a metric registry.
+  """
+  mode = os.environ.get(SCORING_ENV) or "adk"
+  if mode not in SCORING_MODES:
+    raise RuntimeError(f"{SCORING_ENV}={mode!r}; expected one of {SCORING_MODES}")
+  try:
+    from google.adk.evaluation.metric_evaluator_registry import (
+        DEFAULT_METRIC_EVALUATOR_REGISTRY,
+    )
+    from google.adk.evaluation.response_evaluator import ResponseEvaluator
+  except ImportError as exc:
+    if mode == "adk":
+      return mode
+    raise RuntimeError(
+        "local scoring needs ADK's MetricEvaluatorRegistry; upgrade google-adk"
+    ) from exc
+  # Re-registering the default lets a process switch back to ADK's scorer.
+  DEFAULT_METRIC_EVALUATOR_REGISTRY.register_evaluator(
+      metric_info=ResponseEvaluator.get_metric_info(RESPONSE_MATCH_METRIC),
+      evaluator=ResponseMatchEvaluator if mode == "local" else ResponseEvaluator,
+  )
+  return mode
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(
+      description="Score generated evalsets against a reference evalset (ROUGE-1)"
+  )
+  parser.add_argument("reference", type=Path, help="Evalset with the expected responses")
+  parser.add_argument(
+      "runs",
+      type=Path,
+      nargs="+",
+      help="Generated evalsets, one per run, with the same eval ids",
+  )
+  parser.add_argument(
+      "--threshold",
+      type=float,
+      default=None,
+      help=(
+          "Minimum mean response_match_score per case (default: the reference's"
+          " test_config.json criterion, else 0.8)"
+      ),
+  )
+  parser.add_argument(
+      "--json",
+      type=Path,
+      default=None,
+      help="Also write per-case scores to this JSON file",
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  threshold = args.threshold if args.threshold is not None else load_threshold(args.reference)
+  try:
+    results = ResponseScorer().score_files(args.reference, args.runs)
+  except (OSError, ValueError) as exc:
+    print(f"{exc.__class__.__name__}: {exc}")
+    return 2
+
+  name_width = max([len("Case")] + [len(result.case_id) for result in results])
+  header = f"{'Case':<{name_width}}  Status  Score   Runs"
+  print(header)
+  print("-" * len(header))
+  passed = 0
+  for result in results:
+    score = result.score
+    ok = score is not None and score >= threshold
+    passed += ok
+    runs = " ".join("-" if s is None else f"{s:.3f}" for s in result.run_scores)
+    shown = "n/a  " if score is None else f"{score:.3f}"
+    print(f"{result.case_id:<{name_width}}  {'PASS' if ok else 'FAIL':<5}  {shown}   {runs}")
+  print(f"\n{passed}/{len(results)} cases reached {RESPONSE_MATCH_METRIC} {threshold}")
+
+  if args.json:
+    args.json.write_text(
+        json.dumps(
+            {
+                "threshold": threshold,
+                "cases": [
+                    {"eval_id": r.case_id, "score": r.score, "run_scores": r.run_scores}
+                    for r in results
+                ],
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+  return 0 if passed == len(results) else 1
+
+
+__all__ = [
+    "CaseScore",
+    "DEFAULT_THRESHOLD",
+    "ProfileTable",
+    "ResponseMatchEvaluator",
+    "ResponseScorer",
+    "SCORING_ENV",
+    "SCORING_MODES",
+    "configure_env",
+    "default_tokenizer",
+    "load_threshold",
+    "register_adk_evaluator",
+    "rouge1_f",
+]
+
+
+if __name__ == "__main__":
+  sys.exit(main())
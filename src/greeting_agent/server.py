@@ -0,0 +1,603 @@
+"""Asyncio HTTP front-end serving many greeting-agent sessions concurrently.
+
+One ``Runner`` and one agent from ``create_greeting_agent`` are shared by every
+session. Messages within a session are processed strictly in arrival order;
+messages for different sessions run concurrently up to ``max_inflight``, and
+once ``max_queue`` messages are waiting new requests are rejected with 503 so
+clients back off instead of piling up. The per-session bookkeeping of sessions
+idle for ``idle_seconds`` is dropped; their next message picks the stored
+session up again. With ``--route`` the agent spreads turns over several models
+through ``RoutingLlm``, whose per-model health shows up in ``/healthz``.
+
+Endpoints (JSON in, JSON out):
+  POST   /users/{user_id}/sessions/{session_id}/messages  {"text": "..."}
+  DELETE /users/{user_id}/sessions/{session_id}
+  GET    /healthz
+
+Usage:
+  python -m greeting_agent.server --port 8080
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import signal
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from dotenv import load_dotenv
+from google.adk.agents import BaseAgent
+from google.adk.runners import Runner
+from google.adk.sessions import BaseSessionService
+from google.genai import types
+
+from .agent import DEFAULT_GREETING_MODEL
+from .agent import create_greeting_agent
+from .event_text import event_text
+from .poem_cache import PoemCache
+from .rate_limit import RateLimiter
+from .rate_limit import parse_budgets
+from .routing_llm import RoutingLlm
+from .routing_llm import parse_routes
+from .sessions import BoundedInMemorySessionService
+from .sessions import DEFAULT_SESSION_DB
+from .sessions import SESSION_BACKENDS
+from .sessions import create_session_service
+
+_DEFAULT_APP_NAME = "greeting_agent_app"
+_MAX_BODY_BYTES = 64 * 1024
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+SessionKey = Tuple[str, str]
+
+
+class ServerBusyError(RuntimeError):
+  """Raised when the message queue is full or the server is shutting down."""
+
+
+@dataclass
+class _SessionState:
+  lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+  created: bool = False
+  last_used: float = field(default_factory=time.monotonic)
+
+
+class GreetingServer:
+  """Routes messages for many sessions through one shared ``Runner``."""
+
+  def __init__(
+      self,
+      *,
+      agent: Optional[BaseAgent] = None,
+      runner: Optional[Runner] = None,
+      session_service: Optional[BaseSessionService] = None,
+      app_name: str = _DEFAULT_APP_NAME,
+      max_inflight: int = 64,
+      max_queue: int = 1024,
+      poem_cache: Optional[PoemCache] = None,
+      rate_limiter: Optional[RateLimiter] = None,
+      router: Optional[RoutingLlm] = None,
+      idle_seconds: float = 600.0,
+  ):
+    if max_inflight <= 0 or max_queue <= 0:
+      raise ValueError("max_inflight and max_queue must be positive")
+    if idle_seconds <= 0:
+      raise ValueError("idle_seconds must be positive")
+    self.app_name = app_name
+    self.runner = runner or Runner(
+        app_name=app_name,
+        agent=agent
+        or create_greeting_agent(
+            model=router or DEFAULT_GREETING_MODEL,
+            poem_cache=poem_cache,
+            rate_limiter=rate_limiter,
+        ),
+        session_service=session_service or create_session_service(),
+    )
+    self.max_queue = max_queue
+    self.poem_cache = poem_cache
+    self.rate_limiter = rate_limiter
+    self.router = router
+    self._inflight = asyncio.Semaphore(max_inflight)
+    self._sessions: Dict[SessionKey, _SessionState] = {}
+    self.idle_seconds = idle_seconds
+    self._last_prune = time.monotonic()
+    self._waiting = 0
+    self._active = 0
+    self._idle = asyncio.Event()
+    self._idle.set()
+    self._closing = False
+    self._server: Optional[asyncio.AbstractServer] = None
+    # Open connections, mapped to whether a request is being handled.
+    self._connections: Dict[asyncio.StreamWriter, bool] = {}
+    self._handlers: Set[asyncio.Task] = set()
+    self.completed = 0
+
+  @property
+  def stats(self) -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "sessions": len(self._sessions),
+        "active": self._active,
+        "waiting": self._waiting,
+        "completed": self.completed,
+        "closing": self._closing,
+    }
+    if self.poem_cache is not None:
+      stats["poem_cache"] = self.poem_cache.stats()
+    if self.router is not None:
+      stats["routing"] = self.router.stats()
+    return stats
+
+  def forget_session(self, app_name: str, user_id: str, session_id: str) -> None:
+    """Drops bookkeeping for a session its backend evicted.
+
+    Suitable as ``on_evict`` for ``BoundedInMemorySessionService``.
+    """
+    state = self._sessions.get((user_id, session_id))
+    if state is None:
+      return
+    state.created = False
+    if not state.lock.locked():
+      self._sessions.pop((user_id, session_id), None)
+
+  def _prune_sessions(self) -> None:
+    """Drops the bookkeeping of sessions idle for ``idle_seconds``.
+
+    Sessions with a message running or queued hold their lock and stay.
+    Scans at most every ``idle_seconds / 2``, so the cost is amortized.
+    """
+    now = time.monotonic()
+    if now - self._last_prune < self.idle_seconds / 2:
+      return
+    self._last_prune = now
+    cutoff = now - self.idle_seconds
+    idle = [
+        key
+        for key, state in self._sessions.items()
+        if not state.lock.locked() and state.last_used < cutoff
+    ]
+    for key in idle:
+      del self._sessions[key]
+
+  async def _ensure_session(self, key: SessionKey, state: _SessionState) -> None:
+    if state.created:
+      return
+    user_id, session_id = key
+    service = self.runner.session_service
+    existing = await service.get_session(
+        app_name=self.app_name, user_id=user_id, session_id=session_id
+    )
+    if existing is None:
+      await service.create_session(
+          app_name=self.app_name, user_id=user_id, session_id=session_id
+      )
+    state.created = True
+
+  async def handle_message(self, user_id: str, session_id: str, text: str) -> List[str]:
+    """Runs one user message and returns the agent's final replies.
+
+    Raises:
+      ServerBusyError: The queue is full or the server is shutting down.
+    """
+    if self._closing:
+      raise ServerBusyError("Server is shutting down")
+    if self._waiting + self._active >= self.max_queue:
+      raise ServerBusyError("Too many queued messages; retry later")
+
+    self._prune_sessions()
+    key = (user_id, session_id)
+    state = self._sessions.setdefault(key, _SessionState())
+    self._waiting += 1
+    self._idle.clear()
+    waiting = True
+    try:
+      # The per-session lock is FIFO, which keeps turns of one conversation
+      # in arrival order; the semaphore bounds model calls across sessions.
+      async with state.lock:
+        async with self._inflight:
+          self._waiting -= 1
+          waiting = False
+          self._active += 1
+          try:
+            await self._ensure_session(key, state)
+            replies = await self._run_turn(user_id, session_id, text)
+            if replies is None:
+              # The backend evicted the session since we last used it.
+              state.created = False
+              await self._ensure_session(key, state)
+              replies = await self._run_turn(user_id, session_id, text) or []
+          finally:
+            self._active -= 1
+            state.last_used = time.monotonic()
+    finally:
+      if waiting:
+        self._waiting -= 1
+      if self._waiting + self._active == 0:
+        self._idle.set()
+    self.completed += 1
+    return replies
+
+  async def _run_turn(
+      self, user_id: str, session_id: str, text: str
+  ) -> Optional[List[str]]:
+    """Returns the turn's replies, or ``None`` if the session is gone."""
+    message = types.Content(role="user", parts=[types.Part.from_text(text=text)])
+    replies: List[str] = []
+    try:
+      async for event in self.runner.run_async(
+          user_id=user_id, session_id=session_id, new_message=message
+      ):
+        if event.author == "user" or event.partial:
+          continue
+        text = event_text(event)
+        if text:
+          replies.append(text)
+    except ValueError as exc:
+      if "Session not found" in str(exc) and not replies:
+        return None
+      raise
+    return replies
+
+  async def close_session(self, user_id: str, session_id: str) -> bool:
+    """Deletes one session once its pending messages have finished.
+
+    Returns whether the session existed, including pruned idle sessions.
+    """
+    key = (user_id, session_id)
+    state = self._sessions.setdefault(key, _SessionState())
+    service = self.runner.session_service
+    async with state.lock:
+      self._sessions.pop(key, None)
+      exists = state.created or (
+          await service.get_session(
+              app_name=self.app_name, user_id=user_id, session_id=session_id
+          )
+          is not None
+      )
+      if exists:
+        await service.delete_session(
+            app_name=self.app_name, user_id=user_id, session_id=session_id
+        )
+      # Messages already queued on this state start a fresh session.
+      state.created = False
+    return exists
+
+  # -- HTTP -----------------------------------------------------------------
+
+  async def _dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+    parts = [p for p in path.split("?", 1)[0].split("/") if p]
+    if parts == ["healthz"]:
+      return 200, self.stats
+    if len(parts) < 4 or parts[0] != "users" or parts[2] != "sessions":
+      return 404, {"error": "not found"}
+    user_id, session_id = parts[1], parts[3]
+    if len(parts) == 5 and parts[4] == "messages":
+      if method != "POST":
+        return 405, {"error": "use POST"}
+      try:
+        payload = json.loads(body or b"{}")
+        text = str(payload["text"]).strip()
+      except (ValueError, KeyError, TypeError):
+        return 400, {"error": 'body must be JSON like {"text": "..."}'}
+      if not text:
+        return 400, {"error": "text must not be empty"}
+      started = time.perf_counter()
+      try:
+        replies = await self.handle_message(user_id, session_id, text)
+      except ServerBusyError as exc:
+        return 503, {"error": str(exc)}
+      return 200, {
+          "session_id": session_id,
+          "replies": replies,
+          "latency": time.perf_counter() - started,
+      }
+    if len(parts) == 4:
+      if method != "DELETE":
+        return 405, {"error": "use DELETE"}
+      closed = await self.close_session(user_id, session_id)
+      return (200, {"closed": True}) if closed else (404, {"error": "unknown session"})
+    return 404, {"error": "not found"}
+
+  async def _handle_connection(
+      self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+  ) -> None:
+    task = asyncio.current_task()
+    if task is not None:
+      self._handlers.add(task)
+    self._connections[writer] = False
+    try:
+      while not self._closing:
+        request_line = await reader.readline()
+        if not request_line:
+          break
+        self._connections[writer] = True
+        try:
+          method, path, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+          await self._write(writer, 400, {"error": "malformed request"}, False)
+          break
+        headers: Dict[str, str] = {}
+        while True:
+          line = await reader.readline()
+          if line in (b"\r\n", b"\n", b""):
+            break
+          name, _, value = line.decode("latin-1").partition(":")
+          headers[name.strip().lower()] = value.strip()
+        try:
+          length = int(headers.get("content-length") or 0)
+        except ValueError:
+          length = -1
+        if length < 0:
+          await self._write(writer, 400, {"error": "invalid Content-Length"}, False)
+          break
+        keep_alive = headers.get("connection", "").lower() != "close"
+        if length > _MAX_BODY_BYTES:
+          await self._write(writer, 413, {"error": "body too large"}, False)
+          break
+        body = await reader.readexactly(length) if length else b""
+        try:
+          status, payload = await self._dispatch(method.upper(), path, body)
+        except Exception as exc:  # noqa: BLE001 - reported to the client
+          status, payload = 500, {"error": f"{exc.__class__.__name__}: {exc}"}
+        # Once shutdown has begun, clients are told not to reuse the socket.
+        keep_alive = keep_alive and not self._closing
+        await self._write(writer, status, payload, keep_alive)
+        self._connections[writer] = False
+        if not keep_alive:
+          break
+    except (asyncio.IncompleteReadError, ConnectionError):
+      pass
+    finally:
+      self._connections.pop(writer, None)
+      if task is not None:
+        self._handlers.discard(task)
+      writer.close()
+
+  @staticmethod
+  async def _write(
+      writer: asyncio.StreamWriter, status: int, payload: Any, keep_alive: bool
+  ) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+
+  async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+    """Starts listening; returns the underlying ``asyncio`` server."""
+    self._server = await asyncio.start_server(self._handle_connection, host, port)
+    return self._server
+
+  async def shutdown(self, timeout: float = 30.0) -> None:
+    """Stops accepting work, drains in-flight messages, closes all sessions.
+
+    Idle keep-alive connections are closed right away; connections with a
+    request in flight get their response with ``Connection: close``. Those
+    still open after ``timeout`` are aborted.
+    """
+    self._closing = True
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    if self._server is not None:
+      self._server.close()
+    # Handlers parked in readline() would keep wait_closed() waiting forever.
+    for writer, busy in list(self._connections.items()):
+      if not busy:
+        writer.close()
+    if self._handlers:
+      await asyncio.wait(set(self._handlers), timeout=timeout)
+    try:
+      await asyncio.wait_for(
+          self._idle.wait(), timeout=max(0.0, deadline - loop.time())
+      )
+    except asyncio.TimeoutError:
+      pass
+    for writer in list(self._connections):
+      writer.transport.abort()
+    if self._server is not None:
+      await self._server.wait_closed()
+    keys = list(self._sessions)
+    await asyncio.gather(
+        *(self.close_session(user_id, session_id) for user_id, session_id in keys),
+        return_exceptions=True,
+    )
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+  parser = argparse.ArgumentParser(description="Serve the hobby poem agent over HTTP")
+  parser.add_argument("--host", default="127.0.0.1")
+  parser.add_argument("--port", type=int, default=8080)
+  parser.add_argument(
+      "--max-inflight",
+      type=int,
+      default=64,
+      help="Messages processed concurrently across sessions (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--max-queue",
+      type=int,
+      default=1024,
+      help="Queued plus in-flight messages before returning 503 (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-backend",
+      choices=SESSION_BACKENDS,
+      default="memory",
+      help="Where sessions are stored (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-db",
+      default=DEFAULT_SESSION_DB,
+      help="SQLite file for --session-backend sqlite (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--session-ttl",
+      type=float,
+      default=None,
+      help="Evict in-memory sessions idle for this many seconds",
+  )
+  parser.add_argument(
+      "--max-sessions",
+      type=int,
+      default=None,
+      help="Keep at most this many in-memory sessions (least recently used go first)",
+  )
+  parser.add_argument(
+      "--idle-seconds",
+      type=float,
+      default=600.0,
+      help=(
+          "Forget the per-session bookkeeping of sessions idle this long; the"
+          " sessions themselves stay in the backend (default: %(default)s)"
+      ),
+  )
+  parser.add_argument(
+      "--poem-variants",
+      type=int,
+      default=0,
+      help="Cache up to this many poems per normalized hobby; 0 disables (default: %(default)s)",
+  )
+  parser.add_argument(
+      "--poem-ttl",
+      type=float,
+      default=None,
+      help="Expire cached poems after this many seconds",
+  )
+  parser.add_argument(
+      "--poem-max-hobbies",
+      type=int,
+      default=1000,
+      help="Hobbies kept in the poem cache (least recently used go first; default: %(default)s)",
+  )
+  parser.add_argument(
+      "--rate-limit",
+      default=None,
+      help=(
+          "Shared per-model budgets as MODEL=RPM[:TPM],... ('*' for any model);"
+          " requests wait in the interactive lane, ahead of batch jobs"
+      ),
+  )
+  parser.add_argument(
+      "--rate-limit-file",
+      default=None,
+      help="State file shared by rate-limited processes (default: in the temp dir)",
+  )
+  parser.add_argument(
+      "--route",
+      default=None,
+      metavar="SPEC",
+      help=(
+          "Route turns across models: 'default' or TURN=MODEL[:MODEL...],..."
+          " with turns question, poem and default (default: one model)"
+      ),
+  )
+  parser.add_argument(
+      "--hedge-after",
+      type=float,
+      default=None,
+      metavar="SECONDS",
+      help=(
+          "Race a routed request that is still silent after this long against"
+          " the next model; 0 turns hedging off"
+      ),
+  )
+  parser.add_argument(
+      "--shutdown-timeout",
+      type=float,
+      default=30.0,
+      help="Seconds to drain in-flight messages on shutdown (default: %(default)s)",
+  )
+  return parser.parse_args(argv)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+  session_service = create_session_service(
+      args.session_backend,
+      db_path=args.session_db,
+      ttl_seconds=args.session_ttl,
+      max_sessions=args.max_sessions,
+  )
+  poem_cache = None
+  if args.poem_variants > 0:
+    poem_cache = PoemCache(
+        variants=args.poem_variants,
+        ttl_seconds=args.poem_ttl,
+        max_keys=args.poem_max_hobbies,
+    )
+  rate_limiter = None
+  if args.rate_limit:
+    rate_limiter = RateLimiter(
+        parse_budgets(args.rate_limit),
+        state_path=args.rate_limit_file,
+        lane="interactive",
+    )
+  router = None
+  if args.route:
+    router = RoutingLlm(routes=parse_routes(args.route))
+    if args.hedge_after is not None:
+      router.hedge_after = args.hedge_after or None
+  server = GreetingServer(
+      session_service=session_service,
+      max_inflight=args.max_inflight,
+      max_queue=args.max_queue,
+      poem_cache=poem_cache,
+      rate_limiter=rate_limiter,
+      router=router,
+      idle_seconds=args.idle_seconds,
+  )
+  if isinstance(session_service, BoundedInMemorySessionService):
+    session_service.on_evict = server.forget_session
+  await server.start(args.host, args.port)
+  print(f"Hobby poem agent serving on http://{args.host}:{args.port}")
+  stop = asyncio.Event()
+  loop = asyncio.get_running_loop()
+  for sig in (signal.SIGINT, signal.SIGTERM):
+    try:
+      loop.add_signal_handler(sig, stop.set)
+    except NotImplementedError:  # pragma: no cover - e.g. Windows
+      pass
+  await stop.wait()
+  print("Shutting down...")
+  await server.shutdown(timeout=args.shutdown_timeout)
+  if poem_cache is not None:
+    print(f"Poem cache: {poem_cache.stats()}")
+  if rate_limiter is not None:
+    print(f"Rate limiter: {rate_limiter.stats()}")
+  if router is not None:
+    print(f"Routing: {router.stats()}")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+  args = _parse_args(argv)
+  try:
+    parse_budgets(args.rate_limit or "")
+    if args.route:
+      parse_routes(args.route)
+  except ValueError as exc:
+    print(exc)
+    return 2
+  if args.idle_seconds <= 0:
+    print("--idle-seconds must be positive")
+    return 2
+  load_dotenv()
+  asyncio.run(_serve(args))
+  return 0
+
+
+if __name__ == "__main__":
+  raise SystemExit(main())
@@ -0,0 +1,174 @@
+"""Session service backends: bounded in-memory or persistent SQLite.
+
+``InMemorySessionService`` keeps every session for the life of the process.
+``BoundedInMemorySessionService`` adds idle-TTL and LRU eviction so long
+running processes keep a flat memory profile, and the ``sqlite`` backend
+stores sessions through ADK's ``DatabaseSessionService`` (the
+``google-adk[database]`` extra) so conversations survive restarts.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+from google.adk.sessions import BaseSessionService
+from google.adk.sessions import InMemorySessionService
+
+SESSION_BACKENDS = ("memory", "sqlite")
+DEFAULT_SESSION_DB = "greeting_agent_sessions.db"
+
+_SessionKey = Tuple[str, str, str]
+
+
+class BoundedInMemorySessionService(InMemorySessionService):
+  """In-memory sessions evicted after ``ttl_seconds`` idle or past a cap.
+
+  Every read or write of a session refreshes its recency; eviction runs
+  lazily on those calls, oldest first.
+  """
+
+  def __init__(
+      self,
+      *,
+      ttl_seconds: Optional[float] = None,
+      max_sessions: Optional[int] = None,
+      on_evict: Optional[Callable[[str, str, str], None]] = None,
+  ):
+    super().__init__()
+    self.ttl_seconds = ttl_seconds
+    self.max_sessions = max_sessions
+    self.on_evict = on_evict
+    self.evictions = 0
+    self._last_used: "OrderedDict[_SessionKey, float]" = OrderedDict()
+
+  def _touch(self, key: _SessionKey) -> None:
+    self._last_used[key] = time.monotonic()
+    self._last_used.move_to_end(key)
+
+  async def _evict(self, keep: Optional[_SessionKey] = None) -> None:
+    now = time.monotonic()
+    while self._last_used:
+      key, last_used = next(iter(self._last_used.items()))
+      expired = self.ttl_seconds is not None and now - last_used > self.ttl_seconds
+      over_cap = (
+          self.max_sessions is not None and len(self._last_used) > self.max_sessions
+      )
+      if key == keep or not (expired or over_cap):
+        break
+      self._last_used.pop(key)
+      app_name, user_id, session_id = key
+      await super().delete_session(
+          app_name=app_name, user_id=user_id, session_id=session_id
+      )
+      self.evictions += 1
+      if self.on_evict:
+        self.on_evict(app_name, user_id, session_id)
+
+  async def create_session(self, *, app_name: str, user_id: str, **kwargs: Any):
+    session = await super().create_session(
+        app_name=app_name, user_id=user_id, **kwargs
+    )
+    key = (app_name, user_id, session.id)
+    self._touch(key)
+    await self._evict(keep=key)
+    return session
+
+  async def get_session(
+      self, *, app_name: str, user_id: str, session_id: str, **kwargs: Any
+  ):
+    key = (app_name, user_id, session_id)
+    await self._evict()
+    session = await super().get_session(
+        app_name=app_name, user_id=user_id, session_id=session_id, **kwargs
+    )
+    if session is not None:
+      self._touch(key)
+    return session
+
+  async def append_event(self, session, event):
+    self._touch((session.app_name, session.user_id, session.id))
+    return await super().append_event(session, event)
+
+  async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+    self._last_used.pop((app_name, user_id, session_id), None)
+    await super().delete_session(
+        app_name=app_name, user_id=user_id, session_id=session_id
+    )
+
+
+def _enable_wal(engine: Any) -> None:
+  """Switches a SQLite engine to WAL and applies pragmas to new connections."""
+  from sqlalchemy import event
+
+  @event.listens_for(engine, "connect")
+  def _set_pragmas(dbapi_connection, _connection_record):  # noqa: ANN001
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+  # journal_mode is stored in the database file, so set it once right away
+  # as well; connections opened before the listener existed pick it up.
+  with engine.connect() as connection:
+    connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+
+
+def create_session_service(
+    backend: str = "memory",
+    *,
+    db_path: str | Path = DEFAULT_SESSION_DB,
+    ttl_seconds: Optional[float] = None,
+    max_sessions: Optional[int] = None,
+    pool_size: int = 5,
+    on_evict: Optional[Callable[[str, str, str], None]] = None,
+) -> BaseSessionService:
+  """Builds the session service selected by ``backend``.
+
+  Args:
+    backend: ``memory`` or ``sqlite``.
+    db_path: SQLite database file for the ``sqlite`` backend.
+    ttl_seconds: Idle time after which in-memory sessions are evicted.
+    max_sessions: Maximum number of in-memory sessions kept (LRU).
+    pool_size: Connections kept open by the SQLite connection pool.
+    on_evict: Called with ``(app_name, user_id, session_id)`` whenever the
+      in-memory backend evicts a session.
+
+  Returns:
+    A ready-to-use ``BaseSessionService``.
+  """
+  if backend == "memory":
+    if ttl_seconds is None and max_sessions is None:
+      return InMemorySessionService()
+    return BoundedInMemorySessionService(
+        ttl_seconds=ttl_seconds, max_sessions=max_sessions, on_evict=on_evict
+    )
+  if backend == "sqlite":
+    try:
+      from google.adk.sessions import DatabaseSessionService
+    except ImportError as exc:
+      raise RuntimeError(
+          "The sqlite session backend needs the google-adk[database] extra."
+      ) from exc
+    path = Path(db_path).expanduser().resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    service = DatabaseSessionService(
+        db_url=f"sqlite:///{path}",
+        pool_size=pool_size,
+        pool_pre_ping=True,
+        connect_args={"check_same_thread": False},
+    )
+    _enable_wal(service.db_engine)
+    return service
+  raise ValueError(f"Unknown session backend {backend!r}; expected one of {SESSION_BACKENDS}")
+
+
+__all__ = [
+    "BoundedInMemorySessionService",
+    "DEFAULT_SESSION_DB",
+    "SESSION_BACKENDS",
+    "create_session_service",
+]
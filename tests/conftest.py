@@ -0,0 +1,40 @@
+"""Puts ``src`` on ``sys.path`` so the tests run from a plain checkout."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_ROOT = Path(__file__).resolve().parents[1] / "src"
+if str(SRC_ROOT) not in sys.path:
+  sys.path.insert(0, str(SRC_ROOT))
+
+_FAKE_AGENT = '''
+import os
+
+from greeting_agent.agent import create_greeting_agent
+from greeting_agent.fake_llm import FakeLlm
+
+root_agent = create_greeting_agent(
+    model=FakeLlm(latency=float(os.environ.get("FAKE_LLM_LATENCY", "0")))
+)
+'''
+
+
+@pytest.fixture
+def fake_agent_module(tmp_path, monkeypatch):
+  """Name of an agent package backed by ``FakeLlm``, laid out for AgentEvaluator.
+
+  The package is importable here and, through ``PYTHONPATH``, in worker
+  processes; ``FAKE_LLM_LATENCY`` sets the fake's delay in both.
+  """
+  root = tmp_path / "agents"
+  package = root / "fake_agent"
+  package.mkdir(parents=True)
+  (package / "__init__.py").write_text("from . import agent\n", encoding="utf-8")
+  (package / "agent.py").write_text(_FAKE_AGENT, encoding="utf-8")
+  monkeypatch.syspath_prepend(str(root))
+  paths = [str(root), str(SRC_ROOT), os.environ.get("PYTHONPATH", "")]
+  monkeypatch.setenv("PYTHONPATH", os.pathsep.join(path for path in paths if path))
+  return "fake_agent"
@@ -0,0 +1,55 @@
+"""Tests for the adaptive repeat policy."""
+
+from greeting_agent.adaptive_runs import AdaptivePolicy
+from greeting_agent.adaptive_runs import CaseRuns
+from greeting_agent.execute_evalsets import NUM_RUNS
+
+
+def _run(policy, outcomes):
+  case = CaseRuns(case_id="case")
+  for passed in outcomes:
+    if not case.observe(passed, policy):
+      break
+  return case
+
+
+def test_defaults_decide_steady_cases_after_two_runs():
+  policy = AdaptivePolicy()
+  clean = _run(policy, [True] * 10)
+  assert (clean.runs, clean.passed, clean.decided) == (2, True, True)
+  broken = _run(policy, [False] * 10)
+  assert (broken.runs, broken.passed, broken.decided) == (2, False, True)
+  flaky = _run(policy, [True, False, True, True])
+  assert (flaky.runs, flaky.passed, flaky.decided) == (3, True, False)
+
+
+def test_defaults_spend_fewer_runs_than_fixed_repetition():
+  suite = [[True] * 4] * 8 + [[False] * 4, [True, False, False, True]]
+  adaptive = sum(_run(AdaptivePolicy(), outcomes).runs for outcomes in suite)
+  strict = sum(
+      _run(AdaptivePolicy(max_runs=4, pass_rate=1.0, confidence=0.8), outcomes).runs
+      for outcomes in suite
+  )
+  assert adaptive <= NUM_RUNS * len(suite) + 1
+  assert adaptive < strict
+
+
+def test_pass_rate_of_one_requires_every_run():
+  policy = AdaptivePolicy(max_runs=4, pass_rate=1.0)
+  clean = _run(policy, [True] * 10)
+  assert (clean.runs, clean.passed, clean.decided) == (4, True, True)
+  assert not _run(policy, [True, False, True, True]).passed
+
+
+def test_looks_are_bonferroni_adjusted():
+  policy = AdaptivePolicy(max_runs=8, pass_rate=0.5, confidence=0.8)
+  assert policy.look_confidence == 1 - 0.2 / 8
+  # Unadjusted, three clean runs would already clear a 0.5 pass rate.
+  assert policy.verdict(3, 3) is None
+  assert AdaptivePolicy(max_runs=1, pass_rate=0.5, confidence=0.8).verdict(3, 3)
+
+
+def test_lower_pass_rate_stops_early():
+  policy = AdaptivePolicy(max_runs=8, pass_rate=0.5)
+  assert _run(policy, [True] * 8).runs < 8
+  assert not _run(policy, [False] * 8).passed
@@ -0,0 +1,33 @@
+"""Tests for ``batch.run_conversation`` over ``FakeLlm``."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.batch import run_conversation  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+
+
+class _FailingDelete(InMemorySessionService):
+
+  async def delete_session(self, **kwargs):
+    raise OSError("backend unavailable")
+
+
+def test_reports_failed_session_cleanup():
+  runner = Runner(
+      app_name="batch_test",
+      agent=create_greeting_agent(model=FakeLlm()),
+      session_service=_FailingDelete(),
+  )
+  record = asyncio.run(run_conversation(runner, '{"id": "c1", "turns": ["hi"]}', 0))
+
+  assert record["turns"][0]["replies"] == [FakeLlm().responses[0]]
+  assert record["error"] == "session cleanup failed: OSError: backend unavailable"
+  assert "latency" in record
@@ -0,0 +1,80 @@
+"""Tests for the console's token-by-token streaming and profiling."""
+
+import asyncio
+import io
+import json
+import time
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+
+from greeting_agent import cli  # noqa: E402
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+
+
+class _TimedWriter(io.StringIO):
+  """Records when each chunk was written."""
+
+  def __init__(self):
+    super().__init__()
+    self.writes = []
+
+  def write(self, text):
+    self.writes.append((time.perf_counter(), text))
+    return super().write(text)
+
+
+def test_stream_turn_prints_deltas_as_they_arrive():
+  model = FakeLlm(latency=0.05, tokens_per_second=50)
+  runner = Runner(
+      app_name=cli._DEFAULT_APP_NAME,
+      agent=create_greeting_agent(model=model),
+      session_service=InMemorySessionService(),
+  )
+  out = _TimedWriter()
+
+  async def turn():
+    await runner.session_service.create_session(
+        app_name=cli._DEFAULT_APP_NAME, user_id="u", session_id="s"
+    )
+    started = time.perf_counter()
+    first_text, total = await cli._stream_turn(
+        runner, user_id="u", session_id="s", message=cli._user_message("hi"), out=out
+    )
+    return started, first_text, total
+
+  started, first_text, total = asyncio.run(turn())
+
+  reply = model.responses[0]
+  # The final event repeats the deltas; it is not printed a second time.
+  assert out.getvalue() == f"Agent: {reply}\n"
+  deltas = [at for at, text in out.writes if text not in ("Agent: ", "\n")]
+  assert len(deltas) == len(reply.split())
+  # The first words reach the console well before the reply is complete.
+  assert deltas[0] - started < total / 2
+  assert 0.05 <= first_text < total
+
+
+def test_profile_flag_times_the_console_phases(monkeypatch, capsys, tmp_path):
+  monkeypatch.chdir(tmp_path)
+  monkeypatch.setenv("GOOGLE_API_KEY", "test")
+  create_agent = cli.create_greeting_agent
+  monkeypatch.setattr(
+      cli,
+      "create_greeting_agent",
+      lambda **kwargs: create_agent(**{**kwargs, "model": FakeLlm()}),
+  )
+  monkeypatch.setattr("sys.stdin", io.StringIO("hi\npainting\nexit\n"))
+
+  assert cli.main(["--profile", str(tmp_path / "prof" / "console")]) == 0
+
+  data = json.loads((tmp_path / "prof" / "console.json").read_text(encoding="utf-8"))
+  assert {"load", "session", "input", "model_wait", "write"} <= set(data["phases"])
+  assert data["phases"]["input"]["calls"] == 3
+  assert (tmp_path / "prof" / "console.collapsed").is_file()
+  assert "Profile written to" in capsys.readouterr().err
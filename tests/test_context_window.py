@@ -0,0 +1,127 @@
+"""Tests for ``ContextWindow`` budgets."""
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent import context_window  # noqa: E402
+from greeting_agent.context_window import ContextWindow  # noqa: E402
+from greeting_agent.context_window import budget_for  # noqa: E402
+from greeting_agent.context_window import parse_model_budgets  # noqa: E402
+
+
+def test_model_budget_spec_overrides_defaults():
+  budgets = parse_model_budgets("gemini-2.5-flash=6000, *=3000")
+  assert budget_for("gemini-2.5-flash", budgets) == 6000
+  assert budget_for("gemini-2.5-flash-preview-05-20", budgets) == 6000
+  assert budget_for("gemini-2.5-pro", budgets) == 8_000
+  assert budget_for("other-model", budgets) == 3000
+  assert budget_for("other-model") == context_window.DEFAULT_CONTEXT_BUDGET
+
+
+@pytest.mark.parametrize("spec", ["gemini-2.5-flash", "=100", "gemini-2.5-flash=0", "x=lots"])
+def test_invalid_model_budget_spec(spec):
+  with pytest.raises(ValueError, match="MODEL=TOKENS"):
+    parse_model_budgets(spec)
+
+
+def test_window_from_spec(monkeypatch):
+  assert ContextWindow.from_spec(None) is None
+  assert ContextWindow.from_spec("0") is None
+  assert ContextWindow.from_spec(1500).budget_for("gemini-2.5-pro") == 1500
+  assert ContextWindow.from_spec("auto").budget_for("gemini-2.5-pro") == 8_000
+  monkeypatch.setenv(context_window.CONTEXT_BUDGET_ENV, "gemini-2.5-pro=500")
+  window = ContextWindow.from_env()
+  assert window.budget_for("gemini-2.5-pro") == 500
+  assert window.budget_for("gemini-2.0-flash") == 4_000
+
+
+class _Context:
+  """The ``CallbackContext`` surface ``ContextWindow`` uses."""
+
+  def __init__(self):
+    self.state = {}
+
+
+def _content(role, text):
+  return types.Content(role=role, parts=[types.Part.from_text(text=text)])
+
+
+def _history(turns):
+  contents = []
+  for index in range(turns):
+    contents.append(_content("user", f"question {index} " + "word " * 40))
+    contents.append(_content("model", f"answer {index} " + "word " * 40))
+  contents.append(_content("user", "latest question"))
+  return contents
+
+
+def _request(contents):
+  return LlmRequest(model="gemini-2.0-flash", contents=list(contents))
+
+
+def test_history_within_budget_is_untouched():
+  window = ContextWindow(10_000)
+  request = _request(_history(3))
+  window.before_model(_Context(), request)
+  assert len(request.contents) == 7
+  assert window.trimmed_turns == 0
+
+
+def test_older_turns_are_folded_into_a_summary():
+  window = ContextWindow(200)
+  contents = _history(6)
+  request = _request(contents)
+  window.before_model(_Context(), request)
+
+  kept = request.contents
+  assert kept[-1].parts[0].text == "latest question"
+  assert kept[0].role == "user" and len(kept) < len(contents)
+  assert sum(context_window.content_tokens(c) for c in kept) <= 150
+  instruction = request.config.system_instruction
+  assert "Summary of the earlier conversation:" in instruction
+  # The newest dropped lines survive the summary's own budget.
+  dropped = contents[: len(contents) - len(kept)]
+  assert dropped[-1].parts[0].text.split()[1] in instruction
+  assert window.trimmed_turns == 1
+
+
+def test_summary_extends_incrementally_per_session():
+  calls = []
+
+  def summarizer(previous, dropped):
+    calls.append(len(dropped))
+    return context_window.extractive_summary(previous, dropped)
+
+  window = ContextWindow(200, summarizer=summarizer)
+  context = _Context()
+  contents = _history(6)
+  window.before_model(context, _request(contents))
+  window.before_model(context, _request(contents))
+  longer = contents[:-1] + _history(8)[12:]
+  window.before_model(context, _request(longer))
+
+  # Repeats reuse the cached summary; new turns only fold what slid out.
+  assert len(calls) == 2 and sum(calls) < len(longer)
+  window.before_model(_Context(), _request(contents))
+  assert len(calls) == 3
+
+
+def test_recent_contents_are_kept_even_over_budget():
+  window = ContextWindow(10, min_recent=3)
+  contents = _history(2)
+  request = _request(contents)
+  window.before_model(_Context(), request)
+  assert request.contents == contents[-3:]
+
+
+def test_window_starts_on_a_user_turn():
+  # The two most recent contents start on an agent reply; it is dropped.
+  window = ContextWindow(10, min_recent=2)
+  contents = _history(2)
+  request = _request(contents)
+  window.before_model(_Context(), request)
+  assert request.contents == contents[-1:]
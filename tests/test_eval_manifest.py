@@ -0,0 +1,72 @@
+"""Tests for the fingerprints behind ``--changed-only``."""
+
+import json
+
+import pytest
+
+from greeting_agent.eval_manifest import EvalManifest
+from greeting_agent.eval_manifest import agent_fingerprint
+from greeting_agent.eval_manifest import evalset_fingerprint
+
+
+@pytest.fixture
+def evalset(tmp_path):
+  path = tmp_path / "a.evalset.json"
+  path.write_text(json.dumps({"eval_set_id": "a", "eval_cases": []}), encoding="utf-8")
+  return path
+
+
+def _fingerprint(path, **overrides):
+  kwargs = {"agent_fp": "agent", "num_runs": 2, "initial_session_file": None, "mode": ""}
+  kwargs.update(overrides)
+  return evalset_fingerprint(path, **kwargs)
+
+
+def test_evalset_fingerprint_tracks_every_input(evalset, tmp_path):
+  base = _fingerprint(evalset)
+  assert _fingerprint(evalset) == base
+  session = tmp_path / "session.json"
+  session.write_text("{}", encoding="utf-8")
+  changed = [
+      _fingerprint(evalset, agent_fp="other"),
+      _fingerprint(evalset, num_runs=3),
+      _fingerprint(evalset, initial_session_file=str(session)),
+      _fingerprint(evalset, mode="adaptive"),
+  ]
+  assert base not in changed and len(set(changed)) == len(changed)
+
+  (tmp_path / "test_config.json").write_text('{"criteria": {}}', encoding="utf-8")
+  with_config = _fingerprint(evalset)
+  assert with_config != base
+  evalset.write_text(json.dumps({"eval_set_id": "a", "eval_cases": [{}]}), encoding="utf-8")
+  assert _fingerprint(evalset) not in (base, with_config)
+
+
+def test_agent_fingerprint_tracks_module_sources(tmp_path, monkeypatch):
+  package = tmp_path / "tiny_agent"
+  package.mkdir()
+  source = package / "__init__.py"
+  source.write_text("root_agent = None\n", encoding="utf-8")
+  monkeypatch.syspath_prepend(str(tmp_path))
+
+  before = agent_fingerprint("tiny_agent")
+  assert agent_fingerprint("tiny_agent") == before
+  source.write_text("root_agent = None  # edited\n", encoding="utf-8")
+  assert agent_fingerprint("tiny_agent") != before
+
+
+def test_manifest_only_returns_entries_with_matching_fingerprint(evalset, tmp_path):
+  path = tmp_path / "manifest.json"
+  manifest = EvalManifest.load(path)
+  manifest.update(evalset, "fp1", True, "ok")
+  manifest.save()
+
+  reloaded = EvalManifest.load(path)
+  entry = reloaded.lookup(evalset, "fp1")
+  assert (entry.passed, entry.details) == (True, "ok")
+  assert reloaded.lookup(evalset, "fp2") is None
+
+  data = json.loads(path.read_text(encoding="utf-8"))
+  data["version"] += 1
+  path.write_text(json.dumps(data), encoding="utf-8")
+  assert EvalManifest.load(path).lookup(evalset, "fp1") is None
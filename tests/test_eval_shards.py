@@ -0,0 +1,94 @@
+"""Tests for round-robin evalset sharding and merging shard results."""
+
+import json
+
+import pytest
+
+from greeting_agent.eval_shards import ShardResult
+from greeting_agent.eval_shards import merge_results
+from greeting_agent.eval_shards import parse_shard
+from greeting_agent.eval_shards import read_results
+from greeting_agent.eval_shards import shard_evalsets
+from greeting_agent.eval_shards import write_results
+from greeting_agent.evalset_io import case_id
+from greeting_agent.evalset_io import load_evalset
+
+
+def _evalset(directory, name, ids):
+  directory.mkdir(exist_ok=True)
+  path = directory / f"{name}.evalset.json"
+  cases = [{"eval_id": eval_id, "conversation": []} for eval_id in ids]
+  path.write_text(json.dumps({"eval_set_id": name, "eval_cases": cases}), encoding="utf-8")
+  return path
+
+
+def test_shard_spec():
+  assert parse_shard(" 2 / 4 ") == (2, 4)
+  for spec in ("0/4", "5/4", "1/0", "1", "a/b"):
+    with pytest.raises(ValueError, match="Invalid shard"):
+      parse_shard(spec)
+
+
+def test_cases_are_dealt_round_robin_across_evalsets(tmp_path):
+  evals = tmp_path / "evals"
+  first = _evalset(evals, "a", ["a0", "a1", "a2"])
+  second = _evalset(evals, "b", ["b0", "b1"])
+  (evals / "test_config.json").write_text('{"criteria": {}}', encoding="utf-8")
+  work = tmp_path / "work"
+
+  plans = {
+      index: shard_evalsets([first, second], (index, 3), work) for index in (1, 2, 3)
+  }
+
+  dealt = {
+      index: [(plan.source.name, plan.case_ids) for plan in shard]
+      for index, shard in plans.items()
+  }
+  assert dealt == {
+      1: [("a.evalset.json", ["a0"]), ("b.evalset.json", ["b0"])],
+      2: [("a.evalset.json", ["a1"]), ("b.evalset.json", ["b1"])],
+      3: [("a.evalset.json", ["a2"])],
+  }
+  for shard in plans.values():
+    for plan in shard:
+      assert [case_id(c) for c in load_evalset(plan.path)["eval_cases"]] == plan.case_ids
+      assert (plan.path.parent / "test_config.json").is_file()
+  # The same slice is reused, not rewritten, by the next run.
+  assert [p.path for p in shard_evalsets([first, second], (1, 3), work)] == [
+      p.path for p in plans[1]
+  ]
+
+
+@pytest.mark.parametrize("suffix", [".json", ".xml"])
+def test_results_round_trip(suffix, tmp_path):
+  results = [
+      ShardResult("evals/a.evalset.json", True, "all criteria satisfied", ["a0", "a2"]),
+      ShardResult("evals/b.evalset.json", False, "b1 below threshold", ["b1"]),
+  ]
+  path = write_results(tmp_path / f"shard{suffix}", results, (2, 3))
+  assert read_results(path) == ((2, 3), results)
+
+
+def test_merge_combines_slices_and_reports_gaps(tmp_path):
+  write_results(
+      tmp_path / "1.json",
+      [ShardResult("a", True, "ok", ["a0"]), ShardResult("b", True, "ok", ["b0"])],
+      (1, 3),
+  )
+  write_results(
+      tmp_path / "2.xml",
+      [ShardResult("a", False, "a1 failed", ["a1"]), ShardResult("b", True, "ok", ["b1"])],
+      (2, 3),
+  )
+
+  merged, problems = merge_results([tmp_path / "1.json", tmp_path / "2.xml"])
+  assert [(r.evalset, r.passed, r.cases) for r in merged] == [
+      ("a", False, ["a0", "a1"]),
+      ("b", True, ["b0", "b1"]),
+  ]
+  assert merged[0].details == "shard 2/3: a1 failed"
+  assert merged[1].details == "all criteria satisfied (2 cases)"
+  assert problems == ["missing results for shard(s) 3/3"]
+
+  _, problems = merge_results([tmp_path / "1.json", tmp_path / "1.json"])
+  assert "shard 1/3 appears more than once" in problems[0]
@@ -0,0 +1,142 @@
+"""Tests for evalset formats, derived copies and streaming reads."""
+
+import io
+import json
+
+import pytest
+
+from greeting_agent import evalset_io
+from greeting_agent.evalset_io import EVALSET_FORMATS
+from greeting_agent.evalset_io import evalset_path
+from greeting_agent.evalset_io import load_evalset
+from greeting_agent.evalset_io import materialize_evalset
+from greeting_agent.evalset_io import write_evalset
+
+_PAYLOAD = {
+    "eval_set_id": "s",
+    "description": None,
+    "eval_cases": [
+        {
+            "eval_id": f"c{index}",
+            "session_input": None,
+            "conversation": [
+                {
+                    "user_content": {"role": "user", "parts": [{"text": "hi", "blob": None}]},
+                    "final_response": {"parts": [{"text": f"reply {index}"}]},
+                }
+            ],
+        }
+        for index in range(3)
+    ],
+}
+
+
+@pytest.mark.parametrize("fmt", EVALSET_FORMATS)
+def test_formats_round_trip(fmt, tmp_path):
+  path = write_evalset(_PAYLOAD, evalset_path(tmp_path, "s", fmt), fmt)
+  expected = _PAYLOAD if fmt == "json" else evalset_io.strip_none(_PAYLOAD)
+  assert load_evalset(path) == expected
+
+
+def test_compact_drops_nulls_and_whitespace(tmp_path):
+  legacy = write_evalset(_PAYLOAD, tmp_path / "legacy.evalset.json", "json")
+  compact = write_evalset(_PAYLOAD, tmp_path / "compact.evalset.json", "compact")
+  text = compact.read_text(encoding="utf-8")
+  assert "null" not in text and "\n" not in text
+  assert len(text) < len(legacy.read_text(encoding="utf-8")) / 2
+  # Lists keep their length, so turns and parts stay aligned.
+  assert [len(case["conversation"]) for case in load_evalset(compact)["eval_cases"]] == [1, 1, 1]
+
+
+def test_materialized_copy_is_reused_until_its_inputs_change(tmp_path):
+  source_dir = tmp_path / "evals"
+  source_dir.mkdir()
+  plain = write_evalset(_PAYLOAD, source_dir / "p.evalset.json", "compact")
+  assert materialize_evalset(plain, tmp_path / "cache") == plain
+
+  source = write_evalset(_PAYLOAD, evalset_path(source_dir, "s", "jsonl"), "jsonl")
+  cache = tmp_path / "cache"
+  first = materialize_evalset(source, cache)
+  assert first.name == "s.evalset.json"
+  assert load_evalset(first) == evalset_io.strip_none(_PAYLOAD)
+  assert materialize_evalset(source, cache) == first
+
+  (source_dir / "test_config.json").write_text(
+      json.dumps({"criteria": {"response_match_score": 0.5}}), encoding="utf-8"
+  )
+  second = materialize_evalset(source, cache)
+  assert second != first and not first.exists()
+  assert (second.parent / "test_config.json").is_file()
+
+
+def _case(index):
+  return {"eval_id": f"c{index}", "conversation": [{"final_response": {"parts": [{"text": "x"}]}}]}
+
+
+def test_journal_flushes_cases_and_drops_a_torn_tail(tmp_path):
+  path = tmp_path / "s.evalset.partial.jsonl"
+  journal = evalset_io.EvalsetJournal.open(path, {"eval_set_id": "s"})
+  journal.append(_case(1))
+  journal.append(_case(0))
+  # Flushed while still open, so a crash right now loses nothing.
+  assert len(path.read_text(encoding="utf-8").splitlines()) == 3
+  journal.close()
+  with path.open("a", encoding="utf-8") as handle:
+    handle.write('{"eval_id":"c2","conv')  # killed mid-write
+
+  reopened = evalset_io.EvalsetJournal.open(path)
+  assert reopened.header == {"eval_set_id": "s"}
+  assert reopened.completed_ids == {"c0", "c1"}
+  reopened.append(_case(2))
+  out = reopened.compact(tmp_path / "s.evalset.json", "compact", order=["c0", "c1", "c2", "c9"])
+  reopened.remove()
+
+  assert [case["eval_id"] for case in load_evalset(out)["eval_cases"]] == ["c0", "c1", "c2"]
+  assert not path.exists()
+
+
+def test_missing_journal_needs_a_header(tmp_path):
+  with pytest.raises(FileNotFoundError):
+    evalset_io.EvalsetJournal.open(tmp_path / "missing.evalset.partial.jsonl")
+
+
+_RECORDS = [
+    {"id": "a", "turns": ["[not, a] \"list\"", "café \\u00e9"]},
+    123,
+    1.5e3,
+    -0.25,
+    True,
+    None,
+    "]",
+    [],
+    {"nested": [[1, 2], {"k": "},"}]},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 16])
+def test_json_array_streams_across_chunk_edges(chunk_size):
+  text = " [ " + " , ".join(json.dumps(record) for record in _RECORDS) + " ] "
+  records = list(evalset_io.iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+  assert records == _RECORDS
+
+
+def test_json_array_reads_lazily():
+  handle = io.StringIO("[" + ",".join(json.dumps({"id": i}) for i in range(1000)) + "]")
+  records = evalset_io.iter_json_array(handle, chunk_size=64)
+  assert next(records) == {"id": 0}
+  assert handle.tell() < 1000
+
+
+@pytest.mark.parametrize("text", ['{"id": 1}', "[1 2]", "[1,", '[{"id": 1]'])
+def test_malformed_json_array(text):
+  with pytest.raises(ValueError):
+    list(evalset_io.iter_json_array(io.StringIO(text), chunk_size=2))
+
+
+def test_json_records_from_lines_or_array(tmp_path):
+  lines = tmp_path / "scripts.jsonl"
+  lines.write_text('{"id": "a"}\n\n{"id": "b"}\n', encoding="utf-8")
+  array = tmp_path / "scripts.json"
+  array.write_text('[{"id": "a"}, {"id": "b"}]', encoding="utf-8")
+  assert list(evalset_io.iter_json_records(lines)) == [{"id": "a"}, {"id": "b"}]
+  assert list(evalset_io.iter_json_records(array)) == [{"id": "a"}, {"id": "b"}]
@@ -0,0 +1,125 @@
+"""Tests for ``event_text`` against the ``model_dump`` extractor it replaced."""
+
+from typing import Any, Optional
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.events import Event  # noqa: E402
+from google.genai import types  # noqa: E402
+from pydantic import BaseModel  # noqa: E402
+
+from greeting_agent.event_text import TurnText  # noqa: E402
+from greeting_agent.event_text import event_text  # noqa: E402
+
+
+def _first_text(content: Any) -> Optional[str]:
+  if content is None:
+    return None
+  parts = getattr(content, "parts", None)
+  if parts is None and isinstance(content, dict):
+    parts = content.get("parts")
+  for part in parts or []:
+    text = getattr(part, "text", None)
+    if text is None and isinstance(part, dict):
+      text = part.get("text")
+    if isinstance(text, str) and text.strip():
+      return text
+  return None
+
+
+def _legacy_text(event: Any) -> Optional[str]:
+  """generate_evalset's extractor before event_text, trimmed to its logic."""
+  if event is None:
+    return None
+  found = _first_text(event) or _first_text(getattr(event, "content", None))
+  if found:
+    return found
+  if hasattr(event, "model_dump"):
+    found = _legacy_text(event.model_dump())
+    if found:
+      return found
+  if isinstance(event, dict):
+    found = _first_text(event.get("content"))
+    if found:
+      return found
+    for path in (
+        ("final_response", "parts", 0, "text"),
+        ("response", "text"),
+        ("assistant", "text"),
+        ("message", "content", 0, "text"),
+    ):
+      current: Any = event
+      try:
+        for key in path:
+          current = current[key]
+      except (KeyError, IndexError, TypeError):
+        continue
+      if isinstance(current, str) and current.strip():
+        return current
+    for value in event.values():
+      if isinstance(value, dict) and isinstance(value.get("text"), str):
+        if value["text"].strip():
+          return value["text"]
+  return None
+
+
+class _Reply(BaseModel):
+  assistant: dict
+
+
+def _event(*parts, partial=False):
+  return Event(
+      author="greeting_agent",
+      partial=partial,
+      content=types.Content(role="model", parts=list(parts)) if parts else None,
+  )
+
+
+_CALL = types.Part(function_call=types.FunctionCall(name="lookup", args={}))
+
+_SHAPES = [
+    _event(types.Part(text="What is your hobby?")),
+    _event(_CALL, types.Part(text="after a call")),
+    _event(_CALL),
+    _event(),
+    _event(types.Part(text="   ")),
+    types.Content(role="model", parts=[types.Part(text="bare content")]),
+    {"content": {"parts": [{"text": "dumped event"}]}},
+    {"final_response": {"parts": [{"text": "final"}]}},
+    {"response": {"text": "response"}},
+    {"message": {"content": [{"text": "message"}]}},
+    {"other": {"text": "nested"}},
+    {"nothing": 1},
+    _Reply(assistant={"text": "pydantic reply"}),
+    None,
+]
+
+
+@pytest.mark.parametrize("shape", _SHAPES)
+def test_matches_model_dump_extractor(shape):
+  text = event_text(shape)
+  # Both sides drop blank text, as every caller does.
+  assert (text if text.strip() else None) == _legacy_text(shape)
+
+
+def test_multiple_text_parts_are_joined():
+  event = _event(types.Part(text="Roses"), _CALL, types.Part(text="are red"))
+  # The console always joined every part; the generator kept only the first.
+  assert event_text(event) == "Roses are red"
+  assert event_text(event, "\n") == "Roses\nare red"
+
+
+def test_turn_text_keeps_one_copy_of_a_streamed_reply():
+  turn = TurnText()
+  chunks = ["Brushes ", "whisper ", "colour."]
+  assert [turn.add(_event(types.Part(text=c), partial=True)) for c in chunks] == [None] * 3
+  assert turn.text == "Brushes whisper colour."
+  user = Event(author="user", content=types.Content(role="user", parts=[types.Part(text="hi")]))
+  assert turn.add(user) is None
+  assert turn.add(_event(types.Part(text="Brushes whisper colour."))) == "Brushes whisper colour."
+  # A final event without text completes the streamed chunks instead.
+  turn.add(_event(types.Part(text="Done"), partial=True))
+  assert turn.add(_event(_CALL)) == "Done"
+  assert turn.replies == 2
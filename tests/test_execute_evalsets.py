@@ -0,0 +1,337 @@
+"""Tests for how ``execute_evalsets`` schedules evaluations."""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+# _evaluate retries quota errors through rate_limit, which needs ADK.
+pytest.importorskip("google.adk")
+
+from greeting_agent import execute_evalsets  # noqa: E402
+from greeting_agent.adaptive_runs import AdaptivePolicy  # noqa: E402
+from greeting_agent.evalset_io import load_evalset  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+
+
+class _FakeEvaluator:
+  """Stands in for ``AgentEvaluator``: cases whose id starts with ``fail`` fail."""
+
+  def __init__(self, delay=0.05):
+    self.delay = delay
+    self.calls = 0
+    self.in_flight = 0
+    self.peak = 0
+
+  async def evaluate(self, *, eval_dataset_file_path_or_dir, num_runs, **_):
+    self.calls += 1
+    self.in_flight += 1
+    self.peak = max(self.peak, self.in_flight)
+    try:
+      await asyncio.sleep(self.delay)
+    finally:
+      self.in_flight -= 1
+    cases = load_evalset(Path(eval_dataset_file_path_or_dir))["eval_cases"]
+    if any(case["eval_id"].startswith("fail") for case in cases):
+      raise AssertionError("response_match_score below threshold")
+
+
+def _write_evalset(path, ids):
+  path.write_text(
+      json.dumps(
+          {
+              "eval_set_id": path.stem,
+              "eval_cases": [{"eval_id": eval_id, "conversation": []} for eval_id in ids],
+          }
+      ),
+      encoding="utf-8",
+  )
+  return path
+
+
+def test_adaptive_runs_cases_concurrently(tmp_path):
+  path = _write_evalset(
+      tmp_path / "a.evalset.json", ["pass0", "pass1", "pass2", "fail3"]
+  )
+  evaluator = _FakeEvaluator()
+  result = asyncio.run(
+      execute_evalsets._evaluate_adaptive(
+          evaluator, path, "agent", None, AdaptivePolicy()
+      )
+  )
+
+  assert not result.passed
+  assert [(case.case_id, case.runs, case.passed) for case in result.cases] == [
+      ("pass0", 2, True),
+      ("pass1", 2, True),
+      ("pass2", 2, True),
+      ("fail3", 2, False),
+  ]
+  assert evaluator.calls == 8
+  assert evaluator.peak == min(4, execute_evalsets.PER_CASE_PARALLELISM)
+
+
+def test_native_engine_bounds_concurrency_and_keeps_order(tmp_path, monkeypatch):
+  evaluator = _FakeEvaluator(delay=0.1)
+  monkeypatch.setattr(execute_evalsets, "_import_agent_evaluator", lambda: evaluator)
+  paths = [
+      _write_evalset(tmp_path / f"{name}.evalset.json", [name])
+      for name in ("pass0", "fail1", "pass2", "pass3")
+  ]
+
+  results = execute_evalsets.run_evalsets(paths, workers=2)
+
+  assert [(res.path, res.passed) for res in results] == [
+      (paths[0], True),
+      (paths[1], False),
+      (paths[2], True),
+      (paths[3], True),
+  ]
+  assert "AssertionError" in results[1].details
+  assert evaluator.calls == 4 and evaluator.peak == 2
+
+
+def test_native_engine_fail_fast_cancels_outstanding_evalsets(tmp_path, monkeypatch):
+  evaluator = _FakeEvaluator(delay=0.1)
+  monkeypatch.setattr(execute_evalsets, "_import_agent_evaluator", lambda: evaluator)
+  paths = [
+      _write_evalset(tmp_path / f"{name}.evalset.json", [name])
+      for name in ("fail0", "pass1", "pass2")
+  ]
+
+  results = execute_evalsets.run_evalsets(paths, workers=1, fail_fast=True)
+
+  assert [(res.path, res.passed) for res in results] == [(paths[0], False)]
+  # The next evalset may already hold the freed slot; it is cancelled too.
+  assert evaluator.calls < len(paths)
+  assert evaluator.in_flight == 0
+
+
+def test_changed_only_reruns_edited_and_failed_evalsets(
+    tmp_path, monkeypatch, fake_agent_module
+):
+  monkeypatch.chdir(tmp_path)
+  evaluator = _FakeEvaluator(delay=0)
+  monkeypatch.setattr(execute_evalsets, "_import_agent_evaluator", lambda: evaluator)
+  monkeypatch.setattr(execute_evalsets, "RUN_RESULTS", [])
+  kept = _write_evalset(tmp_path / "kept.evalset.json", ["pass0"])
+  edited = _write_evalset(tmp_path / "edited.evalset.json", ["pass1"])
+  failed = _write_evalset(tmp_path / "failed.evalset.json", ["fail2"])
+  argv = [
+      str(kept),
+      str(edited),
+      str(failed),
+      "--engine",
+      "native",
+      "--agent-module",
+      fake_agent_module,
+      "--changed-only",
+  ]
+
+  assert execute_evalsets.main(argv) == 1
+  assert evaluator.calls == 3
+  _write_evalset(edited, ["pass1", "pass3"])
+  assert execute_evalsets.main(argv) == 1
+
+  # Only the edited evalset and the earlier failure ran again.
+  assert evaluator.calls == 5
+  reused = {res.path for res in execute_evalsets.RUN_RESULTS if res.reused}
+  assert reused == {kept}
+
+
+def _fake_conversation_evalset(path):
+  """One case replaying ``FakeLlm``'s default replies, as generate_evalset writes it."""
+  turns = [
+      {
+          "user_content": {"role": "user", "parts": [{"text": text}]},
+          "final_response": {"role": "model", "parts": [{"text": reply}]},
+      }
+      for text, reply in zip(["hi", "painting"], FakeLlm().responses)
+  ]
+  path.write_text(
+      json.dumps(
+          {"eval_set_id": path.stem, "eval_cases": [{"eval_id": "c0", "conversation": turns}]}
+      ),
+      encoding="utf-8",
+  )
+  return path
+
+
+def test_adaptive_decides_steady_case_with_agent_evaluator(tmp_path, fake_agent_module):
+  pytest.importorskip("rouge_score")
+  path = _fake_conversation_evalset(tmp_path / "fake.evalset.json")
+  [result] = execute_evalsets.run_evalsets(
+      [path], agent_module=fake_agent_module, adaptive=AdaptivePolicy()
+  )
+  assert result.passed, result.details
+  assert [(case.runs, case.decided) for case in result.cases] == [(2, True)]
+  score, threshold = result.cases[0].scores["response_match_score"]
+  assert score == pytest.approx(1.0) and threshold > 0
+
+
+def test_fixed_runs_evaluate_evalset_once(tmp_path):
+  path = _write_evalset(tmp_path / "a.evalset.json", ["pass0", "pass1", "pass2"])
+  evaluator = _FakeEvaluator()
+  result = asyncio.run(
+      execute_evalsets._evaluate_evalset_async(evaluator, path, "agent", 2, None)
+  )
+  assert result.passed
+  assert evaluator.calls == 1
+
+
+def test_history_records_metric_scores_of_fixed_runs(
+    tmp_path, monkeypatch, request, fake_agent_module
+):
+  pytest.importorskip("rouge_score")
+  from greeting_agent import instrumentation
+  from greeting_agent.run_history import RunHistory
+
+  monkeypatch.chdir(tmp_path)
+  # --history turns on metrics through the environment; undo that afterwards.
+  for name in (instrumentation.METRICS_PATH_ENV, instrumentation.METRICS_SOURCE_ENV):
+    monkeypatch.setenv(name, "")
+  request.addfinalizer(instrumentation.env_instrumentation.reset)
+  path = _fake_conversation_evalset(tmp_path / "fake.evalset.json")
+  db = tmp_path / "history.sqlite"
+  exit_code = execute_evalsets.main(
+      [
+          str(path),
+          "--engine",
+          "native",
+          "--agent-module",
+          fake_agent_module,
+          "--history",
+          str(db),
+      ]
+  )
+  assert exit_code == 0
+  with RunHistory(db) as history:
+    [run] = history.runs()
+    rows = history.case_scores("fake.evalset.json")
+  assert run["mode"] == f"num_runs={execute_evalsets.NUM_RUNS}"
+  scores = {row["metric"]: row["score"] for row in rows}
+  assert {row["case_id"] for row in rows} == {"c0"}
+  assert scores["response_match_score"] == pytest.approx(1.0)
+
+
+def test_local_scoring_replaces_adk_response_match(
+    tmp_path, monkeypatch, fake_agent_module
+):
+  pytest.importorskip("rouge_score")
+  from greeting_agent import scoring
+
+  monkeypatch.setattr(scoring.ResponseMatchEvaluator, "_table", None)
+  monkeypatch.setenv(scoring.SCORING_ENV, "")
+  monkeypatch.setattr(execute_evalsets, "RUN_RESULTS", [])
+  path = _fake_conversation_evalset(tmp_path / "fake.evalset.json")
+  try:
+    exit_code = execute_evalsets.main(
+        [
+            str(path),
+            "--engine",
+            "native",
+            "--agent-module",
+            fake_agent_module,
+            "--scoring",
+            "local",
+        ]
+    )
+  finally:
+    monkeypatch.setenv(scoring.SCORING_ENV, "adk")
+    scoring.register_adk_evaluator()
+  assert exit_code == 0
+  [result] = execute_evalsets.RUN_RESULTS
+  [case] = result.cases
+  assert case.scores["response_match_score"][0] == pytest.approx(1.0)
+  # Two references and the replies of every run share the table's rows.
+  assert len(scoring.ResponseMatchEvaluator.table()) == 2
+
+
+class _LoggingEvaluator:
+  """Logs each evaluation's slice, process and timing to a JSONL file.
+
+  Cases whose id starts with ``slow`` take ``slow_delay`` seconds.
+  """
+
+  def __init__(self, log, delay=0.3, slow_delay=30.0):
+    self.log = log
+    self.delay = delay
+    self.slow_delay = slow_delay
+
+  def _write(self, **record):
+    with open(self.log, "a", encoding="utf-8") as handle:
+      handle.write(json.dumps(record) + "\n")
+
+  async def evaluate(self, *, eval_dataset_file_path_or_dir, num_runs, **_):
+    [case] = load_evalset(Path(eval_dataset_file_path_or_dir))["eval_cases"]
+    case_id = case["eval_id"]
+    delay = self.slow_delay if case_id.startswith("slow") else self.delay
+    self._write(case=case_id, pid=os.getpid(), event="start", at=time.time())
+    await asyncio.sleep(delay)
+    self._write(case=case_id, pid=os.getpid(), event="end", at=time.time())
+    if case_id.startswith("fail"):
+      raise AssertionError("response_match_score below threshold")
+
+
+def _worker_log(tmp_path, monkeypatch, **kwargs):
+  if multiprocessing.get_start_method() != "fork":
+    pytest.skip("worker processes only see the fake evaluator when forked")
+  log = tmp_path / "evaluations.jsonl"
+  evaluator = _LoggingEvaluator(log, **kwargs)
+  monkeypatch.setattr(execute_evalsets, "_import_agent_evaluator", lambda: evaluator)
+  monkeypatch.setattr(execute_evalsets, "RUN_RESULTS", [])
+  return log
+
+
+def _read_log(log):
+  if not log.exists():
+    return []
+  return [json.loads(line) for line in log.read_text(encoding="utf-8").splitlines()]
+
+
+def test_workers_spread_the_cases_of_one_evalset(tmp_path, monkeypatch):
+  log = _worker_log(tmp_path, monkeypatch)
+  path = _write_evalset(tmp_path / "big.evalset.json", ["c0", "c1", "fail2"])
+
+  exit_code = execute_evalsets._run_with_workers([path], workers=3, fail_fast=False)
+
+  assert exit_code == 1
+  [result] = execute_evalsets.RUN_RESULTS
+  assert result.path == path and not result.passed
+  assert result.details.startswith("1/3 cases failed: fail2 (AssertionError")
+  records = _read_log(log)
+  starts = [r for r in records if r["event"] == "start"]
+  ends = [r for r in records if r["event"] == "end"]
+  assert sorted(r["case"] for r in starts) == ["c0", "c1", "fail2"]
+  assert len({r["pid"] for r in starts}) == 3
+  # Every case started before any finished, so they ran side by side.
+  assert max(r["at"] for r in starts) < min(r["at"] for r in ends)
+
+
+def test_fail_fast_kills_running_workers(tmp_path, monkeypatch):
+  log = _worker_log(tmp_path, monkeypatch)
+  first = _write_evalset(tmp_path / "a.evalset.json", ["slow0", "fail1"])
+  second = _write_evalset(tmp_path / "b.evalset.json", ["slow2"])
+
+  started = time.monotonic()
+  exit_code = execute_evalsets._run_with_workers(
+      [first, second], workers=3, fail_fast=True
+  )
+
+  assert exit_code == 1
+  assert time.monotonic() - started < 15
+  assert [(res.path, res.passed) for res in execute_evalsets.RUN_RESULTS] == [
+      (first, False)
+  ]
+  records = _read_log(log)
+  assert {r["case"] for r in records if r["event"] == "start"} == {
+      "slow0",
+      "fail1",
+      "slow2",
+  }
+  assert {r["case"] for r in records if r["event"] == "end"} == {"fail1"}
+  assert multiprocessing.active_children() == []
@@ -0,0 +1,131 @@
+"""Tests for concurrent evalset generation over ``FakeLlm``."""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from greeting_agent import generate_evalset  # noqa: E402
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.evalset_io import case_id  # noqa: E402
+from greeting_agent.evalset_io import load_evalset  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+
+
+def _write_scripts(tmp_path, count):
+  scripts = [{"id": f"c{i}", "turns": [f"hello {i}"]} for i in range(count)]
+  path = tmp_path / "scripts.json"
+  path.write_text(json.dumps(scripts), encoding="utf-8")
+  return path
+
+
+def _generate(tmp_path, model, scripts, **kwargs):
+  out = asyncio.run(
+      generate_evalset._main(
+          generation_agent=create_greeting_agent(model=model),
+          tests_path=scripts,
+          output_dir=tmp_path,
+          retry_backoff=0.01,
+          **kwargs,
+      )
+  )
+  return load_evalset(out)
+
+
+def test_keeps_script_order_under_concurrency(tmp_path):
+  # Earlier calls are slower, so cases finish in reverse order.
+  model = FakeLlm(latencies=[0.4, 0.3, 0.2, 0.1, 0.0])
+  evalset = _generate(tmp_path, model, _write_scripts(tmp_path, 5), concurrency=5)
+
+  assert [case_id(case) for case in evalset["eval_cases"]] == [f"c{i}" for i in range(5)]
+  assert model.call_count == 5
+
+
+def test_retries_attempt_that_times_out(tmp_path):
+  model = FakeLlm(latencies=[5.0, 0.0])
+  evalset = _generate(
+      tmp_path, model, _write_scripts(tmp_path, 1), case_timeout=0.2, max_retries=1
+  )
+
+  assert [case_id(case) for case in evalset["eval_cases"]] == ["c0"]
+  assert model.call_count == 2
+
+
+def test_gives_up_after_max_retries(tmp_path):
+  model = FakeLlm(error_rate=1.0, error_code=503)
+  with pytest.raises(Exception, match="Injected by FakeLlm"):
+    _generate(tmp_path, model, _write_scripts(tmp_path, 1), max_retries=2)
+  assert model.call_count == 3
+  # The journal stays behind so the run can be resumed.
+  assert list(tmp_path.glob("*.partial.jsonl"))
+
+
+def test_does_not_retry_permanent_errors(tmp_path):
+  model = FakeLlm(error_rate=1.0, error_code=400)
+  with pytest.raises(Exception, match="Injected by FakeLlm"):
+    _generate(tmp_path, model, _write_scripts(tmp_path, 1), max_retries=2)
+  assert model.call_count == 1
+
+
+def test_generated_evalset_passes_against_the_same_fake(tmp_path, fake_agent_module):
+  pytest.importorskip("rouge_score")
+  from greeting_agent import execute_evalsets
+
+  scripts = tmp_path / "scripts.json"
+  scripts.write_text(
+      json.dumps([{"id": "c0", "turns": ["hi", "painting"]}]), encoding="utf-8"
+  )
+  out = asyncio.run(
+      generate_evalset._main(
+          generation_agent=create_greeting_agent(model=FakeLlm()),
+          tests_path=scripts,
+          output_dir=tmp_path,
+      )
+  )
+  turn = load_evalset(out)["eval_cases"][0]["conversation"][0]
+  assert turn["user_content"]["role"] == "user"
+
+  [result] = execute_evalsets.run_evalsets(
+      [out], agent_module=fake_agent_module, num_runs=1
+  )
+  assert result.passed, result.details
+
+
+def test_resume_generates_only_the_unfinished_cases(tmp_path):
+  scripts = _write_scripts(tmp_path, 3)
+  # Seeded draws 0.84, 0.76, ...: the first call passes, the second fails.
+  flaky = FakeLlm(error_rate=0.8, error_code=400)
+  with pytest.raises(Exception, match="Injected by FakeLlm"):
+    _generate(tmp_path, flaky, scripts)
+  [journal] = tmp_path.glob("*.partial.jsonl")
+
+  model = FakeLlm()
+  evalset = _generate(tmp_path, model, scripts, resume_path=journal)
+
+  assert model.call_count == 2
+  assert [case_id(case) for case in evalset["eval_cases"]] == ["c0", "c1", "c2"]
+  assert not journal.exists()
+
+
+def test_scripts_stream_with_stable_ids(tmp_path):
+  scripts = tmp_path / "scripts.jsonl"
+  scripts.write_text(
+      "\n".join(
+          json.dumps(script)
+          for script in [{"turns": ["hi"]}, {"id": "x", "turns": ["yo"]}, {"turns": ["hi"]}]
+      ),
+      encoding="utf-8",
+  )
+  first = [test["id"] for test in generate_evalset._iter_tests(scripts)]
+  again = [test["id"] for test in generate_evalset._iter_tests(scripts)]
+  assert first == again
+  assert first[1] == "x" and first[2] == f"{first[0]}_2"
+
+  array = tmp_path / "scripts.json"
+  array.write_text('[{"turns": ["hi"]}, "not a script"]', encoding="utf-8")
+  tests = generate_evalset._iter_tests(array)
+  assert next(tests)["turns"] == ["hi"]
+  with pytest.raises(ValueError, match="id, turns"):
+    next(tests)
@@ -0,0 +1,73 @@
+"""Tests for per-turn ``Instrumentation`` records and their summary."""
+
+import asyncio
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.runners import Runner  # noqa: E402
+from google.adk.sessions import InMemorySessionService  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent import instrumentation  # noqa: E402
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.instrumentation import Instrumentation  # noqa: E402
+
+
+def _run_turns(metrics, texts, *, tracked):
+  runner = Runner(
+      app_name="app",
+      agent=create_greeting_agent(model=FakeLlm(latency=0.05), instrumentation=metrics),
+      session_service=InMemorySessionService(),
+  )
+
+  async def run():
+    await runner.session_service.create_session(
+        app_name="app", user_id="u", session_id="s"
+    )
+    for text in texts:
+      events = runner.run_async(
+          user_id="u",
+          session_id="s",
+          new_message=types.Content(role="user", parts=[types.Part.from_text(text=text)]),
+      )
+      if tracked:
+        events = metrics.track(events, label="s")
+      async for _ in events:
+        pass
+
+  asyncio.run(run())
+
+
+@pytest.mark.parametrize("tracked", [True, False])
+def test_one_record_per_turn(tracked, tmp_path):
+  path = tmp_path / "metrics.jsonl"
+  metrics = Instrumentation(path, source="test")
+
+  _run_turns(metrics, ["hi", "painting"], tracked=tracked)
+
+  records = instrumentation.load_records(path)
+  assert len(records) == len(metrics.records) == 2
+  assert all(r["source"] == "test" and r["model_calls"] == 1 for r in records)
+  assert all(r["model_latency"] >= 0.05 for r in records)
+  assert all(r["time_to_first_event"] >= 0.05 for r in records)
+  assert all(r["total_latency"] >= r["model_latency"] for r in records)
+  # The second turn's prompt carries the first turn's history.
+  assert 0 < records[0]["prompt_tokens"] < records[1]["prompt_tokens"]
+  assert all(r["response_tokens"] > 0 for r in records)
+  assert {r["label"] for r in records} == {"s" if tracked else "greeting_agent"}
+
+
+def test_summary_percentiles():
+  assert instrumentation.percentile([4, 1, 3, 2], 50) == 2.5
+  records = [{"total_latency": float(value), "events": None} for value in range(1, 101)]
+  summary = instrumentation.summarize(records)
+  assert set(summary) == {"total_latency"}
+  stats = summary["total_latency"]
+  assert (stats["count"], stats["mean"], stats["p50"]) == (100, 50.5, 50.5)
+  assert stats["p99"] == pytest.approx(99.01)
+  table = instrumentation.format_summary(summary)
+  assert table.splitlines()[2].split() == ["total_latency", "100", "50.500", "50.500", "95.050", "99.010"]
+  assert instrumentation.format_summary({}) == "No turn metrics recorded."
@@ -0,0 +1,26 @@
+"""Importing the package must stay cheap: no ADK runtime, no dotenv."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_ROOT = Path(__file__).resolve().parents[1] / "src"
+
+_PROBE = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+import greeting_agent
+print(json.dumps({name: name in sys.modules for name in sys.argv[2:]}))
+"""
+
+
+def test_import_does_not_load_runtime():
+  heavy = ["google.adk.runners", "google.adk.agents", "dotenv"]
+  output = subprocess.run(
+      [sys.executable, "-c", _PROBE, str(SRC_ROOT), *heavy],
+      check=True,
+      capture_output=True,
+      text=True,
+  ).stdout
+  assert json.loads(output) == {name: False for name in heavy}
@@ -0,0 +1,42 @@
+"""Tests for the ``before_model``/``after_model`` bookkeeping of the caches."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent.llm_cache import PendingCalls  # noqa: E402
+from greeting_agent.llm_cache import ResponseCache  # noqa: E402
+
+
+def _request(text):
+  return LlmRequest(
+      model="fake",
+      contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+  )
+
+
+def test_pending_calls_keep_most_recent_entries():
+  pending = PendingCalls(max_entries=2)
+  pending.put("a", 1)
+  pending.put("b", 2)
+  pending.put("a", 3)
+  pending.put("c", 4)
+  assert len(pending) == 2
+  assert pending.pop("b") is None
+  assert pending.pop("a") == 3
+  assert pending.pop("c") == 4
+
+
+def test_failed_model_calls_do_not_grow_pending(tmp_path):
+  cache = ResponseCache(tmp_path, mode="record")
+  cache._pending = PendingCalls(max_entries=8)
+  # after_model never runs for these, as when the model call raises.
+  for i in range(100):
+    context = SimpleNamespace(invocation_id=f"inv{i}")
+    assert cache.before_model(context, _request(f"hi {i}")) is None
+  assert len(cache._pending) == 8
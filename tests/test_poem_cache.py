@@ -0,0 +1,77 @@
+"""Tests for which turns ``PoemCache`` and ``classify_turn`` treat as hobbies."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.adk.models.llm_response import LlmResponse  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent.poem_cache import PoemCache  # noqa: E402
+from greeting_agent.poem_cache import hobby_key  # noqa: E402
+from greeting_agent.routing_llm import classify_turn  # noqa: E402
+
+_QUESTION = "Hello there! What hobby fills your days with joy?"
+_POEM = "Oh what fun, a hobby so grand,\nWith facts and cheer close at hand."
+
+
+def _request(*turns, role=None):
+  """Alternating user/model turns; ``role`` is what user contents carry."""
+  return LlmRequest(
+      model="fake",
+      contents=[
+          types.Content(
+              role="model" if index % 2 else role,
+              parts=[types.Part(text=text)],
+          )
+          for index, text in enumerate(turns)
+      ],
+  )
+
+
+def _reply(text):
+  return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+@pytest.mark.parametrize("role", ["user", None])
+def test_keys_the_answer_to_the_hobby_question(role):
+  first = hobby_key(_request("hi", _QUESTION, "I love Painting!", role=role))
+  second = hobby_key(_request("hello", _QUESTION, "painting", role=role))
+  assert first is not None and first == second
+  assert classify_turn(_request("hi", _QUESTION, "painting", role=role)) == "poem"
+
+
+@pytest.mark.parametrize(
+    "turns",
+    [
+        ("painting",),
+        ("hi", "Hello! How are you today?", "sure"),
+        ("hi", _QUESTION, "painting", _POEM, "can you make it rhyme more?"),
+        ("hi", _QUESTION, "painting", "How long have you painted? Is it your hobby?", "10 years"),
+        ("hi", _QUESTION, "hi"),
+    ],
+)
+def test_other_turns_are_not_keyed(turns):
+  request = _request(*turns, role="user")
+  assert hobby_key(request) is None
+  assert classify_turn(request) == "question"
+
+
+def test_follow_up_replies_are_never_cached_or_served():
+  cache = PoemCache(variants=1)
+  context = SimpleNamespace(invocation_id="inv")
+  follow_up = _request("hi", _QUESTION, "painting", _POEM, "make it rhyme more", role="user")
+  for _ in range(3):
+    assert cache.before_model(context, follow_up) is None
+    cache.after_model(context, _reply("A rhymier poem."))
+  assert cache.stats()["keys"] == 0
+  assert cache.skipped == 3
+
+  answer = _request("hi", _QUESTION, "painting", role="user")
+  assert cache.before_model(context, answer) is None
+  cache.after_model(context, _reply(_POEM))
+  served = cache.before_model(context, _request("hey", _QUESTION, "Painting!"))
+  assert served.content.parts[0].text == _POEM
@@ -0,0 +1,89 @@
+"""Tests for ``Profiler`` phases, task timing and output files."""
+
+import asyncio
+import io
+import json
+import pstats
+import time
+
+import pytest
+
+from greeting_agent import profiling
+
+
+def test_markers_are_free_without_a_profiler():
+  items = [1, 2]
+  assert profiling.active_profiler() is None
+  assert profiling.phase("a") is profiling.phase("b")
+  assert profiling.phase_iter(items, "read") is items
+  with profiling.profile(None) as profiler:
+    assert profiler is None
+
+
+def test_nested_phases_report_self_time():
+  profiler = profiling.Profiler("unused")
+  with profiler.phase("outer"):
+    time.sleep(0.02)
+    with profiler.phase("inner"):
+      time.sleep(0.05)
+  outer, inner = profiler.phases["outer"], profiler.phases["inner"]
+  assert outer.calls == inner.calls == 1
+  assert outer.wall >= inner.wall + 0.02
+  assert 0.015 < outer.self_time < inner.wall
+
+
+def test_profile_writes_phases_tasks_and_stacks(tmp_path):
+  out = io.StringIO()
+
+  async def wait():
+    await asyncio.sleep(0.05)
+
+  async def main():
+    with profiling.phase("model_wait"):
+      await asyncio.gather(wait(), wait())
+
+  with profiling.profile(tmp_path / "run", interval=0.001, out=out) as profiler:
+    assert profiling.active_profiler() is profiler
+    profiling.run(main())
+    items = list(profiling.phase_iter(iter(range(3)), "read"))
+  assert items == [0, 1, 2]
+  assert profiling.active_profiler() is None
+
+  data = json.loads((tmp_path / "run.json").read_text(encoding="utf-8"))
+  assert data["mode"] == "sample"
+  assert data["phases"]["model_wait"]["calls"] == 1
+  # One call per item, plus the one that hits the end of the iterator.
+  assert data["phases"]["read"]["calls"] == 4
+  [waits] = [stats for name, stats in data["tasks"].items() if name.endswith(".wait")]
+  # Both tasks spent their time awaiting the sleep, not on the loop.
+  assert waits["tasks"] == 2
+  assert waits["wall"] > 0.09 and waits["busy"] < 0.02
+  assert data["samples"] > 0 and 0 < data["idle_samples"] <= data["samples"]
+
+  lines = (tmp_path / "run.collapsed").read_text(encoding="utf-8").splitlines()
+  stack, count = lines[0].rsplit(" ", 1)
+  assert stack.startswith("MainThread;") and int(count) >= 1
+  assert not (tmp_path / "run.pstats").exists()
+
+  summary = out.getvalue()
+  assert "idle in the event loop" in summary and "model_wait" in summary
+  assert f"Profile written to {tmp_path / 'run.collapsed'}" in summary
+
+
+def test_deterministic_mode_writes_pstats(tmp_path):
+  def busy():
+    return sum(range(10_000))
+
+  with profiling.profile(tmp_path / "run", mode="deterministic", out=io.StringIO()):
+    busy()
+  stats = pstats.Stats(str(tmp_path / "run.pstats"))
+  assert any(name == "busy" for _, _, name in stats.stats)
+
+
+def test_invalid_and_nested_profiles_are_rejected(tmp_path):
+  with pytest.raises(ValueError, match="mode must be one of"):
+    profiling.Profiler(tmp_path / "run", mode="trace")
+  with profiling.profile(tmp_path / "outer", out=io.StringIO()):
+    with pytest.raises(RuntimeError, match="already active"):
+      with profiling.profile(tmp_path / "inner"):
+        pass
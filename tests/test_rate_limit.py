@@ -0,0 +1,109 @@
+"""Tests for the shared ``RateLimiter`` buckets."""
+
+import asyncio
+import fcntl
+import threading
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from greeting_agent.rate_limit import ModelBudget  # noqa: E402
+from greeting_agent.rate_limit import RateLimiter  # noqa: E402
+from greeting_agent.rate_limit import parse_budgets  # noqa: E402
+
+
+def _limiter(tmp_path, rpm=600, **kwargs):
+  return RateLimiter(
+      {"m": ModelBudget(rpm=rpm)}, state_path=tmp_path / "state.json", **kwargs
+  )
+
+
+def test_quota_error_pauses_model_without_blocking_the_loop(tmp_path):
+  limiter = _limiter(tmp_path, quota_cooldown=0.3)
+  locked = threading.Event()
+  release = threading.Event()
+
+  def hold_lock():
+    # Another process holding the state file, e.g. mid-update.
+    with open(limiter.state_path, "a+", encoding="utf-8") as handle:
+      fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+      locked.set()
+      release.wait(timeout=5)
+
+  holder = threading.Thread(target=hold_lock)
+  holder.start()
+  locked.wait()
+
+  async def scenario():
+    ticks = 0
+    report = asyncio.ensure_future(limiter.report_quota_error("m"))
+    while ticks < 5:
+      await asyncio.sleep(0.01)
+      ticks += 1
+    assert not report.done()
+    release.set()
+    await report
+    return await limiter.acquire("m")
+
+  try:
+    waited = asyncio.run(scenario())
+  finally:
+    release.set()
+    holder.join()
+  assert limiter.quota_errors == 1
+  assert 0.15 < waited < 2
+
+
+def test_budget_spec_with_wildcard():
+  budgets = parse_budgets("gemini-2.0-flash=15:1000000, *=60")
+  assert budgets == {
+      "gemini-2.0-flash": ModelBudget(rpm=15, tpm=1_000_000),
+      "*": ModelBudget(rpm=60),
+  }
+  limiter = RateLimiter(budgets)
+  assert limiter.budget_for("gemini-2.5-pro") == ModelBudget(rpm=60)
+  assert RateLimiter({}).budget_for("gemini-2.5-pro") is None
+  with pytest.raises(ValueError, match="MODEL=RPM"):
+    parse_budgets("gemini-2.0-flash")
+
+
+async def _drain(limiter, model="m"):
+  for _ in range(int(limiter.budget_for(model).rpm)):
+    assert await limiter.acquire(model) < 0.1
+
+
+def test_processes_share_one_bucket(tmp_path):
+  first = _limiter(tmp_path, rpm=30)
+  second = _limiter(tmp_path, rpm=30)
+
+  async def scenario():
+    await _drain(first)
+    return await second.acquire("m")
+
+  # 30 RPM refills one request every 2s.
+  waited = asyncio.run(scenario())
+  assert 1 < waited < 4
+  assert second.stats()["waited"] == 1
+
+
+def test_batch_lane_yields_to_interactive_callers(tmp_path):
+  interactive = _limiter(tmp_path, rpm=60, lane="interactive")
+  batch = _limiter(tmp_path, rpm=60, lane="batch")
+  finished = []
+
+  async def take(limiter, name):
+    await limiter.acquire("m")
+    finished.append(name)
+
+  async def scenario():
+    await _drain(batch)
+    batch_waiters = [asyncio.ensure_future(take(batch, f"batch{i}")) for i in range(2)]
+    await asyncio.sleep(0.02)
+    await take(interactive, "interactive")
+    await asyncio.gather(*batch_waiters)
+
+  asyncio.run(scenario())
+  # The batch callers queued first, yet the interactive one went first.
+  assert finished[0] == "interactive"
+  assert batch.peak_waiting["batch"] >= 1
@@ -0,0 +1,164 @@
+"""Tests for ``RoutingLlm`` hedging and fallback over ``FakeLlm``."""
+
+import asyncio
+import io
+import time
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from google.adk.models.llm_request import LlmRequest  # noqa: E402
+from google.adk.models.registry import LLMRegistry  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from greeting_agent import agent  # noqa: E402
+from greeting_agent import cli  # noqa: E402
+from greeting_agent import routing_llm  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.routing_llm import DEFAULT_ROUTES  # noqa: E402
+from greeting_agent.routing_llm import RoutingLlm  # noqa: E402
+from greeting_agent.routing_llm import parse_routes  # noqa: E402
+
+
+def _request() -> LlmRequest:
+  return LlmRequest(
+      contents=[types.Content(role="user", parts=[types.Part.from_text(text="hi")])]
+  )
+
+
+def _router(*models: FakeLlm, **kwargs) -> RoutingLlm:
+  return RoutingLlm(
+      routes={"default": list(models)}, classifier=lambda _: "default", **kwargs
+  )
+
+
+async def _texts(router: RoutingLlm):
+  return [
+      response.content.parts[0].text
+      async for response in router.generate_content_async(_request())
+  ]
+
+
+def test_falls_back_when_primary_fails():
+  primary = FakeLlm(model="fake-primary", error_rate=1.0)
+  backup = FakeLlm(model="fake-backup")
+  router = _router(primary, backup)
+
+  assert asyncio.run(_texts(router)) == [FakeLlm().responses[0]]
+  stats = router.stats()
+  assert stats["fallbacks"] == 1
+  assert stats["models"]["fake-primary"]["errors"] == 1
+  assert stats["models"]["fake-backup"]["errors"] == 0
+  # The failed model cools down and is tried last next time.
+  assert [name for name, _ in router.candidates(_request())] == [
+      "fake-backup",
+      "fake-primary",
+  ]
+
+
+def test_raises_last_error_when_every_model_fails():
+  router = _router(
+      FakeLlm(model="fake-a", error_rate=1.0), FakeLlm(model="fake-b", error_rate=1.0)
+  )
+  with pytest.raises(Exception, match="Injected by FakeLlm"):
+    asyncio.run(_texts(router))
+
+
+def test_hedges_slow_primary():
+  slow = FakeLlm(model="fake-slow", latency=5.0)
+  fast = FakeLlm(model="fake-fast")
+  router = _router(slow, fast, hedge_after=0.05)
+
+  started = time.monotonic()
+  assert asyncio.run(_texts(router)) == [FakeLlm().responses[0]]
+  assert time.monotonic() - started < 1.0
+  stats = router.stats()
+  assert stats["hedges"] == 1
+  assert stats["models"]["fake-slow"]["errors"] == 0
+  # The loser's latency is censored: at least the time it ran.
+  assert stats["models"]["fake-slow"]["latency"] >= 0.05
+
+
+def test_censored_loser_never_improves_its_average():
+  router = _router(
+      FakeLlm(model="fake-slow", latency=5.0), FakeLlm(model="fake-fast"), hedge_after=0.05
+  )
+  router._stats_for("fake-slow").latency = 3.0
+
+  asyncio.run(_texts(router))
+  assert router.stats()["models"]["fake-slow"]["latency"] == 3.0
+
+
+def test_cancellation_propagates_and_cancels_candidates():
+  slow = FakeLlm(model="fake-slow", latency=5.0)
+  router = _router(slow, FakeLlm(model="fake-slower", latency=5.0), hedge_after=0.05)
+
+  async def run():
+    task = asyncio.create_task(_texts(router))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    started = time.monotonic()
+    with pytest.raises(asyncio.CancelledError):
+      await task
+    return time.monotonic() - started
+
+  assert asyncio.run(run()) < 1.0
+  # Neither call answered, so nothing is recorded for them.
+  assert router.stats()["models"]["fake-slow"]["calls"] == 0
+
+
+def test_route_spec():
+  assert parse_routes("default") == DEFAULT_ROUTES
+  assert parse_routes(" question=a , poem=b:c ") == {"question": ["a"], "poem": ["b", "c"]}
+
+
+@pytest.mark.parametrize("spec", ["", "poem", "=a", "poem=", "poem=:"])
+def test_invalid_route_spec(spec):
+  with pytest.raises(ValueError, match="TURN=MODEL"):
+    parse_routes(spec)
+
+
+def test_root_agent_routes_from_env(monkeypatch):
+  monkeypatch.setattr(agent, "_root_agent", None)
+  monkeypatch.setenv(routing_llm.ROUTES_ENV, "")
+  assert agent.get_root_agent().model == agent.DEFAULT_GREETING_MODEL
+
+  monkeypatch.setattr(agent, "_root_agent", None)
+  monkeypatch.setenv(routing_llm.ROUTES_ENV, "poem=gemini-2.5-flash")
+  monkeypatch.setenv(routing_llm.HEDGE_AFTER_ENV, "0")
+  router = agent.get_root_agent().model
+  assert isinstance(router, RoutingLlm)
+  assert router.routes == {"poem": ["gemini-2.5-flash"]}
+  assert router.hedge_after is None
+
+
+def test_console_routes_turns_with_route_flag(monkeypatch, tmp_path):
+  LLMRegistry.register(FakeLlm)
+  monkeypatch.chdir(tmp_path)
+  monkeypatch.setenv("GOOGLE_API_KEY", "test")
+  # --route configures the environment; restore it afterwards.
+  monkeypatch.setenv(routing_llm.ROUTES_ENV, "")
+  monkeypatch.setenv(routing_llm.HEDGE_AFTER_ENV, "")
+  models = []
+  create_agent = cli.create_greeting_agent
+
+  def create(**kwargs):
+    models.append(kwargs["model"])
+    return create_agent(**kwargs)
+
+  monkeypatch.setattr(cli, "create_greeting_agent", create)
+  monkeypatch.setattr("sys.stdin", io.StringIO("hi\npainting\nexit\n"))
+
+  assert cli.main(["--route", "question=fake-question,poem=fake-poem"]) == 0
+
+  [router] = models
+  assert isinstance(router, RoutingLlm)
+  calls = {name: model["calls"] for name, model in router.stats()["models"].items()}
+  assert calls == {"fake-question": 1, "fake-poem": 1}
+
+
+def test_invalid_route_flag_is_rejected(capsys):
+  with pytest.raises(SystemExit):
+    cli.main(["--route", "poem"])
+  assert "TURN=MODEL" in capsys.readouterr().err
@@ -0,0 +1,108 @@
+"""Tests for recording and querying ``RunHistory`` runs."""
+
+from greeting_agent import run_history
+from greeting_agent.run_history import RunHistory
+
+
+def _record(
+    history, *, scores, mode="num_runs=2", started_at, passed=True, agent_module="agent"
+):
+  return history.record_run(
+      agent_module=agent_module,
+      started_at=started_at,
+      mode=mode,
+      evalsets=[
+          {
+              "evalset": "a.evalset.json",
+              "evalset_hash": "h",
+              "passed": passed,
+              "details": "",
+              "cases": [
+                  {
+                      "case_id": f"c{index}",
+                      "passed": score is not None and score >= 0.8,
+                      "runs": 2,
+                      "scores": {"response_match_score": (score, 0.8)},
+                  }
+                  for index, score in enumerate(scores)
+              ],
+          }
+      ],
+  )
+
+
+def test_case_scores_are_queried_per_run(tmp_path):
+  with RunHistory(tmp_path / "history.sqlite") as history:
+    first = _record(history, scores=[0.9, 0.85], started_at=1.0)
+    second = _record(history, scores=[0.95, None], started_at=2.0)
+    rows = history.case_scores("a.evalset.json")
+    assert [(row["run_id"], row["case_id"], row["score"]) for row in rows] == [
+        (second, "c0", 0.95),
+        (second, "c1", None),
+        (first, "c0", 0.9),
+        (first, "c1", 0.85),
+    ]
+    latest = history.case_scores("a.evalset.json", case_id="c0", limit=1)
+    assert [(row["run_id"], row["threshold"]) for row in latest] == [(second, 0.8)]
+    assert history.case_scores("a.evalset.json", metric="other") == []
+
+
+def test_report_flags_dropping_scores_against_same_mode_baseline(tmp_path):
+  with RunHistory(tmp_path / "history.sqlite") as history:
+    for started_at in range(1, 4):
+      _record(history, scores=[0.9, 0.92, 0.88, 0.91], started_at=started_at)
+    # Another repeat mode is never part of the baseline.
+    _record(history, scores=[0.1] * 4, mode="adaptive", started_at=4)
+    _record(history, scores=[0.5, 0.55, 0.45, 0.52], started_at=5)
+    _, baseline, comparisons = history.compare()
+  assert len(baseline) == 3
+  [score] = [c for c in comparisons if c.metric == "response_match_score"]
+  assert score.baseline > 0.85 and score.current < 0.6
+  assert score.regression
+
+
+def test_steady_scores_are_not_regressions(tmp_path):
+  with RunHistory(tmp_path / "history.sqlite") as history:
+    for started_at in range(1, 5):
+      _record(history, scores=[0.9, 0.92, 0.88, 0.91], started_at=started_at)
+    _, _, comparisons = history.compare()
+  assert not any(c.regression for c in comparisons)
+
+
+def test_runs_are_listed_newest_first_per_agent(tmp_path):
+  with RunHistory(tmp_path / "history.sqlite") as history:
+    first = _record(history, scores=[0.9], started_at=1.0)
+    other = _record(history, scores=[0.9], started_at=2.0, agent_module="other")
+    failed = _record(history, scores=[0.1], started_at=3.0, passed=False)
+    rows = history.runs()
+    assert [(row["id"], row["evalsets"], row["passed"]) for row in rows] == [
+        (failed, 1, 0),
+        (other, 1, 1),
+        (first, 1, 1),
+    ]
+    assert [row["id"] for row in history.runs(agent_module="agent", limit=1)] == [failed]
+
+
+def test_scores_command_prints_one_row_per_case(tmp_path, capsys):
+  db = tmp_path / "history.sqlite"
+  with RunHistory(db) as history:
+    _record(history, scores=[0.9, None], started_at=1.0)
+  assert run_history.main(["--db", str(db), "scores", "a.evalset.json", "--case", "c1"]) == 0
+  header, row = capsys.readouterr().out.splitlines()
+  assert header.split() == ["Run", "Case", "Metric", "score", "threshold"]
+  assert row.split() == ["1", "c1", "response_match_score", "-", "0.8"]
+  assert run_history.main(["--db", str(db), "scores", "missing.evalset.json"]) == 1
+  assert run_history.main(["--db", str(tmp_path / "none.sqlite"), "list"]) == 2
+
+
+def test_report_command_exits_nonzero_on_regressions(tmp_path, capsys):
+  db = tmp_path / "history.sqlite"
+  with RunHistory(db) as history:
+    for started_at in range(1, 4):
+      _record(history, scores=[0.9, 0.92, 0.88, 0.91], started_at=started_at)
+    _record(history, scores=[0.5, 0.55, 0.45, 0.52], started_at=4)
+  assert run_history.main(["--db", str(db), "report"]) == 1
+  output = capsys.readouterr().out
+  assert output.startswith("Run 4 (agent, model -) against 3 previous run(s)")
+  assert "Regressions: " in output and "response_match_score" in output
+  assert run_history.main(["--db", str(db), "report", "--run", "3"]) == 0
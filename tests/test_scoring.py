@@ -0,0 +1,83 @@
+"""Checks the batched ROUGE-1 scorer against ``rouge_score`` itself."""
+
+import itertools
+from pathlib import Path
+
+import pytest
+
+rouge_scorer = pytest.importorskip("rouge_score.rouge_scorer")
+
+from greeting_agent import scoring  # noqa: E402
+from greeting_agent.event_text import content_text  # noqa: E402
+from greeting_agent.evalset_io import load_evalset  # noqa: E402
+
+EVALSET = (
+    Path(__file__).resolve().parents[1]
+    / "src"
+    / "greeting_agent"
+    / "evalset47fcf6.evalset.json"
+)
+
+
+def _texts():
+  texts = []
+  for case in load_evalset(EVALSET)["eval_cases"]:
+    for invocation in case["conversation"]:
+      texts.append(content_text(invocation["user_content"], "\n"))
+      texts.append(content_text(invocation["final_response"], "\n"))
+  # Unique texts plus the empty and token-less edge cases.
+  return list(dict.fromkeys(texts)) + ["", "!!!"]
+
+
+@pytest.mark.parametrize("batched", [True, False])
+def test_matches_rouge_score(batched, monkeypatch):
+  if not batched:
+    monkeypatch.setattr(scoring, "np", None)
+  elif scoring.np is None:
+    pytest.skip("numpy is not installed")
+  reference = rouge_scorer.RougeScorer(["rouge1"], use_stemmer=True)
+  table = scoring.ProfileTable()
+  pairs = list(itertools.product(_texts(), repeat=2))
+  scores = table.rouge1(
+      [table.row(candidate) for candidate, _ in pairs],
+      [table.row(target) for _, target in pairs],
+  )
+  expected = [
+      reference.score(target, candidate)["rouge1"].fmeasure
+      for candidate, target in pairs
+  ]
+  assert scores == pytest.approx(expected)
+
+
+def test_scores_evalset_against_itself():
+  results = scoring.ResponseScorer().score_files(EVALSET, [EVALSET])
+  assert results and all(result.score == pytest.approx(1.0) for result in results)
+
+
+def test_adk_evaluator_matches_rouge_evaluator():
+  pytest.importorskip("google.adk")
+  from google.adk.evaluation.eval_case import Invocation
+  from google.adk.evaluation.eval_metrics import EvalMetric
+  from google.adk.evaluation.final_response_match_v1 import RougeEvaluator
+  from google.genai import types
+
+  def invocation(text):
+    return Invocation(
+        user_content=types.Content(role="user", parts=[types.Part(text="hi")]),
+        final_response=types.Content(role="model", parts=[types.Part(text=text)]),
+    )
+
+  texts = _texts()
+  actual = [invocation(text) for text in texts]
+  expected = [invocation(text) for text in reversed(texts)]
+  metric = EvalMetric(metric_name=scoring.RESPONSE_MATCH_METRIC, threshold=0.5)
+  local = scoring.ResponseMatchEvaluator(metric).evaluate_invocations(actual, expected)
+  adk = RougeEvaluator(metric).evaluate_invocations(actual, expected)
+  assert local.overall_score == pytest.approx(adk.overall_score)
+  assert local.overall_eval_status == adk.overall_eval_status
+  assert [r.score for r in local.per_invocation_results] == pytest.approx(
+      [r.score for r in adk.per_invocation_results]
+  )
+  assert [r.eval_status for r in local.per_invocation_results] == [
+      r.eval_status for r in adk.per_invocation_results
+  ]
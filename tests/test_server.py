@@ -0,0 +1,166 @@
+"""Tests for ``GreetingServer`` driven over HTTP against ``FakeLlm``."""
+
+import asyncio
+import json
+from typing import Dict, Tuple
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from greeting_agent.agent import create_greeting_agent  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.server import GreetingServer  # noqa: E402
+
+
+async def _request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    path: str,
+    body: bytes,
+    content_length: str = "",
+) -> Tuple[int, Dict[str, str], dict]:
+  length = content_length or str(len(body))
+  writer.write(
+      (
+          f"POST {path} HTTP/1.1\r\nHost: test\r\n"
+          f"Content-Type: application/json\r\nContent-Length: {length}\r\n\r\n"
+      ).encode("latin-1")
+      + body
+  )
+  await writer.drain()
+  status = int((await reader.readline()).split()[1])
+  headers: Dict[str, str] = {}
+  while True:
+    line = await reader.readline()
+    if line in (b"\r\n", b""):
+      break
+    name, _, value = line.decode("latin-1").partition(":")
+    headers[name.strip().lower()] = value.strip()
+  payload = json.loads(await reader.readexactly(int(headers["content-length"])))
+  return status, headers, payload
+
+
+async def _message(reader, writer, session: int, text: str):
+  body = json.dumps({"text": text}).encode("utf-8")
+  return await _request(
+      reader, writer, f"/users/u{session}/sessions/s{session}/messages", body
+  )
+
+
+async def _start(latency: float, **kwargs) -> Tuple[GreetingServer, int]:
+  server = GreetingServer(
+      agent=create_greeting_agent(model=FakeLlm(latency=latency)), **kwargs
+  )
+  listener = await server.start("127.0.0.1", 0)
+  return server, listener.sockets[0].getsockname()[1]
+
+
+def test_replies_stay_in_order_per_session():
+  responses = FakeLlm().responses
+
+  async def client(port: int, session: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    replies = []
+    try:
+      for turn in range(3):
+        status, _, payload = await _message(reader, writer, session, f"turn {turn}")
+        assert status == 200
+        replies.append(payload["replies"][-1])
+    finally:
+      writer.close()
+    return replies
+
+  async def run():
+    server, port = await _start(0.01, max_inflight=4)
+    try:
+      return await asyncio.gather(*(client(port, i) for i in range(8)))
+    finally:
+      await server.shutdown(timeout=5)
+
+  expected = [responses[turn % len(responses)] for turn in range(3)]
+  assert asyncio.run(run()) == [expected] * 8
+
+
+def test_rejects_with_503_when_queue_is_full():
+  async def one(port: int, session: int) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+      return (await _message(reader, writer, session, "hi"))[0]
+    finally:
+      writer.close()
+
+  async def run():
+    server, port = await _start(0.2, max_inflight=1, max_queue=2)
+    try:
+      return await asyncio.gather(*(one(port, i) for i in range(5)))
+    finally:
+      await server.shutdown(timeout=5)
+
+  statuses = asyncio.run(run())
+  assert statuses.count(200) == 2
+  assert statuses.count(503) == 3
+
+
+def test_rejects_malformed_content_length():
+  async def run():
+    server, port = await _start(0.0)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+      return await _request(
+          reader, writer, "/users/u/sessions/s/messages", b"{}", "abc"
+      )
+    finally:
+      writer.close()
+      await server.shutdown(timeout=5)
+
+  status, headers, _ = asyncio.run(run())
+  assert status == 400
+  assert headers["connection"] == "close"
+
+
+def test_shutdown_closes_idle_connections_and_drains_inflight():
+  async def run():
+    server, port = await _start(0.3)
+    idle_reader, idle_writer = await asyncio.open_connection("127.0.0.1", port)
+    status, headers, _ = await _message(idle_reader, idle_writer, 0, "hi")
+    assert status == 200 and headers["connection"] == "keep-alive"
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    inflight = asyncio.create_task(_message(reader, writer, 1, "hi"))
+    await asyncio.sleep(0.1)
+    # Idle keep-alive connections used to make wait_closed() hang on 3.12+.
+    await asyncio.wait_for(server.shutdown(timeout=5), timeout=5)
+    status, headers, _ = await inflight
+    idle_eof = await idle_reader.read() == b""
+    writer.close()
+    idle_writer.close()
+    return status, headers["connection"], idle_eof
+
+  assert asyncio.run(run()) == (200, "close", True)
+
+
+def test_idle_sessions_are_pruned_but_keep_their_conversation():
+  responses = FakeLlm().responses
+
+  async def run():
+    server, port = await _start(0.0, idle_seconds=0.05)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+      for session in range(3):
+        assert (await _message(reader, writer, session, "hi"))[0] == 200
+      await asyncio.sleep(0.1)
+      _, _, payload = await _message(reader, writer, 0, "painting")
+      sessions = server.stats["sessions"]
+      closed = await server.close_session("u1", "s1")
+      unknown = await server.close_session("u9", "s9")
+      return sessions, payload["replies"][-1], closed, unknown
+    finally:
+      writer.close()
+      await server.shutdown(timeout=5)
+
+  sessions, reply, closed, unknown = asyncio.run(run())
+  assert sessions == 1
+  # The pruned session still answers with its second turn.
+  assert reply == responses[1]
+  assert closed and not unknown
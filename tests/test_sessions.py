@@ -0,0 +1,108 @@
+"""Tests for the session backends and the console loop that uses them."""
+
+import asyncio
+import io
+import sqlite3
+
+import pytest
+
+pytest.importorskip("google.adk")
+
+from greeting_agent import cli  # noqa: E402
+from greeting_agent import sessions  # noqa: E402
+from greeting_agent.fake_llm import FakeLlm  # noqa: E402
+from greeting_agent.sessions import BoundedInMemorySessionService  # noqa: E402
+from greeting_agent.sessions import create_session_service  # noqa: E402
+
+_APP = "app"
+
+
+class _Clock:
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  clock = _Clock()
+  monkeypatch.setattr(sessions.time, "monotonic", clock)
+  return clock
+
+
+async def _create(service, *session_ids):
+  for session_id in session_ids:
+    await service.create_session(app_name=_APP, user_id="u", session_id=session_id)
+
+
+async def _exists(service, session_id):
+  session = await service.get_session(app_name=_APP, user_id="u", session_id=session_id)
+  return session is not None
+
+
+def test_idle_sessions_expire_after_ttl(clock):
+  service = BoundedInMemorySessionService(ttl_seconds=60)
+
+  async def run():
+    await _create(service, "old", "busy")
+    clock.now += 45
+    assert await _exists(service, "busy")
+    clock.now += 30
+    return await _exists(service, "old"), await _exists(service, "busy")
+
+  assert asyncio.run(run()) == (False, True)
+  assert service.evictions == 1
+
+
+def test_least_recently_used_sessions_go_past_the_cap(clock):
+  evicted = []
+  service = BoundedInMemorySessionService(
+      max_sessions=2, on_evict=lambda *key: evicted.append(key)
+  )
+
+  async def run():
+    await _create(service, "a")
+    clock.now += 1
+    await _create(service, "b")
+    clock.now += 1
+    assert await _exists(service, "a")
+    await _create(service, "c")
+    return [await _exists(service, name) for name in ("a", "b", "c")]
+
+  assert asyncio.run(run()) == [True, False, True]
+  assert evicted == [(_APP, "u", "b")]
+
+
+def test_sqlite_backend_uses_wal_and_survives_restarts(tmp_path):
+  pytest.importorskip("sqlalchemy")
+  db = tmp_path / "sessions.db"
+
+  async def run():
+    await _create(create_session_service("sqlite", db_path=db), "s")
+    return await _exists(create_session_service("sqlite", db_path=db), "s")
+
+  assert asyncio.run(run())
+  with sqlite3.connect(db) as connection:
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_console_loop_replies_until_exit(stream, monkeypatch, capsys, tmp_path):
+  monkeypatch.chdir(tmp_path)
+  monkeypatch.setenv("GOOGLE_API_KEY", "test")
+  create_agent = cli.create_greeting_agent
+  monkeypatch.setattr(
+      cli,
+      "create_greeting_agent",
+      lambda **kwargs: create_agent(**{**kwargs, "model": FakeLlm()}),
+  )
+  monkeypatch.setattr("sys.stdin", io.StringIO("hi\n\npainting\nexit\n"))
+
+  cli.run_cli(stream=stream)
+
+  output = capsys.readouterr().out
+  first, second = FakeLlm().responses[:2]
+  assert output.index(f"Agent: {first}") < output.index(f"Agent: {second}")
+  assert output.rstrip().endswith("Agent: Goodbye!")